@@ -1,6 +1,4 @@
 import os
-import shutil
-from datetime import datetime
 from pathlib import Path
 import sys
 
@@ -12,47 +10,35 @@ except ImportError:
     print("Error: No se pudo cargar config.py")
     sys.exit(1)
 
-MAX_SIZE_MB = 10
 MAX_HISTORY = 5
 
-def rotate_log(log_path_str):
+def audit_log(log_path_str):
+    """Informa del tamaño del log activo y sus copias. La rotación la hace services/log_sink.py."""
     log_path = Path(log_path_str)
     if not log_path.exists():
         print(f"Skipping {log_path.name}: File does not exist.")
-        return
+        return 0
 
     size_mb = log_path.stat().st_size / (1024 * 1024)
-    print(f"Checking {log_path.name} ({size_mb:.2f} MB)...")
+    rotated = sorted(log_path.parent.glob(f"{log_path.name}.[0-9]*"))
+    rotated_mb = sum(p.stat().st_size for p in rotated) / (1024 * 1024)
+    print(f"Checking {log_path.name}: {size_mb:.2f} MB activo, {len(rotated)} copias rotadas ({rotated_mb:.2f} MB)")
 
-    if size_mb > MAX_SIZE_MB:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        rotated_path = log_path.with_suffix(f".{timestamp}.log")
-        
+    # Copias con el formato antiguo de este script (file.YYYYMMDD_HHMMSS.log)
+    freed = 0
+    legacy_logs = sorted(
+        log_path.parent.glob(f"{log_path.stem}.*_*.log"),
+        key=os.path.getmtime,
+        reverse=True
+    )
+    for old_log in legacy_logs[MAX_HISTORY:]:
         try:
-            # Copy then truncate to avoid issues with open handles
-            shutil.copy(log_path, rotated_path)
-            with open(log_path, 'w') as f:
-                f.truncate(0)
-            print(f"✅ Rotated: {log_path.name} -> {rotated_path.name}")
-            
-            # Cleanup old logs
-            logs_dir = log_path.parent
-            pattern = f"{log_path.stem}.*.log"
-            history_logs = sorted(
-                list(logs_dir.glob(pattern)),
-                key=os.path.getmtime,
-                reverse=True
-            )
-            
-            if len(history_logs) > MAX_HISTORY:
-                for old_log in history_logs[MAX_HISTORY:]:
-                    old_log.unlink()
-                    print(f"🗑️ Deleted old history: {old_log.name}")
-                    
+            freed += old_log.stat().st_size
+            old_log.unlink()
+            print(f"🗑️ Deleted old history: {old_log.name}")
         except Exception as e:
-            print(f"❌ Error rotating {log_path.name}: {e}")
-    else:
-        print(f"  Steady: {log_path.name} is within limits.")
+            print(f"❌ Error deleting {old_log.name}: {e}")
+    return freed
 
 def main():
     print("--- BioEngine V3 Log Management ---")
@@ -62,9 +48,8 @@ def main():
         config.MODEL_FALLBACK_LOG
     ]
     
-    for l in logs_to_check:
-        rotate_log(l)
-    print("--- Maintenance Completed ---")
+    freed = sum(audit_log(l) for l in logs_to_check)
+    print(f"--- Maintenance Completed: {freed / (1024 * 1024):.2f} MB liberados ---")
 
 if __name__ == "__main__":
     main()
@@ -8,8 +8,20 @@ def calculate_equipment_usage():
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
-    cursor.execute("SELECT * FROM activities")
-    activities = cursor.fetchall()
+    # Clasificación precalculada (sport_label / sport_canonical, migración 0006)
+    cursor.execute("""
+        SELECT CASE
+                 WHEN sport_label = 'Trail Running' THEN 'Trail (Hoka/NB)'
+                 WHEN sport_canonical = 'running' THEN 'Running (Kayano/Brooks)'
+                 WHEN sport_canonical = 'cycling' THEN 'Ciclismo (Trek)'
+                 WHEN sport_canonical = 'tennis' THEN 'Tenis (Babolat)'
+               END AS cat,
+               SUM(COALESCE(distancia_km, 0)) AS km, COUNT(*) AS sesiones,
+               MIN(fecha) AS desde, MAX(fecha) AS hasta
+        FROM activities
+        WHERE cat IS NOT NULL
+        GROUP BY cat
+    """)
     
     stats = {
         "Running (Kayano/Brooks)": {"km": 0, "sesiones": 0, "desde": None, "hasta": None},
@@ -17,34 +29,23 @@ def calculate_equipment_usage():
         "Ciclismo (Trek)": {"km": 0, "sesiones": 0, "desde": None, "hasta": None},
         "Tenis (Babolat)": {"km": 0, "sesiones": 0, "desde": None, "hasta": None}
     }
-    
-    for act in activities:
-        tipo = act['tipo'].lower()
-        nombre = (act['nombre'] or "").lower()
-        dist = act['distancia_km'] or 0
-        elev = act['elevacion_m'] or 0
-        fecha = act['fecha']
-        
-        cat = None
-        if "trail" in tipo or "hiking" in tipo or "trail" in nombre or elev > 100:
-            cat = "Trail (Hoka/NB)"
-        elif "running" in tipo or "carrera" in tipo or "run" in tipo:
-            cat = "Running (Kayano/Brooks)"
-        elif "cycling" in tipo or "ciclismo" in tipo:
-            cat = "Ciclismo (Trek)"
-        elif "tenis" in tipo or "tennis" in tipo:
-            cat = "Tenis (Babolat)"
-
-        if cat:
-            stats[cat]["km"] += dist
-            stats[cat]["sesiones"] += 1
-            if not stats[cat]["desde"] or fecha < stats[cat]["desde"]: stats[cat]["desde"] = fecha
-            if not stats[cat]["hasta"] or fecha > stats[cat]["hasta"]: stats[cat]["hasta"] = fecha
+    for row in cursor.fetchall():
+        stats[row['cat']] = {k: row[k] for k in ("km", "sesiones", "desde", "hasta")}
 
     conn.close()
     return stats
 
+def gear_odometers():
+    """Odómetro por material desde el libro de material (tabla gear, migración 0007)."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute("SELECT name, base_km + km AS total_km, base_sessions + sessions AS total_sessions FROM gear ORDER BY category").fetchall()
+    conn.close()
+    return {r['name']: {"km": round(r['total_km'], 1), "sesiones": r['total_sessions']} for r in rows}
+
 if __name__ == "__main__":
     usage = calculate_equipment_usage()
     print("📊 REPORTE DE USO DE EQUIPAMIENTO (BioEngine DB):")
     print(json.dumps(usage, indent=2))
+    print("\n👟 ODÓMETRO POR MATERIAL:")
+    print(json.dumps(gear_odometers(), indent=2, ensure_ascii=False))
@@ -12,14 +12,14 @@ def audit():
     cur = conn.cursor()
     
     # Cycling
-    cur.execute("SELECT SUM(distancia_km), COUNT(*) FROM activities WHERE lower(tipo) IN ('cycling', 'ciclismo', 'bicicleta', 'bike')")
+    cur.execute("SELECT SUM(distancia_km), COUNT(*) FROM activities WHERE sport_canonical = 'cycling'")
     res = cur.fetchone()
     print(f"--- CYCLING AUDIT ---")
     print(f"Total KM in DB: {res[0]}")
     print(f"Total Sessions in DB: {res[1]}")
     
     # Last few cycling activities
-    cur.execute("SELECT fecha, nombre, distancia_km FROM activities WHERE lower(tipo) IN ('cycling', 'ciclismo', 'bicicleta', 'bike') ORDER BY fecha DESC LIMIT 5")
+    cur.execute("SELECT fecha, nombre, distancia_km FROM activities WHERE sport_canonical = 'cycling' ORDER BY fecha_ts DESC LIMIT 5")
     rows = cur.fetchall()
     print("\nRecent cycling activities:")
     for r in rows:
@@ -19,7 +19,54 @@ if not CONTEXT_BASE_PATH.exists():
 # Database
 DB_DIR = BASE_DIR / "db"
 DB_DIR.mkdir(exist_ok=True)
-DB_PATH = str(DB_DIR / "bioengine_v3.db")
+DB_PATH = os.getenv("BIOENGINE_DB_PATH", str(DB_DIR / "bioengine_v3.db"))
+# Series por segundo de cada actividad (.npy mapeados en memoria, ver services/activity_streams.py)
+STREAMS_DIR = Path(os.getenv("BIOENGINE_STREAMS_DIR", str(DB_DIR / "streams")))
+
+# SQLite connection pool (ver services/db_pool.py)
+DB_POOL_SIZE = int(os.getenv("BIOENGINE_DB_POOL_SIZE", "16"))
+DB_POOL_TIMEOUT_S = float(os.getenv("BIOENGINE_DB_POOL_TIMEOUT_S", "30"))
+DB_CACHE_SIZE_KB = int(os.getenv("BIOENGINE_DB_CACHE_SIZE_KB", "32768"))
+DB_MMAP_SIZE_MB = int(os.getenv("BIOENGINE_DB_MMAP_SIZE_MB", "256"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("BIOENGINE_DB_BUSY_TIMEOUT_MS", "5000"))
+# Hilos dedicados a SQLite para los endpoints async (acotado por el tamaño del pool)
+DB_EXECUTOR_WORKERS = int(os.getenv("BIOENGINE_DB_EXECUTOR_WORKERS", "8"))
+
+# Zona horaria del atleta: las fechas sin zona se interpretan en ella (fecha_ts / fecha_local)
+LOCAL_TIMEZONE = os.getenv("BIOENGINE_TZ", "America/Montevideo")
+
+# Deduplicación entre fuentes (ver services/dedup.py): ventana de inicio y
+# prioridad de fuentes (la primera que aparezca en `fuente` gana)
+DEDUP_WINDOW_S = int(os.getenv("BIOENGINE_DEDUP_WINDOW_S", "900"))
+DEDUP_SOURCE_PRIORITY = tuple(
+    s.strip().lower() for s in os.getenv("BIOENGINE_DEDUP_SOURCE_PRIORITY", "garmin,runkeeper,strava,apple").split(",") if s.strip()
+)
+
+# HTTP de proveedores (Withings, ...; ver services/provider_http.py)
+PROVIDER_HTTP_CONNECT_TIMEOUT_S = float(os.getenv("BIOENGINE_PROVIDER_CONNECT_TIMEOUT_S", "5"))
+PROVIDER_HTTP_READ_TIMEOUT_S = float(os.getenv("BIOENGINE_PROVIDER_READ_TIMEOUT_S", "30"))
+PROVIDER_HTTP_RETRIES = int(os.getenv("BIOENGINE_PROVIDER_HTTP_RETRIES", "3"))
+PROVIDER_HTTP_BACKOFF_S = float(os.getenv("BIOENGINE_PROVIDER_HTTP_BACKOFF_S", "0.5"))
+PROVIDER_HTTP_POOL_SIZE = int(os.getenv("BIOENGINE_PROVIDER_HTTP_POOL_SIZE", "8"))
+
+# Backfill por ventanas (SyncService): días por petición y peticiones simultáneas por proveedor
+SYNC_WINDOW_DAYS = int(os.getenv("BIOENGINE_SYNC_WINDOW_DAYS", "30"))
+SYNC_PROVIDER_CONCURRENCY = {
+    "garmin": int(os.getenv("BIOENGINE_SYNC_GARMIN_CONCURRENCY", "2")),
+    "withings": int(os.getenv("BIOENGINE_SYNC_WITHINGS_CONCURRENCY", "3")),
+}
+
+# Sincronización programada (services/sync_scheduler.py). Intervalo base, intervalo
+# en las horas habituales de entrenamiento y tope del backoff cuando no hay nada nuevo.
+# SYNC_TRAINING_HOURS ("7,8,19") fija esas horas; vacío = se deducen del historial.
+# Desactivado por defecto: sincroniza con cuentas reales sin que nadie lo pida.
+SYNC_SCHEDULER_ENABLED = os.getenv("BIOENGINE_SYNC_SCHEDULER", "0").lower() in ("1", "true", "yes")
+SYNC_INTERVAL_S = float(os.getenv("BIOENGINE_SYNC_INTERVAL_S", "3600"))
+SYNC_ACTIVE_INTERVAL_S = float(os.getenv("BIOENGINE_SYNC_ACTIVE_INTERVAL_S", "900"))
+SYNC_MAX_INTERVAL_S = float(os.getenv("BIOENGINE_SYNC_MAX_INTERVAL_S", str(6 * 3600)))
+SYNC_TRAINING_HOURS = tuple(
+    int(h) for h in os.getenv("BIOENGINE_SYNC_TRAINING_HOURS", "").split(",") if h.strip()
+)
 
 # Security
 ADMIN_TOKEN = os.getenv("BIOENGINE_ADMIN_TOKEN", "bioengine-local")
@@ -28,9 +75,36 @@ ADMIN_TOKEN = os.getenv("BIOENGINE_ADMIN_TOKEN", "bioengine-local")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Salud de modelos LLM (services/model_health.py): ventana de la tasa de error,
+# fallos seguidos o tasa que abren el circuito, y enfriamiento (se duplica si
+# la prueba en half-open vuelve a fallar, hasta el máximo)
+LLM_HEALTH_WINDOW = int(os.getenv("BIOENGINE_LLM_HEALTH_WINDOW", "20"))
+LLM_BREAKER_FAILURES = int(os.getenv("BIOENGINE_LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("BIOENGINE_LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("BIOENGINE_LLM_BREAKER_COOLDOWN_S", "30"))
+LLM_BREAKER_MAX_COOLDOWN_S = float(os.getenv("BIOENGINE_LLM_BREAKER_MAX_COOLDOWN_S", "600"))
+# Una latencia medida hace más de esto deja de ordenar: el modelo vuelve a su
+# prioridad y se re-mide en la siguiente llamada
+LLM_LATENCY_TTL_S = float(os.getenv("BIOENGINE_LLM_LATENCY_TTL_S", "900"))
+# Hedging del chat en streaming (opt-in): si el modelo principal no da su primer
+# token dentro del percentil LLM_HEDGE_PERCENTILE de su TTFT reciente (o de
+# LLM_HEDGE_DELAY_S sin historial), se lanza en paralelo otro modelo gratuito
+LLM_HEDGE_ENABLED = os.getenv("BIOENGINE_LLM_HEDGE", "0").lower() in ("1", "true", "yes")
+LLM_HEDGE_PERCENTILE = float(os.getenv("BIOENGINE_LLM_HEDGE_PERCENTILE", "90"))
+LLM_HEDGE_DELAY_S = float(os.getenv("BIOENGINE_LLM_HEDGE_DELAY_S", "2.0"))
+# Permisos de CostControl cacheados en memoria (se invalidan al habilitar/deshabilitar)
+COST_CONTROL_CACHE_TTL_S = float(os.getenv("BIOENGINE_COST_CONTROL_CACHE_TTL_S", "10"))
+
 # Logging
 LOG_DIR = BASE_DIR / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 LOG_FILE = str(LOG_DIR / "bioengine_v3.log")
 AI_DEBUG_LOG = str(LOG_DIR / "ai_service_debug.log")
 MODEL_FALLBACK_LOG = str(LOG_DIR / "ai_model_fallback.log")
+
+# Sink de logs en segundo plano (ver services/log_sink.py)
+LOG_MAX_BYTES = int(os.getenv("BIOENGINE_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("BIOENGINE_LOG_BACKUP_COUNT", "5"))
+LOG_BATCH_SIZE = int(os.getenv("BIOENGINE_LOG_BATCH_SIZE", "100"))
+LOG_FLUSH_INTERVAL_S = float(os.getenv("BIOENGINE_LOG_FLUSH_INTERVAL_S", "1.0"))
+LOG_QUEUE_SIZE = int(os.getenv("BIOENGINE_LOG_QUEUE_SIZE", "10000"))
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends, HTTPException, Header, Request
+from fastapi import FastAPI, Depends, HTTPException, Header, Request, Query
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import sqlite3
@@ -9,16 +9,71 @@ from typing import List, Optional
 from pydantic import BaseModel, ValidationError
 from datetime import datetime
 from services.sync_service import SyncService
+from services.sync_jobs import SyncJobConflict, SyncJobManager
+from services.sync_scheduler import SyncScheduler
+from services.data_events import subscribe as subscribe_data_changed
+from services.provider_http import close_http_sessions
+from services.llm_clients import aclose_llm_clients
+from services.model_health import get_model_health
 from services.ai_service import AIService
 from services.hitl_service import get_hitl_service, ActionSeverity
 from services.coach_logic import AdaptiveCoach
-
-from config import DB_PATH, ADMIN_TOKEN
+from services.db_pool import get_db_pool, get_connection, run_db, close_db_pools, shutdown_db_executor
+from services.pagination import keyset_page, InvalidCursorError
+from services.activity_frame import get_activity_frame
+from services.log_sink import get_log_sink, close_log_sinks
+from services.training_load import get_training_load_service
+from services.equipment import get_equipment_service, GEAR_CATEGORIES
+from services.activity_streams import CHANNELS as STREAM_CHANNELS, read_range, stream_info
+from services.datetime_normalizer import backfill_normalized_columns, refresh_tz_offsets
+from migrations import run_migrations
+
+from config import ADMIN_TOKEN, LOCAL_TIMEZONE, SYNC_SCHEDULER_ENABLED
 
 app = FastAPI(title="BioEngine V3 API")
+
 sync_service = SyncService()
+sync_jobs = SyncJobManager({"garmin": sync_service.sync_garmin, "withings": sync_service.sync_withings})
+sync_scheduler = SyncScheduler(sync_jobs)
 ai_service = AIService()
 hitl_service = get_hitl_service()
+# Datos nuevos (sync manual o programado): el análisis cacheado deja de valer
+subscribe_data_changed(lambda event: ai_service.invalidate_analysis_cache())
+
+@app.on_event("startup")
+def prepare_database() -> None:
+    # Primer hook de arranque: esquema al día antes de que nada lea la DB
+    applied = run_migrations()
+    if applied:
+        print(f"[DB] Migraciones aplicadas: {applied}")
+
+    # Filas insertadas por scripts que no rellenan fecha_ts / fecha_local
+    with get_connection() as conn:
+        if refresh_tz_offsets(conn):
+            print(f"[DB] tz_offsets regenerada para {LOCAL_TIMEZONE}")
+        backfilled = backfill_normalized_columns(conn)
+        conn.commit()
+    if backfilled:
+        print(f"[DB] Fechas normalizadas: {backfilled} filas")
+
+@app.on_event("startup")
+def load_activity_frame() -> None:
+    get_activity_frame().load()
+
+@app.on_event("startup")
+async def start_sync_scheduler() -> None:
+    if SYNC_SCHEDULER_ENABLED:
+        sync_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_db_pools() -> None:
+    await sync_scheduler.stop()
+    sync_jobs.shutdown()
+    close_http_sessions()
+    await aclose_llm_clients()
+    shutdown_db_executor()
+    close_db_pools()
+    close_log_sinks()
 
 # Habilitar CORS
 app.add_middleware(
@@ -29,27 +84,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Log de peticiones de las sesiones de prueba: solo si existe log_temp/ al arrancar
+_request_log_dir = os.path.join(os.getcwd(), "log_temp")
+_request_log = os.path.join(_request_log_dir, "test_sessions.log") if os.path.isdir(_request_log_dir) else None
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
     response = await call_next(request)
     duration = time.time() - start_time
     
-    log_entry = {
-        "timestamp": datetime.now().isoformat(),
-        "method": request.method,
-        "path": request.url.path,
-        "status": response.status_code,
-        "duration": f"{duration:.4f}s"
-    }
-    
-    try:
-        log_dir = os.path.join(os.getcwd(), "log_temp")
-        if os.path.exists(log_dir):
-            with open(os.path.join(log_dir, "test_sessions.log"), "a", encoding="utf-8") as f:
-                f.write(json.dumps(log_entry) + "\n")
-    except Exception:
-        pass # Don't block requests if logging fails
+    if _request_log is not None:
+        log_entry = {
+            "timestamp": datetime.now().isoformat(),
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "duration": f"{duration:.4f}s"
+        }
+        # Solo encola: la escritura a disco la hace el hilo del sink
+        get_log_sink(_request_log).write(json.dumps(log_entry))
             
     return response
 
@@ -67,6 +121,8 @@ class Activity(BaseModel):
     elevacion_m: Optional[float]
     cadencia_media: Optional[float]
     fuente: Optional[str]
+    sport_canonical: Optional[str] = None
+    sport_label: Optional[str] = None
 
 class Biometric(BaseModel):
     fecha: str
@@ -74,6 +130,14 @@ class Biometric(BaseModel):
     grasa_pct: Optional[float]
     masa_muscular_kg: Optional[float]
 
+class ActivityPage(BaseModel):
+    items: List[Activity]
+    next_cursor: Optional[str] = None
+
+class BiometricPage(BaseModel):
+    items: List[Biometric]
+    next_cursor: Optional[str] = None
+
 class LogEntry(BaseModel):
     event_type: str
     description: str
@@ -85,12 +149,14 @@ class ChatRequest(BaseModel):
 
 # Dependencia de DB
 def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+    # acquire/release explícitos: FastAPI puede ejecutar la entrada y la salida
+    # de esta dependencia en hilos distintos del threadpool.
+    pool = get_db_pool()
+    conn = pool.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
 
 def verify_admin_token(x_admin_token: str = Header(None)) -> bool:
     token = ADMIN_TOKEN
@@ -109,13 +175,46 @@ def read_root() -> dict:
     return {"status": "BioEngine V3 API Operational", "version": "3.1.0-v4.2"}
 
 @app.post("/sync/all")
-def trigger_sync(_: bool = Depends(verify_admin_token)) -> dict:
-    res_garmin = sync_service.sync_garmin()
-    res_withings = sync_service.sync_withings()
-    return {
-        "garmin": res_garmin,
-        "withings": res_withings
-    }
+def trigger_sync(wait: bool = False, _: bool = Depends(verify_admin_token)) -> dict:
+    """
+    Lanza Garmin y Withings en paralelo y responde al instante con el id del
+    trabajo; el progreso se sigue en /sync/jobs/{job_id}/events (SSE). Con
+    `wait=true` espera y devuelve los resultados por proveedor (respuesta previa).
+    """
+    try:
+        job = sync_jobs.start()
+    except SyncJobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if wait:
+        job.wait()
+        return dict(job.results)
+    return {**job.snapshot(), "events_url": f"/sync/jobs/{job.id}/events"}
+
+@app.get("/sync/schedule")
+def get_sync_schedule() -> dict:
+    """Estado del sync programado: próxima ejecución, backoff y horas activas."""
+    return {"enabled": SYNC_SCHEDULER_ENABLED, **sync_scheduler.status()}
+
+@app.get("/sync/jobs/{job_id}")
+def get_sync_job(job_id: str) -> dict:
+    job = sync_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo de sincronización no encontrado")
+    return job.snapshot()
+
+@app.get("/sync/jobs/{job_id}/events")
+async def stream_sync_job(job_id: str):
+    """Server-Sent Events con el progreso del trabajo; termina con el evento `done`."""
+    job = sync_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo de sincronización no encontrado")
+
+    async def events():
+        async for event in job.stream():
+            yield f"id: {event['seq']}\nevent: {event['stage']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.get("/coach-analysis")
 async def get_coach_analysis() -> dict:
@@ -127,83 +226,94 @@ async def chat_endpoint(req: ChatRequest) -> dict:
     return {"response": response}
 
 @app.get("/plans")
-async def get_plans(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.execute("SELECT * FROM training_plans ORDER BY start_date DESC")
-    return [dict(row) for row in cursor.fetchall()]
+async def get_plans():
+    def _load_plans() -> List[dict]:
+        with get_connection() as conn:
+            return [dict(row) for row in conn.execute("SELECT * FROM training_plans ORDER BY start_date DESC").fetchall()]
 
-@app.post("/plans/generate")
-async def generate_plan(db: sqlite3.Connection = Depends(get_db)):
+    return await run_db(_load_plans)
+
+def _generate_plan_sync() -> dict:
     # 1. Obtener contexto para Triage
     from services.context_manager import ContextManager
     ctx = ContextManager()
     weight_log = ctx.get_biometrics_history(days=30)
     pain_log = ctx.get_pain_history(days=30)
-    activities = ctx.get_activity_history(days=30)
-    
-    # 2. Obtener plan previo si existe
-    last_plan_row = db.execute("SELECT * FROM training_plans ORDER BY end_date DESC LIMIT 1").fetchone()
-    last_plan = dict(last_plan_row) if last_plan_row else None
-    if last_plan:
-        last_plan['sessions'] = json.loads(last_plan['content']).get('sessions', [])
-
-    # 3. Usar CoachLogic para generar
-    coach = AdaptiveCoach(athlete_profile={}) # Perfil se sacaría de DB en real
-    status = coach.analyze_status(weight_log, pain_log, activities)
-    new_plan = coach.generate_adaptive_plan(status, last_plan)
+    load = get_training_load_service().acute_chronic_km()
     
-    # 4. Persistir en DB
-    db.execute(
-        "INSERT INTO training_plans (start_date, end_date, status, title, content, evaluation) VALUES (?, ?, ?, ?, ?, ?)",
-        (str(new_plan.start_date), str(new_plan.end_date), "active", "Plan Adaptativo SOTA 2026", new_plan.json(), "")
-    )
-    db.commit()
+    with get_connection() as db:
+        # 2. Obtener plan previo si existe
+        last_plan_row = db.execute("SELECT * FROM training_plans ORDER BY end_date DESC LIMIT 1").fetchone()
+        last_plan = dict(last_plan_row) if last_plan_row else None
+        if last_plan:
+            last_plan['sessions'] = json.loads(last_plan['content']).get('sessions', [])
+
+        # 3. Usar CoachLogic para generar
+        coach = AdaptiveCoach(athlete_profile={}) # Perfil se sacaría de DB en real
+        status = coach.analyze_status(weight_log, pain_log, [], load=load)
+        new_plan = coach.generate_adaptive_plan(status, last_plan)
+        
+        # 4. Persistir en DB
+        db.execute(
+            "INSERT INTO training_plans (start_date, end_date, status, title, content, evaluation) VALUES (?, ?, ?, ?, ?, ?)",
+            (str(new_plan.start_date), str(new_plan.end_date), "active", "Plan Adaptativo SOTA 2026", new_plan.json(), "")
+        )
+        db.commit()
     
     return {"status": "success", "plan": new_plan}
 
-@app.post("/plans/{plan_id}/evaluate")
-async def evaluate_plan(plan_id: int, db: sqlite3.Connection = Depends(get_db)):
-    # 1. Obtener el plan a evaluar
-    plan_row = db.execute("SELECT * FROM training_plans WHERE id = ?", (plan_id,)).fetchone()
-    if not plan_row:
-        raise HTTPException(status_code=404, detail="Plan no encontrado")
-    
-    plan_dict = dict(plan_row)
-    
-    # 2. Obtener actividades del periodo del plan
-    from services.context_manager import ContextManager
-    ctx = ContextManager()
-    activities = ctx.get_activity_history(days=30)  # Simplificado, idealmente filtrar por fechas del plan
-    
-    # 3. Evaluar rendimiento
-    coach = AdaptiveCoach(athlete_profile={})
-    evaluation = coach.evaluate_performance(plan_dict['content'], activities)
-    
-    # 4. Actualizar el plan con la evaluación
-    db.execute(
-        "UPDATE training_plans SET evaluation = ?, status = ? WHERE id = ?",
-        (json.dumps(evaluation), "completed", plan_id)
-    )
-    db.commit()
+@app.post("/plans/generate")
+async def generate_plan():
+    return await run_db(_generate_plan_sync)
+
+def _evaluate_plan_sync(plan_id: int) -> dict:
+    with get_connection() as db:
+        # 1. Obtener el plan a evaluar
+        plan_row = db.execute("SELECT * FROM training_plans WHERE id = ?", (plan_id,)).fetchone()
+        if not plan_row:
+            raise HTTPException(status_code=404, detail="Plan no encontrado")
+        
+        plan_dict = dict(plan_row)
+        
+        # 2. Obtener actividades del periodo del plan
+        from services.context_manager import ContextManager
+        ctx = ContextManager()
+        activities = ctx.get_activity_history(days=30)  # Simplificado, idealmente filtrar por fechas del plan
+        
+        # 3. Evaluar rendimiento
+        coach = AdaptiveCoach(athlete_profile={})
+        evaluation = coach.evaluate_performance(plan_dict['content'], activities)
+        
+        # 4. Actualizar el plan con la evaluación
+        db.execute(
+            "UPDATE training_plans SET evaluation = ?, status = ? WHERE id = ?",
+            (json.dumps(evaluation), "completed", plan_id)
+        )
+        db.commit()
     
     return {"status": "success", "evaluation": evaluation}
 
+@app.post("/plans/{plan_id}/evaluate")
+async def evaluate_plan(plan_id: int):
+    return await run_db(_evaluate_plan_sync, plan_id)
+
 class PainLogRequest(BaseModel):
     level: int  # 0-10
     location: str = "Rodilla Derecha"
     notes: str = ""
 
 @app.post("/pain")
-async def log_pain(req: PainLogRequest, db: sqlite3.Connection = Depends(get_db)):
+async def log_pain(req: PainLogRequest):
     from services.context_manager import ContextManager
     ctx = ContextManager()
-    ctx.log_pain(req.level, f"{req.location}: {req.notes}")
+    await run_db(ctx.log_pain, req.level, f"{req.location}: {req.notes}")
     return {"status": "success", "message": f"Dolor nivel {req.level} registrado correctamente"}
 
 @app.get("/pain/history")
-async def get_pain_history(limit: int = 10, db: sqlite3.Connection = Depends(get_db)):
+async def get_pain_history(limit: int = 10):
     from services.context_manager import ContextManager
     ctx = ContextManager()
-    history = ctx.get_pain_history(limit=limit)
+    history = await run_db(ctx.get_pain_history, limit=limit)
     return {"status": "success", "history": history}
 
 @app.post("/chat/stream")
@@ -251,6 +361,11 @@ def get_chat_status():
         return ai_service.multi_model_client.get_current_model_info()
     return {"description": "Gemini 3 Pro (Standard)"}
 
+@app.get("/chat/models/health")
+def get_models_health() -> dict:
+    """Salud por modelo LLM: estado del circuito, tasa de error y latencia EWMA."""
+    return get_model_health().snapshot()
+
 @app.post("/logs")
 def create_log(entry: LogEntry, db: sqlite3.Connection = Depends(get_db)) -> dict:
     cursor = db.cursor()
@@ -268,88 +383,135 @@ def get_logs(limit: int = 50, db: sqlite3.Connection = Depends(get_db)) -> List[
     rows = cursor.fetchall()
     return [dict(row) for row in rows]
 
-@app.get("/activities", response_model=List[Activity])
-def get_activities(limit: int = 2000, skip: int = 0, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("""
-        SELECT id, fecha, tipo, nombre, distancia_km, duracion_min, calorias, 
-               fc_media, fc_max, elevacion_m, cadencia_media, fuente 
-        FROM activities 
-        ORDER BY fecha DESC 
-        LIMIT ? OFFSET ?
-    """, (limit, skip))
-    rows = cursor.fetchall()
-    return [dict(row) for row in rows]
-
-@app.get("/biometrics", response_model=List[Biometric])
-def get_biometrics(limit: int = 1000, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT fecha, peso, grasa_pct, masa_muscular_kg FROM biometrics ORDER BY fecha DESC LIMIT ?", (limit,))
-    rows = cursor.fetchall()
-    return [dict(row) for row in rows]
+ACTIVITY_COLUMNS = ("id", "fecha", "tipo", "nombre", "distancia_km", "duracion_min", "calorias",
+                    "fc_media", "fc_max", "elevacion_m", "cadencia_media", "fuente",
+                    "sport_canonical", "sport_label")
+BIOMETRIC_COLUMNS = ("fecha", "peso", "grasa_pct", "masa_muscular_kg")
+
+@app.get("/activities", response_model=ActivityPage)
+def get_activities(
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    tipo: Optional[str] = None,
+    sport: Optional[str] = None,
+    db: sqlite3.Connection = Depends(get_db),
+):
+    """
+    Actividades paginadas por cursor sobre (fecha_ts, id), de la más reciente a la
+    más antigua. `from`/`to` acotan por fecha (inclusivos), `tipo` filtra por el
+    tipo crudo sin distinguir mayúsculas y `sport` por deporte canónico
+    (running, trail, cycling...). Para la página siguiente, pasar `next_cursor` como `cursor`.
+    """
+    filters = []
+    if tipo:
+        filters.append(("LOWER(tipo) = ?", tipo.lower()))
+    if sport:
+        filters.append(("sport_canonical = ?", sport.lower()))
+    try:
+        items, next_cursor = keyset_page(db, "activities", ACTIVITY_COLUMNS, limit, cursor, date_from, date_to, filters)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/biometrics", response_model=BiometricPage)
+def get_biometrics(
+    limit: int = Query(1000, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    db: sqlite3.Connection = Depends(get_db),
+):
+    """Biometría paginada por cursor sobre (fecha_ts, id); mismos parámetros que /activities."""
+    try:
+        items, next_cursor = keyset_page(db, "biometrics", BIOMETRIC_COLUMNS, limit, cursor, date_from, date_to)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
 
 @app.get("/equipment")
-def get_equipment(db: sqlite3.Connection = Depends(get_db)) -> dict:
+def get_equipment() -> dict:
     """
-    Returns equipment info from equipamiento.md with dynamic km calculations.
+    Inventario (equipamiento.md), estadísticas por deporte y odómetro de cada
+    material. Se sirve desde caché; solo se recalcula tras un sync o una edición de material.
     """
+    return get_equipment_service().snapshot()
+
+class GearRequest(BaseModel):
+    slug: str
+    name: str
+    category: str  # road | trail | cycling | tennis
+    since: Optional[str] = None
+    retired_on: Optional[str] = None
+    base_km: float = 0
+    base_sessions: int = 0
+    match_name: Optional[str] = None
+    max_km: Optional[float] = None
+    races: bool = True
+    priority: int = 0
+
+class GearUpdateRequest(BaseModel):
+    name: Optional[str] = None
+    since: Optional[str] = None
+    retired_on: Optional[str] = None
+    base_km: Optional[float] = None
+    base_sessions: Optional[int] = None
+    match_name: Optional[str] = None
+    max_km: Optional[float] = None
+    races: Optional[bool] = None
+    priority: Optional[int] = None
+
+class GearAssignRequest(BaseModel):
+    gear: Optional[str] = None  # slug; None = asignación automática
+
+@app.post("/equipment/gear")
+async def add_gear(req: GearRequest, _: bool = Depends(verify_admin_token)) -> dict:
+    if req.category not in GEAR_CATEGORIES:
+        raise HTTPException(status_code=400, detail=f"Categoría inválida: {req.category}")
     try:
-        # Read equipamiento.md
-        equipment_path = r"c:\BioEngine_V3\BioEngine_V3_Contexto_Base\equipamiento.md"
-        with open(equipment_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Calculate km by activity type from database
-        cursor = db.cursor()
-        
-        # Running asfalto
-        cursor.execute("""
-            SELECT SUM(distancia_km) as total_km 
-            FROM activities 
-            WHERE LOWER(tipo) IN ('carrera', 'running', 'run', 'correr')
-            AND fecha >= '2024-01-01'
-        """)
-        training_km = cursor.fetchone()['total_km'] or 0
-        
-        # Trail/Trekking
-        cursor.execute("""
-            SELECT SUM(distancia_km) as total_km 
-            FROM activities 
-            WHERE LOWER(tipo) IN ('trail', 'trekking', 'hiking', 'montaña')
-            AND fecha >= '2024-01-01'
-        """)
-        trail_km = cursor.fetchone()['total_km'] or 0
-        
-        # Bicicleta
-        cursor.execute("""
-            SELECT SUM(distancia_km) as total_km 
-            FROM activities 
-            WHERE LOWER(tipo) IN ('ciclismo', 'bicicleta', 'cycling', 'bike')
-            AND fecha >= '2024-06-15'
-        """)
-        bike_km = cursor.fetchone()['total_km'] or 0
-        
-        # Tenis (count sessions)
-        cursor.execute("""
-            SELECT COUNT(*) as sessions 
-            FROM activities 
-            WHERE LOWER(tipo) IN ('tenis', 'tennis')
-            AND fecha >= '2024-01-01'
-        """)
-        tennis_sessions = cursor.fetchone()['sessions'] or 0
-        
-        return {
-            "markdown_content": content,
-            "stats": {
-                "training_km": round(training_km, 1),
-                "trail_km": round(trail_km, 1),
-                "bike_km": round(bike_km, 1),
-                "bike_km_total": round(2450 + bike_km, 1),  # Base km desde compra
-                "tennis_sessions": tennis_sessions
-            }
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error reading equipment: {str(e)}")
+        gear = await run_db(get_equipment_service().add_gear, req.model_dump())
+    except sqlite3.IntegrityError:
+        raise HTTPException(status_code=409, detail=f"Ya existe material '{req.slug}'")
+    return {"status": "success", "gear": gear}
+
+@app.patch("/equipment/gear/{slug}")
+async def update_gear(slug: str, req: GearUpdateRequest, _: bool = Depends(verify_admin_token)) -> dict:
+    gear = await run_db(get_equipment_service().update_gear, slug, req.model_dump(exclude_unset=True))
+    if gear is None:
+        raise HTTPException(status_code=404, detail="Material no encontrado")
+    return {"status": "success", "gear": gear}
+
+@app.put("/activities/{activity_id}/gear")
+async def assign_activity_gear(activity_id: int, req: GearAssignRequest, _: bool = Depends(verify_admin_token)) -> dict:
+    if not await run_db(get_equipment_service().assign_activity, activity_id, req.gear):
+        raise HTTPException(status_code=404, detail="Actividad o material no encontrado")
+    return {"status": "success"}
+
+@app.get("/activities/{activity_id}/streams")
+def get_activity_streams(
+    activity_id: int,
+    start: int = Query(0, ge=0),
+    end: Optional[int] = Query(None, ge=0),
+    channels: Optional[str] = None,
+    db: sqlite3.Connection = Depends(get_db),
+) -> dict:
+    """
+    Series por segundo (importadas de FIT/GPX/TCX) en el tramo [start, end) en
+    segundos desde el inicio. `channels` es una lista separada por comas
+    (hr, cadence, speed, altitude, distance); por defecto, todas.
+    """
+    names = [c.strip() for c in channels.split(",") if c.strip()] if channels else list(STREAM_CHANNELS)
+    try:
+        views = read_range(db, activity_id, start, end, names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if views is None:
+        raise HTTPException(status_code=404, detail="La actividad no tiene series")
+    info = stream_info(db, activity_id)
+    # NaN (sin dato) -> null en el JSON
+    series = {name: [None if v != v else v for v in view.tolist()] for name, view in views.items()}
+    return {"activity_id": activity_id, "start_ts": info.start_ts + start, "samples": info.samples, "series": series}
 
 if __name__ == "__main__":
     import uvicorn
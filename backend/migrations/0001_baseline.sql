@@ -0,0 +1,127 @@
+-- 0001: esquema base de BioEngine V3 (tal como existe en db/bioengine_v3.db).
+-- Todas las sentencias son IF NOT EXISTS: en una base de datos existente solo
+-- registra la versión; en una vacía crea las tablas.
+
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha DATETIME,
+    tipo TEXT,
+    distancia_km REAL,
+    duracion_min REAL,
+    calorias REAL,
+    fc_media INTEGER,
+    fc_max INTEGER,
+    elevacion_m REAL,
+    cadencia_media INTEGER,
+    calzado TEXT,
+    evento_nombre TEXT,
+    stress_score REAL,
+    fuente TEXT,
+    nombre TEXT
+);
+
+CREATE TABLE IF NOT EXISTS biometrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha DATETIME,
+    peso REAL,
+    grasa_pct REAL,
+    masa_muscular_kg REAL,
+    fuente TEXT
+);
+
+CREATE TABLE IF NOT EXISTS user_context (
+    key TEXT PRIMARY KEY,
+    value_json TEXT,
+    updated_at DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS secrets (
+    service TEXT PRIMARY KEY,
+    credentials_json TEXT,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS sync_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    service TEXT,
+    status TEXT,
+    message TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS system_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_type TEXT,
+    description TEXT,
+    data_json TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS api_keys (
+    provider TEXT PRIMARY KEY,
+    api_key TEXT NOT NULL,
+    enabled INTEGER DEFAULT 1,
+    priority INTEGER DEFAULT 99,
+    last_used TEXT,
+    error_count INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS model_cost_config (
+    provider TEXT PRIMARY KEY,
+    cost_type TEXT NOT NULL,  -- 'free', 'free_tier', 'paid'
+    enabled_by_default INTEGER DEFAULT 0,
+    allow_usage INTEGER DEFAULT 0,  -- 0=bloqueado, 1=permitido temporalmente, 2=siempre permitido
+    usage_count INTEGER DEFAULT 0,
+    estimated_cost_usd REAL DEFAULT 0.0,
+    last_used TEXT,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS evolutionary_memory (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    lesson TEXT NOT NULL,
+    context TEXT,
+    source TEXT DEFAULT 'chat',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS pain_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    location TEXT DEFAULT 'Rodilla Derecha',
+    notes TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS training_plans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    status TEXT,
+    title TEXT,
+    content TEXT,
+    evaluation TEXT,
+    feedback_score INTEGER,
+    next_plan_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS hitl_actions (
+    action_id TEXT PRIMARY KEY,
+    action_type TEXT NOT NULL,
+    description TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    proposed_changes TEXT NOT NULL,
+    reasoning TEXT,
+    risks TEXT,
+    benefits TEXT,
+    status TEXT DEFAULT 'pending',
+    created_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    approved_at TEXT,
+    approved_by TEXT,
+    rejection_reason TEXT
+);
@@ -0,0 +1,29 @@
+-- 0002: índices secundarios para los accesos calientes.
+-- Ver scripts/bench_indexes.py para planes de consulta y tiempos.
+
+-- /activities, _get_user_context, get_coach_analysis, db://activities/recent:
+--   ORDER BY fecha DESC LIMIT n  -> recorrido inverso del índice, sin TEMP B-TREE.
+-- Paginación por cursor (keyset) de /activities: el índice sobre (fecha) lleva
+--   implícito el rowid como sufijo, así que ORDER BY fecha DESC, id DESC y
+--   WHERE (fecha, id) < (?, ?) se resuelven recorriéndolo sin ordenación extra.
+-- SyncService.sync_garmin:
+--   WHERE fecha = ? AND tipo = ?  -> búsqueda por fecha (pocas filas por fecha).
+--   MAX(fecha) WHERE fuente LIKE '%Garmin%'  -> el LIKE con comodín inicial no
+--   admite búsqueda, pero el planificador recorre este índice desde el final y
+--   se detiene en la primera fila Garmin, en vez de leer la tabla entera.
+-- (La versión 0003 quedó integrada aquí: no hay fichero 0003.)
+CREATE INDEX IF NOT EXISTS idx_activities_fecha ON activities (fecha);
+
+-- /biometrics, get_coach_analysis: ORDER BY fecha DESC LIMIT n;
+-- sync_withings: WHERE fecha = ? y MAX(fecha) WHERE fuente LIKE '%Withings%'.
+CREATE INDEX IF NOT EXISTS idx_biometrics_fecha ON biometrics (fecha);
+
+-- ContextManager / get_coach_analysis: ORDER BY created_at DESC LIMIT n.
+CREATE INDEX IF NOT EXISTS idx_pain_logs_created_at ON pain_logs (created_at);
+CREATE INDEX IF NOT EXISTS idx_evolutionary_memory_created_at ON evolutionary_memory (created_at);
+
+-- /logs: ORDER BY timestamp DESC LIMIT n.
+CREATE INDEX IF NOT EXISTS idx_system_logs_timestamp ON system_logs (timestamp);
+
+-- HITLService.get_pending_actions: WHERE status = ? AND expires_at > ?.
+CREATE INDEX IF NOT EXISTS idx_hitl_actions_status_expires ON hitl_actions (status, expires_at);
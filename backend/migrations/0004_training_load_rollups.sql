@@ -0,0 +1,82 @@
+-- 0004: tablas de carga diaria y semanal por deporte canónico, mantenidas por
+-- triggers sobre activities (INSERT, UPDATE y DELETE) y rellenadas con el
+-- histórico existente.
+--
+-- La semana empieza en lunes: date(fecha, 'weekday 0', '-6 days').
+-- SQL congelado: el deporte se resuelve con el CASE de alias vigente en esta
+-- versión (0006 lo sustituye por la tabla sport_taxonomy).
+
+CREATE TABLE IF NOT EXISTS daily_load (
+    day TEXT NOT NULL,
+    sport TEXT NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    distancia_km REAL NOT NULL DEFAULT 0, duracion_min REAL NOT NULL DEFAULT 0, calorias REAL NOT NULL DEFAULT 0, elevacion_m REAL NOT NULL DEFAULT 0, stress_score REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, sport)
+) WITHOUT ROWID;
+
+DELETE FROM daily_load;
+
+INSERT INTO daily_load (day, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT date(activities.fecha) AS k, CASE WHEN LOWER(TRIM(activities.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(activities.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(activities.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(activities.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(activities.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(activities.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(activities.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END AS s, COUNT(*),
+       COALESCE(SUM(activities.distancia_km), 0), COALESCE(SUM(activities.duracion_min), 0), COALESCE(SUM(activities.calorias), 0), COALESCE(SUM(activities.elevacion_m), 0), COALESCE(SUM(activities.stress_score), 0)
+FROM activities
+WHERE k IS NOT NULL
+GROUP BY k, s;
+
+CREATE TABLE IF NOT EXISTS weekly_load (
+    week_start TEXT NOT NULL,
+    sport TEXT NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    distancia_km REAL NOT NULL DEFAULT 0, duracion_min REAL NOT NULL DEFAULT 0, calorias REAL NOT NULL DEFAULT 0, elevacion_m REAL NOT NULL DEFAULT 0, stress_score REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (week_start, sport)
+) WITHOUT ROWID;
+
+DELETE FROM weekly_load;
+
+INSERT INTO weekly_load (week_start, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT date(date(activities.fecha), 'weekday 0', '-6 days') AS k, CASE WHEN LOWER(TRIM(activities.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(activities.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(activities.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(activities.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(activities.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(activities.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(activities.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END AS s, COUNT(*),
+       COALESCE(SUM(activities.distancia_km), 0), COALESCE(SUM(activities.duracion_min), 0), COALESCE(SUM(activities.calorias), 0), COALESCE(SUM(activities.elevacion_m), 0), COALESCE(SUM(activities.stress_score), 0)
+FROM activities
+WHERE k IS NOT NULL
+GROUP BY k, s;
+
+DROP TRIGGER IF EXISTS trg_activities_load_insert;
+
+DROP TRIGGER IF EXISTS trg_activities_load_update;
+
+DROP TRIGGER IF EXISTS trg_activities_load_delete;
+
+CREATE TRIGGER trg_activities_load_insert AFTER INSERT ON activities BEGIN 
+        INSERT INTO daily_load (day, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+        SELECT date(NEW.fecha), CASE WHEN LOWER(TRIM(NEW.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(NEW.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(NEW.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(NEW.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(NEW.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(NEW.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(NEW.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END, 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+        WHERE date(NEW.fecha) IS NOT NULL
+        ON CONFLICT(day, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score;
+        INSERT INTO weekly_load (week_start, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+        SELECT date(date(NEW.fecha), 'weekday 0', '-6 days'), CASE WHEN LOWER(TRIM(NEW.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(NEW.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(NEW.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(NEW.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(NEW.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(NEW.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(NEW.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END, 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+        WHERE date(date(NEW.fecha), 'weekday 0', '-6 days') IS NOT NULL
+        ON CONFLICT(week_start, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score; END;
+
+CREATE TRIGGER trg_activities_load_delete AFTER DELETE ON activities BEGIN 
+        UPDATE daily_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+        WHERE day = date(OLD.fecha) AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END;
+        DELETE FROM daily_load WHERE day = date(OLD.fecha) AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END AND sessions <= 0;
+        UPDATE weekly_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+        WHERE week_start = date(date(OLD.fecha), 'weekday 0', '-6 days') AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END;
+        DELETE FROM weekly_load WHERE week_start = date(date(OLD.fecha), 'weekday 0', '-6 days') AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END AND sessions <= 0; END;
+
+CREATE TRIGGER trg_activities_load_update AFTER UPDATE OF fecha, tipo, distancia_km, duracion_min, calorias, elevacion_m, stress_score ON activities
+BEGIN 
+UPDATE daily_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+WHERE day = date(OLD.fecha) AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END;
+DELETE FROM daily_load WHERE day = date(OLD.fecha) AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END AND sessions <= 0;
+UPDATE weekly_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+WHERE week_start = date(date(OLD.fecha), 'weekday 0', '-6 days') AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END;
+DELETE FROM weekly_load WHERE week_start = date(date(OLD.fecha), 'weekday 0', '-6 days') AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END AND sessions <= 0; 
+INSERT INTO daily_load (day, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT date(NEW.fecha), CASE WHEN LOWER(TRIM(NEW.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(NEW.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(NEW.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(NEW.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(NEW.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(NEW.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(NEW.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END, 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+WHERE date(NEW.fecha) IS NOT NULL
+ON CONFLICT(day, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score;
+INSERT INTO weekly_load (week_start, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT date(date(NEW.fecha), 'weekday 0', '-6 days'), CASE WHEN LOWER(TRIM(NEW.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(NEW.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(NEW.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(NEW.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(NEW.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(NEW.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(NEW.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END, 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+WHERE date(date(NEW.fecha), 'weekday 0', '-6 days') IS NOT NULL
+ON CONFLICT(week_start, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score; END;
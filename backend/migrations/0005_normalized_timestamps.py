@@ -0,0 +1,165 @@
+"""
+0005: columnas normalizadas de fecha en activities, biometrics y pain_logs.
+
+- fecha_ts INTEGER: epoch UTC (s), indexada; orden, rangos y ventanas.
+- fecha_local TEXT: 'YYYY-MM-DD' en LOCAL_TIMEZONE; agrupación por día.
+
+El relleno usa una copia congelada de las reglas de
+`services.datetime_normalizer` en esta versión (sin 'Z' -> hora local; una
+fecha sin hora es la medianoche local) y los rollups de carga pasan a agrupar
+por fecha_local. Nada de aquí importa servicios: si estos cambian, la
+migración sigue produciendo el mismo esquema.
+"""
+
+import datetime
+import logging
+import sqlite3
+from zoneinfo import ZoneInfo
+
+from config import LOCAL_TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+NORMALIZED_TABLES = {
+    "activities": "fecha",
+    "biometrics": "fecha",
+    "pain_logs": "date",
+}
+
+# Rollups de 0004 reinstalados con el día local: COALESCE(fecha_local, date(fecha))
+ROLLUPS_SQL = """
+CREATE TABLE IF NOT EXISTS daily_load (
+    day TEXT NOT NULL,
+    sport TEXT NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    distancia_km REAL NOT NULL DEFAULT 0, duracion_min REAL NOT NULL DEFAULT 0, calorias REAL NOT NULL DEFAULT 0, elevacion_m REAL NOT NULL DEFAULT 0, stress_score REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, sport)
+) WITHOUT ROWID;
+
+DELETE FROM daily_load;
+
+INSERT INTO daily_load (day, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT COALESCE(activities.fecha_local, date(activities.fecha)) AS k, CASE WHEN LOWER(TRIM(activities.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(activities.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(activities.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(activities.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(activities.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(activities.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(activities.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END AS s, COUNT(*),
+       COALESCE(SUM(activities.distancia_km), 0), COALESCE(SUM(activities.duracion_min), 0), COALESCE(SUM(activities.calorias), 0), COALESCE(SUM(activities.elevacion_m), 0), COALESCE(SUM(activities.stress_score), 0)
+FROM activities
+WHERE k IS NOT NULL
+GROUP BY k, s;
+
+CREATE TABLE IF NOT EXISTS weekly_load (
+    week_start TEXT NOT NULL,
+    sport TEXT NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    distancia_km REAL NOT NULL DEFAULT 0, duracion_min REAL NOT NULL DEFAULT 0, calorias REAL NOT NULL DEFAULT 0, elevacion_m REAL NOT NULL DEFAULT 0, stress_score REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (week_start, sport)
+) WITHOUT ROWID;
+
+DELETE FROM weekly_load;
+
+INSERT INTO weekly_load (week_start, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT date(COALESCE(activities.fecha_local, date(activities.fecha)), 'weekday 0', '-6 days') AS k, CASE WHEN LOWER(TRIM(activities.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(activities.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(activities.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(activities.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(activities.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(activities.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(activities.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END AS s, COUNT(*),
+       COALESCE(SUM(activities.distancia_km), 0), COALESCE(SUM(activities.duracion_min), 0), COALESCE(SUM(activities.calorias), 0), COALESCE(SUM(activities.elevacion_m), 0), COALESCE(SUM(activities.stress_score), 0)
+FROM activities
+WHERE k IS NOT NULL
+GROUP BY k, s;
+
+DROP TRIGGER IF EXISTS trg_activities_load_insert;
+
+DROP TRIGGER IF EXISTS trg_activities_load_update;
+
+DROP TRIGGER IF EXISTS trg_activities_load_delete;
+
+CREATE TRIGGER trg_activities_load_insert AFTER INSERT ON activities BEGIN 
+        INSERT INTO daily_load (day, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+        SELECT COALESCE(NEW.fecha_local, date(NEW.fecha)), CASE WHEN LOWER(TRIM(NEW.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(NEW.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(NEW.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(NEW.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(NEW.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(NEW.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(NEW.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END, 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+        WHERE COALESCE(NEW.fecha_local, date(NEW.fecha)) IS NOT NULL
+        ON CONFLICT(day, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score;
+        INSERT INTO weekly_load (week_start, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+        SELECT date(COALESCE(NEW.fecha_local, date(NEW.fecha)), 'weekday 0', '-6 days'), CASE WHEN LOWER(TRIM(NEW.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(NEW.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(NEW.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(NEW.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(NEW.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(NEW.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(NEW.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END, 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+        WHERE date(COALESCE(NEW.fecha_local, date(NEW.fecha)), 'weekday 0', '-6 days') IS NOT NULL
+        ON CONFLICT(week_start, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score; END;
+
+CREATE TRIGGER trg_activities_load_delete AFTER DELETE ON activities BEGIN 
+        UPDATE daily_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+        WHERE day = COALESCE(OLD.fecha_local, date(OLD.fecha)) AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END;
+        DELETE FROM daily_load WHERE day = COALESCE(OLD.fecha_local, date(OLD.fecha)) AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END AND sessions <= 0;
+        UPDATE weekly_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+        WHERE week_start = date(COALESCE(OLD.fecha_local, date(OLD.fecha)), 'weekday 0', '-6 days') AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END;
+        DELETE FROM weekly_load WHERE week_start = date(COALESCE(OLD.fecha_local, date(OLD.fecha)), 'weekday 0', '-6 days') AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END AND sessions <= 0; END;
+
+CREATE TRIGGER trg_activities_load_update AFTER UPDATE OF fecha, fecha_local, tipo, distancia_km, duracion_min, calorias, elevacion_m, stress_score ON activities
+BEGIN 
+UPDATE daily_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+WHERE day = COALESCE(OLD.fecha_local, date(OLD.fecha)) AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END;
+DELETE FROM daily_load WHERE day = COALESCE(OLD.fecha_local, date(OLD.fecha)) AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END AND sessions <= 0;
+UPDATE weekly_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+WHERE week_start = date(COALESCE(OLD.fecha_local, date(OLD.fecha)), 'weekday 0', '-6 days') AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END;
+DELETE FROM weekly_load WHERE week_start = date(COALESCE(OLD.fecha_local, date(OLD.fecha)), 'weekday 0', '-6 days') AND sport = CASE WHEN LOWER(TRIM(OLD.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(OLD.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(OLD.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(OLD.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(OLD.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(OLD.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(OLD.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END AND sessions <= 0; 
+INSERT INTO daily_load (day, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT COALESCE(NEW.fecha_local, date(NEW.fecha)), CASE WHEN LOWER(TRIM(NEW.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(NEW.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(NEW.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(NEW.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(NEW.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(NEW.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(NEW.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END, 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+WHERE COALESCE(NEW.fecha_local, date(NEW.fecha)) IS NOT NULL
+ON CONFLICT(day, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score;
+INSERT INTO weekly_load (week_start, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT date(COALESCE(NEW.fecha_local, date(NEW.fecha)), 'weekday 0', '-6 days'), CASE WHEN LOWER(TRIM(NEW.tipo)) IN ('carrera', 'running', 'run', 'correr', 'competición calle', 'street_running', 'treadmill_running') THEN 'running' WHEN LOWER(TRIM(NEW.tipo)) IN ('trail', 'trail_running', 'trekking', 'hiking', 'montaña', 'competición trail') THEN 'trail' WHEN LOWER(TRIM(NEW.tipo)) IN ('ciclismo', 'bicicleta', 'cycling', 'cycle', 'bike', 'road_biking', 'indoor_cycling', 'mountain_biking') THEN 'cycling' WHEN LOWER(TRIM(NEW.tipo)) IN ('tenis', 'tennis') THEN 'tennis' WHEN LOWER(TRIM(NEW.tipo)) IN ('caminata', 'caminar', 'walking', 'walk') THEN 'walking' WHEN LOWER(TRIM(NEW.tipo)) IN ('strength_training', 'fuerza', 'strength', 'gimnasio', 'weight_training', 'indoor_cardio', 'cardio') THEN 'strength' WHEN LOWER(TRIM(NEW.tipo)) IN ('natación', 'natacion', 'swimming', 'swim', 'lap_swimming', 'open_water_swimming') THEN 'swimming' ELSE 'otros' END, 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+WHERE date(COALESCE(NEW.fecha_local, date(NEW.fecha)), 'weekday 0', '-6 days') IS NOT NULL
+ON CONFLICT(week_start, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score; END;
+"""
+
+
+def _normalized_columns(value, tz):
+    """(fecha_ts, fecha_local) de `value`, o (None, None) si no se puede interpretar."""
+    if value is None or value == "":
+        return None, None
+    if isinstance(value, (int, float)):
+        dt = datetime.datetime.fromtimestamp(value, tz)
+    else:
+        text = str(value).strip()
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        try:
+            dt = datetime.datetime.fromisoformat(text)
+        except ValueError:
+            return None, None
+        dt = dt.replace(tzinfo=tz) if dt.tzinfo is None else dt.astimezone(tz)
+    return int(dt.timestamp()), dt.date().isoformat()
+
+
+def _statements(script):
+    """Parte un script SQL en sentencias completas (los cuerpos de trigger llevan ';')."""
+    pending = ""
+    for line in script.splitlines(keepends=True):
+        pending += line
+        if sqlite3.complete_statement(pending):
+            yield pending.strip()
+            pending = ""
+    if pending.strip():
+        yield pending.strip()
+
+
+def upgrade(conn):
+    for table in NORMALIZED_TABLES:
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if "fecha_ts" not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN fecha_ts INTEGER")
+        if "fecha_local" not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN fecha_local TEXT")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_fecha_ts ON {table}(fecha_ts)")
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_activities_fecha_local ON activities(fecha_local)")
+
+    # Los triggers de 0004 siguen activos durante el relleno; se reinstalan después
+    # y la reconstrucción deja los rollups consistentes.
+    tz = ZoneInfo(LOCAL_TIMEZONE)
+    for table, source in NORMALIZED_TABLES.items():
+        params = []
+        for row_id, value in conn.execute(
+            f"SELECT id, {source} FROM {table} WHERE fecha_ts IS NULL AND {source} IS NOT NULL"
+        ).fetchall():
+            ts, local = _normalized_columns(value, tz)
+            if ts is None:
+                logger.warning(f"{table}.{source} no interpretable en id={row_id}: {value!r}")
+                continue
+            params.append((ts, local, row_id))
+        conn.executemany(f"UPDATE {table} SET fecha_ts = ?, fecha_local = ? WHERE id = ?", params)
+
+    for statement in _statements(ROLLUPS_SQL):
+        conn.execute(statement)
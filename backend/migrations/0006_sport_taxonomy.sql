@@ -0,0 +1,182 @@
+-- 0006: taxonomía de deportes en servidor.
+--
+-- - Tabla `sport_taxonomy` (tipo en minúsculas -> deporte canónico + etiqueta).
+-- - `activities.sport_canonical` / `activities.sport_label`, rellenadas por
+--   triggers en cada INSERT y al cambiar tipo, nombre, distancia o desnivel.
+-- - Índice (sport_canonical, fecha_ts): los filtros por deporte dejan de ser
+--   LOWER(tipo) IN (...) sobre toda la tabla.
+-- - Los rollups de carga resuelven el deporte contra la misma tabla.
+--
+-- Semilla y reglas congeladas tal como estaban en esta versión; los cambios
+-- posteriores a services/sport_taxonomy.py van en una migración nueva.
+
+CREATE TABLE IF NOT EXISTS sport_taxonomy (
+    tipo_key TEXT PRIMARY KEY,
+    sport TEXT NOT NULL,
+    label TEXT
+) WITHOUT ROWID;
+
+ALTER TABLE activities ADD COLUMN sport_canonical TEXT;
+
+ALTER TABLE activities ADD COLUMN sport_label TEXT;
+
+INSERT INTO sport_taxonomy (tipo_key, sport, label) VALUES
+    ('bicicleta', 'cycling', NULL),
+    ('bike', 'cycling', 'Ciclismo'),
+    ('breathwork', 'otros', 'Respiración'),
+    ('caminar', 'walking', NULL),
+    ('caminata', 'walking', 'Caminata'),
+    ('cardio', 'strength', 'Fuerza y Cardio'),
+    ('carrera', 'running', NULL),
+    ('ciclismo', 'cycling', 'Ciclismo'),
+    ('competición calle', 'running', NULL),
+    ('competición trail', 'trail', NULL),
+    ('correr', 'running', 'Carrera'),
+    ('cycle', 'cycling', 'Ciclismo'),
+    ('cycling', 'cycling', 'Ciclismo'),
+    ('fuerza', 'strength', 'Fuerza y Cardio'),
+    ('gimnasio', 'strength', NULL),
+    ('hiking', 'trail', 'Hiking/Senderismo'),
+    ('indoor_cardio', 'strength', 'Fuerza y Cardio'),
+    ('indoor_cycling', 'cycling', NULL),
+    ('lap_swimming', 'swimming', NULL),
+    ('montaña', 'trail', NULL),
+    ('mountain_biking', 'cycling', NULL),
+    ('natacion', 'swimming', NULL),
+    ('natación', 'swimming', 'Natación'),
+    ('open_water_swimming', 'swimming', NULL),
+    ('respiración', 'otros', 'Respiración'),
+    ('road_biking', 'cycling', NULL),
+    ('run', 'running', 'Carrera'),
+    ('running', 'running', 'Carrera'),
+    ('street_running', 'running', NULL),
+    ('strength', 'strength', 'Fuerza y Cardio'),
+    ('strength_training', 'strength', 'Fuerza y Cardio'),
+    ('swim', 'swimming', 'Natación'),
+    ('swimming', 'swimming', 'Natación'),
+    ('tenis', 'tennis', 'Tenis'),
+    ('tennis', 'tennis', 'Tenis'),
+    ('trail', 'trail', 'Trail Running'),
+    ('trail_running', 'trail', 'Trail Running'),
+    ('treadmill_running', 'running', NULL),
+    ('trekking', 'trail', NULL),
+    ('walk', 'walking', 'Caminata'),
+    ('walking', 'walking', 'Caminata'),
+    ('weight_training', 'strength', 'Fuerza y Cardio'),
+    ('yoga', 'otros', 'Yoga');
+
+UPDATE activities SET sport_canonical = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(activities.tipo))), 'otros'), sport_label = CASE
+        WHEN activities.tipo IS NULL OR activities.tipo = '' THEN 'Otros'
+        WHEN instr(LOWER(TRIM(activities.tipo)), 'trail') > 0 OR instr(LOWER(TRIM(activities.tipo)), 'hiking') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), 'trail') > 0 OR COALESCE(activities.elevacion_m, 0) > 100 THEN 'Trail Running'
+        WHEN LOWER(TRIM(activities.tipo)) IN ('running', 'carrera', 'run', 'correr') THEN CASE
+            WHEN instr(LOWER(COALESCE(activities.nombre, '')), 'maraton') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), 'marathon') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), '10k') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), '21k') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), '42k') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), 'gp') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), 'competencia') > 0 OR instr(LOWER(TRIM(activities.tipo)), 'competición') > 0 THEN 'Competición Calle'
+            WHEN COALESCE(activities.distancia_km, 0) > 15 AND NOT instr(LOWER(COALESCE(activities.nombre, '')), 'entrenamiento') > 0 THEN 'Fondo Largo'
+            ELSE 'Running Entreno' END
+        ELSE COALESCE((SELECT label FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(activities.tipo))),
+                      UPPER(SUBSTR(activities.tipo, 1, 1)) || SUBSTR(activities.tipo, 2))
+    END;
+
+DROP TRIGGER IF EXISTS trg_activities_sport_insert;
+
+DROP TRIGGER IF EXISTS trg_activities_sport_update;
+
+CREATE TRIGGER trg_activities_sport_insert AFTER INSERT ON activities
+    BEGIN UPDATE activities SET sport_canonical = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(activities.tipo))), 'otros'), sport_label = CASE
+    WHEN activities.tipo IS NULL OR activities.tipo = '' THEN 'Otros'
+    WHEN instr(LOWER(TRIM(activities.tipo)), 'trail') > 0 OR instr(LOWER(TRIM(activities.tipo)), 'hiking') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), 'trail') > 0 OR COALESCE(activities.elevacion_m, 0) > 100 THEN 'Trail Running'
+    WHEN LOWER(TRIM(activities.tipo)) IN ('running', 'carrera', 'run', 'correr') THEN CASE
+        WHEN instr(LOWER(COALESCE(activities.nombre, '')), 'maraton') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), 'marathon') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), '10k') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), '21k') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), '42k') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), 'gp') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), 'competencia') > 0 OR instr(LOWER(TRIM(activities.tipo)), 'competición') > 0 THEN 'Competición Calle'
+        WHEN COALESCE(activities.distancia_km, 0) > 15 AND NOT instr(LOWER(COALESCE(activities.nombre, '')), 'entrenamiento') > 0 THEN 'Fondo Largo'
+        ELSE 'Running Entreno' END
+    ELSE COALESCE((SELECT label FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(activities.tipo))),
+                  UPPER(SUBSTR(activities.tipo, 1, 1)) || SUBSTR(activities.tipo, 2))
+END WHERE id = NEW.id; END;
+
+CREATE TRIGGER trg_activities_sport_update AFTER UPDATE OF tipo, nombre, distancia_km, elevacion_m ON activities
+    BEGIN UPDATE activities SET sport_canonical = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(activities.tipo))), 'otros'), sport_label = CASE
+    WHEN activities.tipo IS NULL OR activities.tipo = '' THEN 'Otros'
+    WHEN instr(LOWER(TRIM(activities.tipo)), 'trail') > 0 OR instr(LOWER(TRIM(activities.tipo)), 'hiking') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), 'trail') > 0 OR COALESCE(activities.elevacion_m, 0) > 100 THEN 'Trail Running'
+    WHEN LOWER(TRIM(activities.tipo)) IN ('running', 'carrera', 'run', 'correr') THEN CASE
+        WHEN instr(LOWER(COALESCE(activities.nombre, '')), 'maraton') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), 'marathon') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), '10k') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), '21k') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), '42k') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), 'gp') > 0 OR instr(LOWER(COALESCE(activities.nombre, '')), 'competencia') > 0 OR instr(LOWER(TRIM(activities.tipo)), 'competición') > 0 THEN 'Competición Calle'
+        WHEN COALESCE(activities.distancia_km, 0) > 15 AND NOT instr(LOWER(COALESCE(activities.nombre, '')), 'entrenamiento') > 0 THEN 'Fondo Largo'
+        ELSE 'Running Entreno' END
+    ELSE COALESCE((SELECT label FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(activities.tipo))),
+                  UPPER(SUBSTR(activities.tipo, 1, 1)) || SUBSTR(activities.tipo, 2))
+END WHERE id = NEW.id; END;
+
+CREATE INDEX IF NOT EXISTS idx_activities_sport_fecha_ts ON activities(sport_canonical, fecha_ts);
+
+CREATE TABLE IF NOT EXISTS daily_load (
+    day TEXT NOT NULL,
+    sport TEXT NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    distancia_km REAL NOT NULL DEFAULT 0, duracion_min REAL NOT NULL DEFAULT 0, calorias REAL NOT NULL DEFAULT 0, elevacion_m REAL NOT NULL DEFAULT 0, stress_score REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, sport)
+) WITHOUT ROWID;
+
+DELETE FROM daily_load;
+
+INSERT INTO daily_load (day, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT COALESCE(activities.fecha_local, date(activities.fecha)) AS k, COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(activities.tipo))), 'otros') AS s, COUNT(*),
+       COALESCE(SUM(activities.distancia_km), 0), COALESCE(SUM(activities.duracion_min), 0), COALESCE(SUM(activities.calorias), 0), COALESCE(SUM(activities.elevacion_m), 0), COALESCE(SUM(activities.stress_score), 0)
+FROM activities
+WHERE k IS NOT NULL
+GROUP BY k, s;
+
+CREATE TABLE IF NOT EXISTS weekly_load (
+    week_start TEXT NOT NULL,
+    sport TEXT NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    distancia_km REAL NOT NULL DEFAULT 0, duracion_min REAL NOT NULL DEFAULT 0, calorias REAL NOT NULL DEFAULT 0, elevacion_m REAL NOT NULL DEFAULT 0, stress_score REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (week_start, sport)
+) WITHOUT ROWID;
+
+DELETE FROM weekly_load;
+
+INSERT INTO weekly_load (week_start, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT date(COALESCE(activities.fecha_local, date(activities.fecha)), 'weekday 0', '-6 days') AS k, COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(activities.tipo))), 'otros') AS s, COUNT(*),
+       COALESCE(SUM(activities.distancia_km), 0), COALESCE(SUM(activities.duracion_min), 0), COALESCE(SUM(activities.calorias), 0), COALESCE(SUM(activities.elevacion_m), 0), COALESCE(SUM(activities.stress_score), 0)
+FROM activities
+WHERE k IS NOT NULL
+GROUP BY k, s;
+
+DROP TRIGGER IF EXISTS trg_activities_load_insert;
+
+DROP TRIGGER IF EXISTS trg_activities_load_update;
+
+DROP TRIGGER IF EXISTS trg_activities_load_delete;
+
+CREATE TRIGGER trg_activities_load_insert AFTER INSERT ON activities BEGIN 
+        INSERT INTO daily_load (day, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+        SELECT COALESCE(NEW.fecha_local, date(NEW.fecha)), COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(NEW.tipo))), 'otros'), 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+        WHERE COALESCE(NEW.fecha_local, date(NEW.fecha)) IS NOT NULL
+        ON CONFLICT(day, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score;
+        INSERT INTO weekly_load (week_start, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+        SELECT date(COALESCE(NEW.fecha_local, date(NEW.fecha)), 'weekday 0', '-6 days'), COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(NEW.tipo))), 'otros'), 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+        WHERE date(COALESCE(NEW.fecha_local, date(NEW.fecha)), 'weekday 0', '-6 days') IS NOT NULL
+        ON CONFLICT(week_start, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score; END;
+
+CREATE TRIGGER trg_activities_load_delete AFTER DELETE ON activities BEGIN 
+        UPDATE daily_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+        WHERE day = COALESCE(OLD.fecha_local, date(OLD.fecha)) AND sport = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(OLD.tipo))), 'otros');
+        DELETE FROM daily_load WHERE day = COALESCE(OLD.fecha_local, date(OLD.fecha)) AND sport = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(OLD.tipo))), 'otros') AND sessions <= 0;
+        UPDATE weekly_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+        WHERE week_start = date(COALESCE(OLD.fecha_local, date(OLD.fecha)), 'weekday 0', '-6 days') AND sport = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(OLD.tipo))), 'otros');
+        DELETE FROM weekly_load WHERE week_start = date(COALESCE(OLD.fecha_local, date(OLD.fecha)), 'weekday 0', '-6 days') AND sport = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(OLD.tipo))), 'otros') AND sessions <= 0; END;
+
+CREATE TRIGGER trg_activities_load_update AFTER UPDATE OF fecha, fecha_local, tipo, distancia_km, duracion_min, calorias, elevacion_m, stress_score ON activities
+BEGIN 
+UPDATE daily_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+WHERE day = COALESCE(OLD.fecha_local, date(OLD.fecha)) AND sport = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(OLD.tipo))), 'otros');
+DELETE FROM daily_load WHERE day = COALESCE(OLD.fecha_local, date(OLD.fecha)) AND sport = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(OLD.tipo))), 'otros') AND sessions <= 0;
+UPDATE weekly_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+WHERE week_start = date(COALESCE(OLD.fecha_local, date(OLD.fecha)), 'weekday 0', '-6 days') AND sport = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(OLD.tipo))), 'otros');
+DELETE FROM weekly_load WHERE week_start = date(COALESCE(OLD.fecha_local, date(OLD.fecha)), 'weekday 0', '-6 days') AND sport = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(OLD.tipo))), 'otros') AND sessions <= 0; 
+INSERT INTO daily_load (day, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT COALESCE(NEW.fecha_local, date(NEW.fecha)), COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(NEW.tipo))), 'otros'), 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+WHERE COALESCE(NEW.fecha_local, date(NEW.fecha)) IS NOT NULL
+ON CONFLICT(day, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score;
+INSERT INTO weekly_load (week_start, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT date(COALESCE(NEW.fecha_local, date(NEW.fecha)), 'weekday 0', '-6 days'), COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(NEW.tipo))), 'otros'), 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+WHERE date(COALESCE(NEW.fecha_local, date(NEW.fecha)), 'weekday 0', '-6 days') IS NOT NULL
+ON CONFLICT(week_start, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score; END;
@@ -0,0 +1,115 @@
+-- 0007: libro de material (gear + gear_activities) con acumulados por triggers.
+--
+-- Siembra el material de equipamiento.md, asigna el historial existente y deja
+-- los triggers que mantienen km/sesiones por material al insertar, reclasificar
+-- o borrar actividades. Semilla y reglas de asignación congeladas en esta versión.
+
+CREATE TABLE IF NOT EXISTS gear (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    slug TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    since TEXT,
+    retired_on TEXT,
+    base_km REAL NOT NULL DEFAULT 0,
+    base_sessions INTEGER NOT NULL DEFAULT 0,
+    match_name TEXT,
+    max_km REAL,
+    races INTEGER NOT NULL DEFAULT 1,
+    priority INTEGER NOT NULL DEFAULT 0,
+    km REAL NOT NULL DEFAULT 0,
+    sessions INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS gear_activities (
+    activity_id INTEGER PRIMARY KEY,
+    gear_id INTEGER NOT NULL REFERENCES gear(id),
+    km REAL NOT NULL DEFAULT 0,
+    pinned INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_gear_activities_gear ON gear_activities(gear_id);
+
+INSERT OR IGNORE INTO gear (slug, name, category, base_km, match_name) VALUES ('kayano', 'ASICS Kayano 31', 'road', 574, 'kayano');
+
+INSERT OR IGNORE INTO gear (slug, name, category, match_name, max_km, races) VALUES ('brooks', 'Brooks Adrenaline GTS 23', 'road', 'brooks', 10, 0);
+
+INSERT OR IGNORE INTO gear (slug, name, category) VALUES ('speedgoat', 'Hoka Speedgoat 6', 'trail');
+
+INSERT OR IGNORE INTO gear (slug, name, category, since, base_km) VALUES ('trek', 'Trek FX Sport AL 3', 'cycling', '2024-06-15', 2450);
+
+INSERT OR IGNORE INTO gear (slug, name, category, base_sessions) VALUES ('babolat', 'Babolat Fury 3', 'tennis', 74);
+
+DROP TRIGGER IF EXISTS trg_activities_gear_assign;
+
+DROP TRIGGER IF EXISTS trg_activities_gear_delete;
+
+DROP TRIGGER IF EXISTS trg_gear_activities_insert;
+
+DROP TRIGGER IF EXISTS trg_gear_activities_update;
+
+DROP TRIGGER IF EXISTS trg_gear_activities_delete;
+
+CREATE TRIGGER trg_activities_gear_assign AFTER UPDATE OF sport_label, fecha_local ON activities
+    BEGIN
+        DELETE FROM gear_activities WHERE activity_id = NEW.id AND pinned = 0;
+        UPDATE gear_activities SET km = COALESCE(NEW.distancia_km, 0) WHERE activity_id = NEW.id;
+        INSERT OR IGNORE INTO gear_activities (activity_id, gear_id, km)
+        SELECT NEW.id, g, COALESCE(NEW.distancia_km, 0) FROM (SELECT (SELECT id FROM (
+    SELECT g.id, g.priority, g.max_km IS NOT NULL AS specific, (g.match_name IS NOT NULL AND instr(LOWER(COALESCE(NEW.nombre, '')), g.match_name) > 0) AS named FROM gear g
+    WHERE g.category = CASE
+    WHEN NEW.sport_label IN ('Trail Running', 'Hiking/Senderismo') THEN 'trail'
+    WHEN instr(NEW.sport_label, 'Running') > 0 OR instr(NEW.sport_label, 'Competición') > 0 OR instr(NEW.sport_label, 'Fondo') > 0 THEN 'road'
+    WHEN NEW.sport_label = 'Tenis' THEN 'tennis'
+    WHEN NEW.sport_label = 'Ciclismo' THEN 'cycling'
+END
+      AND (g.since IS NULL OR g.since <= COALESCE(NEW.fecha_local, date(NEW.fecha)))
+      AND (g.retired_on IS NULL OR COALESCE(NEW.fecha_local, date(NEW.fecha)) <= g.retired_on)
+      AND ((g.match_name IS NOT NULL AND instr(LOWER(COALESCE(NEW.nombre, '')), g.match_name) > 0) OR ((g.max_km IS NULL OR COALESCE(NEW.distancia_km, 0) < g.max_km)
+                       AND (g.races = 1 OR NEW.sport_label <> 'Competición Calle'))))
+    ORDER BY named DESC, specific DESC, priority DESC, id
+    LIMIT 1) AS g)
+        WHERE g IS NOT NULL;
+    END;
+
+CREATE TRIGGER trg_activities_gear_delete AFTER DELETE ON activities
+BEGIN DELETE FROM gear_activities WHERE activity_id = OLD.id; END;
+
+CREATE TRIGGER trg_gear_activities_insert AFTER INSERT ON gear_activities
+BEGIN UPDATE gear SET km = km + NEW.km, sessions = sessions + 1 WHERE id = NEW.gear_id; END;
+
+CREATE TRIGGER trg_gear_activities_delete AFTER DELETE ON gear_activities
+BEGIN UPDATE gear SET km = km - OLD.km, sessions = sessions - 1 WHERE id = OLD.gear_id; END;
+
+CREATE TRIGGER trg_gear_activities_update AFTER UPDATE OF gear_id, km ON gear_activities
+BEGIN
+    UPDATE gear SET km = km - OLD.km, sessions = sessions - 1 WHERE id = OLD.gear_id;
+    UPDATE gear SET km = km + NEW.km, sessions = sessions + 1 WHERE id = NEW.gear_id;
+END;
+
+DELETE FROM gear_activities WHERE pinned = 0;
+
+INSERT OR IGNORE INTO gear_activities (activity_id, gear_id, km)
+    SELECT id, g, km FROM (
+        SELECT activities.id AS id, COALESCE(activities.distancia_km, 0) AS km,
+               (SELECT id FROM (
+    SELECT g.id, g.priority, g.max_km IS NOT NULL AS specific, (g.match_name IS NOT NULL AND instr(LOWER(COALESCE(activities.nombre, '')), g.match_name) > 0) AS named FROM gear g
+    WHERE g.category = CASE
+    WHEN activities.sport_label IN ('Trail Running', 'Hiking/Senderismo') THEN 'trail'
+    WHEN instr(activities.sport_label, 'Running') > 0 OR instr(activities.sport_label, 'Competición') > 0 OR instr(activities.sport_label, 'Fondo') > 0 THEN 'road'
+    WHEN activities.sport_label = 'Tenis' THEN 'tennis'
+    WHEN activities.sport_label = 'Ciclismo' THEN 'cycling'
+END
+      AND (g.since IS NULL OR g.since <= COALESCE(activities.fecha_local, date(activities.fecha)))
+      AND (g.retired_on IS NULL OR COALESCE(activities.fecha_local, date(activities.fecha)) <= g.retired_on)
+      AND ((g.match_name IS NOT NULL AND instr(LOWER(COALESCE(activities.nombre, '')), g.match_name) > 0) OR ((g.max_km IS NULL OR COALESCE(activities.distancia_km, 0) < g.max_km)
+                       AND (g.races = 1 OR activities.sport_label <> 'Competición Calle'))))
+    ORDER BY named DESC, specific DESC, priority DESC, id
+    LIMIT 1) AS g
+        FROM activities
+    )
+    WHERE g IS NOT NULL;
+
+UPDATE gear SET
+    km = COALESCE((SELECT SUM(km) FROM gear_activities WHERE gear_id = gear.id), 0),
+    sessions = (SELECT COUNT(*) FROM gear_activities WHERE gear_id = gear.id);
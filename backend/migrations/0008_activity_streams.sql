@@ -0,0 +1,13 @@
+-- 0008: series por segundo (FC, cadencia, velocidad, altitud, distancia) de
+-- las actividades importadas desde FIT/GPX/TCX. Los datos viven en un .npy
+-- por actividad (STREAMS_DIR) que se abre mapeado en memoria; aquí queda el
+-- enlace con activities.id y lo necesario para leer rangos sin abrirlo.
+CREATE TABLE IF NOT EXISTS activity_streams (
+    activity_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    start_ts INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    channels TEXT NOT NULL,
+    source_file TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,113 @@
+"""
+0009: claves naturales de las filas que traen los proveedores.
+
+SyncService inserta con executemany + ON CONFLICT DO NOTHING en lugar de
+consultar fila a fila si ya existe: la unicidad la garantizan los índices
+(fuente, fecha_ts, tipo) en activities y (fuente, fecha_ts) en biometrics.
+
+Antes de crearlos se fusionan las filas repetidas de cada clave: se conserva
+la de id menor, se completan sus campos vacíos (NULL, 0 o '') con los de las
+demás y, en activities, las series (activity_streams) y el material fijado a
+mano (gear_activities) de las repetidas pasan a ella si no tiene (si ya
+tiene series, se quita el enlace de las sobrantes). Si dos filas
+de una misma clave traen valores distintos en un mismo campo no se elige
+ninguno: la migración aborta (sin cambios) y lista los ids para revisarlos.
+Reglas congeladas en esta versión; no se importan servicios.
+"""
+
+from typing import Dict, List, Sequence
+
+
+class ConflictingDuplicatesError(RuntimeError):
+    """Filas con la misma clave natural y datos distintos: hay que resolverlas a mano."""
+
+
+NATURAL_KEYS = {
+    "activities": ("fuente", "fecha_ts", "tipo"),
+    "biometrics": ("fuente", "fecha_ts"),
+}
+
+# Columnas que no se comparan: identidad y formas de la misma fecha (la clave usa fecha_ts)
+_IGNORED = {"id", "created_at", "fecha", "fecha_local"}
+
+
+def _empty(value) -> bool:
+    return value is None or value == 0 or value == ""
+
+
+def _plan(rows: List[Dict], columns: Sequence[str]):
+    """(id conservado, ids repetidos, campos a completar) o None si hay conflicto."""
+    keeper, duplicates = rows[0], rows[1:]
+    updates = {}
+    for column in columns:
+        values = {row[column] for row in rows if not _empty(row[column])}
+        if len(values) > 1:
+            return None
+        if values and _empty(keeper[column]):
+            updates[column] = values.pop()
+    return keeper["id"], [row["id"] for row in duplicates], updates
+
+
+def _adopt_children(conn, keeper: int, duplicates: List[int]) -> None:
+    marks = ", ".join("?" * len(duplicates))
+    if not conn.execute("SELECT 1 FROM activity_streams WHERE activity_id = ?", (keeper,)).fetchone():
+        conn.execute(
+            f"UPDATE activity_streams SET activity_id = ? WHERE activity_id = "
+            f"(SELECT MIN(activity_id) FROM activity_streams WHERE activity_id IN ({marks}))",
+            (keeper, *duplicates),
+        )
+    # Series repetidas de la misma sesión: se quita el enlace (el .npy queda en disco)
+    conn.execute(f"DELETE FROM activity_streams WHERE activity_id IN ({marks})", duplicates)
+    pinned = conn.execute(
+        f"SELECT MIN(activity_id) FROM gear_activities WHERE activity_id IN ({marks}) AND pinned = 1", duplicates
+    ).fetchone()[0]
+    if pinned is not None and not conn.execute(
+        "SELECT 1 FROM gear_activities WHERE activity_id = ? AND pinned = 1", (keeper,)
+    ).fetchone():
+        conn.execute("DELETE FROM gear_activities WHERE activity_id = ?", (keeper,))
+        conn.execute("UPDATE gear_activities SET activity_id = ? WHERE activity_id = ?", (keeper, pinned))
+
+
+def _merge_duplicates(conn, table: str, key: Sequence[str]) -> None:
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    compared = [c for c in columns if c not in _IGNORED and c not in key]
+    not_null = " AND ".join(f"{c} IS NOT NULL" for c in key)
+    groups = conn.execute(
+        f"SELECT {', '.join(key)} FROM {table} WHERE {not_null} GROUP BY {', '.join(key)} HAVING COUNT(*) > 1"
+    ).fetchall()
+
+    plans, conflicts = [], []
+    for values in groups:
+        cursor = conn.execute(
+            f"SELECT * FROM {table} WHERE {' AND '.join(f'{c} = ?' for c in key)} ORDER BY id", tuple(values)
+        )
+        names = [d[0] for d in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        plan = _plan(rows, compared)
+        if plan is None:
+            conflicts.append([row["id"] for row in rows])
+        else:
+            plans.append(plan)
+
+    if conflicts:
+        raise ConflictingDuplicatesError(
+            f"{table}: {len(conflicts)} grupos con la misma clave {key} y datos distintos (ids {conflicts}); "
+            "resolverlos a mano antes de migrar"
+        )
+    for keeper, duplicates, updates in plans:
+        if updates:
+            conn.execute(
+                f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in updates)} WHERE id = ?",
+                (*updates.values(), keeper),
+            )
+        if table == "activities":
+            _adopt_children(conn, keeper, duplicates)
+        conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(d,) for d in duplicates])
+
+
+def upgrade(conn):
+    for table, key in NATURAL_KEYS.items():
+        _merge_duplicates(conn, table, key)
+        conn.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_natural_key ON {table} ({', '.join(key)})"
+        )
@@ -0,0 +1,9 @@
+-- 0010: checkpoints de los backfills por ventanas de SyncService.
+-- `synced_through` es el último día local (YYYY-MM-DD) hasta el que todas las
+-- ventanas del proveedor están confirmadas; un backfill interrumpido retoma
+-- desde el día siguiente en lugar de volver a pedir todo el rango.
+CREATE TABLE IF NOT EXISTS sync_cursors (
+    provider TEXT PRIMARY KEY,
+    synced_through TEXT NOT NULL,
+    updated_at TEXT
+);
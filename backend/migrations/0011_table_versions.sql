@@ -0,0 +1,36 @@
+-- 0011: contadores de cambios por tabla para invalidar cachés en memoria.
+-- ContextManager cachea el contexto base compilado y solo lo reconstruye si
+-- cambió la versión de user_context o evolutionary_memory (o los .md). Se usan
+-- triggers y no PRAGMA data_version porque este último no ve los commits hechos
+-- por la propia conexión, y con el pool la conexión que consulta varía.
+CREATE TABLE IF NOT EXISTS table_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO table_versions (name, version) VALUES ('user_context', 0), ('evolutionary_memory', 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_user_context_version_ins AFTER INSERT ON user_context
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'user_context';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_user_context_version_upd AFTER UPDATE ON user_context
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'user_context';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_user_context_version_del AFTER DELETE ON user_context
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'user_context';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_evolutionary_memory_version_ins AFTER INSERT ON evolutionary_memory
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'evolutionary_memory';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_evolutionary_memory_version_upd AFTER UPDATE ON evolutionary_memory
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'evolutionary_memory';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_evolutionary_memory_version_del AFTER DELETE ON evolutionary_memory
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'evolutionary_memory';
+END;
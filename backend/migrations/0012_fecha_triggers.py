@@ -0,0 +1,175 @@
+"""
+0012: fecha_ts / fecha_local se recalculan en SQLite cuando cambia la fecha.
+
+Los servicios escriben las columnas normalizadas al insertar, pero un INSERT
+crudo (scripts, consola) o un UPDATE de `fecha` las dejaba vacías o
+desfasadas. Los triggers las calculan con las mismas reglas que
+`services.datetime_normalizer`: fecha con zona ('Z', '+00:00') -> se convierte;
+sin zona -> hora local; sin hora -> medianoche local.
+
+SQLite no conoce zonas horarias, así que `tz_offsets` guarda los tramos de
+desfase de LOCAL_TIMEZONE (por inicio en UTC y en hora local) y los triggers
+buscan ahí el desfase. `datetime_normalizer.refresh_tz_offsets` la rehace si
+cambia BIOENGINE_TZ. Los triggers solo actúan si quien escribe no trajo las
+columnas: en un INSERT sin fecha_ts, o en un UPDATE de la fecha que no tocó
+fecha_ts.
+
+En activities el recálculo va dentro de los triggers de rollups de 0006 (copia
+literal más el recálculo) y no en triggers aparte, porque el orden entre
+triggers no está garantizado:
+
+- INSERT: al final de trg_activities_load_insert, cuando la fila ya sumó en
+  los rollups; el UPDATE de fecha_local dispara trg_activities_load_update,
+  que la mueve al día correcto.
+- UPDATE de fecha: trg_activities_load_update suma en el día recalculado y
+  después escribe las columnas; ese UPDATE anidado no vuelve a dispararlo
+  (SQLite no dispara un trigger desde sí mismo sin PRAGMA recursive_triggers).
+"""
+
+import datetime
+from zoneinfo import ZoneInfo
+
+from config import LOCAL_TIMEZONE
+
+NORMALIZED_TABLES = {
+    "activities": "fecha",
+    "biometrics": "fecha",
+    "pain_logs": "date",
+}
+
+LOAD_INSERT_SQL = """CREATE TRIGGER trg_activities_load_insert AFTER INSERT ON activities BEGIN 
+        INSERT INTO daily_load (day, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+        SELECT COALESCE(NEW.fecha_local, date(NEW.fecha)), COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(NEW.tipo))), 'otros'), 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+        WHERE COALESCE(NEW.fecha_local, date(NEW.fecha)) IS NOT NULL
+        ON CONFLICT(day, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score;
+        INSERT INTO weekly_load (week_start, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+        SELECT date(COALESCE(NEW.fecha_local, date(NEW.fecha)), 'weekday 0', '-6 days'), COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(NEW.tipo))), 'otros'), 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+        WHERE date(COALESCE(NEW.fecha_local, date(NEW.fecha)), 'weekday 0', '-6 days') IS NOT NULL
+        ON CONFLICT(week_start, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score;
+"""
+
+LOAD_UPDATE_SQL = """CREATE TRIGGER trg_activities_load_update AFTER UPDATE OF fecha, fecha_local, tipo, distancia_km, duracion_min, calorias, elevacion_m, stress_score ON activities
+BEGIN 
+UPDATE daily_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+WHERE day = COALESCE(OLD.fecha_local, date(OLD.fecha)) AND sport = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(OLD.tipo))), 'otros');
+DELETE FROM daily_load WHERE day = COALESCE(OLD.fecha_local, date(OLD.fecha)) AND sport = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(OLD.tipo))), 'otros') AND sessions <= 0;
+UPDATE weekly_load SET sessions = sessions - 1, distancia_km = distancia_km - COALESCE(OLD.distancia_km, 0), duracion_min = duracion_min - COALESCE(OLD.duracion_min, 0), calorias = calorias - COALESCE(OLD.calorias, 0), elevacion_m = elevacion_m - COALESCE(OLD.elevacion_m, 0), stress_score = stress_score - COALESCE(OLD.stress_score, 0)
+WHERE week_start = date(COALESCE(OLD.fecha_local, date(OLD.fecha)), 'weekday 0', '-6 days') AND sport = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(OLD.tipo))), 'otros');
+DELETE FROM weekly_load WHERE week_start = date(COALESCE(OLD.fecha_local, date(OLD.fecha)), 'weekday 0', '-6 days') AND sport = COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(OLD.tipo))), 'otros') AND sessions <= 0; 
+INSERT INTO daily_load (day, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT COALESCE(NEW.fecha_local, date(NEW.fecha)), COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(NEW.tipo))), 'otros'), 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+WHERE COALESCE(NEW.fecha_local, date(NEW.fecha)) IS NOT NULL
+ON CONFLICT(day, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score;
+INSERT INTO weekly_load (week_start, sport, sessions, distancia_km, duracion_min, calorias, elevacion_m, stress_score)
+SELECT date(COALESCE(NEW.fecha_local, date(NEW.fecha)), 'weekday 0', '-6 days'), COALESCE((SELECT sport FROM sport_taxonomy WHERE tipo_key = LOWER(TRIM(NEW.tipo))), 'otros'), 1, COALESCE(NEW.distancia_km, 0), COALESCE(NEW.duracion_min, 0), COALESCE(NEW.calorias, 0), COALESCE(NEW.elevacion_m, 0), COALESCE(NEW.stress_score, 0)
+WHERE date(COALESCE(NEW.fecha_local, date(NEW.fecha)), 'weekday 0', '-6 days') IS NOT NULL
+ON CONFLICT(week_start, sport) DO UPDATE SET sessions = sessions + 1, distancia_km = distancia_km + excluded.distancia_km, duracion_min = duracion_min + excluded.duracion_min, calorias = calorias + excluded.calorias, elevacion_m = elevacion_m + excluded.elevacion_m, stress_score = stress_score + excluded.stress_score;
+"""
+
+# Día que suma trg_activities_load_update (se sustituye por el recalculado)
+NEW_DAY = "COALESCE(NEW.fecha_local, date(NEW.fecha))"
+
+# Tramo inicial: cubre todo lo anterior a la primera transición registrada
+SINCE_EVER = -(2 ** 62)
+TRANSITIONS_FROM = datetime.datetime(1900, 1, 1, tzinfo=datetime.timezone.utc)
+TRANSITIONS_TO = datetime.datetime(2100, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _offset(tz, ts: int) -> int:
+    return int(datetime.datetime.fromtimestamp(ts, tz).utcoffset().total_seconds())
+
+
+def _transitions(zone: str):
+    """(utc_from, offset_s) de cada tramo de `zone` entre 1900 y 2100."""
+    tz = ZoneInfo(zone)
+    day = 86400
+    ts, end = int(TRANSITIONS_FROM.timestamp()), int(TRANSITIONS_TO.timestamp())
+    current = _offset(tz, ts)
+    spans = [(SINCE_EVER, current)]
+    while ts < end:
+        nxt = ts + day
+        if _offset(tz, nxt) != current:
+            lo, hi = ts, nxt  # el cambio ocurre en (lo, hi]
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if _offset(tz, mid) == current:
+                    lo = mid
+                else:
+                    hi = mid
+            current = _offset(tz, hi)
+            spans.append((hi, current))
+        ts = nxt
+    return spans
+
+
+def fill_tz_offsets(conn, zone: str) -> None:
+    conn.execute("DELETE FROM tz_offsets")
+    conn.executemany(
+        "INSERT INTO tz_offsets (utc_from, local_from, offset_s, zone) VALUES (?, ?, ?, ?)",
+        [(utc_from, utc_from if utc_from == SINCE_EVER else utc_from + offset, offset, zone)
+         for utc_from, offset in _transitions(zone)],
+    )
+
+
+def _zoned(value: str) -> str:
+    return (f"({value} LIKE '%Z' OR (length({value}) > 10 AND substr({value}, -6, 1) IN ('+', '-') "
+            f"AND substr({value}, -3, 1) = ':'))")
+
+
+def _fecha_ts(value: str) -> str:
+    return (f"CASE WHEN {_zoned(value)} THEN unixepoch({value}) "
+            f"ELSE unixepoch({value}) - (SELECT offset_s FROM tz_offsets "
+            f"WHERE local_from <= unixepoch({value}) ORDER BY local_from DESC LIMIT 1) END")
+
+
+def _fecha_local(value: str) -> str:
+    return (f"CASE WHEN {_zoned(value)} THEN date(unixepoch({value}) + (SELECT offset_s FROM tz_offsets "
+            f"WHERE utc_from <= unixepoch({value}) ORDER BY utc_from DESC LIMIT 1), 'unixepoch') "
+            f"ELSE date({value}) END")
+
+
+def _recompute(table: str, source: str, where: str = "") -> str:
+    return (f"UPDATE {table} SET fecha_ts = {_fecha_ts(f'NEW.{source}')}, "
+            f"fecha_local = {_fecha_local(f'NEW.{source}')} WHERE rowid = NEW.rowid{where};")
+
+
+def _stale(source: str) -> str:
+    """Cambió la fecha y quien escribió no trajo fecha_ts."""
+    return f"NEW.{source} IS NOT OLD.{source} AND NEW.fecha_ts IS OLD.fecha_ts"
+
+
+def _triggers(table: str, source: str):
+    if table == "activities":
+        new_day = f"CASE WHEN {_stale(source)} THEN {_fecha_local('NEW.fecha')} ELSE {NEW_DAY} END"
+        yield "DROP TRIGGER IF EXISTS trg_activities_load_insert"
+        yield (LOAD_INSERT_SQL.rstrip() + "\n        "
+               + _recompute(table, source, f" AND NEW.{source} IS NOT NULL AND NEW.fecha_ts IS NULL") + " END")
+        yield "DROP TRIGGER IF EXISTS trg_activities_load_update"
+        yield (LOAD_UPDATE_SQL.replace(NEW_DAY, new_day).rstrip() + "\n"
+               + _recompute(table, source, f" AND {_stale(source)}") + " END")
+        return
+    recompute = _recompute(table, source)
+    yield f"DROP TRIGGER IF EXISTS trg_{table}_fecha_insert"
+    yield f"DROP TRIGGER IF EXISTS trg_{table}_fecha_update"
+    yield (f"CREATE TRIGGER trg_{table}_fecha_insert AFTER INSERT ON {table}\n"
+           f"WHEN NEW.{source} IS NOT NULL AND NEW.fecha_ts IS NULL\n"
+           f"BEGIN {recompute} END")
+    yield (f"CREATE TRIGGER trg_{table}_fecha_update AFTER UPDATE OF {source} ON {table}\n"
+           f"WHEN {_stale(source)}\n"
+           f"BEGIN {recompute} END")
+
+
+def upgrade(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tz_offsets (
+            utc_from INTEGER PRIMARY KEY,
+            local_from INTEGER NOT NULL,
+            offset_s INTEGER NOT NULL,
+            zone TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tz_offsets_local ON tz_offsets(local_from)")
+    fill_tz_offsets(conn, LOCAL_TIMEZONE)
+    for table, source in NORMALIZED_TABLES.items():
+        for statement in _triggers(table, source):
+            conn.execute(statement)
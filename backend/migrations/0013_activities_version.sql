@@ -0,0 +1,20 @@
+-- 0013: versión de activities en table_versions para que ActivityFrame detecte
+-- cualquier cambio (altas, ediciones, borrados y fusiones del dedup), no solo
+-- las filas con id nuevo. Cada fila afectada suma 1. El UPDATE solo cuenta las
+-- columnas que lee el frame; fecha_ts/fecha_local se derivan de `fecha`, así
+-- que rellenarlas (triggers de 0012, backfill) no cuenta como cambio.
+INSERT OR IGNORE INTO table_versions (name, version) VALUES ('activities', 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_activities_version_ins AFTER INSERT ON activities
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'activities';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_activities_version_upd
+AFTER UPDATE OF fecha, tipo, nombre, fuente, distancia_km, duracion_min, calorias, fc_media, fc_max, elevacion_m ON activities
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'activities';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_activities_version_del AFTER DELETE ON activities
+BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'activities';
+END;
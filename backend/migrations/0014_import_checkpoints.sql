@@ -0,0 +1,14 @@
+-- 0014: checkpoints de importaciones de archivos (export de Apple Health) en su
+-- propia tabla. Vivían en user_context, donde cada lote movía la versión de la
+-- tabla (invalidando la caché del contexto base) y aparecían en el recurso
+-- user_context del servidor MCP.
+CREATE TABLE IF NOT EXISTS import_checkpoints (
+    source TEXT PRIMARY KEY,
+    value_json TEXT NOT NULL,
+    updated_at TEXT
+);
+
+INSERT OR IGNORE INTO import_checkpoints (source, value_json, updated_at)
+SELECT 'apple_health', value_json, updated_at FROM user_context WHERE key = 'apple_health_checkpoint';
+
+DELETE FROM user_context WHERE key = 'apple_health_checkpoint';
@@ -0,0 +1,11 @@
+"""
+Migraciones versionadas del esquema de BioEngine V3.
+
+Los ficheros `NNNN_nombre.sql` (o `NNNN_nombre.py` con una función
+`upgrade(conn)`) se aplican en orden numérico y cada versión aplicada queda
+registrada en `schema_migrations` y en `PRAGMA user_version`.
+"""
+
+from migrations.runner import run_migrations, get_schema_version, discover_migrations
+
+__all__ = ["run_migrations", "get_schema_version", "discover_migrations"]
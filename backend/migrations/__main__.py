@@ -0,0 +1,33 @@
+"""
+Uso (desde backend/):
+    python -m migrations            # aplica las pendientes sobre DB_PATH
+    python -m migrations --status   # muestra versión actual y pendientes
+"""
+
+import sys
+import logging
+
+from config import DB_PATH
+from services.db_pool import get_connection
+from migrations.runner import run_migrations, get_schema_version, discover_migrations
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    if "--status" in sys.argv:
+        with get_connection(DB_PATH) as conn:
+            has_table = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'"
+            ).fetchone()
+            applied = {r[0] for r in conn.execute("SELECT version FROM schema_migrations")} if has_table else set()
+        print(f"DB: {DB_PATH}")
+        print(f"Versión actual: {get_schema_version(DB_PATH)}")
+        for m in discover_migrations():
+            print(f"  [{'x' if m.version in applied else ' '}] {m.version:04d}_{m.name}.{m.kind}")
+    else:
+        done = run_migrations(DB_PATH)
+        print(f"Migraciones aplicadas: {done or 'ninguna (esquema al día)'}")
+
+
+if __name__ == "__main__":
+    main()
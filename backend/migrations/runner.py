@@ -0,0 +1,120 @@
+"""
+Runner de migraciones del esquema SQLite (CLI: `python -m migrations`).
+"""
+
+import os
+import re
+import sqlite3
+import logging
+import importlib.util
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from services.db_pool import get_connection
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Solo los ficheros numerados son migraciones; los scripts sueltos heredados
+# (p.ej. add_multi_model_support.sql) se ignoran.
+_MIGRATION_RE = re.compile(r"^(\d{4})_([a-z0-9_]+)\.(sql|py)$")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: str
+
+    @property
+    def kind(self) -> str:
+        return os.path.splitext(self.path)[1].lstrip(".")
+
+
+def discover_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Devuelve las migraciones del directorio ordenadas por versión."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _MIGRATION_RE.match(filename)
+        if not match:
+            continue
+        migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Versiones de migración duplicadas en {directory}: {versions}")
+    return migrations
+
+
+def _ensure_migrations_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def _applied_versions(conn: sqlite3.Connection) -> set:
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+
+def get_schema_version(db_path: Optional[str] = None) -> int:
+    """Versión de esquema actual (0 si nunca se migró la base de datos)."""
+    with get_connection(db_path) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _apply(conn: sqlite3.Connection, migration: Migration) -> None:
+    if migration.kind == "sql":
+        with open(migration.path, "r", encoding="utf-8") as f:
+            sql = f.read()
+        # executescript confirma cualquier transacción previa; abrimos la nuestra
+        # para que el DDL y el registro de versión sean atómicos.
+        conn.executescript("BEGIN;\n" + sql)
+    else:
+        spec = importlib.util.spec_from_file_location(f"migration_{migration.version:04d}", migration.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        module.upgrade(conn)
+
+    conn.execute(
+        "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+        (migration.version, migration.name, datetime.now().isoformat()),
+    )
+    conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+    conn.commit()
+
+
+def run_migrations(db_path: Optional[str] = None, directory: str = MIGRATIONS_DIR) -> List[int]:
+    """
+    Aplica las migraciones pendientes en orden. Idempotente: las versiones ya
+    registradas en `schema_migrations` se omiten. Devuelve las versiones aplicadas.
+    """
+    applied_now = []
+    with get_connection(db_path) as conn:
+        _ensure_migrations_table(conn)
+        applied = _applied_versions(conn)
+
+        for migration in discover_migrations(directory):
+            if migration.version in applied:
+                continue
+            logger.info(f"Aplicando migración {migration.version:04d}_{migration.name}")
+            try:
+                _apply(conn, migration)
+            except Exception:
+                if conn.in_transaction:
+                    conn.rollback()
+                logger.error(f"Falló la migración {migration.version:04d}_{migration.name}")
+                raise
+            applied_now.append(migration.version)
+
+    return applied_now
+
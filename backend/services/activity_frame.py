@@ -0,0 +1,302 @@
+"""
+ActivityFrame: historial de actividades en memoria, en columnas NumPy.
+
+Se carga una vez al arrancar la API y sigue a la tabla con la versión de
+activities en table_versions (migración 0013), que avanza con cada fila
+insertada, editada o borrada. Si desde la carga solo hubo altas (la versión
+avanzó tanto como filas con id nuevo hay), se añaden esas filas; con
+cualquier otro cambio se recarga entero. Los analíticos (triage del coach, /equipment, contexto del análisis IA)
+recortan arrays en lugar de consultar SQLite y construir dicts en cada
+petición.
+
+Las columnas se mantienen ordenadas por (fecha, id) ascendente, de modo que
+las ventanas temporales son un searchsorted y las últimas N actividades son
+la cola de los arrays.
+"""
+
+import threading
+import logging
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from services.db_pool import get_connection
+from services.datetime_normalizer import epoch_to_local, normalize
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_COLUMNS = ("distancia_km", "duracion_min", "calorias", "fc_media", "fc_max", "elevacion_m")
+TEXT_COLUMNS = ("fecha_raw", "nombre", "fuente")
+
+DateLike = Union[str, datetime.date, datetime.datetime, np.datetime64]
+
+
+def _parse_fecha(value: Any) -> Optional[np.datetime64]:
+    """Convierte una fecha (ISO con 'T', con espacio, solo día o con zona) a hora local datetime64[s]."""
+    normalized = normalize(value)
+    if normalized is None:
+        return None
+    return np.datetime64(normalized.local, "s")
+
+
+def _to_datetime64(value: DateLike) -> np.datetime64:
+    if isinstance(value, np.datetime64):
+        return value.astype("datetime64[s]")
+    if isinstance(value, str):
+        parsed = _parse_fecha(value)
+        if parsed is None:
+            raise ValueError(f"Fecha inválida: {value!r}")
+        return parsed
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return np.datetime64(value, "s")
+
+
+class ActivityView:
+    """
+    Conjunto inmutable de columnas (o un recorte de ellas). Los recortes por
+    ventana/cola son vistas NumPy, sin copia; los filtros por máscara copian.
+    """
+
+    def __init__(self, ids: np.ndarray, fecha: np.ndarray, tipo_code: np.ndarray,
+                 tipos: Sequence[str], numeric: Dict[str, np.ndarray], text: Dict[str, np.ndarray]):
+        self.ids = ids
+        self.fecha = fecha
+        self.tipo_code = tipo_code
+        self.tipos = tipos
+        self.numeric = numeric
+        self.text = text
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _take(self, index) -> "ActivityView":
+        return ActivityView(
+            self.ids[index], self.fecha[index], self.tipo_code[index], self.tipos,
+            {k: v[index] for k, v in self.numeric.items()},
+            {k: v[index] for k, v in self.text.items()},
+        )
+
+    def column(self, name: str) -> np.ndarray:
+        return self.numeric[name]
+
+    def between(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> "ActivityView":
+        """Actividades con start <= fecha < end (cualquiera de los dos puede omitirse)."""
+        lo = 0 if start is None else int(np.searchsorted(self.fecha, _to_datetime64(start), side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.fecha, _to_datetime64(end), side="left"))
+        return self._take(slice(lo, max(lo, hi)))
+
+    def since_days(self, days: int, now: Optional[datetime.datetime] = None) -> "ActivityView":
+        """Actividades de los últimos N días naturales (desde las 00:00 del día de corte)."""
+        cutoff = ((now or datetime.datetime.now()) - datetime.timedelta(days=days)).date()
+        return self.between(cutoff)
+
+    def last(self, n: int) -> "ActivityView":
+        return self._take(slice(max(0, len(self) - n), len(self)))
+
+    def type_mask(self, labels: Iterable[str]) -> np.ndarray:
+        """Máscara booleana de las actividades cuyo tipo (sin distinguir mayúsculas) está en `labels`."""
+        wanted = {label.lower() for label in labels}
+        codes = [i for i, t in enumerate(self.tipos) if t.lower() in wanted]
+        return np.isin(self.tipo_code, codes)
+
+    def of_types(self, labels: Iterable[str]) -> "ActivityView":
+        return self._take(self.type_mask(labels))
+
+    def total(self, name: str) -> float:
+        """Suma de una columna numérica ignorando nulos (equivalente a SUM() en SQL)."""
+        return float(np.nansum(self.numeric[name])) if len(self) else 0.0
+
+    def to_records(self, newest_first: bool = True) -> List[Dict[str, Any]]:
+        """Materializa la vista como lista de dicts (mismas claves que la tabla activities)."""
+        order = range(len(self) - 1, -1, -1) if newest_first else range(len(self))
+        records = []
+        for i in order:
+            record = {
+                "id": int(self.ids[i]),
+                "fecha": self.text["fecha_raw"][i],
+                "tipo": self.tipos[self.tipo_code[i]],
+                "nombre": self.text["nombre"][i],
+                "fuente": self.text["fuente"][i],
+            }
+            for name, values in self.numeric.items():
+                value = values[i]
+                record[name] = None if np.isnan(value) else float(value)
+            records.append(record)
+        return records
+
+
+def _empty_view(tipos: List[str]) -> ActivityView:
+    return ActivityView(
+        np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[s]"), np.empty(0, dtype=np.int32), tipos,
+        {name: np.empty(0, dtype=np.float64) for name in NUMERIC_COLUMNS},
+        {name: np.empty(0, dtype=object) for name in TEXT_COLUMNS},
+    )
+
+
+class ActivityFrame:
+    """
+    Almacén de proceso del historial de actividades.
+
+    `view()` devuelve una instantánea inmutable: una recarga o un append
+    sustituyen la instantánea completa, así que los lectores nunca ven arrays
+    a medio actualizar y no necesitan lock.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._tipos: List[str] = []
+        self._tipo_index: Dict[str, int] = {}
+        self._view: Optional[ActivityView] = None
+        self._max_id = 0
+        self._version: Optional[int] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._view is not None
+
+    def view(self) -> ActivityView:
+        """Instantánea actual (carga completa la primera vez; al día con la tabla)."""
+        view = self._view
+        if view is None:
+            self.load()
+        elif self._current_version() != self._version:
+            self.refresh()
+        return self._view
+
+    def load(self) -> int:
+        """Carga (o recarga) el historial completo. Devuelve el número de actividades."""
+        with self._lock:
+            with get_connection(self.db_path) as conn:
+                self._load(conn)
+            logger.info(f"ActivityFrame cargado: {len(self._view)} actividades")
+            return len(self._view)
+
+    def refresh(self) -> int:
+        """
+        Pone la instantánea al día si la versión de activities cambió: agrega las
+        filas nuevas si solo hubo altas o recarga todo si no. Devuelve cuántas
+        actividades ganó (negativo si hubo borrados). Si aún no se cargó, no
+        hace nada: la primera `view()` lo leerá todo.
+        """
+        if self._view is None:
+            return 0
+        with self._lock:
+            before = len(self._view)
+            with get_connection(self.db_path) as conn:
+                version = self._read_version(conn)
+                if version is not None and version == self._version:
+                    return 0
+                # La versión se lee antes que las filas: lo que llegue en medio
+                # vuelve a mover la versión y se recoge en la próxima llamada
+                rows = self._fetch(conn, after_id=self._max_id)
+                appended_only = (
+                    version is not None and self._version is not None and version - self._version == len(rows)
+                )
+                if appended_only:
+                    self._view = self._append(self._view, rows)
+                    self._version = version
+                else:
+                    self._load(conn)
+            return len(self._view) - before
+
+    def _load(self, conn) -> None:
+        self._tipos, self._tipo_index, self._max_id = [], {}, 0
+        self._version = self._read_version(conn)
+        self._view = self._append(_empty_view(self._tipos), self._fetch(conn, after_id=0))
+
+    def _current_version(self) -> Optional[int]:
+        with get_connection(self.db_path) as conn:
+            return self._read_version(conn)
+
+    @staticmethod
+    def _read_version(conn) -> Optional[int]:
+        row = conn.execute("SELECT version FROM table_versions WHERE name = 'activities'").fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _fetch(conn, after_id: int) -> List[Any]:
+        return conn.execute(f"""
+            SELECT id, fecha, fecha_ts, tipo, nombre, fuente, {', '.join(NUMERIC_COLUMNS)}
+            FROM activities WHERE id > ? ORDER BY id
+        """, (after_id,)).fetchall()
+
+    def _tipo_code(self, tipo: Optional[str]) -> int:
+        label = tipo or "otros"
+        code = self._tipo_index.get(label)
+        if code is None:
+            code = len(self._tipos)
+            self._tipos.append(label)
+            self._tipo_index[label] = code
+        return code
+
+    def _append(self, base: ActivityView, rows: List[Any]) -> ActivityView:
+        ids, fechas, codes, raw = [], [], [], []
+        numeric = {name: [] for name in NUMERIC_COLUMNS}
+        nombres, fuentes = [], []
+        for row in rows:
+            self._max_id = max(self._max_id, row["id"])
+            if row["fecha_ts"] is not None:
+                fecha = np.datetime64(epoch_to_local(row["fecha_ts"]), "s")
+            else:
+                fecha = _parse_fecha(row["fecha"])
+            if fecha is None:
+                logger.warning(f"ActivityFrame: fecha no válida en actividad {row['id']}: {row['fecha']!r}")
+                continue
+            ids.append(row["id"])
+            fechas.append(fecha)
+            raw.append(row["fecha"])
+            codes.append(self._tipo_code(row["tipo"]))
+            nombres.append(row["nombre"])
+            fuentes.append(row["fuente"])
+            for name in NUMERIC_COLUMNS:
+                value = row[name]
+                numeric[name].append(np.nan if value is None else float(value))
+
+        if not ids:
+            return base
+
+        def text_array(values: List[Any]) -> np.ndarray:
+            arr = np.empty(len(values), dtype=object)
+            arr[:] = values
+            return arr
+
+        all_ids = np.concatenate([base.ids, np.asarray(ids, dtype=np.int64)])
+        all_fecha = np.concatenate([base.fecha, np.asarray(fechas, dtype="datetime64[s]")])
+        # Las filas nuevas suelen ser las más recientes; solo se reordena si un
+        # sync trae actividades antiguas (lexsort: fecha, y a igualdad, id).
+        new_fecha = all_fecha[len(base):]
+        needs_sort = (
+            (len(base) and new_fecha.min() < base.fecha[-1])
+            or bool(np.any(new_fecha[1:] < new_fecha[:-1]))
+        )
+        order = np.lexsort((all_ids, all_fecha)) if needs_sort else None
+
+        merged = ActivityView(
+            all_ids, all_fecha,
+            np.concatenate([base.tipo_code, np.asarray(codes, dtype=np.int32)]),
+            self._tipos,
+            {name: np.concatenate([base.numeric[name], np.asarray(numeric[name], dtype=np.float64)]) for name in NUMERIC_COLUMNS},
+            {
+                "fecha_raw": np.concatenate([base.text["fecha_raw"], text_array(raw)]),
+                "nombre": np.concatenate([base.text["nombre"], text_array(nombres)]),
+                "fuente": np.concatenate([base.text["fuente"], text_array(fuentes)]),
+            },
+        )
+        return merged._take(order) if order is not None else merged
+
+
+_activity_frame: Optional[ActivityFrame] = None
+_activity_frame_lock = threading.Lock()
+
+
+def get_activity_frame() -> ActivityFrame:
+    """Get singleton ActivityFrame instance"""
+    global _activity_frame
+    if _activity_frame is None:
+        with _activity_frame_lock:
+            if _activity_frame is None:
+                _activity_frame = ActivityFrame()
+    return _activity_frame
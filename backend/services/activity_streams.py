@@ -0,0 +1,377 @@
+"""
+Series por segundo de las actividades (FC, cadencia, velocidad, altitud, distancia).
+
+Los archivos FIT, GPX y TCX se leen en streaming (fitdecode para FIT,
+`iterparse` para GPX/TCX) y se remuestrean a una rejilla de 1 Hz. Cada
+actividad se guarda como un array estructurado en un `.npy` bajo STREAMS_DIR
+(~13 bytes por segundo) y se enlaza con `activities.id` en `activity_streams`
+(migración 0008). La lectura abre el archivo con `mmap_mode="r"`, así que
+`read_range` devuelve vistas sin copia: solo se leen de disco las páginas
+del tramo pedido.
+
+Al importar, si ya existe una actividad que empieza dentro de la ventana de
+deduplicación se le asocian las series; si no, se crea con los agregados
+calculados desde el archivo.
+"""
+
+import logging
+import math
+import os
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import DEDUP_WINDOW_S, STREAMS_DIR
+from services.datetime_normalizer import normalize
+
+logger = logging.getLogger(__name__)
+
+STREAM_DTYPE = np.dtype([
+    ("hr", np.uint8),           # lpm, 0 = sin dato
+    ("cadence", np.uint8),      # rpm / pasos por pierna, 0 = sin dato
+    ("speed", np.float32),      # m/s, NaN = sin dato
+    ("altitude", np.float32),   # m, NaN = sin dato
+    ("distance", np.float32),   # m acumulados, NaN = sin dato
+])
+CHANNELS = STREAM_DTYPE.names
+STREAM_FORMATS = (".fit", ".gpx", ".tcx")
+FILE_SOURCE = "Archivo {fmt}"
+
+# Tipo del archivo (sport de FIT/TCX, <type> de GPX) -> `tipo` de activities
+FILE_SPORTS: Dict[str, str] = {
+    "running": "running", "run": "running", "trail_running": "trail_running",
+    "cycling": "cycling", "biking": "cycling", "ride": "cycling",
+    "swimming": "swimming", "walking": "walking", "hiking": "hiking",
+    "tennis": "tennis", "training": "strength_training",
+}
+
+
+class FitDecoderMissingError(ImportError):
+    """Se pidió importar un .fit sin el paquete `fitdecode` instalado (fallo del entorno, no del archivo)."""
+
+
+class Sample(NamedTuple):
+    ts: int
+    hr: Optional[float] = None
+    cadence: Optional[float] = None
+    speed: Optional[float] = None
+    altitude: Optional[float] = None
+    distance: Optional[float] = None
+
+
+class StreamInfo(NamedTuple):
+    activity_id: int
+    path: str
+    start_ts: int
+    samples: int
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _float(text) -> Optional[float]:
+    try:
+        return float(text) if text not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def _haversine_m(lat1, lon1, lat2, lon2) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371000.0 * math.asin(math.sqrt(a))
+
+
+# ---------------------------------------------------------------------------
+# Parsers (todos devuelven (sport, iterador de Sample) y no materializan el archivo)
+# ---------------------------------------------------------------------------
+
+def _iter_xml(path: str, point_tag: str) -> Iterator[Tuple[Optional[str], Optional[ET.Element]]]:
+    """
+    Recorre el XML emitiendo (sport, None) cuando aparece el tipo de actividad
+    y (None, punto) por cada punto cerrado; el punto se libera tras usarse.
+    """
+    context = ET.iterparse(path, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        tag = _local(elem.tag)
+        if event == "start":
+            if tag == "Activity" and elem.get("Sport"):
+                yield elem.get("Sport"), None
+            continue
+        if tag == point_tag:
+            yield None, elem
+            elem.clear()
+            root.clear()
+        elif tag == "type" and elem.text:
+            yield elem.text, None
+
+
+def _children(elem) -> Dict[str, ET.Element]:
+    return {_local(child.tag): child for child in elem.iter() if child is not elem}
+
+
+def parse_gpx(path: str) -> Tuple[List[str], Iterator[Sample]]:
+    sport: List[str] = []
+
+    def samples():
+        prev, total = None, 0.0
+        for found, pt in _iter_xml(path, "trkpt"):
+            if pt is None:
+                sport.append(found)
+                continue
+            kids = _children(pt)
+            when = normalize(kids["time"].text) if "time" in kids else None
+            if when is None:
+                continue
+            lat, lon = _float(pt.get("lat")), _float(pt.get("lon"))
+            if prev is not None and lat is not None and lon is not None:
+                total += _haversine_m(prev[0], prev[1], lat, lon)
+            if lat is not None and lon is not None:
+                prev = (lat, lon)
+            yield Sample(
+                when.ts,
+                hr=_float(kids["hr"].text) if "hr" in kids else None,
+                cadence=_float(kids["cad"].text) if "cad" in kids else None,
+                speed=_float(kids["speed"].text) if "speed" in kids else None,
+                altitude=_float(kids["ele"].text) if "ele" in kids else None,
+                distance=total,
+            )
+
+    return sport, samples()
+
+
+def parse_tcx(path: str) -> Tuple[List[str], Iterator[Sample]]:
+    sport: List[str] = []
+
+    def samples():
+        for found, pt in _iter_xml(path, "Trackpoint"):
+            if pt is None:
+                sport.append(found)
+                continue
+            kids = _children(pt)
+            when = normalize(kids["Time"].text) if "Time" in kids else None
+            if when is None:
+                continue
+            hr = kids.get("HeartRateBpm")
+            hr_value = _children(hr).get("Value") if hr is not None else None
+            cadence = kids.get("Cadence") if "Cadence" in kids else kids.get("RunCadence")
+            yield Sample(
+                when.ts,
+                hr=_float(hr_value.text) if hr_value is not None else None,
+                cadence=_float(cadence.text) if cadence is not None else None,
+                speed=_float(kids["Speed"].text) if "Speed" in kids else None,
+                altitude=_float(kids["AltitudeMeters"].text) if "AltitudeMeters" in kids else None,
+                distance=_float(kids["DistanceMeters"].text) if "DistanceMeters" in kids else None,
+            )
+
+    return sport, samples()
+
+
+def parse_fit(path: str) -> Tuple[List[str], Iterator[Sample]]:
+    try:
+        import fitdecode
+    except ImportError as e:
+        raise FitDecoderMissingError("Para importar .fit hace falta fitdecode: pip install fitdecode") from e
+
+    sport: List[str] = []
+
+    def field(frame, *names):
+        for name in names:
+            if frame.has_field(name):
+                value = frame.get_value(name)
+                if value is not None:
+                    return value
+        return None
+
+    def samples():
+        with fitdecode.FitReader(path) as fit:
+            for frame in fit:
+                if frame.frame_type != fitdecode.FIT_FRAME_DATA:
+                    continue
+                if frame.name in ("sport", "session") and not sport:
+                    value = field(frame, "sport")
+                    if value is not None:
+                        sport.append(str(value))
+                if frame.name != "record":
+                    continue
+                when = normalize(field(frame, "timestamp"))
+                if when is None:
+                    continue
+                yield Sample(
+                    when.ts,
+                    hr=field(frame, "heart_rate"),
+                    cadence=field(frame, "cadence"),
+                    speed=field(frame, "enhanced_speed", "speed"),
+                    altitude=field(frame, "enhanced_altitude", "altitude"),
+                    distance=field(frame, "distance"),
+                )
+
+    return sport, samples()
+
+
+PARSERS = {".fit": parse_fit, ".gpx": parse_gpx, ".tcx": parse_tcx}
+
+
+# ---------------------------------------------------------------------------
+# Remuestreo y almacenamiento
+# ---------------------------------------------------------------------------
+
+def to_stream(samples: Iterator[Sample]) -> Tuple[Optional[int], np.ndarray]:
+    """Remuestrea a 1 Hz (offset en segundos desde el primer punto) -> (start_ts, array)."""
+    columns: Dict[str, List] = {name: [] for name in ("ts",) + CHANNELS}
+    for s in samples:
+        for name in columns:
+            value = getattr(s, name)
+            columns[name].append(np.nan if value is None else value)
+    if not columns["ts"]:
+        return None, np.zeros(0, dtype=STREAM_DTYPE)
+
+    ts = np.asarray(columns["ts"], dtype=np.int64)
+    start = int(ts.min())
+    offsets = ts - start
+    out = np.zeros(int(offsets.max()) + 1, dtype=STREAM_DTYPE)
+    for name in ("speed", "altitude", "distance"):
+        out[name] = np.nan
+    for name in CHANNELS:
+        values = np.asarray(columns[name], dtype=np.float64)
+        known = ~np.isnan(values)
+        if name in ("hr", "cadence"):
+            out[name][offsets[known]] = np.clip(np.round(values[known]), 0, 255)
+        else:
+            out[name][offsets[known]] = values[known]
+
+    # Sin velocidad en el archivo: derivarla de la distancia acumulada
+    if np.isnan(out["speed"]).all():
+        dist = out["distance"]
+        known = np.flatnonzero(~np.isnan(dist))
+        if len(known) > 1:
+            filled = np.interp(np.arange(len(out)), known, dist[known])
+            out["speed"] = np.diff(filled, prepend=filled[0])
+    return start, out
+
+
+def _stream_path(activity_id: int) -> str:
+    return os.path.join(str(STREAMS_DIR), f"{int(activity_id)}.npy")
+
+
+def save_stream(conn, activity_id: int, start_ts: int, stream: np.ndarray,
+                source_file: Optional[str] = None) -> StreamInfo:
+    """Escribe el .npy (vía archivo temporal + rename) y registra el enlace."""
+    os.makedirs(str(STREAMS_DIR), exist_ok=True)
+    path = _stream_path(activity_id)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, stream)
+    os.replace(tmp, path)
+    conn.execute(
+        "INSERT OR REPLACE INTO activity_streams (activity_id, path, start_ts, samples, channels, source_file) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (activity_id, path, start_ts, len(stream), ",".join(CHANNELS), source_file),
+    )
+    conn.commit()
+    return StreamInfo(activity_id, path, start_ts, len(stream))
+
+
+def stream_info(conn, activity_id: int) -> Optional[StreamInfo]:
+    row = conn.execute(
+        "SELECT activity_id, path, start_ts, samples FROM activity_streams WHERE activity_id = ?", (activity_id,)
+    ).fetchone()
+    return StreamInfo(*row) if row else None
+
+
+def open_stream(path: str) -> np.ndarray:
+    """Array estructurado mapeado en memoria (solo lectura); no carga el archivo."""
+    return np.load(path, mmap_mode="r")
+
+
+def read_range(conn, activity_id: int, start_s: int = 0, end_s: Optional[int] = None,
+               channels: Optional[Sequence[str]] = None):
+    """
+    Tramo [start_s, end_s) en segundos desde el inicio. Devuelve una vista sin
+    copia del mmap: el array estructurado completo o, con `channels`, un dict
+    canal -> vista. None si la actividad no tiene series.
+    """
+    info = stream_info(conn, activity_id)
+    if info is None or not os.path.exists(info.path):
+        return None
+    view = open_stream(info.path)[max(0, start_s):end_s]
+    if channels is None:
+        return view
+    unknown = set(channels) - set(CHANNELS)
+    if unknown:
+        raise ValueError(f"Canales desconocidos: {sorted(unknown)}")
+    return {name: view[name] for name in channels}
+
+
+# ---------------------------------------------------------------------------
+# Importación
+# ---------------------------------------------------------------------------
+
+def summarize(stream: np.ndarray) -> Dict[str, Optional[float]]:
+    """Agregados de sesión (los de `activities`) calculados desde la serie."""
+    def mean(values):
+        values = values[values > 0]
+        return round(float(values.mean())) if len(values) else None
+
+    distance = stream["distance"][~np.isnan(stream["distance"])]
+    altitude = stream["altitude"][~np.isnan(stream["altitude"])]
+    hr = stream["hr"]
+    return {
+        "distancia_km": round(float(distance.max() - distance.min()) / 1000.0, 2) if len(distance) else None,
+        "duracion_min": round(len(stream) / 60.0, 1),
+        "fc_media": mean(hr),
+        "fc_max": int(hr.max()) if len(hr) and hr.max() > 0 else None,
+        "elevacion_m": round(float(np.clip(np.diff(altitude), 0, None).sum()), 1) if len(altitude) > 1 else None,
+        "cadencia_media": mean(stream["cadence"]),
+    }
+
+
+def _file_sport(found: List[str]) -> str:
+    raw = (found[0] if found else "").strip().lower()
+    return FILE_SPORTS.get(raw, raw or "otros")
+
+
+def _match_activity(conn, start_ts: int, window_s: int) -> Optional[int]:
+    row = conn.execute(
+        "SELECT id FROM activities WHERE fecha_ts BETWEEN ? AND ? ORDER BY ABS(fecha_ts - ?), id LIMIT 1",
+        (start_ts - window_s, start_ts + window_s, start_ts),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def import_activity_file(conn, path: str, activity_id: Optional[int] = None,
+                         window_s: int = DEDUP_WINDOW_S) -> Optional[StreamInfo]:
+    """
+    Importa un FIT/GPX/TCX: guarda sus series y las enlaza con `activity_id`, con
+    la actividad que empieza dentro de la ventana o, si no hay, con una nueva.
+    Formato no soportado -> ValueError; .fit sin fitdecode -> FitDecoderMissingError.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in PARSERS:
+        raise ValueError(f"Formato no soportado: {ext} (válidos: {', '.join(STREAM_FORMATS)})")
+    sport, samples = PARSERS[ext](path)
+    start_ts, stream = to_stream(samples)
+    if start_ts is None:
+        logger.warning(f"{path}: sin puntos con hora, nada que importar")
+        return None
+
+    if activity_id is None:
+        activity_id = _match_activity(conn, start_ts, window_s)
+    if activity_id is None:
+        when = normalize(start_ts)
+        stats = summarize(stream)
+        cur = conn.execute(
+            f"INSERT INTO activities (fecha, fecha_ts, fecha_local, tipo, fuente, {', '.join(stats)}) "
+            f"VALUES (?, ?, ?, ?, ?{', ?' * len(stats)})",
+            (when.local.isoformat(sep=" "), when.ts, when.local_date, _file_sport(sport),
+             FILE_SOURCE.format(fmt=ext[1:].upper()), *stats.values()),
+        )
+        activity_id = cur.lastrowid
+
+    info = save_stream(conn, activity_id, start_ts, stream, source_file=os.path.basename(path))
+    logger.info(f"Series de {path}: {info.samples} s -> actividad {activity_id}")
+    return info
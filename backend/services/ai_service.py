@@ -6,11 +6,11 @@ import time
 import re
 import asyncio
 import logging
-from google import genai
 from google.genai import types
 from typing import Optional, List, Dict, Any, Union
 from services.context_manager import ContextManager
 from services.multi_model_client import MultiModelClient
+from services.llm_clients import get_llm_client
 from services.cost_control import CostControl
 from models.schemas import ActivitySchema, BodyCompositionSchema
 from models.schemas_biomecanica import GaitAnalysis, TennisFatigue, AthleteBiometrics2026, RiskAssessment
@@ -24,12 +24,16 @@ from services.agents.coach_agent import CoachAgent
 from services.agents.recovery_agent import RecoveryAgent
 from services.agents.biomechanics_agent import BiomechanicsAgent
 from services.agents.skills.notebooklm_bridge.bridge_logic import NotebookLMBridge
+from services.db_pool import get_connection, run_db
+from services.activity_frame import get_activity_frame
+from services.training_load import get_training_load_service
+from services.log_sink import LogSinkHandler
 
 from config import DB_PATH, LOG_FILE, GEMINI_MODEL
 
 # Setup detailed logging for debugging
 logging.basicConfig(
-    filename=LOG_FILE,
+    handlers=[LogSinkHandler(LOG_FILE)],
     level=logging.DEBUG,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
@@ -80,10 +84,13 @@ class AIService:
         except Exception:
             return False
 
-    def _get_connection(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+    def _get_connection(self):
+        """Presta una conexión del pool compartido (usar con `with`)."""
+        return get_connection(self.db_path)
+
+    def invalidate_analysis_cache(self) -> None:
+        """Descarta el análisis cacheado; se llama al llegar datos nuevos (data_events)."""
+        self._analysis_cache = {"timestamp": 0, "content": None}
 
     def _get_gemini_key(self) -> Optional[str]:
         # BioEngine V4: Prioritize environment variables from .env
@@ -93,9 +100,8 @@ class AIService:
             return GEMINI_API_KEY.strip()
 
         # Fallback to database (legacy)
-        conn = self._get_connection()
-        row = conn.execute("SELECT credentials_json FROM secrets WHERE service = ?", ('gemini',)).fetchone()
-        conn.close()
+        with self._get_connection() as conn:
+            row = conn.execute("SELECT credentials_json FROM secrets WHERE service = ?", ('gemini',)).fetchone()
         if not row:
             return None
             
@@ -125,7 +131,8 @@ class AIService:
             print("Warning: No Gemini API key found")
             self.client = None
         else:
-            self.client = genai.Client(api_key=self.api_key)
+            # Mismo cliente (y pool de conexiones) que usa MultiModelClient para esta key
+            self.client = get_llm_client("gemini", self.api_key)
             if self.client:
                 logger.info("Gemini API client initialized successfully")
                 # Inyectar cliente y modelo en los agentes registrados
@@ -136,16 +143,14 @@ class AIService:
     
     def _get_all_api_keys(self):
         """Retrieve all API keys for multi-model client."""
-        conn = self._get_connection()
         keys = {}
         try:
-            rows = conn.execute("SELECT provider, api_key FROM api_keys WHERE enabled = 1 ORDER BY priority ASC").fetchall()
+            with self._get_connection() as conn:
+                rows = conn.execute("SELECT provider, api_key FROM api_keys WHERE enabled = 1 ORDER BY priority ASC").fetchall()
             for row in rows:
                 keys[row['provider']] = row['api_key']
         except sqlite3.OperationalError as e:
             logger.warning(f"Could not load API keys for multi-model: {e}")
-        finally:
-            conn.close()
         return keys
     
     def _setup_multi_model_client(self):
@@ -163,38 +168,35 @@ class AIService:
             self.multi_model_client = None
 
     def _get_user_context(self) -> str:
-        conn = self._get_connection()
-        try:
-            # Reduce context size to save tokens and avoid hitting rate limits faster
-            raw_activities = conn.execute("SELECT * FROM activities ORDER BY fecha DESC LIMIT 5").fetchall()
-            raw_biometrics = conn.execute("SELECT * FROM biometrics ORDER BY fecha DESC LIMIT 3").fetchall()
+        # Reduce context size to save tokens and avoid hitting rate limits faster
+        raw_activities = get_activity_frame().view().last(5).to_records()
+        with self._get_connection() as conn:
+            raw_biometrics = conn.execute("SELECT * FROM biometrics ORDER BY fecha_ts DESC, id DESC LIMIT 3").fetchall()
             
-            activities: List[ActivitySchema] = []
-            for row in raw_activities:
-                try:
-                    activities.append(ActivitySchema(**dict(row)))
-                except Exception:
-                    continue
+        activities: List[ActivitySchema] = []
+        for row in raw_activities:
+            try:
+                activities.append(ActivitySchema(**dict(row)))
+            except Exception:
+                continue
 
-            biometrics: List[BodyCompositionSchema] = []
-            for row in raw_biometrics:
-                try:
-                    biometrics.append(BodyCompositionSchema(**dict(row)))
-                except Exception:
-                    continue
-
-            context = "CONTEXTO DEL USUARIO (BIOENGINE V3):\n"
-            context += "Últimas Actividades:\n"
-            for a in activities:
-                date_str = a.fecha.strftime('%Y-%m-%d') if hasattr(a.fecha, 'strftime') else str(a.fecha)
-                context += f"- {date_str}: {a.tipo}, {a.distancia_km}km, {a.duracion_min}min, {a.calorias}cal\n"
-            
-            context += "\nÚltima Biometría (Peso):\n"
-            for b in biometrics:
-                date_b = b.fecha.strftime('%Y-%m-%d') if hasattr(b.fecha, 'strftime') else str(b.fecha)
-                context += f"- {date_b}: {b.peso}kg, {b.grasa_pct}% grasa\n"
-        finally:
-            conn.close()
+        biometrics: List[BodyCompositionSchema] = []
+        for row in raw_biometrics:
+            try:
+                biometrics.append(BodyCompositionSchema(**dict(row)))
+            except Exception:
+                continue
+
+        context = "CONTEXTO DEL USUARIO (BIOENGINE V3):\n"
+        context += "Últimas Actividades:\n"
+        for a in activities:
+            date_str = a.fecha.strftime('%Y-%m-%d') if hasattr(a.fecha, 'strftime') else str(a.fecha)
+            context += f"- {date_str}: {a.tipo}, {a.distancia_km}km, {a.duracion_min}min, {a.calorias}cal\n"
+        
+        context += "\nÚltima Biometría (Peso):\n"
+        for b in biometrics:
+            date_b = b.fecha.strftime('%Y-%m-%d') if hasattr(b.fecha, 'strftime') else str(b.fecha)
+            context += f"- {date_b}: {b.peso}kg, {b.grasa_pct}% grasa\n"
             
         return context
 
@@ -304,11 +306,12 @@ class AIService:
         
         if chat_history is None:
             chat_history = []
+        foundational_context = await run_db(self.context_manager.get_foundational_context)
         system_instruction = (
             "Eres BioEngine Coach, un asistente experto en triatlón, running (calle y trail), tenis y salud biomecánica.\n"
             f"FECHA ACTUAL: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
             "=== MEMORIA Y CONTEXTO BASE ===\n"
-            f"{self.context_manager.get_foundational_context()}\n\n"
+            f"{foundational_context}\n\n"
             "=== INSTRUCCIONES DE ESPECIALIDAD ===\n"
             "1. RUNNING & TENIS: Tus consejos deben optimizar el rendimiento en carrera de calle/trail y la agilidad en tenis master.\n"
             "2. SALUD BIOMECÁNICA: Prioriza la protección de articulaciones (específicamente la rodilla derecha) mediante ejercicios de fortalecimiento y movilidad.\n"
@@ -331,7 +334,7 @@ class AIService:
             "Habla en español de forma natural y profesional."
         )
 
-        full_context = self._get_user_context()
+        full_context = await run_db(self._get_user_context)
         history_block = self._format_chat_history(chat_history)
         prompt_parts = [full_context]
         if history_block:
@@ -347,7 +350,7 @@ class AIService:
         if self.multi_model_client:
             try:
                 logger.info("Attempting chat with multi-model client...")
-                response = self.multi_model_client.generate(
+                response = await self.multi_model_client.agenerate(
                     prompt=prompt,
                     system_instruction=system_instruction,
                     max_tokens=1200
@@ -375,13 +378,13 @@ class AIService:
             pain_match = re.search(r"\[COMMAND: LOG_PAIN: (\d+)\]", response)
             if pain_match:
                 level = int(pain_match.group(1))
-                self.context_manager.log_pain(level, f"Registrado vía chat: {user_message[:100]}")
+                await run_db(self.context_manager.log_pain, level, f"Registrado vía chat: {user_message[:100]}")
                 logger.info(f"Pain logged from AI response: {level}")
 
             update_match = re.search(r"\[COMMAND: UPDATE_CONTEXT: (.+?)\]", response)
             if update_match:
                 update_text = update_match.group(1).strip()
-                self.context_manager.log_context_update(update_text, source="chat")
+                await run_db(self.context_manager.log_context_update, update_text, source="chat")
                 logger.info("Context update logged from AI response")
                 try:
                     asyncio.create_task(self._update_semantic_summary())
@@ -413,11 +416,12 @@ class AIService:
             chat_history = []
         
         # Reutilizar lógica de construcción de prompt (podríamos refactorizar esto a un método privado común)
+        foundational_context = await run_db(self.context_manager.get_foundational_context)
         system_instruction = (
             "Eres BioEngine Coach, un asistente experto en triatlón, running (calle y trail), tenis y salud biomecánica.\n"
             f"FECHA ACTUAL: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
             "=== MEMORIA Y CONTEXTO BASE ===\n"
-            f"{self.context_manager.get_foundational_context()}\n\n"
+            f"{foundational_context}\n\n"
             "=== INSTRUCCIONES DE ESPECIALIDAD ===\n"
             "1. RUNNING & TENIS: Tus consejos deben optimizar el rendimiento en carrera de calle/trail y la agilidad en tenis master.\n"
             "2. SALUD BIOMECÁNICA: Prioriza la protección de articulaciones (específicamente la rodilla derecha) mediante ejercicios de fortalecimiento y movilidad.\n"
@@ -431,7 +435,7 @@ class AIService:
             "Habla en español de forma natural y profesional."
         )
 
-        full_context = self._get_user_context()
+        full_context = await run_db(self._get_user_context)
         history_block = self._format_chat_history(chat_history)
         prompt_parts = [full_context]
         if history_block:
@@ -463,13 +467,13 @@ class AIService:
             pain_match = re.search(r"\[COMMAND: LOG_PAIN: (\d+)\]", full_response_accumulator)
             if pain_match:
                 level = int(pain_match.group(1))
-                self.context_manager.log_pain(level, f"Registrado vía chat (Stream): {user_message[:100]}")
+                await run_db(self.context_manager.log_pain, level, f"Registrado vía chat (Stream): {user_message[:100]}")
                 logger.info(f"Pain logged from AI response (Stream): {level}")
 
             update_match = re.search(r"\[COMMAND: UPDATE_CONTEXT: (.+?)\]", full_response_accumulator)
             if update_match:
                 update_text = update_match.group(1).strip()
-                self.context_manager.log_context_update(update_text, source="chat_stream")
+                await run_db(self.context_manager.log_context_update, update_text, source="chat_stream")
                 logger.info("Context update logged from AI response (Stream)")
                 try:
                     asyncio.create_task(self._update_semantic_summary())
@@ -485,7 +489,7 @@ class AIService:
                 await self._update_semantic_summary(force=True)
 
     async def _update_semantic_summary(self, force=False):
-        data = self.context_manager.get_semantic_summary_data()
+        data = await run_db(self.context_manager.get_semantic_summary_data)
         total_count = data.get("total_count", 0)
         
         if total_count == 0:
@@ -497,7 +501,7 @@ class AIService:
             logger.info(f"Updating semantic summary. New entries: {total_count - last_count}")
             
             # Obtener solo las nuevas memorias desde la base de datos
-            new_memories = self.context_manager.get_new_evolutionary_memories(last_count)
+            new_memories = await run_db(self.context_manager.get_new_evolutionary_memories, last_count)
             
             if not new_memories:
                 return
@@ -520,7 +524,7 @@ class AIService:
 
             if self.multi_model_client:
                 try:
-                    summary_text = self.multi_model_client.generate(
+                    summary_text = await self.multi_model_client.agenerate(
                         prompt=prompt,
                         system_instruction=system_instruction,
                         max_tokens=600
@@ -529,10 +533,21 @@ class AIService:
                     logger.error(f"Semantic summary via multi-model failed: {e}")
 
             if summary_text:
-                self.context_manager.set_semantic_summary(summary_text, total_count)
+                await run_db(self.context_manager.set_semantic_summary, summary_text, total_count)
 
 
 
+    def _load_analysis_inputs(self):
+        """Datos de entrada del análisis del coach (bloqueante: llamar vía run_db)."""
+        # Get last 50 activities for better trend analysis (including synced competitions)
+        raw_activities = get_activity_frame().view().last(50).to_records()
+        with self._get_connection() as conn:
+            # Get last 5 weight measurements for trend
+            raw_biometrics = conn.execute("SELECT * FROM biometrics ORDER BY fecha_ts DESC, id DESC LIMIT 5").fetchall()
+            pain_logs = conn.execute("SELECT date, level, location, notes FROM pain_logs ORDER BY created_at DESC LIMIT 5").fetchall()
+        weekly = get_training_load_service().weekly(weeks=4)
+        return raw_activities, raw_biometrics, pain_logs, weekly
+
     async def get_coach_analysis(self) -> str:
         # Return static message if AI is paused
         if not self.AI_ENABLED:
@@ -565,82 +580,80 @@ El análisis de IA está temporalmente pausado mientras se resuelven límites de
                     return "Configura tu API Key para ver el análisis."
 
             # Get enhanced context with more data points
-            conn = self._get_connection()
-            try:
-                # Get last 50 activities for better trend analysis (including synced competitions)
-                raw_activities = conn.execute("SELECT * FROM activities ORDER BY fecha DESC LIMIT 50").fetchall()
-                # Get last 5 weight measurements for trend
-                raw_biometrics = conn.execute("SELECT * FROM biometrics ORDER BY fecha DESC LIMIT 5").fetchall()
-
-                activities: List[ActivitySchema] = []
-                for row in raw_activities:
-                    try:
-                        activities.append(ActivitySchema(**dict(row)))
-                    except ValidationError as e:
-                        logger.warning(f"Skipping invalid activity {row['id']}: {e}")
-
-                biometrics: List[BodyCompositionSchema] = []
-                for row in raw_biometrics:
-                    try:
-                        biometrics.append(BodyCompositionSchema(**dict(row)))
-                    except ValidationError as e:
-                        logger.warning(f"Skipping invalid biometric {row['id']}: {e}")
-                
-                # Build detailed context
-                context = "DATOS DEL ATLETA (Gonzalo - 49 años, Tenis Master):\n\n"
-                
-                # Activity summary
-                context += "📊 ACTIVIDADES RECIENTES:\n"
-                if activities:
-                    total_km = sum(a.distancia_km or 0 for a in activities)
-                    total_time = sum(a.duracion_min or 0 for a in activities)
-                    activity_types = {}
-                    for a in activities:
-                        tipo = a.tipo or 'Desconocido'
-                        activity_types[tipo] = activity_types.get(tipo, 0) + 1
-                        # Note: fecha is datetime object now if parsed correctly, or str if schema keeps it str. 
-                        # We defined datetime in schema, so let's format it.
-                        date_str = a.fecha.strftime('%Y-%m-%d') if hasattr(a.fecha, 'strftime') else str(a.fecha)
-                        context += f"  • {date_str}: {tipo} - {a.distancia_km or 0}km, {a.duracion_min or 0}min, {a.calorias or 0}cal\n"
-                    
-                    context += f"\nRESUMEN: {len(activities)} actividades, {total_km:.1f}km totales, {total_time:.0f}min\n"
-                    context += f"Tipos: {', '.join([f'{k} ({v})' for k, v in activity_types.items()])}\n"
-                else:
-                    context += "  No hay actividades registradas recientemente.\n"
+            # Lecturas de SQLite en el executor: el lock no debe bloquear el event loop
+            raw_activities, raw_biometrics, pain_logs, weekly = await run_db(self._load_analysis_inputs)
+
+            activities: List[ActivitySchema] = []
+            for row in raw_activities:
+                try:
+                    activities.append(ActivitySchema(**dict(row)))
+                except ValidationError as e:
+                    logger.warning(f"Skipping invalid activity {row['id']}: {e}")
+
+            biometrics: List[BodyCompositionSchema] = []
+            for row in raw_biometrics:
+                try:
+                    biometrics.append(BodyCompositionSchema(**dict(row)))
+                except ValidationError as e:
+                    logger.warning(f"Skipping invalid biometric {row['id']}: {e}")
+            
+            # Build detailed context
+            context = "DATOS DEL ATLETA (Gonzalo - 49 años, Tenis Master):\n\n"
+            
+            # Activity summary
+            context += "📊 ACTIVIDADES RECIENTES:\n"
+            if activities:
+                total_km = sum(a.distancia_km or 0 for a in activities)
+                total_time = sum(a.duracion_min or 0 for a in activities)
+                activity_types = {}
+                for a in activities:
+                    tipo = a.tipo or 'Desconocido'
+                    activity_types[tipo] = activity_types.get(tipo, 0) + 1
+                    # Note: fecha is datetime object now if parsed correctly, or str if schema keeps it str. 
+                    # We defined datetime in schema, so let's format it.
+                    date_str = a.fecha.strftime('%Y-%m-%d') if hasattr(a.fecha, 'strftime') else str(a.fecha)
+                    context += f"  • {date_str}: {tipo} - {a.distancia_km or 0}km, {a.duracion_min or 0}min, {a.calorias or 0}cal\n"
                 
-                # Weight trend
-                context += "\n⚖️ TENDENCIA DE PESO:\n"
-                if biometrics and len(biometrics) >= 2:
-                    latest = biometrics[0]
-                    oldest = biometrics[-1]
-                    diff = latest.peso - oldest.peso
-                    date_latest = latest.fecha if isinstance(latest.fecha, str) else latest.fecha.strftime('%Y-%m-%d')
-                    date_oldest = oldest.fecha if isinstance(oldest.fecha, str) else oldest.fecha.strftime('%Y-%m-%d')
-                    
-                    context += f"  • Actual: {latest.peso}kg ({date_latest})\n"
-                    context += f"  • Anterior: {oldest.peso}kg ({date_oldest})\n"
-                    context += f"  • Cambio: {diff:+.2f}kg\n"
-                    if latest.grasa_pct:
-                        context += f"  • Grasa corporal: {latest.grasa_pct}%\n"
-                elif biometrics:
-                    b = biometrics[0]
-                    date_b = b.fecha if isinstance(b.fecha, str) else b.fecha.strftime('%Y-%m-%d')
-                    context += f"  • Peso actual: {b.peso}kg ({date_b})\n"
-                else:
-                    context += "  No hay datos de peso disponibles.\n"
+                context += f"\nRESUMEN: {len(activities)} actividades, {total_km:.1f}km totales, {total_time:.0f}min\n"
+                context += f"Tipos: {', '.join([f'{k} ({v})' for k, v in activity_types.items()])}\n"
+            else:
+                context += "  No hay actividades registradas recientemente.\n"
+
+            # Carga semanal pre-agregada (weekly_load)
+            if weekly:
+                context += "\n📈 CARGA SEMANAL (últimas 4 semanas):\n"
+                for w in weekly:
+                    context += f"  • Semana del {w['week_start']}: {w['sessions']} sesiones, {w['distancia_km']:.1f}km, {w['duracion_min']:.0f}min\n"
+            
+            # Weight trend
+            context += "\n⚖️ TENDENCIA DE PESO:\n"
+            if biometrics and len(biometrics) >= 2:
+                latest = biometrics[0]
+                oldest = biometrics[-1]
+                diff = latest.peso - oldest.peso
+                date_latest = latest.fecha if isinstance(latest.fecha, str) else latest.fecha.strftime('%Y-%m-%d')
+                date_oldest = oldest.fecha if isinstance(oldest.fecha, str) else oldest.fecha.strftime('%Y-%m-%d')
                 
-                # Agregar datos de dolor de rodilla
-                context += "\n🦵 HISTORIAL DE DOLOR DE RODILLA:\n"
-                pain_logs = conn.execute("SELECT date, level, location, notes FROM pain_logs ORDER BY created_at DESC LIMIT 5").fetchall()
-                if pain_logs:
-                    for p in pain_logs:
-                        pain_date = p['date'].split('T')[0] if 'T' in p['date'] else p['date']
-                        context += f"  • {pain_date}: Nivel {p['level']}/10 - {p['notes']}\n"
-                else:
-                    context += "  • No hay registros de dolor.\n"
-                    
-            finally:
-                conn.close()
+                context += f"  • Actual: {latest.peso}kg ({date_latest})\n"
+                context += f"  • Anterior: {oldest.peso}kg ({date_oldest})\n"
+                context += f"  • Cambio: {diff:+.2f}kg\n"
+                if latest.grasa_pct:
+                    context += f"  • Grasa corporal: {latest.grasa_pct}%\n"
+            elif biometrics:
+                b = biometrics[0]
+                date_b = b.fecha if isinstance(b.fecha, str) else b.fecha.strftime('%Y-%m-%d')
+                context += f"  • Peso actual: {b.peso}kg ({date_b})\n"
+            else:
+                context += "  No hay datos de peso disponibles.\n"
+            
+            # Agregar datos de dolor de rodilla
+            context += "\n🦵 HISTORIAL DE DOLOR DE RODILLA:\n"
+            if pain_logs:
+                for p in pain_logs:
+                    pain_date = p['date'].split('T')[0] if 'T' in p['date'] else p['date']
+                    context += f"  • {pain_date}: Nivel {p['level']}/10 - {p['notes']}\n"
+            else:
+                context += "  • No hay registros de dolor.\n"
             
             # Get pain history from database
             # NEW: Get context via MCP (Standard V4 Zero-Copy)
@@ -800,8 +813,6 @@ SIEMPRE sigue el formato de análisis especificado y añade una sección de 'MAN
             except Exception as e:
                 logger.error(f"Error generating coach analysis: {e}", exc_info=True)
                 return f"Error al generar análisis: {str(e)}"
-            finally:
-                conn.close()
 
     async def analyze_biomechanics_video(self, video_path: str, analysis_type: str = 'gait') -> AthleteBiometrics2026:
         """
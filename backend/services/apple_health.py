@@ -0,0 +1,234 @@
+"""
+Ingesta en streaming del export de Apple Health (export.xml o export.zip).
+
+El export puede pesar varios GB, así que nunca se carga entero: `iterparse`
+recorre los elementos y cada `Workout` / `Record` de peso se procesa y se
+libera al cerrarse (memoria constante). Las filas se escriben por lotes con
+`executemany` idempotente (no se reinsertan instantes ya presentes de Apple),
+y tras cada lote se guarda un checkpoint en `import_checkpoints` (migración
+0014) para poder reanudar. Al terminar se pasa la deduplicación entre fuentes sobre el rango
+importado, que es lo que antes resolvían a mano los scripts de reparación.
+"""
+
+import json
+import logging
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+from services.datetime_normalizer import normalize
+from services.dedup import deduplicate
+
+logger = logging.getLogger(__name__)
+
+APPLE_SOURCE = "Apple"
+CHECKPOINT_SOURCE = "apple_health"
+DEFAULT_BATCH_SIZE = 1000
+
+BODY_MASS_TYPE = "HKQuantityTypeIdentifierBodyMass"
+_WORKOUT_PREFIX = "HKWorkoutActivityType"
+
+# HKWorkoutActivityType* -> `tipo` que entiende sport_taxonomy; el resto pasa a snake_case
+WORKOUT_TYPES: Dict[str, str] = {
+    "Running": "running",
+    "Walking": "walking",
+    "Hiking": "hiking",
+    "Cycling": "cycling",
+    "Swimming": "swimming",
+    "Tennis": "tennis",
+    "Yoga": "yoga",
+    "TraditionalStrengthTraining": "strength_training",
+    "FunctionalStrengthTraining": "strength_training",
+    "HighIntensityIntervalTraining": "cardio",
+    "MixedCardio": "cardio",
+}
+
+_KM = {"km": 1.0, "m": 0.001, "mi": 1.609344, "yd": 0.0009144}
+_MIN = {"min": 1.0, "s": 1 / 60, "h": 60.0}
+_KCAL = {"kcal": 1.0, "Cal": 1.0, "kJ": 1 / 4.184}
+_KG = {"kg": 1.0, "lb": 0.45359237, "g": 0.001}
+
+_ACTIVITY_SQL = """
+    INSERT INTO activities (fecha, fecha_ts, fecha_local, tipo, distancia_km, duracion_min, calorias,
+                            fc_media, fc_max, fuente, nombre)
+    SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+    WHERE NOT EXISTS (SELECT 1 FROM activities WHERE fecha_ts = ?2 AND fuente = ?10)
+"""
+_BIOMETRIC_SQL = """
+    INSERT INTO biometrics (fecha, fecha_ts, fecha_local, peso, fuente)
+    SELECT ?, ?, ?, ?, ?
+    WHERE NOT EXISTS (SELECT 1 FROM biometrics WHERE fecha_ts = ?2 AND fuente = ?5)
+"""
+
+
+class IngestReport(NamedTuple):
+    workouts: int
+    weights: int
+    skipped: int
+    merged: int
+    resumed_from: int
+
+
+def _convert(value, unit, table: Dict[str, float]) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    factor = table.get(unit or "", 1.0)
+    return round(float(value) * factor, 2)
+
+
+def workout_type(activity_type: Optional[str]) -> str:
+    name = (activity_type or "").replace(_WORKOUT_PREFIX, "")
+    if not name:
+        return "otros"
+    return WORKOUT_TYPES.get(name) or re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def workout_name(activity_type: Optional[str]) -> Optional[str]:
+    """Nombre legible del tipo de entreno: HKWorkoutActivityTypeStairClimbing -> 'Stair Climbing'."""
+    name = (activity_type or "").replace(_WORKOUT_PREFIX, "")
+    return re.sub(r"(?<!^)(?=[A-Z])", " ", name) if name else None
+
+
+def workout_row(elem) -> Optional[tuple]:
+    """Fila de `activities` para un <Workout> (atributos clásicos o hijos WorkoutStatistics)."""
+    when = normalize(elem.get("startDate"))
+    if when is None:
+        return None
+    distance = _convert(elem.get("totalDistance"), elem.get("totalDistanceUnit"), _KM)
+    calories = _convert(elem.get("totalEnergyBurned"), elem.get("totalEnergyBurnedUnit"), _KCAL)
+    hr_avg = hr_max = None
+    for stat in elem.iter("WorkoutStatistics"):
+        kind = stat.get("type", "")
+        if kind.startswith("HKQuantityTypeIdentifierDistance") and distance is None:
+            distance = _convert(stat.get("sum"), stat.get("unit"), _KM)
+        elif kind == "HKQuantityTypeIdentifierActiveEnergyBurned" and calories is None:
+            calories = _convert(stat.get("sum"), stat.get("unit"), _KCAL)
+        elif kind == "HKQuantityTypeIdentifierHeartRate":
+            hr_avg = round(float(stat.get("average"))) if stat.get("average") else None
+            hr_max = round(float(stat.get("maximum"))) if stat.get("maximum") else None
+    tipo = workout_type(elem.get("workoutActivityType"))
+    return (
+        when.local.isoformat(sep=" "), when.ts, when.local_date, tipo,
+        distance, _convert(elem.get("duration"), elem.get("durationUnit"), _MIN), calories,
+        hr_avg, hr_max, APPLE_SOURCE, workout_name(elem.get("workoutActivityType")),
+    )
+
+
+def body_mass_row(elem) -> Optional[tuple]:
+    when = normalize(elem.get("startDate"))
+    peso = _convert(elem.get("value"), elem.get("unit"), _KG)
+    if when is None or not peso:
+        return None
+    return (when.local.isoformat(sep=" "), when.ts, when.local_date, peso, APPLE_SOURCE)
+
+
+def _open_export(path: str):
+    """Stream del XML; del .zip se lee `apple_health_export/export.xml` sin descomprimir a disco."""
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        name = next(n for n in archive.namelist() if n.endswith("export.xml"))
+        return archive.open(name)
+    return open(path, "rb")
+
+
+def iter_export(path: str) -> Iterator[Tuple[str, Optional[tuple]]]:
+    """
+    Recorre el export y devuelve ("activities" | "biometrics", fila) por cada
+    elemento relevante, en orden de documento. Los elementos ya procesados se
+    liberan, así que la memoria no crece con el tamaño del archivo.
+    """
+    with _open_export(path) as stream:
+        context = ET.iterparse(stream, events=("start", "end"))
+        _, root = next(context)
+        depth = 0
+        for event, elem in context:
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth:
+                continue  # hijos (WorkoutStatistics, MetadataEntry...): se leen con el padre
+            if elem.tag == "Workout":
+                yield "activities", workout_row(elem)
+            elif elem.tag == "Record" and elem.get("type") == BODY_MASS_TYPE:
+                yield "biometrics", body_mass_row(elem)
+            root.clear()
+
+
+def _file_signature(path: str) -> dict:
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+
+def load_checkpoint(conn, path: str) -> int:
+    """Elementos ya procesados de este mismo archivo (0 si es otro o no hay checkpoint)."""
+    row = conn.execute(
+        "SELECT value_json FROM import_checkpoints WHERE source = ?", (CHECKPOINT_SOURCE,)
+    ).fetchone()
+    if not row:
+        return 0
+    data = json.loads(row[0])
+    if {k: data.get(k) for k in ("path", "size", "mtime")} != _file_signature(path):
+        return 0
+    return int(data.get("processed", 0))
+
+
+def _save_checkpoint(conn, path: str, processed: int, done: bool = False) -> None:
+    value = dict(_file_signature(path), processed=processed, done=done)
+    conn.execute(
+        "INSERT OR REPLACE INTO import_checkpoints (source, value_json, updated_at) VALUES (?, ?, ?)",
+        (CHECKPOINT_SOURCE, json.dumps(value), datetime.now().isoformat()),
+    )
+
+
+def ingest_export(conn, path: str, batch_size: int = DEFAULT_BATCH_SIZE, resume: bool = True,
+                  dedup: bool = True) -> IngestReport:
+    """
+    Importa entrenamientos y pesajes de `path`. Cada lote se confirma junto con
+    el checkpoint, así que un corte a mitad solo repite (sin duplicar) el lote en curso.
+    """
+    start = load_checkpoint(conn, path) if resume else 0
+    batches = {"activities": [], "biometrics": []}
+    counts = {"activities": 0, "biometrics": 0}
+    skipped = processed = 0
+    ts_range = [None, None]
+
+    def flush():
+        for table, sql in (("activities", _ACTIVITY_SQL), ("biometrics", _BIOMETRIC_SQL)):
+            if batches[table]:
+                counts[table] += conn.executemany(sql, batches[table]).rowcount
+                batches[table].clear()
+        _save_checkpoint(conn, path, processed)
+        conn.commit()
+
+    try:
+        for table, row in iter_export(path):
+            processed += 1
+            if processed <= start:
+                continue
+            if row is None:
+                skipped += 1
+                continue
+            batches[table].append(row)
+            if table == "activities":
+                ts_range[0] = row[1] if ts_range[0] is None else min(ts_range[0], row[1])
+                ts_range[1] = row[1] if ts_range[1] is None else max(ts_range[1], row[1])
+            if len(batches[table]) >= batch_size:
+                flush()
+        flush()
+    except Exception:
+        conn.rollback()
+        raise
+
+    merged = 0
+    if dedup and ts_range[0] is not None:
+        merged = sum(len(p.duplicate_ids) for p in deduplicate(conn, ts_range[0], ts_range[1]))
+    _save_checkpoint(conn, path, processed, done=True)
+    conn.commit()
+
+    report = IngestReport(counts["activities"], counts["biometrics"], skipped, merged, start)
+    logger.info(f"Apple Health: {report}")
+    return report
@@ -0,0 +1,180 @@
+"""
+Importador masivo de CSV / Excel (historial V2, Carreras.xlsx, exportaciones).
+
+Lee el archivo por bloques (pandas `chunksize` para CSV, openpyxl en modo
+read-only para XLSX), traduce columnas con un mapeo declarativo (`ImportSpec`)
+y escribe con `executemany` dentro de una única transacción, con PRAGMAs de
+carga masiva. Devuelve un `ImportReport` con filas y filas/segundo.
+
+    spec = ImportSpec("activities", {"fecha": "Fecha", "tipo": "Tipo", ...}, date_column="fecha")
+    report = import_file(conn, "historial.csv", spec, sep=";")
+"""
+
+import contextlib
+import logging
+import math
+import os
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from services.datetime_normalizer import normalized_columns
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Fuente de cada columna destino: nombre de columna del archivo o función(fila) -> valor
+ColumnSource = Union[str, Callable[[dict], object]]
+
+
+class ImportSpec(NamedTuple):
+    table: str
+    columns: Dict[str, ColumnSource]
+    date_column: Optional[str] = None  # si se indica, se derivan fecha_ts / fecha_local
+    required: Tuple[str, ...] = ()     # columnas destino sin las cuales la fila se descarta
+    sql: Optional[str] = None          # sentencia propia (p. ej. UPDATE) con un `?` por columna
+
+
+class ImportReport(NamedTuple):
+    table: str
+    rows: int
+    skipped: int
+    changes: int
+    seconds: float
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.rows / self.seconds if self.seconds else float(self.rows)
+
+    def __str__(self) -> str:
+        return (f"{self.table}: {self.rows} filas ({self.skipped} descartadas, {self.changes} cambios) "
+                f"en {self.seconds:.2f}s -> {self.rows_per_s:,.0f} filas/s")
+
+
+def _clean(value):
+    """Valores de pandas/openpyxl -> tipos que acepta sqlite3 (NaN -> NULL, Timestamp -> ISO)."""
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "item"):  # escalares numpy
+        return value.item()
+    return value
+
+
+def read_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, sep: str = ",",
+                sheet: Optional[str] = None, header: int = 0) -> Iterator[List[dict]]:
+    """Itera el archivo en bloques de `chunk_size` filas (dicts columna -> valor)."""
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        yield from _read_xlsx_chunks(path, chunk_size, sheet, header)
+        return
+
+    import pandas as pd
+
+    for frame in pd.read_csv(path, sep=sep, header=header, chunksize=chunk_size):
+        # NaN -> None ya en la lectura, para que las funciones del mapeo vean celdas vacías
+        yield frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+def _read_xlsx_chunks(path, chunk_size, sheet, header) -> Iterator[List[dict]]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.active
+        rows = ws.iter_rows(values_only=True)
+        names = None
+        for _ in range(header + 1):
+            names = next(rows, None)
+        if names is None:
+            return
+        names = [str(n).strip() if n is not None else f"col_{i}" for i, n in enumerate(names)]
+        chunk = []
+        for values in rows:
+            chunk.append(dict(zip(names, values)))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        wb.close()
+
+
+def build_statement(spec: ImportSpec) -> Tuple[str, Tuple[str, ...]]:
+    """SQL y orden de columnas de la escritura (INSERT salvo que `spec.sql` diga otra cosa)."""
+    columns = tuple(spec.columns)
+    if spec.date_column:
+        columns += ("fecha_ts", "fecha_local")
+    if spec.sql:
+        return spec.sql, columns
+    # Las filas que chocan con una clave natural (0009) se ignoran: reimportar no duplica
+    return (f"INSERT INTO {spec.table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            "ON CONFLICT DO NOTHING", columns)
+
+
+def map_rows(records: Iterable[dict], spec: ImportSpec) -> Tuple[List[tuple], int]:
+    """Aplica el mapeo declarativo a un bloque; devuelve (tuplas listas para executemany, descartadas)."""
+    out, skipped = [], 0
+    for record in records:
+        row = {}
+        for target, source in spec.columns.items():
+            row[target] = _clean(source(record) if callable(source) else record.get(source))
+        if any(row.get(c) in (None, "") for c in spec.required):
+            skipped += 1
+            continue
+        values = tuple(row.values())
+        if spec.date_column:
+            values += normalized_columns(row[spec.date_column])
+        out.append(values)
+    return out, skipped
+
+
+@contextlib.contextmanager
+def bulk_load(conn):
+    """
+    PRAGMAs de carga masiva durante el bloque (sin fsync por commit, temporales
+    en memoria, caché grande) y una única transacción; restaura al salir.
+    """
+    previous = {p: conn.execute(f"PRAGMA {p}").fetchone()[0] for p in ("synchronous", "cache_size", "temp_store")}
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    try:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        for pragma, value in previous.items():
+            conn.execute(f"PRAGMA {pragma}={value}")
+
+
+def write_chunks(conn, spec: ImportSpec, chunks: Iterable[Sequence[dict]]) -> ImportReport:
+    """Escribe bloques ya leídos en una sola transacción de carga masiva."""
+    sql, _ = build_statement(spec)
+    rows = skipped = changes = 0
+    started = time.perf_counter()
+    with bulk_load(conn):
+        for records in chunks:
+            values, dropped = map_rows(records, spec)
+            skipped += dropped
+            if values:
+                changes += conn.executemany(sql, values).rowcount
+                rows += len(values)
+    report = ImportReport(spec.table, rows, skipped, changes, time.perf_counter() - started)
+    logger.info(f"Importación {report}")
+    return report
+
+
+def import_file(conn, path: str, spec: ImportSpec, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                sep: str = ",", sheet: Optional[str] = None, header: int = 0) -> ImportReport:
+    """Lee `path` por bloques y lo vuelca según `spec`."""
+    return write_chunks(conn, spec, read_chunks(path, chunk_size, sep=sep, sheet=sheet, header=header))
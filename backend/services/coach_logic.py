@@ -12,13 +12,19 @@ class AdaptiveCoach:
         self.acute_load = 0.0
         self.chronic_load = 0.0
 
-    def analyze_status(self, weight_log: List[Dict], knee_pain_log: List[Dict], activities: List[Dict]) -> Dict[str, Any]:
+    def analyze_status(self, weight_log: List[Dict], knee_pain_log: List[Dict], activities: List[Dict], load: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
         """
         The Triage Agent: Analiza carga, peso y dolor.
+        `load` (acute_km/chronic_km de TrainingLoadService) evita recorrer `activities`.
         """
-        # Calcular Carga Aguda (7d) vs Crónica (28d) - Simplificado para el demo
-        self.acute_load = sum(a.get('distancia_km', 0) for a in activities[-10:])
-        self.chronic_load = sum(a.get('distancia_km', 0) for a in activities[-30:]) / 4.0
+        if load is not None:
+            # Carga Aguda (7d) vs Crónica (28d, media semanal) desde daily_load
+            self.acute_load = load.get('acute_km', 0.0)
+            self.chronic_load = load.get('chronic_km', 0.0) / 4.0
+        else:
+            # Calcular Carga Aguda (7d) vs Crónica (28d) - Simplificado para el demo
+            self.acute_load = sum(a.get('distancia_km', 0) for a in activities[-10:])
+            self.chronic_load = sum(a.get('distancia_km', 0) for a in activities[-30:]) / 4.0
         
         # Análisis de Peso
         current_weight = weight_log[-1].get('peso', 76.0) if weight_log else 76.0
@@ -2,12 +2,18 @@ import os
 import json
 import datetime
 import logging
-import sqlite3
-from typing import Optional, Dict, Any, List
+import threading
+from typing import Optional, Dict, Any, List, Tuple
 from config import CONTEXT_BASE_PATH, DB_PATH
+from services.db_pool import get_connection
+from services.activity_frame import get_activity_frame
+from services.datetime_normalizer import normalize
 
 logger = logging.getLogger(__name__)
 
+# Tablas que lee get_foundational_context (versionadas por los triggers de la 0011)
+FOUNDATIONAL_TABLES = ("evolutionary_memory", "user_context")
+
 class ContextManager:
     """
     Gestor del 'Cerebro' de BioEngine. 
@@ -18,40 +24,76 @@ class ContextManager:
         self.db_path = DB_PATH
         self.training_plan_path = os.path.join(base_path, "Plan_Entrenamiento_Tenis_Master_49.md")
         self.equipamiento_path = os.path.join(base_path, "equipamiento.md")
+        # (versión, texto) del último contexto base compilado
+        self._foundational_cache: Optional[Tuple[tuple, str]] = None
+        self._foundational_lock = threading.Lock()
 
     def _get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Presta una conexión del pool compartido (usar con `with`)."""
+        return get_connection(self.db_path)
 
     def _get_context_value(self, key: str) -> Optional[Any]:
         """Obtiene un valor de la tabla user_context."""
-        conn = self._get_connection()
         try:
-            row = conn.execute("SELECT value_json FROM user_context WHERE key = ?", (key,)).fetchone()
+            with self._get_connection() as conn:
+                row = conn.execute("SELECT value_json FROM user_context WHERE key = ?", (key,)).fetchone()
             if row:
                 return json.loads(row['value_json'])
         except Exception as e:
             logger.error(f"Error reading context key {key}: {e}")
-        finally:
-            conn.close()
         return None
 
     def _set_context_value(self, key: str, value: Any):
         """Guarda un valor en la tabla user_context."""
-        conn = self._get_connection()
         try:
-            conn.execute("""
-                INSERT OR REPLACE INTO user_context (key, value_json, updated_at)
-                VALUES (?, ?, CURRENT_TIMESTAMP)
-            """, (key, json.dumps(value, ensure_ascii=False)))
-            conn.commit()
+            with self._get_connection() as conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO user_context (key, value_json, updated_at)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                """, (key, json.dumps(value, ensure_ascii=False)))
+                conn.commit()
         except Exception as e:
             logger.error(f"Error writing context key {key}: {e}")
-        finally:
-            conn.close()
+
+    def _foundational_version(self) -> Optional[tuple]:
+        """
+        Clave de la caché del contexto base: (mtime, tamaño) de los .md y versión
+        de las tablas que se leen. None si no se puede determinar (sin caché).
+        """
+        files = []
+        for path in (self.training_plan_path, self.equipamiento_path):
+            try:
+                st = os.stat(path)
+                files.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                files.append(None)
+        try:
+            with self._get_connection() as conn:
+                rows = conn.execute(
+                    "SELECT name, version FROM table_versions WHERE name IN (?, ?) ORDER BY name", FOUNDATIONAL_TABLES
+                ).fetchall()
+        except Exception as e:
+            logger.warning(f"Sin versiones de tablas, contexto base sin caché: {e}")
+            return None
+        return tuple(files), tuple(tuple(r) for r in rows)
 
     def get_foundational_context(self) -> str:
+        """
+        Conocimiento base compilado (plan, equipamiento, perfil médico, memoria).
+        Se reconstruye solo si cambió algún .md o las tablas de las que sale.
+        """
+        version = self._foundational_version()
+        with self._foundational_lock:
+            cached = self._foundational_cache
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+        context = self._build_foundational_context()
+        if version is not None:
+            with self._foundational_lock:
+                self._foundational_cache = (version, context)
+        return context
+
+    def _build_foundational_context(self) -> str:
         """Lee el conocimiento base completo: plan, equipamiento, perfil médico."""
         context = "=== CONOCIMIENTO BASE DEL ATLETA ===\n\n"
         
@@ -120,9 +162,9 @@ class ContextManager:
                 context += f"  → Confianza: {insight.get('confianza', 0)}%\n"
 
         # 4. MEMORIA EVOLUTIVA (SQLite Table)
-        conn = self._get_connection()
         try:
-            memories = conn.execute("SELECT date, lesson, context FROM evolutionary_memory ORDER BY created_at DESC LIMIT 50").fetchall()
+            with self._get_connection() as conn:
+                memories = conn.execute("SELECT date, lesson, context FROM evolutionary_memory ORDER BY created_at DESC LIMIT 50").fetchall()
             if memories:
                 context += f"\n### MEMORIA EVOLUTIVA (ÚLTIMOS {len(memories)} REGISTROS):\n"
                 # Voltear para mostrar cronológico en el prompt si se desea, o dejar DESC para prioridad
@@ -130,8 +172,6 @@ class ContextManager:
                     context += f"- {m['date']}: {m['lesson']} ({m['context'] or 'N/A'})\n"
         except Exception as e:
             logger.error(f"Error reading evolutionary memory: {e}")
-        finally:
-            conn.close()
 
         if stats:
             context += f"\n### ESTADÍSTICAS ÚLTIMOS 30 DÍAS:\n"
@@ -148,39 +188,35 @@ class ContextManager:
 
     def get_pain_history(self, limit=10):
         """Obtiene los últimos registros de dolor desde SQLite."""
-        conn = self._get_connection()
         try:
-            rows = conn.execute("SELECT date, level, notes FROM pain_logs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+            with self._get_connection() as conn:
+                rows = conn.execute("SELECT date, level, notes FROM pain_logs ORDER BY fecha_ts DESC, id DESC LIMIT ?", (limit,)).fetchall()
             return [dict(r) for r in rows]
         except Exception as e:
             logger.error(f"Error reading pain history: {e}")
             return []
-        finally:
-            conn.close()
 
     def log_pain(self, level: int, notes: str = "") -> None:
         """Registra un nuevo evento de dolor en SQLite."""
-        conn = self._get_connection()
         try:
-            conn.execute("""
-                INSERT INTO pain_logs (date, level, notes)
-                VALUES (?, ?, ?)
-            """, (datetime.datetime.now().isoformat(), level, notes))
-            conn.commit()
+            now = normalize(datetime.datetime.now())
+            with self._get_connection() as conn:
+                conn.execute("""
+                    INSERT INTO pain_logs (date, fecha_ts, fecha_local, level, notes)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (now.local.isoformat(), now.ts, now.local_date, level, notes))
+                conn.commit()
             
             # Actualizar tendencia en el historial médico
             self._update_medical_status(level)
         except Exception as e:
             logger.error(f"Error logging pain: {e}")
-        finally:
-            conn.close()
 
     def log_context_update(self, update_text: str, source: str = "chat"):
         """
         Registra una actualización de contexto relevante en evolutionary_memory.
         Ahora incluye metadatos de procedencia para rastreabilidad.
         """
-        conn = self._get_connection()
         try:
             # Calcular confianza basada en la fuente
             confidence_map = {
@@ -200,26 +236,25 @@ class ContextManager:
                 "version": "1.0"
             }
             
-            conn.execute(
-                """INSERT INTO evolutionary_memory (update_text, source, metadata, created_at) 
-                   VALUES (?, ?, ?, ?)""",
-                (update_text, source, json.dumps(metadata), datetime.datetime.now())
-            )
-            conn.commit()
+            with self._get_connection() as conn:
+                conn.execute(
+                    """INSERT INTO evolutionary_memory (update_text, source, metadata, created_at) 
+                       VALUES (?, ?, ?, ?)""",
+                    (update_text, source, json.dumps(metadata), datetime.datetime.now())
+                )
+                conn.commit()
             logger.info(f"Context update logged from {source} with confidence {confidence}")
         except Exception as e:
             logger.error(f"Error logging context update: {e}")
-        finally:
-            conn.close()
 
 
     def get_semantic_summary_data(self) -> Dict[str, Any]:
         """Retorna datos necesarios para actualizar el resumen semántico."""
         meta = self._get_context_value('metadata') or {}
         
-        conn = self._get_connection()
         try:
-            count_row = conn.execute("SELECT COUNT(*) as total FROM evolutionary_memory").fetchone()
+            with self._get_connection() as conn:
+                count_row = conn.execute("SELECT COUNT(*) as total FROM evolutionary_memory").fetchone()
             total_count = count_row['total'] if count_row else 0
             
             return {
@@ -230,21 +265,17 @@ class ContextManager:
         except Exception as e:
             logger.error(f"Error getting semantic summary data: {e}")
             return {"summary": "", "last_count": 0, "total_count": 0}
-        finally:
-            conn.close()
 
     def get_new_evolutionary_memories(self, last_count: int) -> List[Dict[str, Any]]:
         """Obtiene memorias evolutivas nuevas para el resumen semántico."""
-        conn = self._get_connection()
         try:
-            # SQL OFFSET is useful here
-            rows = conn.execute("SELECT date, lesson, context FROM evolutionary_memory ORDER BY created_at ASC LIMIT -1 OFFSET ?", (last_count,)).fetchall()
+            with self._get_connection() as conn:
+                # SQL OFFSET is useful here
+                rows = conn.execute("SELECT date, lesson, context FROM evolutionary_memory ORDER BY created_at ASC LIMIT -1 OFFSET ?", (last_count,)).fetchall()
             return [dict(r) for r in rows]
         except Exception as e:
             logger.error(f"Error reading new memories: {e}")
             return []
-        finally:
-            conn.close()
 
     def set_semantic_summary(self, summary_text: str, total_count: int) -> None:
         """Guarda el resumen semántico actualizado."""
@@ -256,10 +287,9 @@ class ContextManager:
 
     def get_memory_snapshot(self, recent_limit: int = 20) -> Dict[str, Any]:
         """Devuelve un snapshot de memoria para depuración."""
-        conn = self._get_connection()
-        try:
+        with self._get_connection() as conn:
             memories = conn.execute("SELECT * FROM evolutionary_memory ORDER BY created_at DESC LIMIT ?", (recent_limit,)).fetchall()
-            pains = conn.execute("SELECT * FROM pain_logs ORDER BY created_at DESC LIMIT ?", (recent_limit,)).fetchall()
+            pains = conn.execute("SELECT * FROM pain_logs ORDER BY fecha_ts DESC, id DESC LIMIT ?", (recent_limit,)).fetchall()
             total_mem = conn.execute("SELECT COUNT(*) FROM evolutionary_memory").fetchone()[0]
             total_pain = conn.execute("SELECT COUNT(*) FROM pain_logs").fetchone()[0]
             
@@ -274,8 +304,6 @@ class ContextManager:
                 "dolor_registros_total": total_pain,
                 "dolor_registros_recientes": [dict(p) for p in pains]
             }
-        finally:
-            conn.close()
 
     def _update_medical_status(self, last_pain: int) -> None:
         """Actualiza la tendencia de dolor en el historial médico."""
@@ -296,17 +324,9 @@ class ContextManager:
         self._set_context_value('metadata', meta)
 
     def get_activity_history(self, days: int = 30) -> List[Dict[str, Any]]:
-        """Obtiene el historial de actividades de los últimos N días."""
-        conn = self._get_connection()
+        """Obtiene el historial de actividades de los últimos N días (desde el ActivityFrame en memoria)."""
         try:
-            cutoff_date = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
-            rows = conn.execute(
-                "SELECT * FROM activities WHERE fecha >= ? ORDER BY fecha DESC",
-                (cutoff_date,)
-            ).fetchall()
-            return [dict(r) for r in rows]
+            return get_activity_frame().view().since_days(days).to_records()
         except Exception as e:
             logger.error(f"Error reading activity history: {e}")
             return []
-        finally:
-            conn.close()
@@ -3,10 +3,12 @@ Sistema de control de gasto para modelos de IA pagos.
 Permite configurar API keys sin usarlas automáticamente.
 """
 
-import sqlite3
-from typing import Dict, List, Any
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
-from config import DB_PATH
+from config import DB_PATH, COST_CONTROL_CACHE_TTL_S
+from services.db_pool import get_connection
 
 class CostControl:
     """
@@ -16,56 +18,63 @@ class CostControl:
     
     def __init__(self):
         self.db_path = DB_PATH
+        # provider -> (allow_usage, cost_type), leído de SQLite como mucho cada COST_CONTROL_CACHE_TTL_S
+        self._rules: Optional[Dict[str, Tuple[int, str]]] = None
+        self._rules_at = 0.0
+        self._rules_lock = threading.Lock()
         self._init_table()
     
     def _init_table(self) -> None:
         """Crea la tabla de configuración de costos si no existe"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Tabla de configuración de modelos
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS model_cost_config (
-                provider TEXT PRIMARY KEY,
-                cost_type TEXT NOT NULL,  -- 'free', 'free_tier', 'paid'
-                enabled_by_default INTEGER DEFAULT 0,
-                allow_usage INTEGER DEFAULT 0,  -- 0=bloqueado, 1=permitido temporalmente, 2=siempre permitido
-                usage_count INTEGER DEFAULT 0,
-                estimated_cost_usd REAL DEFAULT 0.0,
-                last_used TEXT,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Insertar configuración por defecto si no existe
-        defaults = [
-            ('gemini', 'free', 1, 2, 0, 0.0),  # Siempre permitido
-            ('anthropic', 'free_tier', 0, 0, 0, 0.0),  # Bloqueado por defecto
-            ('openai', 'paid', 0, 0, 0, 0.0),  # Bloqueado por defecto
-        ]
-        
-        for provider, cost_type, enabled_default, allow, usage, cost in defaults:
+        with get_connection(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            # Tabla de configuración de modelos
             cursor.execute("""
+                CREATE TABLE IF NOT EXISTS model_cost_config (
+                    provider TEXT PRIMARY KEY,
+                    cost_type TEXT NOT NULL,  -- 'free', 'free_tier', 'paid'
+                    enabled_by_default INTEGER DEFAULT 0,
+                    allow_usage INTEGER DEFAULT 0,  -- 0=bloqueado, 1=permitido temporalmente, 2=siempre permitido
+                    usage_count INTEGER DEFAULT 0,
+                    estimated_cost_usd REAL DEFAULT 0.0,
+                    last_used TEXT,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Insertar configuración por defecto si no existe
+            defaults = [
+                ('gemini', 'free', 1, 2, 0, 0.0),  # Siempre permitido
+                ('anthropic', 'free_tier', 0, 0, 0, 0.0),  # Bloqueado por defecto
+                ('openai', 'paid', 0, 0, 0, 0.0),  # Bloqueado por defecto
+            ]
+            
+            cursor.executemany("""
                 INSERT OR IGNORE INTO model_cost_config 
                 (provider, cost_type, enabled_by_default, allow_usage, usage_count, estimated_cost_usd)
                 VALUES (?, ?, ?, ?, ?, ?)
-            """, (provider, cost_type, enabled_default, allow, usage, cost))
-        
-        conn.commit()
-        conn.close()
+            """, defaults)
+            
+            conn.commit()
     
+    def _cost_rules(self) -> Dict[str, Tuple[int, str]]:
+        """Reglas de todos los proveedores, cacheadas en memoria (el fallback consulta en cada candidato)."""
+        with self._rules_lock:
+            if self._rules is None or time.monotonic() - self._rules_at >= COST_CONTROL_CACHE_TTL_S:
+                with get_connection(self.db_path) as conn:
+                    rows = conn.execute("SELECT provider, allow_usage, cost_type FROM model_cost_config").fetchall()
+                self._rules = {r[0]: (r[1], r[2]) for r in rows}
+                self._rules_at = time.monotonic()
+            return self._rules
+
+    def invalidate(self) -> None:
+        with self._rules_lock:
+            self._rules = None
+
     def is_provider_allowed(self, provider: str) -> bool:
         """Verifica si un proveedor está autorizado para usar"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT allow_usage, cost_type FROM model_cost_config 
-            WHERE provider = ?
-        """, (provider,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        row = self._cost_rules().get(provider)
         
         if not row:
             # Si no está en la tabla, asumir que es gratuito
@@ -88,18 +97,15 @@ class CostControl:
             duration_minutes: Por cuánto tiempo permitir (default: 60 min)
             max_cost: Costo máximo permitido en USD (default: $1.00)
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Activar modelos pagos temporalmente (allow_usage = 1)
-        cursor.execute("""
-            UPDATE model_cost_config 
-            SET allow_usage = 1, updated_at = ?
-            WHERE cost_type IN ('paid', 'free_tier')
-        """, (datetime.now().isoformat(),))
-        
-        conn.commit()
-        conn.close()
+        with get_connection(self.db_path) as conn:
+            # Activar modelos pagos temporalmente (allow_usage = 1)
+            conn.execute("""
+                UPDATE model_cost_config 
+                SET allow_usage = 1, updated_at = ?
+                WHERE cost_type IN ('paid', 'free_tier')
+            """, (datetime.now().isoformat(),))
+            conn.commit()
+        self.invalidate()
         
         print(f"Modelos pagos habilitados por {duration_minutes} minutos (max ${max_cost})")
         print("Se deshabilitaran automaticamente despues")
@@ -114,40 +120,31 @@ class CostControl:
     
     def disable_paid_models(self) -> None:
         """Deshabilita el uso de modelos pagos"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE model_cost_config 
-            SET allow_usage = 0, updated_at = ?
-            WHERE cost_type IN ('paid', 'free_tier')
-        """, (datetime.now().isoformat(),))
-        
-        conn.commit()
-        conn.close()
+        with get_connection(self.db_path) as conn:
+            conn.execute("""
+                UPDATE model_cost_config 
+                SET allow_usage = 0, updated_at = ?
+                WHERE cost_type IN ('paid', 'free_tier')
+            """, (datetime.now().isoformat(),))
+            conn.commit()
+        self.invalidate()
         
         print("Modelos pagos deshabilitados. Solo se usaran modelos gratuitos.")
     
     def get_status(self) -> Dict[str, Any]:
         """Retorna el estado actual de todos los modelos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT provider, cost_type, allow_usage, usage_count, 
-                   estimated_cost_usd, last_used
-            FROM model_cost_config
-            ORDER BY 
-                CASE cost_type 
-                    WHEN 'free' THEN 1 
-                    WHEN 'free_tier' THEN 2 
-                    WHEN 'paid' THEN 3 
-                END
-        """)
-        
-        rows = cursor.fetchall()
-        conn.close()
+        with get_connection(self.db_path) as conn:
+            rows = conn.execute("""
+                SELECT provider, cost_type, allow_usage, usage_count, 
+                       estimated_cost_usd, last_used
+                FROM model_cost_config
+                ORDER BY 
+                    CASE cost_type 
+                        WHEN 'free' THEN 1 
+                        WHEN 'free_tier' THEN 2 
+                        WHEN 'paid' THEN 3 
+                    END
+            """).fetchall()
         
         status = {
             "free_models": [],
@@ -176,36 +173,27 @@ class CostControl:
     
     def log_usage(self, provider: str, cost_estimate: float = 0.0) -> None:
         """Registra el uso de un modelo"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE model_cost_config 
-            SET usage_count = usage_count + 1,
-                estimated_cost_usd = estimated_cost_usd + ?,
-                last_used = ?,
-                updated_at = ?
-            WHERE provider = ?
-        """, (cost_estimate, datetime.now().isoformat(), datetime.now().isoformat(), provider))
-        
-        conn.commit()
-        conn.close()
+        with get_connection(self.db_path) as conn:
+            conn.execute("""
+                UPDATE model_cost_config 
+                SET usage_count = usage_count + 1,
+                    estimated_cost_usd = estimated_cost_usd + ?,
+                    last_used = ?,
+                    updated_at = ?
+                WHERE provider = ?
+            """, (cost_estimate, datetime.now().isoformat(), datetime.now().isoformat(), provider))
+            conn.commit()
 
     def is_usage_allowed(self) -> bool:
         """
         Verificación global: ¿Hay algún modelo de pago o free_tier habilitado?
         Útil para chequeos rápidos antes de intentar caídas de fallback.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM model_cost_config 
-            WHERE cost_type IN ('paid', 'free_tier') AND allow_usage > 0
-        """)
-        
-        count = cursor.fetchone()[0]
-        conn.close()
+        with get_connection(self.db_path) as conn:
+            count = conn.execute("""
+                SELECT COUNT(*) FROM model_cost_config 
+                WHERE cost_type IN ('paid', 'free_tier') AND allow_usage > 0
+            """).fetchone()[0]
         
         return count > 0
 
@@ -0,0 +1,48 @@
+"""
+Señal "datos cambiados" del proceso.
+
+Quien escribe datos nuevos (los trabajos de sincronización, importaciones...)
+llama a `publish_data_changed`; las cachés derivadas (análisis del coach,
+contexto de la IA...) se suscriben con `subscribe` y se invalidan en lugar de
+esperar a que venza su TTL. Los callbacks se llaman en el hilo que publica:
+deben ser baratos (marcar como inválido, no recalcular).
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+# callback(event) con event = {"source": ..., "ts": ..., **datos}
+Listener = Callable[[dict], None]
+
+_listeners: List[Listener] = []
+_listeners_lock = threading.Lock()
+
+
+def subscribe(listener: Listener) -> Callable[[], None]:
+    """Registra `listener`; devuelve la función que lo da de baja."""
+    with _listeners_lock:
+        _listeners.append(listener)
+
+    def unsubscribe() -> None:
+        with _listeners_lock:
+            if listener in _listeners:
+                _listeners.remove(listener)
+
+    return unsubscribe
+
+
+def publish_data_changed(source: str, **data) -> dict:
+    """Notifica a todos los suscriptores; el fallo de uno no impide avisar al resto."""
+    event = {"source": source, "ts": time.time(), **data}
+    with _listeners_lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(event)
+        except Exception:
+            logger.exception(f"Suscriptor de data_changed falló ({source})")
+    return event
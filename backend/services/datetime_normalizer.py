@@ -0,0 +1,186 @@
+"""
+Normalizador único de fechas de BioEngine V3.
+
+`fecha` (activities, biometrics) y `date` (pain_logs) mezclan
+'2024-12-08 08:00:00', '2024-12-08T08:00:00', '2026-02-07T21:11:11.848244'
+y fechas sin hora. Todo lo que escribe o filtra por fecha pasa por aquí:
+
+- `fecha_ts`: epoch UTC en segundos (INTEGER, indexado) para rangos y orden.
+- `fecha_local`: 'YYYY-MM-DD' en la zona horaria del atleta (LOCAL_TIMEZONE).
+
+Las fechas sin zona se interpretan como hora local (Garmin `startTimeLocal`,
+Apple Health y los registros manuales ya vienen así); las que traen zona
+('Z', '+00:00') se convierten. Una fecha sin hora es la medianoche local.
+
+Los triggers de la migración 0012 aplican las mismas reglas en SQLite a las
+filas que llegan sin estas columnas; los desfases de LOCAL_TIMEZONE salen de
+`tz_offsets`, que `refresh_tz_offsets` mantiene al día.
+"""
+
+import datetime
+import logging
+from typing import Any, Iterable, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from config import LOCAL_TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+LOCAL_TZ = ZoneInfo(LOCAL_TIMEZONE)
+
+# Tabla -> columna de fecha original que alimenta fecha_ts / fecha_local
+NORMALIZED_TABLES = {
+    "activities": "fecha",
+    "biometrics": "fecha",
+    "pain_logs": "date",
+}
+
+
+# Primer tramo de tz_offsets: cubre todo lo anterior a la primera transición
+SINCE_EVER = -(2 ** 62)
+TZ_SPANS_FROM = datetime.datetime(1900, 1, 1, tzinfo=datetime.timezone.utc)
+TZ_SPANS_TO = datetime.datetime(2100, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class NormalizedTime(NamedTuple):
+    ts: int                   # epoch UTC (s)
+    local_date: str           # YYYY-MM-DD local
+    local: datetime.datetime  # hora local sin tzinfo (para arrays / comparaciones naive)
+
+
+def parse_datetime(value: Any) -> Optional[datetime.datetime]:
+    """Devuelve un datetime con zona (LOCAL_TZ si venía naive) o None si no se puede interpretar."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value, LOCAL_TZ)
+    if isinstance(value, datetime.datetime):
+        dt = value
+    elif isinstance(value, datetime.date):
+        dt = datetime.datetime.combine(value, datetime.time())
+    else:
+        text = str(value).strip()
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        try:
+            dt = datetime.datetime.fromisoformat(text)
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=LOCAL_TZ)
+    return dt.astimezone(LOCAL_TZ)
+
+
+def normalize(value: Any) -> Optional[NormalizedTime]:
+    dt = parse_datetime(value)
+    if dt is None:
+        return None
+    return NormalizedTime(int(dt.timestamp()), dt.date().isoformat(), dt.replace(tzinfo=None))
+
+
+def to_epoch(value: Any) -> Optional[int]:
+    n = normalize(value)
+    return n.ts if n else None
+
+
+def to_local_date(value: Any) -> Optional[str]:
+    n = normalize(value)
+    return n.local_date if n else None
+
+
+def epoch_to_local(ts: int) -> datetime.datetime:
+    """Epoch UTC -> hora local sin tzinfo."""
+    return datetime.datetime.fromtimestamp(ts, LOCAL_TZ).replace(tzinfo=None)
+
+
+def normalized_columns(value: Any) -> Tuple[Optional[int], Optional[str]]:
+    """(fecha_ts, fecha_local) listos para un INSERT/UPDATE."""
+    n = normalize(value)
+    return (n.ts, n.local_date) if n else (None, None)
+
+
+def epoch_bounds(date_from: Any = None, date_to: Any = None) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Traduce un rango (inclusivo en ambos extremos) a límites epoch para
+    `fecha_ts >= lo AND fecha_ts < hi`. Un `date_to` sin hora incluye todo ese día.
+    """
+    lo = to_epoch(date_from) if date_from else None
+    hi = None
+    if date_to:
+        if isinstance(date_to, datetime.date) and not isinstance(date_to, datetime.datetime):
+            hi = to_epoch(date_to + datetime.timedelta(days=1))
+        elif isinstance(date_to, str) and len(date_to.strip()) == 10:
+            end = parse_datetime(date_to)
+            hi = to_epoch(end.date() + datetime.timedelta(days=1)) if end else None
+        else:
+            ts = to_epoch(date_to)
+            hi = ts + 1 if ts is not None else None
+        if hi is None:
+            raise ValueError(f"Fecha inválida: {date_to!r}")
+    if date_from and lo is None:
+        raise ValueError(f"Fecha inválida: {date_from!r}")
+    return lo, hi
+
+
+def backfill_normalized_columns(conn, tables: Optional[Iterable[str]] = None) -> int:
+    """
+    Rellena fecha_ts / fecha_local donde faltan (filas escritas por scripts que
+    no conocen las columnas). Devuelve el número de filas actualizadas.
+    """
+    updated = 0
+    for table in tables or NORMALIZED_TABLES:
+        source = NORMALIZED_TABLES[table]
+        rows = conn.execute(
+            f"SELECT id, {source} FROM {table} WHERE fecha_ts IS NULL AND {source} IS NOT NULL"
+        ).fetchall()
+        params = []
+        for row_id, value in rows:
+            ts, local = normalized_columns(value)
+            if ts is None:
+                logger.warning(f"{table}.{source} no interpretable en id={row_id}: {value!r}")
+                continue
+            params.append((ts, local, row_id))
+        if params:
+            conn.executemany(f"UPDATE {table} SET fecha_ts = ?, fecha_local = ? WHERE id = ?", params)
+            updated += len(params)
+    return updated
+
+
+def _utc_offset(tz: ZoneInfo, ts: int) -> int:
+    return int(datetime.datetime.fromtimestamp(ts, tz).utcoffset().total_seconds())
+
+
+def tz_spans(zone: str) -> List[Tuple[int, int]]:
+    """(inicio UTC, desfase en s) de cada tramo de `zone` entre 1900 y 2100."""
+    tz = ZoneInfo(zone)
+    ts, end = int(TZ_SPANS_FROM.timestamp()), int(TZ_SPANS_TO.timestamp())
+    current = _utc_offset(tz, ts)
+    spans = [(SINCE_EVER, current)]
+    while ts < end:
+        nxt = ts + 86400
+        if _utc_offset(tz, nxt) != current:
+            lo, hi = ts, nxt  # el cambio ocurre en (lo, hi]
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if _utc_offset(tz, mid) == current:
+                    lo = mid
+                else:
+                    hi = mid
+            current = _utc_offset(tz, hi)
+            spans.append((hi, current))
+        ts = nxt
+    return spans
+
+
+def refresh_tz_offsets(conn, zone: str = LOCAL_TIMEZONE) -> bool:
+    """Rehace `tz_offsets` si se generó para otra zona. Devuelve True si la cambió."""
+    zones = {row[0] for row in conn.execute("SELECT DISTINCT zone FROM tz_offsets")}
+    if zones == {zone}:
+        return False
+    conn.execute("DELETE FROM tz_offsets")
+    conn.executemany(
+        "INSERT INTO tz_offsets (utc_from, local_from, offset_s, zone) VALUES (?, ?, ?, ?)",
+        [(utc_from, utc_from if utc_from == SINCE_EVER else utc_from + offset, offset, zone)
+         for utc_from, offset in tz_spans(zone)],
+    )
+    return True
@@ -0,0 +1,285 @@
+"""
+Pool compartido de conexiones SQLite para BioEngine V3.
+
+Todos los servicios (API, ContextManager, SyncService, CostControl, HITL,
+AIService y los servidores MCP) piden sus conexiones aquí en lugar de abrir
+una nueva con sqlite3.connect() en cada llamada. Cada conexión se configura
+una sola vez al crearse: WAL (los lectores no se bloquean durante /sync/all),
+synchronous=NORMAL, page cache dimensionado y mmap.
+
+Las corrutinas no deben tocar SQLite directamente: `await run_db(fn, ...)`
+ejecuta `fn` en un executor dedicado y acotado, y el event loop sigue
+atendiendo (p.ej. los /chat/stream en curso) mientras tanto.
+"""
+
+import sqlite3
+import queue
+import asyncio
+import functools
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+from config import (
+    DB_PATH,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_S,
+    DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE_MB,
+    DB_BUSY_TIMEOUT_MS,
+    DB_EXECUTOR_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class NestedConnection:
+    """
+    Vista de la conexión del hilo para un `connection()` anidado, acotada a un
+    SAVEPOINT: `commit()` consolida solo el trabajo del bloque en la
+    transacción exterior (que sigue siendo de quien la abrió) y `rollback()`
+    deshace solo ese trabajo. Si el bloque termina con una excepción se
+    descarta lo que hizo; si termina bien, queda en la transacción exterior.
+    El resto de atributos son los de la conexión.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, name: str):
+        self._conn = conn
+        self._name = name
+        conn.execute(f"SAVEPOINT {name}")
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._conn, attr)
+
+    def __enter__(self) -> "NestedConnection":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def commit(self) -> None:
+        self._conn.execute(f"RELEASE {self._name}")
+        self._conn.execute(f"SAVEPOINT {self._name}")
+
+    def rollback(self) -> None:
+        self._conn.execute(f"ROLLBACK TO {self._name}")
+
+    def close_savepoint(self, discard: bool = False) -> None:
+        """Cierra el SAVEPOINT al salir del bloque (deshaciéndolo antes si `discard`)."""
+        if discard:
+            self._conn.execute(f"ROLLBACK TO {self._name}")
+        self._conn.execute(f"RELEASE {self._name}")
+
+
+class SQLitePool:
+    """
+    Pool thread-safe de conexiones SQLite hacia una única base de datos.
+
+    Las conexiones se crean de forma perezosa hasta `size` y se reutilizan
+    (LIFO, para mantener caliente la caché de la conexión más reciente).
+    `connection()` es reentrante por hilo: si el hilo ya tiene una conexión
+    del pool, la reutiliza en lugar de pedir otra (evita deadlocks cuando un
+    método con conexión abierta llama a otro que también la necesita). Si quien
+    la tiene lleva una transacción abierta, el bloque anidado corre dentro de un
+    SAVEPOINT (ver `NestedConnection`), así que su commit/rollback no confirma
+    ni descarta el trabajo pendiente de quien lo llamó.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT_S):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=self.size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+    def _create_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000.0,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+        conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE_MB) * 1024 * 1024}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Obtiene una conexión del pool (crea una nueva si aún no se llegó al tamaño máximo)."""
+        if self._closed:
+            raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+
+        if can_create:
+            try:
+                return self._create_connection()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Pool SQLite agotado: {self.size} conexiones en uso durante más de {self.timeout}s"
+            )
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Devuelve una conexión al pool, descartando cualquier transacción sin confirmar."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning(f"Descartando conexión SQLite dañada: {e}")
+            self._discard(conn)
+            return
+
+        if self._closed:
+            self._discard(conn)
+            return
+
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._created -= 1
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Context manager reentrante por hilo que presta una conexión del pool."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                if not held.in_transaction:
+                    # Nada pendiente del llamador que un commit/rollback pueda tocar
+                    yield held
+                    return
+                nested = NestedConnection(held, f"pool_nested_{self._local.depth}")
+                try:
+                    yield nested
+                except BaseException:
+                    nested.close_savepoint(discard=True)
+                    raise
+                nested.close_savepoint()
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self.acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            self.release(conn)
+
+    def close_all(self) -> None:
+        """Cierra las conexiones inactivas y marca el pool como cerrado."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": self.size, "created": self._created, "idle": self._idle.qsize()}
+
+
+# Un pool por fichero de base de datos (singleton por proceso)
+_pools: Dict[str, SQLitePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_db_pool(db_path: Optional[str] = None) -> SQLitePool:
+    """Get singleton pool instance for the given database path."""
+    path = db_path or DB_PATH
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = SQLitePool(path)
+                _pools[path] = pool
+    return pool
+
+
+@contextmanager
+def get_connection(db_path: Optional[str] = None) -> Iterator[sqlite3.Connection]:
+    """Atajo: `with get_connection() as conn:` presta una conexión del pool compartido."""
+    with get_db_pool(db_path).connection() as conn:
+        yield conn
+
+
+def close_db_pools() -> None:
+    """Cierra todos los pools (shutdown de la aplicación)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+
+# Executor dedicado para acceso a SQLite desde corrutinas
+T = TypeVar("T")
+_db_executor: Optional[ThreadPoolExecutor] = None
+_db_executor_lock = threading.Lock()
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Get singleton executor for blocking database work."""
+    global _db_executor
+    if _db_executor is None:
+        with _db_executor_lock:
+            if _db_executor is None:
+                # Más hilos que conexiones solo añadiría espera en acquire()
+                workers = max(1, min(DB_EXECUTOR_WORKERS, DB_POOL_SIZE))
+                _db_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bioengine-db")
+    return _db_executor
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Ejecuta una función bloqueante de acceso a datos fuera del event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_db_executor() -> None:
+    """Espera a que terminen las tareas en curso y libera los hilos (shutdown de la aplicación)."""
+    global _db_executor
+    with _db_executor_lock:
+        executor, _db_executor = _db_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
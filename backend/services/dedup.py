@@ -0,0 +1,218 @@
+"""
+Deduplicación de actividades entre fuentes (Garmin, Runkeeper, Strava, Apple...).
+
+Barrido sort-merge sobre `fecha_ts`: las actividades se recorren en orden de
+inicio (el índice idx_activities_fecha_ts ya las entrega ordenadas) y cada una
+solo se compara con los grupos abiertos dentro de la ventana, así que el coste
+es O(n log n) por el orden y O(n·k) por el barrido, con k = grupos que caben
+en la ventana (normalmente 1-2), en lugar del self-join O(n²).
+
+Dos actividades son la misma si empiezan a menos de `window_s` segundos, son
+de fuentes distintas y de deporte compatible (mismo sport_canonical, o uno de
+los dos sin clasificar). De cada grupo se conserva la de la fuente con más
+prioridad; los campos vacíos (NULL o 0) se completan con los de las demás,
+que se borran. Lo que cuelga de las borradas (series de activity_streams y
+material fijado a mano en gear_activities) pasa a la conservada si esta no lo
+tiene; si ya lo tiene, se descarta. Todo se aplica en una única transacción.
+"""
+
+import logging
+import os
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from config import DEDUP_WINDOW_S, DEDUP_SOURCE_PRIORITY
+from services.sport_taxonomy import OTHER_SPORT
+
+logger = logging.getLogger(__name__)
+
+# Columnas que se completan en la actividad conservada si vienen vacías
+MERGE_COLUMNS = ("distancia_km", "duracion_min", "calorias", "fc_media", "fc_max",
+                 "elevacion_m", "cadencia_media", "nombre")
+
+_FETCH_COLUMNS = ("id", "fecha_ts", "fuente", "sport_canonical") + MERGE_COLUMNS
+
+
+class MergePlan(NamedTuple):
+    keeper_id: int
+    duplicate_ids: List[int]
+    updates: Dict[str, object]  # columna -> valor a completar en la conservada
+
+
+def source_rank(fuente: Optional[str], priority: Sequence[str] = DEDUP_SOURCE_PRIORITY) -> int:
+    """Posición de la fuente en `priority` (menor = más fiable); las desconocidas van al final."""
+    low = (fuente or "").lower()
+    for rank, name in enumerate(priority):
+        if name in low:
+            return rank
+    return len(priority)
+
+
+def _source_key(fuente: Optional[str], priority: Sequence[str]) -> str:
+    """Fuente normalizada para decidir si dos filas vienen del mismo origen."""
+    low = (fuente or "").lower()
+    return next((name for name in priority if name in low), low)
+
+
+def _empty(value) -> bool:
+    return value is None or value == 0 or value == ""
+
+
+def _compatible(sport_a: Optional[str], sport_b: Optional[str]) -> bool:
+    if sport_a in (None, OTHER_SPORT) or sport_b in (None, OTHER_SPORT):
+        return True
+    return sport_a == sport_b
+
+
+def _plan_cluster(members: List[dict], priority: Sequence[str]) -> MergePlan:
+    ordered = sorted(
+        members,
+        key=lambda r: (source_rank(r["fuente"], priority), _empty(r["distancia_km"]), r["id"]),
+    )
+    keeper, duplicates = ordered[0], ordered[1:]
+    updates = {}
+    for column in MERGE_COLUMNS:
+        if _empty(keeper[column]):
+            donor = next((d[column] for d in duplicates if not _empty(d[column])), None)
+            if donor is not None:
+                updates[column] = donor
+    return MergePlan(keeper["id"], [d["id"] for d in duplicates], updates)
+
+
+def plan_merges(
+    rows: Iterable[dict],
+    window_s: int = DEDUP_WINDOW_S,
+    priority: Sequence[str] = DEDUP_SOURCE_PRIORITY,
+) -> List[MergePlan]:
+    """
+    Agrupa duplicados con un barrido sobre las filas ordenadas por `fecha_ts`
+    (se ordenan aquí si no lo están) y devuelve un plan por grupo con más de un miembro.
+    """
+    rows = sorted((r for r in rows if r["fecha_ts"] is not None), key=lambda r: (r["fecha_ts"], r["id"]))
+    open_clusters: deque = deque()  # (fecha_ts del ancla, miembros, fuentes)
+    closed: List[List[dict]] = []
+
+    for row in rows:
+        while open_clusters and row["fecha_ts"] - open_clusters[0][0] > window_s:
+            closed.append(open_clusters.popleft()[1])
+        source = _source_key(row["fuente"], priority)
+        for anchor_ts, members, sources in open_clusters:
+            if source not in sources and all(_compatible(row["sport_canonical"], m["sport_canonical"]) for m in members):
+                members.append(row)
+                sources.add(source)
+                break
+        else:
+            open_clusters.append((row["fecha_ts"], [row], {source}))
+    closed.extend(members for _, members, _ in open_clusters)
+
+    return [_plan_cluster(members, priority) for members in closed if len(members) > 1]
+
+
+def _adopt_children(conn, plan: MergePlan) -> List[str]:
+    """
+    Pasa a la conservada las series y el material fijado de los duplicados.
+    Devuelve los .npy que quedan sin dueño, para borrarlos tras el commit.
+    """
+    marks = ", ".join("?" * len(plan.duplicate_ids))
+    orphans = []
+    has_stream = conn.execute(
+        "SELECT 1 FROM activity_streams WHERE activity_id = ?", (plan.keeper_id,)
+    ).fetchone() is not None
+    for activity_id, path in conn.execute(
+        f"SELECT activity_id, path FROM activity_streams WHERE activity_id IN ({marks}) ORDER BY activity_id",
+        plan.duplicate_ids,
+    ).fetchall():
+        if has_stream:
+            conn.execute("DELETE FROM activity_streams WHERE activity_id = ?", (activity_id,))
+            orphans.append(path)
+        else:
+            conn.execute("UPDATE activity_streams SET activity_id = ? WHERE activity_id = ?",
+                         (plan.keeper_id, activity_id))
+            has_stream = True
+
+    pinned = conn.execute(
+        f"SELECT activity_id FROM gear_activities WHERE activity_id IN ({marks}) AND pinned = 1 "
+        "ORDER BY activity_id LIMIT 1",
+        plan.duplicate_ids,
+    ).fetchone()
+    keeper_pinned = conn.execute(
+        "SELECT 1 FROM gear_activities WHERE activity_id = ? AND pinned = 1", (plan.keeper_id,)
+    ).fetchone()
+    if pinned and not keeper_pinned:
+        # Los triggers de gear_activities mantienen km/sesiones del material
+        conn.execute("DELETE FROM gear_activities WHERE activity_id = ?", (plan.keeper_id,))
+        conn.execute("UPDATE gear_activities SET activity_id = ? WHERE activity_id = ?",
+                     (plan.keeper_id, pinned[0]))
+        conn.execute(
+            "UPDATE gear_activities SET km = "
+            "(SELECT COALESCE(distancia_km, 0) FROM activities WHERE id = ?) WHERE activity_id = ?",
+            (plan.keeper_id, plan.keeper_id),
+        )
+    return orphans
+
+
+def apply_merges(conn, plans: Sequence[MergePlan]) -> int:
+    """
+    Aplica los planes en una sola transacción: completa la conservada, le pasa
+    series y material de los duplicados y los borra.
+    """
+    if not plans:
+        return 0
+    orphans = []
+    try:
+        for plan in plans:
+            if plan.updates:
+                conn.execute(
+                    f"UPDATE activities SET {', '.join(f'{c} = ?' for c in plan.updates)} WHERE id = ?",
+                    (*plan.updates.values(), plan.keeper_id),
+                )
+            orphans.extend(_adopt_children(conn, plan))
+        conn.executemany(
+            "DELETE FROM activities WHERE id = ?",
+            [(dup,) for plan in plans for dup in plan.duplicate_ids],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    for path in orphans:
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Dedup: no se pudo borrar la serie {path}: {e}")
+    removed = sum(len(p.duplicate_ids) for p in plans)
+    logger.info(f"Dedup: {len(plans)} grupos fusionados, {removed} duplicados eliminados")
+    return removed
+
+
+def load_candidates(conn, since_ts: Optional[int] = None, until_ts: Optional[int] = None,
+                    window_s: int = DEDUP_WINDOW_S) -> List[dict]:
+    """Actividades (ordenadas por fecha_ts) que pueden chocar con el rango [since_ts, until_ts]."""
+    where, params = ["fecha_ts IS NOT NULL"], []
+    if since_ts is not None:
+        where.append("fecha_ts >= ?")
+        params.append(since_ts - window_s)
+    if until_ts is not None:
+        where.append("fecha_ts <= ?")
+        params.append(until_ts + window_s)
+    sql = f"SELECT {', '.join(_FETCH_COLUMNS)} FROM activities WHERE {' AND '.join(where)} ORDER BY fecha_ts, id"
+    return [dict(zip(_FETCH_COLUMNS, row)) for row in conn.execute(sql, params).fetchall()]
+
+
+def deduplicate(
+    conn,
+    since_ts: Optional[int] = None,
+    until_ts: Optional[int] = None,
+    window_s: int = DEDUP_WINDOW_S,
+    priority: Sequence[str] = DEDUP_SOURCE_PRIORITY,
+    dry_run: bool = False,
+) -> List[MergePlan]:
+    """
+    Detecta y (salvo `dry_run`) fusiona duplicados. Con `since_ts`/`until_ts`
+    solo se revisa ese rango (más la ventana): es lo que usa el sync tras
+    insertar actividades nuevas.
+    """
+    plans = plan_merges(load_candidates(conn, since_ts, until_ts, window_s), window_s, priority)
+    if plans and not dry_run:
+        apply_merges(conn, plans)
+    return plans
@@ -0,0 +1,234 @@
+"""
+Odómetro de equipamiento (libro de material).
+
+- `gear`: cada par de zapatillas / bici / raqueta, con su categoría, reglas de
+  asignación, base histórica (km o sesiones previos a la DB) y los acumulados
+  `km` / `sessions`.
+- `gear_activities`: qué material se usó en cada actividad. Lo rellenan los
+  triggers de la migración 0007 cuando se clasifica una actividad (INSERT o
+  cambio de tipo/distancia/fecha); `pinned = 1` marca asignaciones manuales.
+- Los triggers de `gear_activities` suman/restan sobre `gear`, así que los
+  acumulados están siempre al día sin recorrer el historial.
+
+`EquipmentService` sirve `GET /equipment` desde una caché en memoria que solo
+se invalida tras un sync con actividades nuevas o al editar el material.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from config import CONTEXT_BASE_PATH
+from services.db_pool import get_connection
+from services.training_load import TrainingLoadService
+
+logger = logging.getLogger(__name__)
+
+EQUIPMENT_FILE = CONTEXT_BASE_PATH / "equipamiento.md"
+
+GEAR_COLUMNS = (
+    "slug", "name", "category", "since", "retired_on", "base_km", "base_sessions",
+    "match_name", "max_km", "races", "priority",
+)
+
+GEAR_CATEGORIES = ("road", "trail", "cycling", "tennis")
+
+
+def gear_category_sql(label: str) -> str:
+    """Categoría de material a partir de la etiqueta del dashboard (sport_label)."""
+    return f"""CASE
+        WHEN {label} IN ('Trail Running', 'Hiking/Senderismo') THEN 'trail'
+        WHEN instr({label}, 'Running') > 0 OR instr({label}, 'Competición') > 0 OR instr({label}, 'Fondo') > 0 THEN 'road'
+        WHEN {label} = 'Tenis' THEN 'tennis'
+        WHEN {label} = 'Ciclismo' THEN 'cycling'
+    END"""
+
+
+def gear_assignment_sql(row: str) -> str:
+    """
+    Subconsulta con el id del material que corresponde a la actividad `row`
+    (NEW o activities), o NULL. Gana el material que la nombra; después el de
+    reglas más específicas (max_km) y por último `priority`.
+    """
+    label = f"{row}.sport_label"
+    nombre = f"LOWER(COALESCE({row}.nombre, ''))"
+    dist = f"COALESCE({row}.distancia_km, 0)"
+    day = f"COALESCE({row}.fecha_local, date({row}.fecha))"
+    named = f"(g.match_name IS NOT NULL AND instr({nombre}, g.match_name) > 0)"
+    # SQLite no admite referencias a la fila externa en el ORDER BY de una
+    # subconsulta escalar: los criterios se calculan como columnas de una tabla derivada.
+    return f"""(SELECT id FROM (
+        SELECT g.id, g.priority, g.max_km IS NOT NULL AS specific, {named} AS named FROM gear g
+        WHERE g.category = {gear_category_sql(label)}
+          AND (g.since IS NULL OR g.since <= {day})
+          AND (g.retired_on IS NULL OR {day} <= g.retired_on)
+          AND ({named} OR ((g.max_km IS NULL OR {dist} < g.max_km)
+                           AND (g.races = 1 OR {label} <> 'Competición Calle'))))
+        ORDER BY named DESC, specific DESC, priority DESC, id
+        LIMIT 1)"""
+
+
+def rebuild_gear_ledger(conn) -> None:
+    """Reasigna todas las actividades no fijadas a mano y recalcula los acumulados (tras editar el material)."""
+    conn.execute("DELETE FROM gear_activities WHERE pinned = 0")
+    conn.execute(f"""
+        INSERT OR IGNORE INTO gear_activities (activity_id, gear_id, km)
+        SELECT id, g, km FROM (
+            SELECT activities.id AS id, COALESCE(activities.distancia_km, 0) AS km,
+                   {gear_assignment_sql('activities')} AS g
+            FROM activities
+        )
+        WHERE g IS NOT NULL
+    """)
+    conn.execute("""
+        UPDATE gear SET
+            km = COALESCE((SELECT SUM(km) FROM gear_activities WHERE gear_id = gear.id), 0),
+            sessions = (SELECT COUNT(*) FROM gear_activities WHERE gear_id = gear.id)
+    """)
+
+
+class EquipmentService:
+    def __init__(self, db_path: Optional[str] = None, equipment_file=EQUIPMENT_FILE):
+        self.db_path = db_path
+        self.equipment_file = equipment_file
+        self.load = TrainingLoadService(db_path)
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._generation = 0
+
+    def invalidate(self) -> None:
+        """Descarta la caché (sync con actividades nuevas o edición de material)."""
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Respuesta de GET /equipment; O(1) mientras la caché sea válida."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            generation = self._generation
+        snapshot = self._build()
+        with self._lock:
+            # Si alguien invalidó mientras se construía, no cachear un resultado viejo
+            if generation == self._generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def list_gear(self) -> List[Dict[str, Any]]:
+        with get_connection(self.db_path) as conn:
+            rows = conn.execute("SELECT * FROM gear ORDER BY category, priority DESC, id").fetchall()
+        gear = []
+        for row in rows:
+            item = dict(row)
+            item["km"] = round(item["km"], 1)
+            item["total_km"] = round(item["base_km"] + item["km"], 1)
+            item["total_sessions"] = item["base_sessions"] + item["sessions"]
+            gear.append(item)
+        return gear
+
+    def add_gear(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        values = {k: data[k] for k in GEAR_COLUMNS if data.get(k) is not None}
+        with get_connection(self.db_path) as conn:
+            conn.execute(
+                f"INSERT INTO gear ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})",
+                tuple(values.values()),
+            )
+            rebuild_gear_ledger(conn)
+            conn.commit()
+        self.invalidate()
+        return self.get_gear(values["slug"])
+
+    def update_gear(self, slug: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        changes = {k: v for k, v in changes.items() if k in GEAR_COLUMNS and k != "slug"}
+        with get_connection(self.db_path) as conn:
+            if not changes:
+                # Nada que escribir: solo comprobar que existe (404 si no) sin tocar la caché
+                if not conn.execute("SELECT 1 FROM gear WHERE slug = ?", (slug,)).fetchone():
+                    return None
+                return self.get_gear(slug)
+            cur = conn.execute(
+                f"UPDATE gear SET {', '.join(f'{k} = ?' for k in changes)} WHERE slug = ?",
+                (*changes.values(), slug),
+            )
+            if cur.rowcount == 0:
+                return None
+            rebuild_gear_ledger(conn)
+            conn.commit()
+        self.invalidate()
+        return self.get_gear(slug)
+
+    def assign_activity(self, activity_id: int, slug: Optional[str]) -> bool:
+        """Fija a mano el material de una actividad (`slug=None` vuelve a la asignación automática)."""
+        with get_connection(self.db_path) as conn:
+            if not conn.execute("SELECT 1 FROM activities WHERE id = ?", (activity_id,)).fetchone():
+                return False
+            if slug is None:
+                conn.execute("DELETE FROM gear_activities WHERE activity_id = ?", (activity_id,))
+                conn.execute(f"""
+                    INSERT INTO gear_activities (activity_id, gear_id, km)
+                    SELECT id, g, km FROM (
+                        SELECT activities.id AS id, COALESCE(activities.distancia_km, 0) AS km,
+                               {gear_assignment_sql('activities')} AS g
+                        FROM activities WHERE activities.id = ?
+                    ) WHERE g IS NOT NULL
+                """, (activity_id,))
+            else:
+                gear = conn.execute("SELECT id FROM gear WHERE slug = ?", (slug,)).fetchone()
+                if not gear:
+                    return False
+                conn.execute("""
+                    INSERT INTO gear_activities (activity_id, gear_id, km, pinned)
+                    SELECT id, ?, COALESCE(distancia_km, 0), 1 FROM activities WHERE id = ?
+                    ON CONFLICT(activity_id) DO UPDATE SET gear_id = excluded.gear_id, pinned = 1
+                """, (gear["id"], activity_id))
+            conn.commit()
+        self.invalidate()
+        return True
+
+    def get_gear(self, slug: str) -> Optional[Dict[str, Any]]:
+        return next((g for g in self.list_gear() if g["slug"] == slug), None)
+
+    def _read_markdown(self) -> str:
+        try:
+            with open(self.equipment_file, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError as e:
+            logger.warning(f"No se pudo leer {self.equipment_file}: {e}")
+            return ""
+
+    def _build(self) -> Dict[str, Any]:
+        gear = self.list_gear()
+
+        # Estadísticas históricas del endpoint (desde la carga diaria pre-agregada)
+        since_2024 = self.load.sport_totals(since='2024-01-01', sports=('running', 'trail', 'tennis'))
+        since_bike = self.load.sport_totals(since='2024-06-15', sports=('cycling',))
+        bike_km = since_bike.get('cycling', {}).get('distancia_km', 0)
+        bike_base = sum(g["base_km"] for g in gear if g["category"] == "cycling" and g["retired_on"] is None)
+
+        return {
+            "markdown_content": self._read_markdown(),
+            "stats": {
+                "training_km": round(since_2024.get('running', {}).get('distancia_km', 0), 1),  # Running asfalto
+                "trail_km": round(since_2024.get('trail', {}).get('distancia_km', 0), 1),  # Trail/Trekking
+                "bike_km": round(bike_km, 1),  # Bicicleta
+                "bike_km_total": round(bike_base + bike_km, 1),  # Base km desde compra
+                "tennis_sessions": since_2024.get('tennis', {}).get('sessions', 0),  # Tenis (count sessions)
+            },
+            "gear": gear,
+        }
+
+
+_equipment_service: Optional[EquipmentService] = None
+_equipment_lock = threading.Lock()
+
+
+def get_equipment_service() -> EquipmentService:
+    """Get singleton EquipmentService instance"""
+    global _equipment_service
+    if _equipment_service is None:
+        with _equipment_lock:
+            if _equipment_service is None:
+                _equipment_service = EquipmentService()
+    return _equipment_service
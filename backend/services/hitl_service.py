@@ -5,7 +5,6 @@ Manages critical actions that require human approval before execution.
 Implements safety checks for training load changes, injury risk, and other critical decisions.
 """
 
-import sqlite3
 import datetime
 import json
 import logging
@@ -13,6 +12,7 @@ from typing import Dict, Any, Optional, List
 from enum import Enum
 from pydantic import BaseModel
 from config import DB_PATH
+from services.db_pool import get_connection
 
 logger = logging.getLogger(__name__)
 
@@ -65,9 +65,9 @@ class HITLService:
     
     def _init_db(self):
         """Initialize HITL database table"""
-        conn = sqlite3.connect(self.db_path)
         try:
-            conn.execute("""
+            with get_connection(self.db_path) as conn:
+                conn.execute("""
                 CREATE TABLE IF NOT EXISTS hitl_actions (
                     action_id TEXT PRIMARY KEY,
                     action_type TEXT NOT NULL,
@@ -84,13 +84,11 @@ class HITLService:
                     approved_by TEXT,
                     rejection_reason TEXT
                 )
-            """)
-            conn.commit()
+                """)
+                conn.commit()
             logger.info("HITL database initialized")
         except Exception as e:
             logger.error(f"Error initializing HITL database: {e}")
-        finally:
-            conn.close()
     
     def create_action(
         self,
@@ -136,33 +134,31 @@ class HITLService:
             expires_at=expires_at.isoformat()
         )
         
-        conn = sqlite3.connect(self.db_path)
         try:
-            conn.execute("""
-                INSERT INTO hitl_actions 
-                (action_id, action_type, description, severity, proposed_changes, 
-                 reasoning, risks, benefits, status, created_at, expires_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                action.action_id,
-                action.action_type,
-                action.description,
-                action.severity.value,
-                json.dumps(action.proposed_changes),
-                action.reasoning,
-                json.dumps(action.risks),
-                json.dumps(action.benefits),
-                action.status.value,
-                action.created_at,
-                action.expires_at
-            ))
-            conn.commit()
+            with get_connection(self.db_path) as conn:
+                conn.execute("""
+                    INSERT INTO hitl_actions 
+                    (action_id, action_type, description, severity, proposed_changes, 
+                     reasoning, risks, benefits, status, created_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    action.action_id,
+                    action.action_type,
+                    action.description,
+                    action.severity.value,
+                    json.dumps(action.proposed_changes),
+                    action.reasoning,
+                    json.dumps(action.risks),
+                    json.dumps(action.benefits),
+                    action.status.value,
+                    action.created_at,
+                    action.expires_at
+                ))
+                conn.commit()
             logger.info(f"Created HITL action: {action_id} (severity: {severity})")
         except Exception as e:
             logger.error(f"Error creating HITL action: {e}")
             raise
-        finally:
-            conn.close()
         
         return action
     
@@ -177,55 +173,53 @@ class HITLService:
         Returns:
             True if approved successfully, False otherwise
         """
-        conn = sqlite3.connect(self.db_path)
         try:
-            # Check if action exists and is pending
-            cursor = conn.execute(
-                "SELECT status, expires_at FROM hitl_actions WHERE action_id = ?",
-                (action_id,)
-            )
-            row = cursor.fetchone()
-            
-            if not row:
-                logger.warning(f"Action {action_id} not found")
-                return False
+            with get_connection(self.db_path) as conn:
+                # Check if action exists and is pending
+                cursor = conn.execute(
+                    "SELECT status, expires_at FROM hitl_actions WHERE action_id = ?",
+                    (action_id,)
+                )
+                row = cursor.fetchone()
             
-            status, expires_at = row
+                if not row:
+                    logger.warning(f"Action {action_id} not found")
+                    return False
             
-            if status != ActionStatus.PENDING.value:
-                logger.warning(f"Action {action_id} is not pending (status: {status})")
-                return False
+                status, expires_at = row
             
-            # Check if expired
-            if datetime.datetime.fromisoformat(expires_at) < datetime.datetime.now():
-                conn.execute(
-                    "UPDATE hitl_actions SET status = ? WHERE action_id = ?",
-                    (ActionStatus.EXPIRED.value, action_id)
-                )
-                conn.commit()
-                logger.warning(f"Action {action_id} has expired")
-                return False
+                if status != ActionStatus.PENDING.value:
+                    logger.warning(f"Action {action_id} is not pending (status: {status})")
+                    return False
             
-            # Approve the action
-            conn.execute("""
-                UPDATE hitl_actions 
-                SET status = ?, approved_at = ?, approved_by = ?
-                WHERE action_id = ?
-            """, (
-                ActionStatus.APPROVED.value,
-                datetime.datetime.now().isoformat(),
-                approved_by,
-                action_id
-            ))
-            conn.commit()
-            logger.info(f"Action {action_id} approved by {approved_by}")
-            return True
+                # Check if expired
+                if datetime.datetime.fromisoformat(expires_at) < datetime.datetime.now():
+                    conn.execute(
+                        "UPDATE hitl_actions SET status = ? WHERE action_id = ?",
+                        (ActionStatus.EXPIRED.value, action_id)
+                    )
+                    conn.commit()
+                    logger.warning(f"Action {action_id} has expired")
+                    return False
             
+                # Approve the action
+                conn.execute("""
+                    UPDATE hitl_actions 
+                    SET status = ?, approved_at = ?, approved_by = ?
+                    WHERE action_id = ?
+                """, (
+                    ActionStatus.APPROVED.value,
+                    datetime.datetime.now().isoformat(),
+                    approved_by,
+                    action_id
+                ))
+                conn.commit()
+                logger.info(f"Action {action_id} approved by {approved_by}")
+                return True
+
         except Exception as e:
             logger.error(f"Error approving action: {e}")
             return False
-        finally:
-            conn.close()
     
     def reject_action(self, action_id: str, reason: str = "") -> bool:
         """
@@ -238,40 +232,37 @@ class HITLService:
         Returns:
             True if rejected successfully, False otherwise
         """
-        conn = sqlite3.connect(self.db_path)
         try:
-            conn.execute("""
-                UPDATE hitl_actions 
-                SET status = ?, rejection_reason = ?
-                WHERE action_id = ? AND status = ?
-            """, (
-                ActionStatus.REJECTED.value,
-                reason,
-                action_id,
-                ActionStatus.PENDING.value
-            ))
-            conn.commit()
+            with get_connection(self.db_path) as conn:
+                conn.execute("""
+                    UPDATE hitl_actions 
+                    SET status = ?, rejection_reason = ?
+                    WHERE action_id = ? AND status = ?
+                """, (
+                    ActionStatus.REJECTED.value,
+                    reason,
+                    action_id,
+                    ActionStatus.PENDING.value
+                ))
+                conn.commit()
             logger.info(f"Action {action_id} rejected: {reason}")
             return True
         except Exception as e:
             logger.error(f"Error rejecting action: {e}")
             return False
-        finally:
-            conn.close()
     
     def get_pending_actions(self) -> List[PendingAction]:
         """Get all pending actions"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
         try:
-            cursor = conn.execute("""
-                SELECT * FROM hitl_actions 
-                WHERE status = ? AND expires_at > ?
-                ORDER BY created_at DESC
-            """, (ActionStatus.PENDING.value, datetime.datetime.now().isoformat()))
+            with get_connection(self.db_path) as conn:
+                rows = conn.execute("""
+                    SELECT * FROM hitl_actions 
+                    WHERE status = ? AND expires_at > ?
+                    ORDER BY created_at DESC
+                """, (ActionStatus.PENDING.value, datetime.datetime.now().isoformat())).fetchall()
             
             actions = []
-            for row in cursor.fetchall():
+            for row in rows:
                 actions.append(PendingAction(
                     action_id=row['action_id'],
                     action_type=row['action_type'],
@@ -290,8 +281,6 @@ class HITLService:
         except Exception as e:
             logger.error(f"Error getting pending actions: {e}")
             return []
-        finally:
-            conn.close()
     
     def check_training_load_change(
         self,
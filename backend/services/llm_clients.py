@@ -0,0 +1,118 @@
+"""
+Clientes de los SDK de LLM (google-genai, openai, anthropic) compartidos por el proceso.
+
+Cada cliente mantiene su pool de conexiones HTTP keep-alive, así que crearlo
+una vez y reutilizarlo evita el handshake TLS y el setup del SDK en cada
+llamada. Se crean perezosamente por (proveedor, tipo, api key): si la key
+cambia se crea otro. Los clientes async (httpx.AsyncClient por debajo) quedan
+ligados al event loop en que se crearon, por eso se guardan además por loop
+(también el de Gemini, cuyo `client.aio` tiene su propio pool async).
+El shutdown de la API los cierra con `aclose_llm_clients()`.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SYNC = "sync"
+ASYNC = "async"
+
+# (proveedor, tipo, api key, loop | None) -> cliente
+_clients: Dict[Tuple[str, str, str, Optional[asyncio.AbstractEventLoop]], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _build(provider: str, kind: str, api_key: str) -> Any:
+    if provider == "gemini":
+        from google import genai
+
+        # La API async cuelga de `client.aio` (ligada al loop como los demás)
+        return genai.Client(api_key=api_key)
+    if provider == "openai":
+        try:
+            import openai
+        except ImportError:
+            raise Exception("openai package not installed. Run: pip install openai")
+        return (openai.AsyncOpenAI if kind == ASYNC else openai.OpenAI)(api_key=api_key)
+    if provider == "anthropic":
+        try:
+            import anthropic
+        except ImportError:
+            raise Exception("anthropic package not installed. Run: pip install anthropic")
+        return (anthropic.AsyncAnthropic if kind == ASYNC else anthropic.Anthropic)(api_key=api_key)
+    raise ValueError(f"Proveedor LLM desconocido: {provider}")
+
+
+def get_llm_client(provider: str, api_key: str, kind: str = SYNC) -> Any:
+    """Cliente del SDK de `provider` para `api_key` (async: el del event loop en curso; en Gemini, usar `.aio`)."""
+    loop = asyncio.get_running_loop() if kind == ASYNC else None
+    key = (provider, kind, api_key, loop)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _build(provider, kind, api_key)
+                _clients[key] = client
+    return client
+
+
+def _aclose(provider: str, client: Any):
+    """Corrutina que cierra el pool async del cliente (en Gemini, el de `client.aio`)."""
+    return client.aio.aclose() if provider == "gemini" else client.close()
+
+
+def _close_on_owner_loop(provider: str, client: Any, owner: asyncio.AbstractEventLoop) -> None:
+    """Cierra un cliente async desde fuera de su loop: se encarga a ese loop si sigue vivo."""
+    if owner.is_closed():
+        return  # el loop ya no existe: sus conexiones se cerraron con él
+    coro = _aclose(provider, client)
+    if owner.is_running():
+        asyncio.run_coroutine_threadsafe(coro, owner)
+    else:
+        owner.run_until_complete(coro)
+
+
+def _close_sync_part(provider: str, client: Any) -> None:
+    # genai.Client lleva siempre también un pool síncrono
+    if provider == "gemini":
+        client.close()
+
+
+def close_llm_clients() -> None:
+    """Cierra y olvida todos los clientes (los async, en su propio loop si sigue abierto)."""
+    with _clients_lock:
+        clients = list(_clients.items())
+        _clients.clear()
+    for (provider, kind, _, owner), client in clients:
+        try:
+            if kind == ASYNC:
+                _close_on_owner_loop(provider, client, owner)
+                _close_sync_part(provider, client)
+            else:
+                client.close()
+        except Exception as e:
+            logger.warning(f"Error cerrando cliente {provider}: {e}")
+
+
+async def aclose_llm_clients() -> None:
+    """Cierra todos los clientes: los async del loop actual con await, el resto como close_llm_clients."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = list(_clients.items())
+        _clients.clear()
+    for (provider, kind, _, owner), client in clients:
+        try:
+            if kind == ASYNC:
+                if owner is loop:
+                    await _aclose(provider, client)
+                else:
+                    _close_on_owner_loop(provider, client, owner)
+                _close_sync_part(provider, client)
+            else:
+                client.close()
+        except Exception as e:
+            logger.warning(f"Error cerrando cliente {provider}: {e}")
@@ -0,0 +1,204 @@
+"""
+Sink de logs asíncrono con escritura por lotes y rotación en proceso.
+
+Quien registra solo encola la línea (`sink.write(...)`, sin I/O); un hilo en
+segundo plano por fichero agrupa las líneas y las escribe cuando el lote
+alcanza `batch_size` o han pasado `flush_interval_s` segundos. El fichero se
+mantiene abierto y se rota aquí mismo al superar `max_bytes`
+(file.log -> file.log.1 -> ... -> file.log.N), así que ya no hace falta la
+rotación copiar-y-truncar del skill log-manager.
+"""
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from typing import Dict, List
+
+from config import LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL_S, LOG_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class LogSink:
+    """Escritor en segundo plano para un único fichero de log."""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = LOG_MAX_BYTES,
+        backup_count: int = LOG_BACKUP_COUNT,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval_s: float = LOG_FLUSH_INTERVAL_S,
+        queue_size: int = LOG_QUEUE_SIZE,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = flush_interval_s
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._flush_requests: List[threading.Event] = []
+        self._file = None
+        self._size = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"log-sink:{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def write(self, line: str) -> None:
+        """Encola una línea (se añade el salto de línea). Nunca bloquea: si la cola está llena, se descarta."""
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(line if line.endswith("\n") else line + "\n")
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Bloquea hasta que todo lo encolado hasta ahora esté en disco."""
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Vacía la cola, cierra el fichero y detiene el hilo."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # --- Hilo de escritura ---
+
+    def _run(self) -> None:
+        batch: List[str] = []
+        deadline = time.monotonic() + self.flush_interval_s
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, str):
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+            elif isinstance(item, threading.Event):
+                self._write_batch(batch)
+                batch = []
+                item.set()
+                continue
+            elif item is _STOP:
+                self._write_batch(batch)
+                self._close_file()
+                return
+
+            # Lote lleno o venció el intervalo
+            self._write_batch(batch)
+            batch = []
+            deadline = time.monotonic() + self.flush_interval_s
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            finally:
+                self._file = None
+
+    def _rotate(self) -> None:
+        self._close_file()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src, dst = f"{self.path}.{i}", f"{self.path}.{i + 1}"
+                if os.path.exists(src):
+                    os.replace(src, dst)
+            if os.path.exists(self.path):
+                os.replace(self.path, f"{self.path}.1")
+        else:
+            open(self.path, "w").close()
+        self._open()
+
+    def _write_batch(self, batch: List[str]) -> None:
+        if not batch:
+            return
+        data = "".join(batch)
+        try:
+            if self._file is None:
+                self._open()
+            encoded_len = len(data.encode("utf-8"))
+            if self.max_bytes and self._size > 0 and self._size + encoded_len > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._size += encoded_len
+        except Exception as e:
+            # Nunca propagar: un fallo de disco no debe tumbar el hilo de logs
+            logger.error(f"LogSink: no se pudo escribir en {self.path}: {e}")
+            self._close_file()
+
+
+class LogSinkHandler(logging.Handler):
+    """
+    Handler de `logging` que formatea en el hilo llamante y delega la escritura
+    en el LogSink de su fichero. El sink se resuelve en cada emit por ruta: tras
+    `close_log_sinks()` (shutdown de la API) el handler sigue escribiendo en uno nuevo.
+    """
+
+    def __init__(self, path: str, level: int = logging.NOTSET):
+        super().__init__(level)
+        self.path = path
+
+    @property
+    def sink(self) -> LogSink:
+        return get_log_sink(self.path)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.sink.write(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+# Un sink por fichero (singleton por proceso)
+_sinks: Dict[str, LogSink] = {}
+_sinks_lock = threading.Lock()
+
+
+def get_log_sink(path: str, **kwargs) -> LogSink:
+    """Get singleton sink for the given log file."""
+    key = os.path.abspath(path)
+    sink = _sinks.get(key)
+    if sink is None:
+        with _sinks_lock:
+            sink = _sinks.get(key)
+            if sink is None:
+                sink = LogSink(path, **kwargs)
+                _sinks[key] = sink
+    return sink
+
+
+def close_log_sinks() -> None:
+    """Vacía y cierra todos los sinks (shutdown de la aplicación / salida del proceso)."""
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+        _sinks.clear()
+    for sink in sinks:
+        sink.close()
+
+
+atexit.register(close_log_sinks)
@@ -0,0 +1,226 @@
+"""
+Salud por proveedor/modelo LLM y circuit breaker para el fallback de MultiModelClient.
+
+Cada (proveedor, modelo) lleva una ventana de los últimos resultados (tasa de
+error), un EWMA de latencia (respuesta completa, o primer token en streaming),
+las últimas latencias al primer token (solo streaming; de ellas sale el
+umbral de hedging) y un circuito:
+
+- closed: se usa normalmente;
+- open: tras LLM_BREAKER_FAILURES fallos seguidos, una tasa de error de la
+  ventana >= LLM_BREAKER_ERROR_RATE o un límite de cuota (429) se salta sin
+  llamarlo durante el enfriamiento;
+- half_open: vencido el enfriamiento se deja pasar una sola petición de prueba;
+  si va bien se cierra, si falla vuelve a open con el enfriamiento duplicado.
+
+`order()` ordena los candidatos por nivel de coste (free, free_tier, paid) y,
+dentro de cada nivel, por latencia observada; los modelos aún sin medir van
+detrás de los medidos de su nivel, en su orden de prioridad (no se gastan
+llamadas solo para medirlos: se miden cuando les toca por fallback). Una
+latencia de hace más de LLM_LATENCY_TTL_S caduca: ese modelo recupera su
+puesto de prioridad por delante de los medidos y se vuelve a medir, así un
+modelo lento una vez no queda relegado para siempre (al no llamarlo nunca,
+su EWMA no podría mejorar).
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from config import (
+    LLM_BREAKER_COOLDOWN_S,
+    LLM_BREAKER_ERROR_RATE,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_MAX_COOLDOWN_S,
+    LLM_HEALTH_WINDOW,
+    LLM_LATENCY_TTL_S,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+COST_TIERS = {"free": 0, "free_tier": 1, "paid": 2}
+EWMA_ALPHA = 0.3
+MIN_SAMPLES_FOR_RATE = 5
+# Latencias al primer token guardadas para percentiles (umbral de hedging)
+TTFT_SAMPLES = 50
+MIN_SAMPLES_FOR_PERCENTILE = 5
+_RATE_LIMIT_MARKERS = ("429", "resource_exhausted", "rate limit", "rate_limit", "quota")
+
+Key = Tuple[str, str]
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    text = f"{type(error).__name__} {error}".lower()
+    return getattr(error, "status_code", None) == 429 or any(m in text for m in _RATE_LIMIT_MARKERS)
+
+
+class ModelHealth:
+    def __init__(self, window: int, cooldown_s: float):
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.latency_ewma: Optional[float] = None
+        self.latency_at: Optional[float] = None
+        self.ttfts: Deque[float] = deque(maxlen=TTFT_SAMPLES)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.cooldown_s = cooldown_s
+        self.probe_started_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def error_rate(self) -> float:
+        return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate, 3),
+            "samples": len(self.outcomes),
+            "latency_ewma_s": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "cooldown_s": self.cooldown_s,
+            "last_error": self.last_error,
+        }
+
+
+class HealthTracker:
+    def __init__(self, window: int = LLM_HEALTH_WINDOW, failures: int = LLM_BREAKER_FAILURES,
+                 error_rate: float = LLM_BREAKER_ERROR_RATE, cooldown_s: float = LLM_BREAKER_COOLDOWN_S,
+                 max_cooldown_s: float = LLM_BREAKER_MAX_COOLDOWN_S, latency_ttl_s: float = LLM_LATENCY_TTL_S,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.failures = failures
+        self.error_rate = error_rate
+        self.cooldown_s = cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self.latency_ttl_s = latency_ttl_s
+        self.clock = clock
+        self._models: Dict[Key, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: Key) -> ModelHealth:
+        health = self._models.get(key)
+        if health is None:
+            health = self._models[key] = ModelHealth(self.window, self.cooldown_s)
+        return health
+
+    def allow(self, provider: str, model: str) -> bool:
+        """
+        ¿Se puede llamar ahora? En open, al vencer el enfriamiento pasa a half_open
+        y reserva la única prueba (si la prueba no informa resultado, se libera
+        tras otro enfriamiento).
+        """
+        now = self.clock()
+        with self._lock:
+            health = self._get((provider, model))
+            if health.state == CLOSED:
+                return True
+            if health.state == OPEN:
+                if now - health.opened_at < health.cooldown_s:
+                    return False
+                health.state = HALF_OPEN
+                health.probe_started_at = now
+                return True
+            # half_open: solo una prueba en vuelo
+            if health.probe_started_at is not None and now - health.probe_started_at < health.cooldown_s:
+                return False
+            health.probe_started_at = now
+            return True
+
+    def record_success(self, provider: str, model: str, latency_s: float, ttft: bool = False) -> None:
+        """`ttft`: la latencia es la del primer token de un stream (no la respuesta completa)."""
+        now = self.clock()
+        with self._lock:
+            health = self._get((provider, model))
+            health.outcomes.append(True)
+            health.consecutive_failures = 0
+            if ttft:
+                health.ttfts.append(latency_s)
+            stale = health.latency_at is None or now - health.latency_at > self.latency_ttl_s
+            health.latency_ewma = (latency_s if health.latency_ewma is None or stale
+                                   else EWMA_ALPHA * latency_s + (1 - EWMA_ALPHA) * health.latency_ewma)
+            health.latency_at = now
+            if health.state != CLOSED:
+                health.state = CLOSED
+                health.cooldown_s = self.cooldown_s
+                health.probe_started_at = None
+                # La ventana previa describe la caída, no el estado actual
+                health.outcomes.clear()
+                health.outcomes.append(True)
+
+    def record_failure(self, provider: str, model: str, error: BaseException) -> None:
+        now = self.clock()
+        with self._lock:
+            health = self._get((provider, model))
+            health.outcomes.append(False)
+            health.consecutive_failures += 1
+            health.last_error = str(error)[:200]
+            if health.state == HALF_OPEN:
+                health.cooldown_s = min(health.cooldown_s * 2, self.max_cooldown_s)
+                self._open(health, now)
+            elif (is_rate_limit(error)
+                  or health.consecutive_failures >= self.failures
+                  or (len(health.outcomes) >= MIN_SAMPLES_FOR_RATE and health.error_rate >= self.error_rate)):
+                self._open(health, now)
+
+    @staticmethod
+    def _open(health: ModelHealth, now: float) -> None:
+        health.state = OPEN
+        health.opened_at = now
+        health.probe_started_at = None
+
+    def order(self, candidates: Iterable[dict]) -> List[dict]:
+        """Configs de fallback_order por nivel de coste y, dentro de él, latencia observada."""
+        now = self.clock()
+        with self._lock:
+            latency = {key: (h.latency_ewma, h.latency_at) for key, h in self._models.items()}
+
+        def sort_key(indexed):
+            i, config = indexed
+            ewma, measured_at = latency.get((config["provider"], config["model"]), (None, None))
+            tier = COST_TIERS.get(config.get("cost"), len(COST_TIERS))
+            if ewma is None:
+                return tier, 2, 0.0, i
+            if now - measured_at > self.latency_ttl_s:
+                # Caducada: por prioridad y delante, para que se vuelva a medir
+                return tier, 0, 0.0, i
+            return tier, 1, ewma, i
+
+        return [config for _, config in sorted(enumerate(candidates), key=sort_key)]
+
+    def ttft_percentile(self, provider: str, model: str, pct: float) -> Optional[float]:
+        """Percentil `pct` de las latencias al primer token recientes (None si aún hay pocas muestras)."""
+        with self._lock:
+            samples = sorted(self._get((provider, model)).ttfts)
+        if len(samples) < MIN_SAMPLES_FOR_PERCENTILE:
+            return None
+        return samples[min(len(samples) - 1, int(pct / 100.0 * len(samples)))]
+
+    def state(self, provider: str, model: str) -> str:
+        with self._lock:
+            return self._get((provider, model)).state
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {f"{p}/{m}": h.snapshot() for (p, m), h in self._models.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+
+_model_health: Optional[HealthTracker] = None
+_model_health_lock = threading.Lock()
+
+
+def get_model_health() -> HealthTracker:
+    """Get singleton HealthTracker instance"""
+    global _model_health
+    if _model_health is None:
+        with _model_health_lock:
+            if _model_health is None:
+                _model_health = HealthTracker()
+    return _model_health
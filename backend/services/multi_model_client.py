@@ -1,13 +1,21 @@
 import os
 import json
 import time
+import asyncio
 import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime
-from config import MODEL_FALLBACK_LOG
+from config import LLM_HEDGE_DELAY_S, LLM_HEDGE_ENABLED, LLM_HEDGE_PERCENTILE, MODEL_FALLBACK_LOG
+from services.log_sink import get_log_sink
+from services.llm_clients import ASYNC, get_llm_client
+from services.model_health import get_model_health
 
 logger = logging.getLogger(__name__)
 
+STREAM_PROVIDERS = ("openai", "anthropic", "gemini")
+# Niveles de coste a los que se puede hacer hedge (nunca a modelos pagos)
+HEDGE_COSTS = ("free", "free_tier")
+
 class MultiModelClient:
     """
     Cliente multi-modelo con fallback automático.
@@ -76,10 +84,72 @@ class MultiModelClient:
         self.current_model: Optional[str] = None
         self.log_file = MODEL_FALLBACK_LOG
         self.cost_warnings_shown: set = set()  # Para no repetir advertencias de costo
+        # Salud por modelo compartida por el proceso (circuit breaker + latencia)
+        self.health = get_model_health()
         
-    def generate(self, prompt: str, system_instruction: str = "", max_tokens: int = 1000) -> str:
+    def _candidate_configs(self, streaming: bool = False) -> List[Dict[str, Any]]:
+        """
+        Configs de fallback_order con API key y permitidas por costos, en el orden
+        de la salud observada (nivel de coste y latencia, ver model_health).
         """
-        Genera respuesta intentando modelos en orden de fallback.
+        configured = []
+        for config in self.fallback_order:
+            provider = config["provider"]
+            # Verificar si tenemos API key para este proveedor
+            if provider not in self.api_keys or not self.api_keys[provider]:
+                if not streaming:
+                    self._log_skip(provider, config["model"], "No API key configurada")
+                continue
+            configured.append(config)
+
+        allowed = []
+        for config in self.health.order(configured):
+            provider = config["provider"]
+            model = config["model"]
+            cost_type = config.get("cost", "unknown")
+            
+            # Control de costos para modelos pagos/free_tier
+            if cost_type in ["paid", "free_tier"]:
+                if self.cost_control and not self.cost_control.is_provider_allowed(provider):
+                    action = "Streaming bloqueado" if streaming else "Bloqueado"
+                    self._log_skip(provider, model, f"{action} por control de costos (tipo: {cost_type})")
+                    continue
+            allowed.append(config)
+        return allowed
+
+    def _admit(self, config: Dict[str, Any]) -> bool:
+        """Circuito cerrado o en prueba; si está abierto se salta sin esperar a otro timeout / 429."""
+        if self.health.allow(config["provider"], config["model"]):
+            return True
+        self._log_skip(config["provider"], config["model"], "Circuito abierto (en enfriamiento)")
+        return False
+
+    @staticmethod
+    def _describe(config: Dict[str, Any]) -> tuple:
+        provider, model = config["provider"], config["model"]
+        return provider, model, config.get("description", f"{provider}/{model}")
+
+    def _available_models(self, streaming: bool = False):
+        """(provider, model, description) a intentar, en orden y con el circuito admitido."""
+        for config in self._candidate_configs(streaming):
+            if self._admit(config):
+                yield self._describe(config)
+
+    def _mark_success(self, provider: str, model: str, description: str) -> None:
+        if self.current_provider != provider or self.current_model != model:
+            self._log_switch(provider, model, description)
+            self.current_provider = provider
+            self.current_model = model
+
+    def _all_failed(self, last_error: Optional[Exception]) -> Exception:
+        error_msg = f"Todos los modelos fallaron. Último error: {last_error}"
+        self._log_critical(error_msg)
+        return Exception(error_msg)
+
+    async def agenerate(self, prompt: str, system_instruction: str = "", max_tokens: int = 1000) -> str:
+        """
+        Genera respuesta intentando modelos en orden de fallback, con los
+        clientes async de cada SDK: no bloquea el event loop.
         
         Args:
             prompt: El prompt del usuario
@@ -89,63 +159,59 @@ class MultiModelClient:
         Returns:
             La respuesta generada por el primer modelo que funcione
         """
+        calls = {"openai": self._acall_openai, "anthropic": self._acall_anthropic, "gemini": self._acall_gemini}
         last_error = None
-        
-        for config in self.fallback_order:
-            provider = config["provider"]
-            model = config["model"]
-            cost_type = config.get("cost", "unknown")
-            description = config.get("description", f"{provider}/{model}")
-            
-            # Verificar si tenemos API key para este proveedor
-            if provider not in self.api_keys or not self.api_keys[provider]:
-                self._log_skip(provider, model, "No API key configurada")
+        for provider, model, description in self._available_models():
+            call = calls.get(provider)
+            if call is None:
                 continue
-            
-            # 3. Control de costos para modelos pagos/free_tier
-            if cost_type in ["paid", "free_tier"]:
-                if self.cost_control and not self.cost_control.is_provider_allowed(provider):
-                    self._log_skip(provider, model, f"Bloqueado por control de costos (tipo: {cost_type})")
-                    continue
+            started = time.perf_counter()
+            try:
+                self._log_attempt(provider, model, description)
+                response = await call(prompt, system_instruction, model, max_tokens)
+            except Exception as e:
+                last_error = e
+                self.health.record_failure(provider, model, e)
+                self._log_error(provider, model, str(e))
+                continue
+            self.health.record_success(provider, model, time.perf_counter() - started)
+            self._mark_success(provider, model, description)
+            return response
+        raise self._all_failed(last_error)
 
+    def generate(self, prompt: str, system_instruction: str = "", max_tokens: int = 1000) -> str:
+        """
+        Versión síncrona de agenerate (scripts, hilos): mismo fallback con los
+        clientes síncronos. Desde una corrutina usar `await agenerate(...)`.
+        """
+        try:
+            asyncio.get_running_loop()
+            logger.warning("MultiModelClient.generate llamado dentro del event loop: usar agenerate")
+        except RuntimeError:
+            pass
+        calls = {"openai": self._call_openai, "anthropic": self._call_anthropic, "gemini": self._call_gemini}
+        last_error = None
+        for provider, model, description in self._available_models():
+            call = calls.get(provider)
+            if call is None:
+                continue
+            started = time.perf_counter()
             try:
                 self._log_attempt(provider, model, description)
-                
-                if provider == "openai":
-                    response = self._call_openai(prompt, system_instruction, model, max_tokens)
-                elif provider == "anthropic":
-                    response = self._call_anthropic(prompt, system_instruction, model, max_tokens)
-                elif provider == "gemini":
-                    response = self._call_gemini(prompt, system_instruction, model, max_tokens)
-                else:
-                    continue
-                
-                # Si llegamos aquí, funcionó
-                if self.current_provider != provider or self.current_model != model:
-                    self._log_switch(provider, model, description)
-                    self.current_provider = provider
-                    self.current_model = model
-                
-                return response
-                
+                response = call(prompt, system_instruction, model, max_tokens)
             except Exception as e:
                 last_error = e
+                self.health.record_failure(provider, model, e)
                 self._log_error(provider, model, str(e))
                 continue
-        
-        # Si todos fallaron
-        error_msg = f"Todos los modelos fallaron. Último error: {last_error}"
-        self._log_critical(error_msg)
-        raise Exception(error_msg)
+            self.health.record_success(provider, model, time.perf_counter() - started)
+            self._mark_success(provider, model, description)
+            return response
+        raise self._all_failed(last_error)
     
     def _call_openai(self, prompt: str, system_instruction: str, model: str, max_tokens: int) -> str:
         """Llama a OpenAI GPT-4 o GPT-3.5"""
-        try:
-            from openai import OpenAI
-        except ImportError:
-            raise Exception("openai package not installed. Run: pip install openai")
-        
-        client = OpenAI(api_key=self.api_keys["openai"])
+        client = get_llm_client("openai", self.api_keys["openai"])
         
         messages = []
         if system_instruction:
@@ -163,12 +229,7 @@ class MultiModelClient:
     
     def _call_anthropic(self, prompt: str, system_instruction: str, model: str, max_tokens: int) -> str:
         """Llama a Anthropic Claude"""
-        try:
-            from anthropic import Anthropic
-        except ImportError:
-            raise Exception("anthropic package not installed. Run: pip install anthropic")
-        
-        client = Anthropic(api_key=self.api_keys["anthropic"])
+        client = get_llm_client("anthropic", self.api_keys["anthropic"])
         
         response = client.messages.create(
             model=model,
@@ -181,10 +242,9 @@ class MultiModelClient:
     
     def _call_gemini(self, prompt: str, system_instruction: str, model: str, max_tokens: int) -> str:
         """Llama a Google Gemini via new google-genai SDK"""
-        from google import genai
         from google.genai import types
         
-        client = genai.Client(api_key=self.api_keys["gemini"])
+        client = get_llm_client("gemini", self.api_keys["gemini"])
         
         config = types.GenerateContentConfig(
             max_output_tokens=max_tokens,
@@ -200,73 +260,206 @@ class MultiModelClient:
         
         return response.text
     
-    async def generate_stream(self, prompt: str, system_instruction: str = "", max_tokens: int = 1000):
+    async def _acall_openai(self, prompt: str, system_instruction: str, model: str, max_tokens: int) -> str:
+        """Como _call_openai con AsyncOpenAI"""
+        client = get_llm_client("openai", self.api_keys["openai"], ASYNC)
+        messages = []
+        if system_instruction:
+            messages.append({"role": "system", "content": system_instruction})
+        messages.append({"role": "user", "content": prompt})
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0.7
+        )
+        return response.choices[0].message.content
+
+    async def _acall_anthropic(self, prompt: str, system_instruction: str, model: str, max_tokens: int) -> str:
+        """Como _call_anthropic con AsyncAnthropic"""
+        client = get_llm_client("anthropic", self.api_keys["anthropic"], ASYNC)
+        response = await client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            system=system_instruction if system_instruction else "You are a helpful assistant.",
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.content[0].text
+
+    async def _acall_gemini(self, prompt: str, system_instruction: str, model: str, max_tokens: int) -> str:
+        """Como _call_gemini con la API async de google-genai (client.aio)"""
+        from google.genai import types
+
+        client = get_llm_client("gemini", self.api_keys["gemini"], ASYNC)
+        config = types.GenerateContentConfig(
+            max_output_tokens=max_tokens,
+            temperature=0.7,
+            system_instruction=system_instruction
+        )
+        response = await client.aio.models.generate_content(
+            model=model,
+            contents=prompt,
+            config=config
+        )
+        return response.text
+    
+    async def _tracked_stream(self, provider: str, model: str, description: str,
+                              prompt: str, system_instruction: str, max_tokens: int):
+        """Stream de un modelo que registra en la salud el primer token (TTFT) o el fallo."""
+        stream = {"openai": self._call_openai_stream, "anthropic": self._call_anthropic_stream,
+                  "gemini": self._call_gemini_stream}[provider]
+        started = time.perf_counter()
+        first = True
+        self._log_attempt(provider, model, description)
+        try:
+            async for chunk in stream(prompt, system_instruction, model, max_tokens):
+                if first:
+                    # En streaming la latencia que importa es la del primer token
+                    self.health.record_success(provider, model, time.perf_counter() - started, ttft=True)
+                    first = False
+                yield chunk
+        except Exception as e:
+            # La cancelación del perdedor de un hedge no es un fallo del modelo (no es Exception)
+            self.health.record_failure(provider, model, e)
+            self._log_error(provider, model, str(e))
+            raise
+
+    async def generate_stream(self, prompt: str, system_instruction: str = "", max_tokens: int = 1000,
+                              hedge: Optional[bool] = None):
         """
         Genera respuesta en streaming intentando modelos en orden de fallback.
+        Con `hedge` (por defecto LLM_HEDGE_ENABLED) corre un segundo modelo
+        gratuito si el principal tarda en dar el primer token (ver _hedged_stream).
         """
+        if LLM_HEDGE_ENABLED if hedge is None else hedge:
+            async for chunk in self._hedged_stream(prompt, system_instruction, max_tokens):
+                yield chunk
+            return
+
         last_error = None
         
-        for config in self.fallback_order:
-            provider = config["provider"]
-            model = config["model"]
-            cost_type = config.get("cost", "unknown")
-            description = config.get("description", f"{provider}/{model}")
-            
-            # Verificar si tenemos API key para este proveedor
-            if provider not in self.api_keys or not self.api_keys[provider]:
+        for provider, model, description in self._available_models(streaming=True):
+            if provider not in STREAM_PROVIDERS:
                 continue
-            
-            # Control de costos para modelos pagos
-            if cost_type in ["paid", "free_tier"]:
-                if self.cost_control and not self.cost_control.is_provider_allowed(provider):
-                    self._log_skip(provider, model, f"Streaming bloqueado por control de costos (tipo: {cost_type})")
-                    continue
-
+            success = False
             try:
-                self._log_attempt(provider, model, description)
-                
-                # Yield info about which model is starting (optional, maybe too noisy for chat)
-                # yield f"[DEBUG: Usando {description}]\n"
-
-                success = False
-                if provider == "openai":
-                    async for chunk in self._call_openai_stream(prompt, system_instruction, model, max_tokens):
-                        yield chunk
-                        success = True
-                elif provider == "anthropic":
-                    async for chunk in self._call_anthropic_stream(prompt, system_instruction, model, max_tokens):
-                        yield chunk
-                        success = True
-                elif provider == "gemini":
-                    async for chunk in self._call_gemini_stream(prompt, system_instruction, model, max_tokens):
-                        yield chunk
-                        success = True
+                async for chunk in self._tracked_stream(provider, model, description,
+                                                        prompt, system_instruction, max_tokens):
+                    success = True
+                    yield chunk
                 
                 if success:
                     # Si funcionó, registramos y terminamos
-                    if self.current_provider != provider or self.current_model != model:
-                        self._log_switch(provider, model, description)
-                        self.current_provider = provider
-                        self.current_model = model
+                    self._mark_success(provider, model, description)
                     return
 
             except Exception as e:
                 last_error = e
-                self._log_error(provider, model, str(e))
                 # Fallback al siguiente modelo de la lista
                 continue
         
         # Si todos fallaron
         yield f"\n[Error crítico: Todos los modelos de IA fallaron. Último error: {str(last_error)}]"
 
+    def _hedge_delay(self, config: Dict[str, Any]) -> float:
+        """Espera antes del hedge: percentil de TTFT reciente del modelo o LLM_HEDGE_DELAY_S."""
+        delay = self.health.ttft_percentile(config["provider"], config["model"], LLM_HEDGE_PERCENTILE)
+        return LLM_HEDGE_DELAY_S if delay is None else delay
+
+    def _take(self, remaining: List[Dict[str, Any]], hedge_only: bool = False) -> Optional[Dict[str, Any]]:
+        """Saca de `remaining` el siguiente modelo admitido (solo gratuitos si es para un hedge)."""
+        for config in list(remaining):
+            if hedge_only and config.get("cost") not in HEDGE_COSTS:
+                continue  # los pagos nunca entran por hedge; siguen disponibles para el fallback
+            remaining.remove(config)
+            if self._admit(config):
+                return config
+        return None
+
+    async def _hedged_stream(self, prompt: str, system_instruction: str, max_tokens: int):
+        """
+        Carrera por el primer token: arranca el modelo principal y, si no entrega
+        dentro de su umbral (_hedge_delay), un segundo modelo gratuito en paralelo.
+        Gana el primero que da un token; el otro se cancela (se corta su stream
+        HTTP). Si fallan, se sigue con el fallback secuencial habitual.
+        """
+        remaining = [c for c in self._candidate_configs(streaming=True) if c["provider"] in STREAM_PROVIDERS]
+        racers: List[tuple] = []  # (config, stream, tarea del primer chunk)
+        hedge_armed = True
+        last_error = None
+
+        def start(config):
+            stream = self._tracked_stream(*self._describe(config), prompt, system_instruction, max_tokens)
+            racers.append((config, stream, asyncio.ensure_future(stream.__anext__())))
+
+        try:
+            while True:
+                if not racers:
+                    config = self._take(remaining)
+                    if config is None:
+                        break
+                    start(config)
+                timeout = self._hedge_delay(racers[0][0]) if hedge_armed and len(racers) == 1 else None
+                done, _ = await asyncio.wait([task for _, _, task in racers], timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_armed = False
+                    config = self._take(remaining, hedge_only=True)
+                    if config is not None:
+                        self._log_hedge(racers[0][0], config, timeout)
+                        start(config)
+                    continue
+                hedge_armed = False
+
+                winner = None
+                for racer in [r for r in racers if r[2] in done]:
+                    racers.remove(racer)
+                    try:
+                        first = racer[2].result()
+                    except StopAsyncIteration:
+                        continue  # stream vacío: como en el fallback, se prueba otro
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    winner = racer
+                    break
+                if winner is None:
+                    continue
+
+                await self._cancel_racers(racers)
+                config, stream, _ = winner
+                try:
+                    yield first
+                    async for chunk in stream:
+                        yield chunk
+                except Exception as e:
+                    last_error = e
+                    # Fallback al siguiente modelo de la lista
+                    continue
+                self._mark_success(*self._describe(config))
+                return
+        finally:
+            await self._cancel_racers(racers)
+
+        # Si todos fallaron
+        yield f"\n[Error crítico: Todos los modelos de IA fallaron. Último error: {str(last_error)}]"
+
+    @staticmethod
+    async def _cancel_racers(racers: List[tuple]) -> None:
+        """Cancela los streams perdedores (la cancelación llega hasta la petición HTTP)."""
+        for _, _, task in racers:
+            task.cancel()
+        for _, stream, task in racers:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+            await stream.aclose()
+        racers.clear()
+
     async def _call_openai_stream(self, prompt: str, system_instruction: str, model: str, max_tokens: int):
         """Llama a OpenAI en modo streaming"""
-        try:
-            from openai import AsyncOpenAI
-        except ImportError:
-            raise Exception("openai package not installed.")
-        
-        client = AsyncOpenAI(api_key=self.api_keys["openai"])
+        client = get_llm_client("openai", self.api_keys["openai"], ASYNC)
         messages = []
         if system_instruction:
             messages.append({"role": "system", "content": system_instruction})
@@ -285,12 +478,7 @@ class MultiModelClient:
 
     async def _call_anthropic_stream(self, prompt: str, system_instruction: str, model: str, max_tokens: int):
         """Llama a Anthropic en modo streaming"""
-        try:
-            from anthropic import AsyncAnthropic
-        except ImportError:
-            raise Exception("anthropic package not installed.")
-        
-        client = AsyncAnthropic(api_key=self.api_keys["anthropic"])
+        client = get_llm_client("anthropic", self.api_keys["anthropic"], ASYNC)
         async with client.messages.stream(
             model=model,
             max_tokens=max_tokens,
@@ -302,11 +490,10 @@ class MultiModelClient:
 
     async def _call_gemini_stream(self, prompt: str, system_instruction: str, model: str, max_tokens: int):
         """Llama a Gemini en modo streaming asíncrono"""
-        from google import genai
         from google.genai import types
         
         # Usamos el cliente asíncrono de genai
-        client = genai.Client(api_key=self.api_keys["gemini"])
+        client = get_llm_client("gemini", self.api_keys["gemini"], ASYNC)
         
         config = types.GenerateContentConfig(
             max_output_tokens=max_tokens,
@@ -348,6 +535,13 @@ class MultiModelClient:
         self._write_log(msg)
         print(f"\n💰 ADVERTENCIA: {description} - Este modelo GENERA COSTOS\n")
     
+    def _log_hedge(self, primary: Dict[str, Any], hedge: Dict[str, Any], waited_s: float) -> None:
+        """Registra el arranque de un hedge"""
+        msg = (f"[{datetime.now().isoformat()}] HEDGE: {primary['provider']}/{primary['model']} sin primer token "
+               f"tras {waited_s:.2f}s, lanzando {hedge['provider']}/{hedge['model']} en paralelo")
+        logger.info(msg)
+        self._write_log(msg)
+    
     def _log_error(self, provider: str, model: str, error: str) -> None:
         """Registra error de un modelo"""
         error_short = error[:200] if len(error) > 200 else error
@@ -362,12 +556,8 @@ class MultiModelClient:
         self._write_log(msg)
     
     def _write_log(self, message: str) -> None:
-        """Escribe en el archivo de log"""
-        try:
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(message + '\n')
-        except Exception as e:
-            logger.error(f"Error escribiendo log: {e}")
+        """Encola la línea en el sink del archivo de log (la escritura es en segundo plano)"""
+        get_log_sink(self.log_file).write(message)
     
     def get_current_model_info(self) -> Dict[str, str]:
         """Retorna información del modelo actual"""
@@ -0,0 +1,103 @@
+"""
+Paginación por cursor (keyset) sobre (fecha_ts, id).
+
+El cursor es opaco para el cliente: codifica el (fecha_ts, id) de la última
+fila devuelta. La página siguiente se pide con WHERE (fecha_ts, id) < (?, ?),
+que SQLite resuelve recorriendo el índice entero sobre fecha_ts: la página
+1000 cuesta lo mismo que la primera, a diferencia de OFFSET. Los límites
+from/to se traducen a epoch con el normalizador de fechas.
+
+Las filas cuya fecha no se pudo interpretar (fecha_ts NULL; los triggers de
+0012 y el backfill de arranque rellenan todas las demás) no se ocultan: sin
+límites de fecha van al final, por id descendente, con cursor [null, id].
+"""
+
+import json
+import base64
+from typing import Any, List, Optional, Sequence, Tuple
+
+from services.datetime_normalizer import epoch_bounds
+
+
+class InvalidCursorError(ValueError):
+    """El cursor (o un límite de fecha) recibido no es válido."""
+
+
+def encode_cursor(fecha_ts: Optional[int], row_id: int) -> str:
+    raw = json.dumps([fecha_ts, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[int], int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        fecha_ts, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(fecha_ts, (int, type(None))) or not isinstance(row_id, int):
+            raise TypeError
+        return fecha_ts, row_id
+    except Exception:
+        raise InvalidCursorError(f"Cursor inválido: {cursor!r}")
+
+
+def keyset_page(
+    conn,
+    table: str,
+    columns: Sequence[str],
+    limit: int,
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    filters: Sequence[Tuple[str, Any]] = (),
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Devuelve (filas, next_cursor) ordenadas por fecha_ts DESC, id DESC (las
+    de fecha_ts NULL al final, si no hay límites de fecha).
+
+    `filters` son pares (expresión SQL con un único '?', valor) que se añaden
+    con AND; la expresión la escribe siempre el llamador, nunca el cliente.
+    """
+    try:
+        lo, hi = epoch_bounds(date_from, date_to)
+    except ValueError as e:
+        raise InvalidCursorError(str(e))
+    after = decode_cursor(cursor) if cursor else None
+    hidden = [c for c in ("id", "fecha_ts") if c not in columns]
+    select = f"SELECT {', '.join([*hidden, *columns])} FROM {table} WHERE "
+
+    def fetch(where: List[str], params: List[Any], order: str, n: int) -> List[dict]:
+        where = where + [expr for expr, _ in filters]
+        params = params + [value for _, value in filters] + [n]
+        sql = select + " AND ".join(where) + f" ORDER BY {order} LIMIT ?"
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+    rows: List[dict] = []
+    if after is None or after[0] is not None:
+        where, params = ["fecha_ts IS NOT NULL"], []
+        if after is not None:
+            where.append("(fecha_ts, id) < (?, ?)")
+            params.extend(after)
+        if lo is not None:
+            where.append("fecha_ts >= ?")
+            params.append(lo)
+        if hi is not None:
+            where.append("fecha_ts < ?")
+            params.append(hi)
+        rows = fetch(where, params, "fecha_ts DESC, id DESC", limit + 1)
+    # Sin fecha interpretable: solo sin límites de fecha, al final de la lista
+    if len(rows) <= limit and lo is None and hi is None:
+        where, params = ["fecha_ts IS NULL"], []
+        if after is not None and after[0] is None:
+            where.append("id < ?")
+            params.append(after[1])
+        rows += fetch(where, params, "id DESC", limit + 1 - len(rows))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["fecha_ts"], last["id"])
+
+    for row in rows:
+        for col in hidden:
+            row.pop(col, None)
+    return rows, next_cursor
@@ -0,0 +1,94 @@
+"""
+Capa HTTP de los proveedores de datos (Withings y demás APIs REST).
+
+Una `requests.Session` por proveedor, compartida por el proceso: las
+conexiones keep-alive se reutilizan entre syncs (sin handshake TLS cada vez).
+Todas las llamadas llevan timeout explícito y se reintentan con backoff
+exponencial con jitter ante 429, 5xx y errores de conexión; en 429 se respeta
+`Retry-After` si viene.
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    PROVIDER_HTTP_BACKOFF_S,
+    PROVIDER_HTTP_CONNECT_TIMEOUT_S,
+    PROVIDER_HTTP_POOL_SIZE,
+    PROVIDER_HTTP_READ_TIMEOUT_S,
+    PROVIDER_HTTP_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+MAX_BACKOFF_S = 30.0
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_http_session(provider: str) -> requests.Session:
+    """Get singleton session for the given provider."""
+    session = _sessions.get(provider)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(provider)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=PROVIDER_HTTP_POOL_SIZE, pool_maxsize=PROVIDER_HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _sessions[provider] = session
+    return session
+
+
+def close_http_sessions() -> None:
+    """Cierra las sesiones de todos los proveedores (shutdown de la aplicación)."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+def backoff_delay(attempt: int, base: float = PROVIDER_HTTP_BACKOFF_S, retry_after: Optional[str] = None) -> float:
+    """Espera antes del reintento `attempt` (0, 1, ...): full jitter sobre base·2^attempt."""
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_BACKOFF_S)
+        except ValueError:
+            pass
+    return random.uniform(0, min(MAX_BACKOFF_S, base * (2 ** attempt)))
+
+
+def request(provider: str, method: str, url: str, retries: int = PROVIDER_HTTP_RETRIES,
+            timeout=(PROVIDER_HTTP_CONNECT_TIMEOUT_S, PROVIDER_HTTP_READ_TIMEOUT_S), **kwargs) -> requests.Response:
+    """
+    Petición con la sesión del proveedor. Devuelve la última respuesta (también
+    si sigue siendo 429/5xx tras agotar los reintentos); solo propaga la
+    excepción de red si fallan todos los intentos.
+    """
+    session = get_http_session(provider)
+    for attempt in range(retries + 1):
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"{provider}: {method} {url} falló ({e}); reintento {attempt + 1}/{retries} en {delay:.2f}s")
+        else:
+            if response.status_code not in RETRY_STATUS or attempt >= retries:
+                return response
+            delay = backoff_delay(attempt, retry_after=response.headers.get("Retry-After"))
+            logger.warning(f"{provider}: {method} {url} -> {response.status_code}; reintento {attempt + 1}/{retries} en {delay:.2f}s")
+            response.close()
+        time.sleep(delay)
+    raise RuntimeError("unreachable")  # el bucle siempre devuelve o propaga
@@ -0,0 +1,99 @@
+"""
+Taxonomía de deportes de BioEngine V3.
+
+Un único mapeo `tipo` crudo -> (deporte canónico, etiqueta de visualización),
+sembrado en la tabla `sport_taxonomy` por la migración 0006. Los triggers de esa
+migración rellenan `activities.sport_canonical` y `activities.sport_label`
+en cada INSERT (venga de sync, importadores o scripts sueltos) y los
+recalculan si cambian tipo, nombre, distancia o desnivel. Así los filtros por
+deporte son igualdades indexadas y el frontend recibe las filas ya
+clasificadas.
+
+`classify_activity` es la versión Python de las mismas reglas (la usan los
+tests para comprobar que SQL y Python coinciden). La migración guarda su copia
+congelada del SQL: un cambio de reglas aquí necesita una migración nueva.
+"""
+
+from typing import Dict, Optional, Tuple
+
+# Deporte canónico -> valores de `tipo` (en minúsculas) que lo representan.
+# Cubre las etiquetas en español/inglés que llegan de Apple, Garmin y la carga manual.
+SPORT_ALIASES: Dict[str, tuple] = {
+    "running": ("carrera", "running", "run", "correr", "competición calle", "street_running", "treadmill_running"),
+    "trail": ("trail", "trail_running", "trekking", "hiking", "montaña", "competición trail"),
+    "cycling": ("ciclismo", "bicicleta", "cycling", "cycle", "bike", "road_biking", "indoor_cycling", "mountain_biking"),
+    "tennis": ("tenis", "tennis"),
+    "walking": ("caminata", "caminar", "walking", "walk"),
+    "strength": ("strength_training", "fuerza", "strength", "gimnasio", "weight_training", "indoor_cardio", "cardio"),
+    "swimming": ("natación", "natacion", "swimming", "swim", "lap_swimming", "open_water_swimming"),
+}
+OTHER_SPORT = "otros"
+
+# `tipo` (minúsculas) -> etiqueta del dashboard. Los tipos sin etiqueta se
+# muestran tal cual, con la inicial en mayúscula.
+SPORT_LABELS: Dict[str, str] = {
+    "walking": "Caminata", "caminata": "Caminata", "walk": "Caminata",
+    "hiking": "Hiking/Senderismo",
+    "running": "Carrera", "correr": "Carrera", "run": "Carrera",
+    "cycling": "Ciclismo", "ciclismo": "Ciclismo", "cycle": "Ciclismo", "bike": "Ciclismo",
+    "swimming": "Natación", "natación": "Natación", "swim": "Natación",
+    "strength": "Fuerza y Cardio", "fuerza": "Fuerza y Cardio", "weight_training": "Fuerza y Cardio",
+    "strength_training": "Fuerza y Cardio", "indoor_cardio": "Fuerza y Cardio", "cardio": "Fuerza y Cardio",
+    "yoga": "Yoga",
+    "breathwork": "Respiración", "respiración": "Respiración",
+    "trail_running": "Trail Running", "trail": "Trail Running",
+    "tennis": "Tenis", "tenis": "Tenis",
+}
+
+# Reglas por fila (nombre / desnivel / distancia) del dashboard
+ROAD_RUN_TIPOS = ("running", "carrera", "run", "correr")
+COMPETITION_KEYWORDS = ("maraton", "marathon", "10k", "21k", "42k", "gp", "competencia")
+TRAIL_ELEVATION_M = 100
+LONG_RUN_KM = 15
+
+TRAIL_LABEL = "Trail Running"
+COMPETITION_LABEL = "Competición Calle"
+LONG_RUN_LABEL = "Fondo Largo"
+TRAINING_RUN_LABEL = "Running Entreno"
+OTHER_LABEL = "Otros"
+
+
+def canonical_sport(tipo: Optional[str]) -> str:
+    """Versión Python de `sport_case_sql` (mismo resultado para el mismo `tipo`)."""
+    low = (tipo or "").strip().lower()
+    for sport, aliases in SPORT_ALIASES.items():
+        if low in aliases:
+            return sport
+    return OTHER_SPORT
+
+
+def sport_case_sql(column: str) -> str:
+    """Expresión CASE de SQLite que traduce `column` (un tipo crudo) a su deporte canónico."""
+    whens = []
+    for sport, aliases in SPORT_ALIASES.items():
+        quoted = ", ".join("'" + a.replace("'", "''") + "'" for a in aliases)
+        whens.append(f"WHEN LOWER(TRIM({column})) IN ({quoted}) THEN '{sport}'")
+    return "CASE " + " ".join(whens) + f" ELSE '{OTHER_SPORT}' END"
+
+
+def classify_activity(
+    tipo: Optional[str],
+    nombre: Optional[str] = None,
+    distancia_km: Optional[float] = None,
+    elevacion_m: Optional[float] = None,
+) -> Tuple[str, str]:
+    """(sport_canonical, sport_label) de una actividad; mismas reglas que los triggers de 0006."""
+    sport = canonical_sport(tipo)
+    if not tipo:
+        return sport, OTHER_LABEL
+    low = tipo.strip().lower()
+    name = (nombre or "").lower()
+    if "trail" in low or "hiking" in low or "trail" in name or (elevacion_m or 0) > TRAIL_ELEVATION_M:
+        return sport, TRAIL_LABEL
+    if low in ROAD_RUN_TIPOS:
+        if any(k in name for k in COMPETITION_KEYWORDS) or "competición" in low:
+            return sport, COMPETITION_LABEL
+        if (distancia_km or 0) > LONG_RUN_KM and "entrenamiento" not in name:
+            return sport, LONG_RUN_LABEL
+        return sport, TRAINING_RUN_LABEL
+    return sport, SPORT_LABELS.get(low) or tipo[:1].upper() + tipo[1:]
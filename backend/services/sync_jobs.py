@@ -0,0 +1,196 @@
+"""
+Trabajos de sincronización en segundo plano (POST /sync/all).
+
+Cada trabajo lanza los proveedores (Garmin, Withings...) en paralelo en un
+executor propio y devuelve el id al instante; el tiempo total es el del
+proveedor más lento, no la suma. Los proveedores informan el progreso
+(fetched, inserted, deduped...) con un callback y los eventos se guardan en
+el trabajo, de modo que un suscriptor SSE que llegue tarde los recibe todos.
+
+La API crea un único gestor con los métodos de su SyncService (main.sync_jobs).
+Mientras haya un trabajo en curso, `start()` devuelve ese mismo trabajo en
+lugar de lanzar otro (dos clics seguidos no sincronizan dos veces) si cubre
+los proveedores pedidos; si no, lanza SyncJobConflict (409 en la API) en vez
+de dar por hecho un sync que nadie va a ejecutar. Si algún
+proveedor agregó filas, al terminar se publica "datos cambiados" (data_events).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from services.data_events import publish_data_changed
+
+logger = logging.getLogger(__name__)
+
+# Proveedor: fn(progress=callback) -> dict de resultado; callback(stage, **datos)
+Progress = Callable[..., None]
+Provider = Callable[..., dict]
+
+JOB_HISTORY = 20
+
+# Etapas que publican los proveedores (y escucha el frontend, useBioEngineData.js);
+# el cierre del trabajo llega aparte como "done"
+STAGES = ("started", "fetched", "inserted", "deduped", "finished")
+
+
+class SyncJobConflict(RuntimeError):
+    """Hay un trabajo en curso que no incluye todos los proveedores pedidos."""
+
+    def __init__(self, running: "SyncJob", requested: List[str]):
+        super().__init__(
+            f"Ya hay una sincronización en curso ({', '.join(running.providers)}); "
+            f"no incluye {', '.join(p for p in requested if p not in running.providers)}"
+        )
+        self.running = running
+
+
+class SyncJob:
+    def __init__(self, providers: List[str]):
+        self.id = uuid.uuid4().hex
+        self.providers = providers
+        self.status = "running"
+        self.results: Dict[str, dict] = {}
+        self.events: List[dict] = []
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def publish(self, provider: str, stage: str, _final: bool = False, **data) -> None:
+        """Registra un evento y despierta a los suscriptores (seguro desde cualquier hilo)."""
+        with self._lock:
+            event = {"seq": len(self.events), "provider": provider, "stage": stage, "ts": time.time(), **data}
+            self.events.append(event)
+            if _final:
+                # Bajo el mismo lock: quien vea el evento `done` ve también el trabajo terminado
+                self._done.set()
+            waiters = list(self._waiters)
+        for loop, wake in waiters:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:  # loop cerrado: el suscriptor ya no existe
+                pass
+
+    def _finish(self) -> None:
+        with self._lock:
+            failed = [name for name, res in self.results.items() if res.get("status") == "error"]
+            self.status = "error" if failed and len(failed) == len(self.providers) else "done"
+            self.finished_at = time.time()
+        self.publish("job", "done", _final=True, status=self.status, results=self.results,
+                     elapsed_s=round(self.finished_at - self.created_at, 2))
+
+    def added(self) -> Dict[str, int]:
+        """Filas nuevas por proveedor (solo los que agregaron algo)."""
+        with self._lock:
+            return {name: res["added"] for name, res in self.results.items() if res.get("added")}
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    async def stream(self) -> AsyncIterator[dict]:
+        """Eventos desde el principio y luego en vivo, hasta el evento `done`."""
+        wake = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), wake)
+        with self._lock:
+            self._waiters.append(waiter)
+        seq = 0
+        try:
+            while True:
+                wake.clear()
+                with self._lock:
+                    pending = self.events[seq:]
+                    finished = self._done.is_set()
+                for event in pending:
+                    yield event
+                seq += len(pending)
+                if finished:
+                    return
+                await wake.wait()
+        finally:
+            with self._lock:
+                self._waiters.remove(waiter)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "providers": list(self.providers),
+                "results": dict(self.results),
+                "events": len(self.events),
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class SyncJobManager:
+    def __init__(self, providers: Dict[str, Provider], history: int = JOB_HISTORY):
+        self.providers = providers
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max(2, len(providers)), thread_name_prefix="bioengine-sync")
+        self._jobs: "OrderedDict[str, SyncJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, names: Optional[List[str]] = None) -> SyncJob:
+        """
+        Lanza un trabajo con `names` (por defecto todos) o devuelve el que está
+        en curso si ya los incluye; si no los incluye, SyncJobConflict.
+        """
+        names = list(names or self.providers)
+        unknown = set(names) - set(self.providers)
+        if unknown:
+            raise ValueError(f"Proveedores desconocidos: {sorted(unknown)}")
+        with self._lock:
+            running = next((j for j in self._jobs.values() if not j.done), None)
+            if running is not None:
+                if set(names) <= set(running.providers):
+                    return running
+                raise SyncJobConflict(running, names)
+            job = SyncJob(names)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+
+        remaining = [len(names)]
+        remaining_lock = threading.Lock()
+
+        def run(name: str) -> None:
+            job.publish(name, "started")
+            try:
+                result = self.providers[name](progress=lambda stage, **data: job.publish(name, stage, **data))
+            except Exception as e:
+                logger.exception(f"Sync {name} falló")
+                result = {"status": "error", "message": str(e)}
+            with job._lock:
+                job.results[name] = result
+            job.publish(name, "finished", result=result)
+            with remaining_lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                job._finish()
+                added = job.added()
+                if added:
+                    publish_data_changed("sync", job_id=job.id, added=added)
+
+        for name in names:
+            self._executor.submit(run, name)
+        return job
+
+    def get(self, job_id: str) -> Optional[SyncJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,172 @@
+"""
+Sincronización programada dentro del proceso de la API.
+
+Un bucle asyncio (arrancado en el startup de FastAPI) lanza el mismo trabajo
+que POST /sync/all (`SyncJobManager.start`, así que nunca se solapa con uno
+manual) con una cadencia adaptativa:
+
+- en las horas habituales de entrenamiento (las horas en que suelen terminar
+  las actividades, deducidas del historial o fijadas en SYNC_TRAINING_HOURS)
+  se sincroniza cada SYNC_ACTIVE_INTERVAL_S; fuera de ellas cada
+  SYNC_INTERVAL_S, y el bucle se despierta al empezar la siguiente hora activa;
+- cada ejecución sin datos nuevos duplica el intervalo (hasta
+  SYNC_MAX_INTERVAL_S fuera de horas activas, SYNC_INTERVAL_S dentro; el
+  exponente se corta en MAX_BACKOFF_DOUBLINGS);
+  en cuanto llega algo nuevo vuelve al intervalo base.
+
+Los datos nuevos se anuncian con la señal de services/data_events, que publica
+el propio SyncJobManager.
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+from collections import Counter
+from typing import FrozenSet, Iterable, Optional
+
+from config import (
+    DB_PATH,
+    SYNC_ACTIVE_INTERVAL_S,
+    SYNC_INTERVAL_S,
+    SYNC_MAX_INTERVAL_S,
+    SYNC_TRAINING_HOURS,
+)
+from services.data_events import subscribe
+from services.datetime_normalizer import LOCAL_TZ, epoch_to_local
+from services.db_pool import get_connection, run_db
+from services.sync_jobs import SyncJobConflict, SyncJobManager
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DAYS = 90
+MIN_HOUR_SHARE = 0.1
+# Tope del exponente del backoff: 2 ** idle_runs sin límite desborda el float
+MAX_BACKOFF_DOUBLINGS = 10
+
+
+def usual_training_hours(conn, days: int = HISTORY_DAYS, min_share: float = MIN_HOUR_SHARE,
+                         now: Optional[float] = None) -> FrozenSet[int]:
+    """
+    Horas locales en que suelen terminar las actividades de los últimos `days`
+    días (las que reúnen al menos `min_share` del total) más la hora siguiente,
+    que es cuando el reloj suele haber subido el entrenamiento.
+    """
+    since = int((now or time.time()) - days * 86400)
+    ends = Counter()
+    for fecha_ts, duracion_min in conn.execute(
+        "SELECT fecha_ts, duracion_min FROM activities WHERE fecha_ts >= ?", (since,)
+    ):
+        ends[epoch_to_local(int(fecha_ts + (duracion_min or 0) * 60)).hour] += 1
+    total = sum(ends.values())
+    hours = set()
+    for hour, count in ends.items():
+        if count / total >= min_share:
+            hours.update((hour, (hour + 1) % 24))
+    return frozenset(hours)
+
+
+class SyncScheduler:
+    def __init__(self, jobs: SyncJobManager, interval_s: float = SYNC_INTERVAL_S,
+                 active_interval_s: float = SYNC_ACTIVE_INTERVAL_S, max_interval_s: float = SYNC_MAX_INTERVAL_S,
+                 training_hours: Iterable[int] = SYNC_TRAINING_HOURS, db_path: str = DB_PATH):
+        self.jobs = jobs
+        self.interval_s = interval_s
+        self.active_interval_s = active_interval_s
+        self.max_interval_s = max_interval_s
+        self.db_path = db_path
+        self.idle_runs = 0
+        self.runs = 0
+        self.next_run_at: Optional[float] = None
+        self.last_result: Optional[dict] = None
+        self._fixed_hours = frozenset(training_hours) or None
+        self._hours: Optional[FrozenSet[int]] = self._fixed_hours
+        self._task: Optional[asyncio.Task] = None
+        self._unsubscribe = None
+
+    def training_hours(self) -> FrozenSet[int]:
+        """Horas activas (fijadas por config o deducidas del historial; se recalculan con datos nuevos)."""
+        if self._hours is None:
+            with get_connection(self.db_path) as conn:
+                self._hours = usual_training_hours(conn)
+        return self._hours
+
+    def _on_data_changed(self, event: dict) -> None:
+        if self._fixed_hours is None:
+            self._hours = None
+
+    def next_delay(self, now: Optional[datetime.datetime] = None,
+                   hours: Optional[FrozenSet[int]] = None) -> float:
+        """Segundos hasta la próxima sincronización según la hora y las ejecuciones vacías."""
+        now = now or datetime.datetime.now(LOCAL_TZ)
+        if hours is None:
+            hours = self.training_hours()
+        backoff = 2 ** min(self.idle_runs, MAX_BACKOFF_DOUBLINGS)
+        if now.hour in hours:
+            return min(self.active_interval_s * backoff, self.interval_s)
+        delay = min(self.interval_s * backoff, self.max_interval_s)
+        for ahead in range(1, 25):
+            if (now.hour + ahead) % 24 in hours:
+                start = now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=ahead)
+                return min(delay, (start - now).total_seconds())
+        return delay
+
+    async def run_once(self) -> dict:
+        """Un trabajo de sincronización completo; ajusta el backoff según haya o no datos nuevos."""
+        try:
+            job = self.jobs.start()
+        except SyncJobConflict as e:
+            # Hay uno manual de otros proveedores: se espera a ese en vez de solaparse
+            job = e.running
+        await asyncio.to_thread(job.wait)
+        added = job.added()
+        self.idle_runs = 0 if added else self.idle_runs + 1
+        self.runs += 1
+        self.last_result = {"job_id": job.id, "status": job.status, "added": added, "finished_at": job.finished_at}
+        return self.last_result
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                # Deducir las horas lee la BD: fuera del event loop
+                delay = self.next_delay(hours=await run_db(self.training_hours))
+            except Exception:
+                logger.exception("No se pudo calcular el próximo sync; se usa el intervalo base")
+                delay = self.interval_s
+            self.next_run_at = time.time() + delay
+            await asyncio.sleep(delay)
+            try:
+                result = await self.run_once()
+                logger.info(f"Sync programado: {result}")
+            except Exception:
+                logger.exception("Sync programado falló")
+
+    def start(self) -> None:
+        """Arranca el bucle en el event loop actual (idempotente)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._unsubscribe = subscribe(self._on_data_changed)
+        self._task = asyncio.get_running_loop().create_task(self._loop(), name="bioengine-sync-scheduler")
+
+    async def stop(self) -> None:
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.next_run_at = None
+
+    def status(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "next_run_at": self.next_run_at,
+            "idle_runs": self.idle_runs,
+            "runs": self.runs,
+            "training_hours": sorted(self.training_hours()),
+            "last_result": self.last_result,
+        }
@@ -1,100 +1,293 @@
-import sqlite3
 import json
 import datetime
-import requests
-from garminconnect import Garmin
-from typing import Dict, Any, List, Optional
-from config import DB_PATH
+import logging
+import threading
+from garminconnect import Garmin, GarminConnectAuthenticationError
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from config import DB_PATH, SYNC_WINDOW_DAYS, SYNC_PROVIDER_CONCURRENCY
+from services.db_pool import get_connection
+from services.activity_frame import get_activity_frame
+from services.equipment import get_equipment_service
+from services.dedup import deduplicate
+from services.datetime_normalizer import epoch_bounds, epoch_to_local, normalize, normalized_columns
+from services import provider_http
+
+logger = logging.getLogger(__name__)
+
+WITHINGS_OAUTH_URL = "https://wbsapi.withings.net/v2/oauth2"
+WITHINGS_MEASURE_URL = "https://wbsapi.withings.net/measure"
+
+# Inicio del backfill cuando un proveedor no tiene cursor ni datos previos
+BACKFILL_START = datetime.date(2023, 1, 1)
+
+def _no_progress(stage: str, **data) -> None:
+    pass
+
+def date_windows(start: datetime.date, end: datetime.date, days: int) -> List[Tuple[datetime.date, datetime.date]]:
+    """Parte [start, end] (inclusivo) en ventanas consecutivas de `days` días."""
+    windows = []
+    while start <= end:
+        last = min(start + datetime.timedelta(days=max(1, days) - 1), end)
+        windows.append((start, last))
+        start = last + datetime.timedelta(days=1)
+    return windows
+
+GARMIN_SOURCE = 'Garmin V3 Sync'
+WITHINGS_SOURCE = 'Withings V3 Sync'
+
+_ACTIVITY_INSERT = '''
+    INSERT INTO activities (fecha, fecha_ts, fecha_local, tipo, distancia_km, duracion_min, calorias, fc_media, fc_max, elevacion_m, cadencia_media, fuente, nombre)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT DO NOTHING
+'''
+_BIOMETRIC_INSERT = '''
+    INSERT INTO biometrics (fecha, fecha_ts, fecha_local, peso, grasa_pct, masa_muscular_kg, fuente)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT DO NOTHING
+'''
+
+def garmin_activity_row(act: dict) -> tuple:
+    """Actividad de la API de Garmin -> fila de `activities` (orden de _ACTIVITY_INSERT)."""
+    fecha = act['startTimeLocal']
+    fecha_ts, fecha_local = normalized_columns(fecha)
+    return (
+        fecha, fecha_ts, fecha_local,
+        act.get('activityType', {}).get('typeKey', 'otros'),
+        round(act.get('distance', 0) / 1000.0, 2),
+        round(act.get('duration', 0) / 60.0, 1),
+        act.get('calories', 0),
+        act.get('averageHR', None),
+        act.get('maxHR', None),
+        act.get('totalElevationGain', None),
+        act.get('averageRunningCadence', None) or act.get('averageBikeCadence', None),
+        GARMIN_SOURCE,
+        act.get('activityName', 'Actividad sin nombre'),
+    )
+
+def withings_biometric_row(g: dict) -> Optional[tuple]:
+    """Grupo de medidas de Withings -> fila de `biometrics` (None si no trae peso o fecha)."""
+    when = normalize(g.get('date'))
+    if when is None:
+        return None
+    peso, grasa, musculo = None, None, None
+    for m in g['measures']:
+        val = m['value'] * (10 ** m['unit'])
+        if m['type'] == 1: peso = round(val, 2)
+        elif m['type'] == 6: grasa = round(val, 2)
+        elif m['type'] == 76: musculo = round(val, 2)
+    if not peso:
+        return None
+    return (when.local.isoformat(), when.ts, when.local_date, peso, grasa, musculo, WITHINGS_SOURCE)
 
 class SyncService:
     def __init__(self):
         self.db_path = DB_PATH
+        # Cliente de Garmin ya autenticado, reutilizado entre syncs del proceso
+        self._garmin: Optional[Garmin] = None
+        self._garmin_lock = threading.Lock()
+        self._relogin_lock = threading.Lock()
 
-    def get_connection(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        conn.row_factory = sqlite3.Row
-        return conn
+    def get_connection(self):
+        """Presta una conexión del pool compartido (usar con `with`)."""
+        return get_connection(self.db_path)
 
     def get_secret(self, service: str) -> dict:
-        conn = self.get_connection()
-        row = conn.execute("SELECT credentials_json FROM secrets WHERE service = ?", (service,)).fetchone()
-        conn.close()
+        with self.get_connection() as conn:
+            row = conn.execute("SELECT credentials_json FROM secrets WHERE service = ?", (service,)).fetchone()
         return json.loads(row['credentials_json']) if row else None
 
     def save_secret(self, service: str, data: dict) -> None:
-        conn = self.get_connection()
-        conn.execute("INSERT OR REPLACE INTO secrets (service, credentials_json, updated_at) VALUES (?, ?, ?)",
-                     (service, json.dumps(data), datetime.datetime.now().isoformat()))
-        conn.commit()
-        conn.close()
+        with self.get_connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO secrets (service, credentials_json, updated_at) VALUES (?, ?, ?)",
+                         (service, json.dumps(data), datetime.datetime.now().isoformat()))
+            conn.commit()
 
     def log_sync(self, service: str, status: str, message: str) -> None:
-        conn = self.get_connection()
-        conn.execute("INSERT INTO sync_logs (service, status, message) VALUES (?, ?, ?)",
-                     (service, status, message))
+        with self.get_connection() as conn:
+            conn.execute("INSERT INTO sync_logs (service, status, message) VALUES (?, ?, ?)",
+                         (service, status, message))
+            conn.commit()
+
+    def insert_activities(self, conn, rows: List[tuple]) -> Tuple[int, List[int]]:
+        """
+        Inserta las actividades que no existan ya por (fecha_ts, tipo) en cualquier
+        fuente. Las claves del rango se cargan en una sola consulta y la escritura
+        es un executemany; el índice único (fuente, fecha_ts, tipo) de la 0009
+        cubre además a dos syncs simultáneos. Devuelve (insertadas, fecha_ts de
+        las candidatas), lo que acota el rango a deduplicar.
+        """
+        stamps = [r[1] for r in rows if r[1] is not None]
+        known = set()
+        if stamps:
+            known = {tuple(k) for k in conn.execute(
+                "SELECT fecha_ts, tipo FROM activities WHERE fecha_ts BETWEEN ? AND ?", (min(stamps), max(stamps))
+            )}
+        nuevos = []
+        for row in rows:
+            key = (row[1], row[3])
+            if row[1] is not None and key in known:
+                continue
+            known.add(key)
+            nuevos.append(row)
+        inserted = conn.executemany(_ACTIVITY_INSERT, nuevos).rowcount if nuevos else 0
         conn.commit()
-        conn.close()
+        return inserted, [r[1] for r in nuevos if r[1] is not None]
+
+    def insert_biometrics(self, conn, rows: List[tuple]) -> int:
+        """Como insert_activities para pesajes: clave fecha_ts (cualquier fuente)."""
+        stamps = [r[1] for r in rows]
+        known = set()
+        if stamps:
+            known = {ts for (ts,) in conn.execute(
+                "SELECT fecha_ts FROM biometrics WHERE fecha_ts BETWEEN ? AND ?", (min(stamps), max(stamps))
+            )}
+        nuevos = []
+        for row in rows:
+            if row[1] in known:
+                continue
+            known.add(row[1])
+            nuevos.append(row)
+        inserted = conn.executemany(_BIOMETRIC_INSERT, nuevos).rowcount if nuevos else 0
+        conn.commit()
+        return inserted
+
+    def garmin_client(self, creds: dict) -> Garmin:
+        """
+        Cliente de Garmin autenticado. Dentro del proceso se reutiliza el mismo
+        (sin login); entre reinicios se reanuda desde los tokens guardados en
+        `secrets` ('garmin_tokens') y solo si no sirven se hace login completo.
+        """
+        with self._garmin_lock:
+            if self._garmin is None:
+                client = Garmin(creds['email'], creds['password'])
+                cached = self.get_secret('garmin_tokens')
+                client.login(cached.get('tokens') if cached else None)
+                # login() pudo renovar los tokens o hacer login completo: guardar los vigentes
+                self.save_secret('garmin_tokens', {'tokens': client.client.dumps()})
+                self._garmin = client
+            return self._garmin
 
-    def sync_garmin(self) -> dict:
+    def reset_garmin_client(self, forget_tokens: bool = False) -> None:
+        with self._garmin_lock:
+            self._garmin = None
+        if forget_tokens:
+            with self.get_connection() as conn:
+                conn.execute("DELETE FROM secrets WHERE service = 'garmin_tokens'")
+                conn.commit()
+
+    def _relogin_garmin(self, failed: Garmin, creds: dict) -> Garmin:
+        """Login completo tras un error de sesión; si otra ventana ya lo hizo, reutiliza su cliente."""
+        with self._relogin_lock:
+            if self._garmin is failed or self._garmin is None:
+                self.reset_garmin_client(forget_tokens=True)
+            return self.garmin_client(creds)
+
+    def get_cursor(self, provider: str) -> Optional[datetime.date]:
+        """Último día local con todas sus ventanas confirmadas (None si nunca se sincronizó)."""
+        with self.get_connection() as conn:
+            row = conn.execute("SELECT synced_through FROM sync_cursors WHERE provider = ?", (provider,)).fetchone()
+        return datetime.date.fromisoformat(row['synced_through']) if row else None
+
+    def save_cursor(self, conn, provider: str, through: datetime.date) -> None:
+        conn.execute("INSERT OR REPLACE INTO sync_cursors (provider, synced_through, updated_at) VALUES (?, ?, ?)",
+                     (provider, through.isoformat(), datetime.datetime.now().isoformat()))
+
+    def run_windows(self, provider: str, start: datetime.date, end: datetime.date,
+                    fetch: Callable[[datetime.date, datetime.date], list],
+                    store: Callable[[Any, list], int],
+                    progress: Callable[..., None] = _no_progress) -> Tuple[int, int]:
+        """
+        Backfill de [start, end] por ventanas de SYNC_WINDOW_DAYS. Las ventanas se
+        piden en paralelo (hasta SYNC_PROVIDER_CONCURRENCY[provider] a la vez) y se
+        guardan en orden: cada una se confirma junto con el cursor, que avanza solo
+        sobre ventanas contiguas. Si una falla se cancelan las pendientes y la
+        excepción se propaga; el siguiente sync retoma desde el cursor. El cursor
+        no pasa de ayer: el día en curso se vuelve a pedir (la inserción es idempotente).
+        Devuelve (filas insertadas, ventanas confirmadas).
+        """
+        windows = date_windows(start, end, SYNC_WINDOW_DAYS)
+        ayer = datetime.date.today() - datetime.timedelta(days=1)
+        inserted = done = 0
+        workers = max(1, SYNC_PROVIDER_CONCURRENCY.get(provider, 1))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"bioengine-{provider}")
+        try:
+            futures = [pool.submit(fetch, a, b) for a, b in windows]
+            for (a, b), future in zip(windows, futures):
+                items = future.result()
+                with self.get_connection() as conn:
+                    count = store(conn, items)
+                    through = min(b, ayer)
+                    if through >= a:
+                        self.save_cursor(conn, provider, through)
+                    conn.commit()
+                inserted += count
+                done += 1
+                progress("fetched", count=len(items), start=a.isoformat(), end=b.isoformat(), inserted=count)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        return inserted, done
+
+    def _start_date(self, provider: str, table: str, source_like: str) -> datetime.date:
+        """Día siguiente al cursor; sin cursor, el último día ya guardado de la fuente (o 2023-01-01)."""
+        cursor = self.get_cursor(provider)
+        if cursor is not None:
+            return cursor + datetime.timedelta(days=1)
+        with self.get_connection() as conn:
+            row = conn.execute(f"SELECT MAX(fecha_ts) AS last_ts FROM {table} WHERE fuente LIKE ?", (source_like,)).fetchone()
+        if row and row['last_ts'] is not None:
+            return epoch_to_local(row['last_ts']).date()
+        return BACKFILL_START
+
+    def sync_garmin(self, progress: Callable[..., None] = _no_progress) -> dict:
         creds = self.get_secret('garmin')
         if not creds:
             return {"status": "error", "message": "No hay credenciales de Garmin"}
 
         try:
-            client = Garmin(creds['email'], creds['password'])
-            client.login()
-            
-            # Obtener última fecha en DB
-            conn = self.get_connection()
-            last_date_row = conn.execute("SELECT MAX(fecha) as last_date FROM activities WHERE fuente LIKE '%Garmin%'").fetchone()
-            
-            if last_date_row and last_date_row['last_date']:
-                start_date = datetime.datetime.fromisoformat(last_date_row['last_date']).date() + datetime.timedelta(days=1)
-            else:
-                start_date = datetime.date(2023, 1, 1)
-
+            self.garmin_client(creds)
+            start_date = self._start_date('garmin', 'activities', '%Garmin%')
             hoy = datetime.date.today()
             if start_date > hoy:
                 return {"status": "ok", "message": "Garmin ya está al día"}
 
-            activities = client.get_activities_by_date(start_date.isoformat(), hoy.isoformat())
-            nuevos_count = 0
-            
-            for act in activities:
-                fecha = act['startTimeLocal']
-                tipo = act.get('activityType', {}).get('typeKey', 'otros')
-                
-                # Evitar duplicados por fecha y tipo
-                exists = conn.execute("SELECT id FROM activities WHERE fecha = ? AND tipo = ?", (fecha, tipo)).fetchone()
-                if not exists:
-                    nombre = act.get('activityName', 'Actividad sin nombre')
-                    conn.execute('''
-                    INSERT INTO activities (fecha, tipo, distancia_km, duracion_min, calorias, fc_media, fc_max, elevacion_m, cadencia_media, fuente, nombre)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        fecha, tipo,
-                        round(act.get('distance', 0) / 1000.0, 2),
-                        round(act.get('duration', 0) / 60.0, 1),
-                        act.get('calories', 0),
-                        act.get('averageHR', None),
-                        act.get('maxHR', None),
-                        act.get('totalElevationGain', None),
-                        act.get('averageRunningCadence', None) or act.get('averageBikeCadence', None),
-                        'Garmin V3 Sync',
-                        nombre
-                    ))
-                    nuevos_count += 1
-            
-            conn.commit()
-            conn.close()
+            def fetch(a: datetime.date, b: datetime.date) -> list:
+                client = self.garmin_client(creds)
+                try:
+                    return client.get_activities_by_date(a.isoformat(), b.isoformat())
+                except GarminConnectAuthenticationError:
+                    # Sesión caducada en el servidor: un único reintento con login completo
+                    return self._relogin_garmin(client, creds).get_activities_by_date(a.isoformat(), b.isoformat())
+
+            nuevos_ts: List[int] = []
+
+            def store(conn, activities: list) -> int:
+                count, stamps = self.insert_activities(conn, [garmin_activity_row(act) for act in activities])
+                nuevos_ts.extend(stamps)
+                return count
+
+            try:
+                nuevos_count, windows = self.run_windows('garmin', start_date, hoy, fetch, store, progress)
+            finally:
+                # Lo confirmado antes de un fallo también se fusiona y se refleja en las cachés
+                merged = []
+                if nuevos_ts:
+                    with self.get_connection() as conn:
+                        # Fusionar con lo que ya trajeron otras fuentes (Apple, Runkeeper...) en ese rango
+                        merged = deduplicate(conn, min(nuevos_ts), max(nuevos_ts))
+                    get_activity_frame().refresh()
+                    get_equipment_service().invalidate()
+            progress("inserted", count=nuevos_count)
+            merged_count = sum(len(p.duplicate_ids) for p in merged)
+            progress("deduped", count=merged_count)
             self.log_sync('garmin', 'success', f"Sincronizados {nuevos_count} actividades")
-            return {"status": "success", "added": nuevos_count}
+            return {"status": "success", "added": nuevos_count, "merged": merged_count, "windows": windows}
 
         except Exception as e:
             self.log_sync('garmin', 'error', str(e))
             return {"status": "error", "message": str(e)}
 
-    def sync_withings(self) -> dict:
+    def sync_withings(self, progress: Callable[..., None] = _no_progress) -> dict:
         app_secrets = self.get_secret('withings_app')
         tokens = self.get_secret('withings_tokens')
         
@@ -102,7 +295,6 @@ class SyncService:
             return {"status": "error", "message": "Faltan credenciales o tokens de Withings"}
 
         def refresh_tokens(refresh_token):
-            url = "https://wbsapi.withings.net/v2/oauth2"
             payload = {
                 'action': 'requesttoken',
                 'grant_type': 'refresh_token',
@@ -111,12 +303,14 @@ class SyncService:
                 'refresh_token': refresh_token
             }
             try:
-                r = requests.post(url, data=payload)
+                # Sin reintentos: si la respuesta se pierde tras rotar el refresh token,
+                # repetir el POST con el token ya consumido invalidaría la sesión
+                r = provider_http.request('withings', 'POST', WITHINGS_OAUTH_URL, retries=0, data=payload)
                 data = r.json()
                 if data['status'] == 0:
                     new_tokens = data['body']
                     self.save_secret('withings_tokens', new_tokens)
-                    return new_tokens['access_token']
+                    return new_tokens
                 else:
                     self.log_sync('withings', 'error', f"Refresh failed: {data}")
                     return None
@@ -124,62 +318,46 @@ class SyncService:
                 self.log_sync('withings', 'error', f"Refresh exception: {str(e)}")
                 return None
 
-        access_token = tokens['access_token']
-        # Obtener última fecha en DB
-        conn = self.get_connection()
-        last_date_row = conn.execute("SELECT MAX(fecha) as last_date FROM biometrics WHERE fuente LIKE '%Withings%'").fetchone()
-        
-        # Withings pide timestamp
-        if last_date_row and last_date_row['last_date']:
-            last_timestamp = int(datetime.datetime.fromisoformat(last_date_row['last_date']).timestamp()) - 3600
-        else:
-            last_timestamp = 1672531200 # 2023-01-01
-
-        url = "https://wbsapi.withings.net/measure"
-        headers = {'Authorization': f'Bearer {access_token}'}
-        params = {'action': 'getmeas', 'meastype': '1,6,76', 'lastupdate': last_timestamp}
-        
-        r = requests.post(url, headers=headers, data=params)
-        data = r.json()
-
-        if data['status'] == 401:
-            access_token = refresh_tokens(tokens['refresh_token'])
-            if access_token:
-                headers['Authorization'] = f'Bearer {access_token}'
-                r = requests.post(url, headers=headers, data=params)
-                data = r.json()
-            else:
-                return {"status": "error", "message": "Error renovando token Withings"}
-
-        if data['status'] == 0:
-            grps = data['body']['measuregrps']
-            nuevos_count = 0
-            for g in grps:
-                fecha = datetime.datetime.fromtimestamp(g['date']).isoformat()
-                peso, grasa, musculo = None, None, None
-                for m in g['measures']:
-                    val = m['value'] * (10 ** m['unit'])
-                    if m['type'] == 1: peso = round(val, 2)
-                    elif m['type'] == 6: grasa = round(val, 2)
-                    elif m['type'] == 76: musculo = round(val, 2)
-                
-                if peso:
-                    # Evitar duplicados exactos por fecha
-                    exists = conn.execute("SELECT id FROM biometrics WHERE fecha = ?", (fecha,)).fetchone()
-                    if not exists:
-                        conn.execute('''
-                        INSERT INTO biometrics (fecha, peso, grasa_pct, masa_muscular_kg, fuente)
-                        VALUES (?, ?, ?, ?, ?)
-                        ''', (fecha, peso, grasa, musculo, 'Withings V3 Sync'))
-                        nuevos_count += 1
-            
-            conn.commit()
-            conn.close()
-            self.log_sync('withings', 'success', f"Sincronizados {nuevos_count} pesajes")
-            return {"status": "success", "added": nuevos_count}
-        
-        conn.close()
-        return {"status": "error", "message": f"Error API Withings: {data['status']}"}
+        # Token compartido por las ventanas: la primera que recibe 401 lo renueva
+        state = {'tokens': tokens}
+        state_lock = threading.Lock()
+
+        def getmeas(access_token: str, params: dict) -> dict:
+            headers = {'Authorization': f'Bearer {access_token}'}
+            return provider_http.request('withings', 'POST', WITHINGS_MEASURE_URL, headers=headers, data=params).json()
+
+        def fetch(a: datetime.date, b: datetime.date) -> list:
+            lo, hi = epoch_bounds(a, b)
+            params = {'action': 'getmeas', 'meastype': '1,6,76', 'startdate': lo, 'enddate': hi - 1}
+            used = state['tokens']
+            data = getmeas(used['access_token'], params)
+            if data['status'] == 401:
+                with state_lock:
+                    if state['tokens'] is used:
+                        renewed = refresh_tokens(used['refresh_token'])
+                        if not renewed:
+                            raise RuntimeError("Error renovando token Withings")
+                        state['tokens'] = renewed
+                data = getmeas(state['tokens']['access_token'], params)
+            if data['status'] != 0:
+                raise RuntimeError(f"Error API Withings: {data['status']}")
+            return data['body']['measuregrps']
+
+        def store(conn, grps: list) -> int:
+            return self.insert_biometrics(conn, [row for row in map(withings_biometric_row, grps) if row is not None])
+
+        start_date = self._start_date('withings', 'biometrics', '%Withings%')
+        hoy = datetime.date.today()
+        if start_date > hoy:
+            return {"status": "ok", "message": "Withings ya está al día"}
+        try:
+            nuevos_count, windows = self.run_windows('withings', start_date, hoy, fetch, store, progress)
+        except Exception as e:
+            self.log_sync('withings', 'error', str(e))
+            return {"status": "error", "message": str(e)}
+        progress("inserted", count=nuevos_count)
+        self.log_sync('withings', 'success', f"Sincronizados {nuevos_count} pesajes")
+        return {"status": "success", "added": nuevos_count, "windows": windows}
 
 if __name__ == "__main__":
     service = SyncService()
@@ -0,0 +1,85 @@
+"""
+Carga de entrenamiento pre-agregada (tablas daily_load / weekly_load).
+
+Las tablas las mantienen al día los triggers sobre `activities` de las
+migraciones 0004 (reinstalados en 0005 y 0006); este servicio solo las lee. Cada consulta recorre O(días) filas agregadas en lugar de O(actividades)
+filas crudas.
+"""
+
+import datetime
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from services.db_pool import get_connection
+
+logger = logging.getLogger(__name__)
+
+LOAD_COLUMNS = ("distancia_km", "duracion_min", "calorias", "elevacion_m", "stress_score")
+
+
+class TrainingLoadService:
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+
+    def sport_totals(self, since: Optional[str] = None, sports: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, float]]:
+        """Totales por deporte desde `since` (YYYY-MM-DD, inclusivo): sesiones y sumas de carga."""
+        where, params = [], []
+        if since:
+            where.append("day >= ?")
+            params.append(since)
+        if sports is not None:
+            sports = list(sports)
+            where.append(f"sport IN ({', '.join('?' * len(sports))})")
+            params.extend(sports)
+        sql = f"""
+            SELECT sport, SUM(sessions) AS sessions, {', '.join(f'SUM({c}) AS {c}' for c in LOAD_COLUMNS)}
+            FROM daily_load
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            GROUP BY sport
+        """
+        with get_connection(self.db_path) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return {row["sport"]: {k: row[k] or 0 for k in ("sessions", *LOAD_COLUMNS)} for row in rows}
+
+    def distance_since_days(self, days: int, today: Optional[datetime.date] = None) -> float:
+        """Km totales (todos los deportes) de los últimos N días naturales."""
+        cutoff = ((today or datetime.date.today()) - datetime.timedelta(days=days)).isoformat()
+        with get_connection(self.db_path) as conn:
+            row = conn.execute("SELECT SUM(distancia_km) FROM daily_load WHERE day >= ?", (cutoff,)).fetchone()
+        return float(row[0] or 0.0)
+
+    def acute_chronic_km(self, today: Optional[datetime.date] = None) -> Dict[str, float]:
+        """Carga aguda (7d) y crónica (28d) en km, la entrada del triage de AdaptiveCoach."""
+        return {
+            "acute_km": self.distance_since_days(7, today),
+            "chronic_km": self.distance_since_days(28, today),
+        }
+
+    def weekly(self, weeks: int = 4, today: Optional[datetime.date] = None) -> List[Dict[str, float]]:
+        """Semanas (lunes a domingo) más recientes con sus totales, de la más nueva a la más antigua."""
+        today = today or datetime.date.today()
+        first_week = (today - datetime.timedelta(days=today.weekday()) - datetime.timedelta(weeks=weeks - 1)).isoformat()
+        with get_connection(self.db_path) as conn:
+            rows = conn.execute(f"""
+                SELECT week_start, SUM(sessions) AS sessions, {', '.join(f'SUM({c}) AS {c}' for c in LOAD_COLUMNS)}
+                FROM weekly_load
+                WHERE week_start >= ?
+                GROUP BY week_start
+                ORDER BY week_start DESC
+            """, (first_week,)).fetchall()
+        return [dict(row) for row in rows]
+
+
+_training_load_service: Optional[TrainingLoadService] = None
+_training_load_lock = threading.Lock()
+
+
+def get_training_load_service() -> TrainingLoadService:
+    """Get singleton TrainingLoadService instance"""
+    global _training_load_service
+    if _training_load_service is None:
+        with _training_load_lock:
+            if _training_load_service is None:
+                _training_load_service = TrainingLoadService()
+    return _training_load_service
@@ -1,64 +1,49 @@
 import sqlite3
-import pandas as pd
 import os
-from datetime import datetime
+import argparse
+from config import BASE_DIR, DB_PATH
+from services.bulk_import import ImportSpec, read_chunks, write_chunks
 
-DB_PATH = r'c:\BioEngine_V3\db\bioengine_v3.db'
-EXCEL_PATH = r'c:\BioEngine_V3\Carreras.xlsx'
+EXCEL_PATH = str(BASE_DIR / "Carreras.xlsx")
 
-def sync_competitions():
-    if not os.path.exists(DB_PATH) or not os.path.exists(EXCEL_PATH):
-        print("Missing files")
-        return
+def _competition_date(row):
+    date_val = row.get('Fecha')
+    if isinstance(date_val, str):
+        return date_val.split(' ')[0]
+    return date_val.strftime('%Y-%m-%d') if hasattr(date_val, 'strftime') else None
+
+def _competition_type(row):
+    # Simple logic: if 'trail' in name -> Competición Trail, else Competición Calle
+    name = str(row.get('Carrera') or '').lower()
+    if 'trail' in name or 'aventura' in name:
+        return 'Competición Trail'
+    return 'Competición Calle'
 
-    # 1. Read Excel
-    df = pd.read_excel(EXCEL_PATH, header=3) # Based on previous check
-    df = df.dropna(subset=['Fecha', 'Carrera'])
-    
-    competitions = []
-    for _, row in df.iterrows():
-        try:
-            date_val = row['Fecha']
-            if isinstance(date_val, str):
-                date_str = date_val.split(' ')[0]
-            else:
-                date_str = date_val.strftime('%Y-%m-%d')
-            
-            competitions.append({
-                'date': date_str,
-                'name': str(row['Carrera']).strip()
-            })
-        except:
-            continue
+# Marca la actividad del mismo día local (fecha_local, indexada) como competición
+COMPETITION_SPEC = ImportSpec("activities", {
+    "tipo": _competition_type,
+    "nombre": lambda row: str(row.get('Carrera') or '').strip() or None,
+    "fecha_local": _competition_date,
+}, required=("nombre", "fecha_local"), sql="""
+    UPDATE activities SET tipo = ?, nombre = ?
+    WHERE fecha_local = ? AND (tipo LIKE 'run%' OR tipo LIKE 'carrera%' OR tipo IS NULL OR tipo = 'Otros')
+""")
 
-    print(f"Found {len(competitions)} competitions in Excel.")
+def sync_competitions(db_path=DB_PATH, excel_path=EXCEL_PATH):
+    if not os.path.exists(db_path) or not os.path.exists(excel_path):
+        print("Missing files")
+        return
 
-    # 2. Update DB
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    
-    updated_count = 0
-    for comp in competitions:
-        # Try to find a matching activity on the same date
-        # Date in DB can be '2024-12-08 08:00:00' or '2024-12-08'
-        date_pattern = comp['date'] + '%'
-        
-        # Determine if it's Trail or Street
-        # Simple logic: if 'trail' in name -> Competición Trail, else Competición Calle
-        new_type = 'Competición Calle'
-        if 'trail' in comp['name'].lower() or 'aventura' in comp['name'].lower():
-            new_type = 'Competición Trail'
-            
-        cur.execute("UPDATE activities SET tipo = ?, nombre = ? WHERE fecha LIKE ? AND (tipo LIKE 'run%' OR tipo LIKE 'carrera%' OR tipo IS NULL OR tipo = 'Otros')", 
-                    (new_type, comp['name'], date_pattern))
-        
-        if cur.rowcount > 0:
-            print(f"Matched: {comp['date']} -> {comp['name']} ({new_type})")
-            updated_count += cur.rowcount
-            
-    conn.commit()
-    print(f"\nSuccessfully updated {updated_count} activities as Competitions.")
+    # Excel leído por bloques (header en la fila 4) y volcado con executemany en una transacción
+    conn = sqlite3.connect(db_path)
+    report = write_chunks(conn, COMPETITION_SPEC, read_chunks(excel_path, header=3))
+    print(f"Found {report.rows} competitions in Excel ({report.skipped} skipped).")
+    print(f"\nSuccessfully updated {report.changes} activities as Competitions.")
     conn.close()
 
 if __name__ == "__main__":
-    sync_competitions()
+    parser = argparse.ArgumentParser(description="Marca como competición las actividades listadas en Carreras.xlsx")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--excel", default=EXCEL_PATH)
+    args = parser.parse_args()
+    sync_competitions(args.db, args.excel)
@@ -0,0 +1,31 @@
+"""
+Configuración común de los tests del backend.
+
+Los tests nunca tocan la base del repo (db/bioengine_v3.db): antes de importar
+nada se copia a un directorio temporal y `BIOENGINE_DB_PATH` apunta a la copia,
+así las migraciones y escrituras de la API quedan fuera del árbol.
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+REPO_DB = Path(__file__).resolve().parents[2] / "db" / "bioengine_v3.db"
+
+_tmp_dir = None
+
+
+def pytest_configure(config):
+    global _tmp_dir
+    _tmp_dir = tempfile.mkdtemp(prefix="bioengine-tests-")
+    db_path = os.path.join(_tmp_dir, "bioengine_v3.db")
+    if REPO_DB.exists():
+        shutil.copyfile(REPO_DB, db_path)
+    os.environ["BIOENGINE_DB_PATH"] = db_path
+    os.environ["BIOENGINE_STREAMS_DIR"] = os.path.join(_tmp_dir, "streams")
+
+
+def pytest_unconfigure(config):
+    if _tmp_dir:
+        shutil.rmtree(_tmp_dir, ignore_errors=True)
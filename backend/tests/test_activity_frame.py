@@ -0,0 +1,103 @@
+import sys
+import os
+import sqlite3
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services.activity_frame import ActivityFrame
+
+
+def _insert(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO activities (fecha, tipo, distancia_km, duracion_min, fc_media, fuente) VALUES (?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def _make_db(tmp_path):
+    db_path = str(tmp_path / "frame.db")
+    run_migrations(db_path)
+    _insert(db_path, [
+        ("2024-03-01 08:00:00", "running", 10.0, 50.0, 140, "Garmin V3 Sync"),
+        ("2024-01-15T07:30:00", "Ciclismo", 40.0, 90.0, None, "Apple"),
+        ("2023-12-31", "Tenis", None, 60.0, 120, "Apple"),
+    ])
+    return db_path
+
+
+def test_load_sorts_by_fecha_and_mixed_formats(tmp_path):
+    frame = ActivityFrame(_make_db(tmp_path))
+    assert frame.load() == 3
+    records = frame.view().to_records()
+    assert [r["tipo"] for r in records] == ["running", "Ciclismo", "Tenis"]
+    assert records[0]["fc_media"] == 140.0
+    assert records[2]["distancia_km"] is None
+
+
+def test_window_type_filter_and_totals(tmp_path):
+    frame = ActivityFrame(_make_db(tmp_path))
+    view = frame.view()
+    since_2024 = view.between("2024-01-01")
+    assert len(since_2024) == 2
+    assert since_2024.of_types(["RUNNING", "carrera"]).total("distancia_km") == 10.0
+    assert len(view.of_types(["tenis"])) == 1
+    assert view.of_types(["tenis"]).total("distancia_km") == 0.0
+    assert [r["tipo"] for r in view.last(1).to_records()] == ["running"]
+
+
+def test_refresh_appends_only_new_rows(tmp_path):
+    db_path = _make_db(tmp_path)
+    frame = ActivityFrame(db_path)
+    frame.load()
+    before = frame.view()
+
+    # Una actividad antigua traída por un sync debe quedar en su sitio cronológico
+    _insert(db_path, [
+        ("2025-05-01 09:00:00", "running", 5.0, 30.0, 150, "Garmin V3 Sync"),
+        ("2023-06-01 09:00:00", "walking", 3.0, 40.0, 90, "Garmin V3 Sync"),
+    ])
+    assert frame.refresh() == 2
+    assert frame.refresh() == 0
+
+    view = frame.view()
+    assert len(before) == 3  # las instantáneas previas no cambian
+    assert [r["tipo"] for r in view.to_records(newest_first=False)] == ["walking", "Tenis", "Ciclismo", "running", "running"]
+    assert view.of_types(["running"]).total("distancia_km") == 15.0
+
+
+def test_refresh_before_load_is_noop(tmp_path):
+    frame = ActivityFrame(_make_db(tmp_path))
+    assert frame.refresh() == 0
+    assert not frame.loaded
+    assert len(frame.view()) == 3
+
+
+def test_view_follows_updates_and_deletes(tmp_path, monkeypatch):
+    """Ediciones y borrados (p.ej. fusiones del dedup) se reflejan sin recargar a mano"""
+    db_path = _make_db(tmp_path)
+    frame = ActivityFrame(db_path)
+    assert len(frame.view()) == 3
+    version = frame._version
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE activities SET distancia_km = 12.0 WHERE tipo = 'running'")
+    conn.execute("DELETE FROM activities WHERE tipo = 'Tenis'")
+    conn.commit()
+    conn.close()
+
+    view = frame.view()
+    assert [r["tipo"] for r in view.to_records()] == ["running", "Ciclismo"]
+    assert view.of_types(["running"]).total("distancia_km") == 12.0
+    assert frame._version == version + 2
+    assert frame.refresh() == 0
+
+    # Solo altas: se agregan sin recargar
+    reloads = []
+    monkeypatch.setattr(frame, "_load", lambda conn: reloads.append(conn))
+    _insert(db_path, [("2025-05-01 09:00:00", "running", 5.0, 30.0, 150, "Garmin V3 Sync")])
+    assert len(frame.view()) == 3 and reloads == []
@@ -0,0 +1,126 @@
+import sys
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services import activity_streams
+from services.activity_streams import import_activity_file, read_range, to_stream, Sample
+from services.datetime_normalizer import normalized_columns
+from services.dedup import deduplicate
+
+GPX = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1"
+     xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">
+ <trk><type>running</type><trkseg>
+  <trkpt lat="-34.9000" lon="-56.1500"><ele>10</ele><time>2025-03-02T11:00:00Z</time>
+   <extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>120</gpxtpx:hr><gpxtpx:cad>85</gpxtpx:cad></gpxtpx:TrackPointExtension></extensions></trkpt>
+  <trkpt lat="-34.9001" lon="-56.1500"><ele>12</ele><time>2025-03-02T11:00:04Z</time>
+   <extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>130</gpxtpx:hr><gpxtpx:cad>86</gpxtpx:cad></gpxtpx:TrackPointExtension></extensions></trkpt>
+  <trkpt lat="-34.9002" lon="-56.1500"><ele>11</ele><time>2025-03-02T11:00:09Z</time>
+   <extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>140</gpxtpx:hr><gpxtpx:cad>87</gpxtpx:cad></gpxtpx:TrackPointExtension></extensions></trkpt>
+ </trkseg></trk>
+</gpx>
+"""
+
+TCX = """<?xml version="1.0" encoding="UTF-8"?>
+<TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2">
+ <Activities><Activity Sport="Biking"><Id>2025-03-05T10:00:00Z</Id><Lap StartTime="2025-03-05T10:00:00Z"><Track>
+  <Trackpoint><Time>2025-03-05T10:00:00Z</Time><AltitudeMeters>5</AltitudeMeters><DistanceMeters>0</DistanceMeters>
+   <HeartRateBpm><Value>100</Value></HeartRateBpm><Cadence>80</Cadence></Trackpoint>
+  <Trackpoint><Time>2025-03-05T10:00:10Z</Time><AltitudeMeters>8</AltitudeMeters><DistanceMeters>80</DistanceMeters>
+   <HeartRateBpm><Value>110</Value></HeartRateBpm><Cadence>82</Cadence></Trackpoint>
+ </Track></Lap></Activity></Activities>
+</TrainingCenterDatabase>
+"""
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(activity_streams, "STREAMS_DIR", tmp_path / "streams")
+    db_path = str(tmp_path / "streams.db")
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    yield conn
+    conn.close()
+
+
+def test_to_stream_resamples_to_1hz():
+    start, stream = to_stream(iter([Sample(100, hr=120, distance=0.0), Sample(103, hr=130, distance=9.0)]))
+    assert start == 100 and len(stream) == 4
+    assert stream["hr"].tolist() == [120, 0, 0, 130]
+    assert stream["speed"][1:].tolist() == [3.0, 3.0, 3.0]  # derivada de la distancia
+    assert np.isnan(stream["altitude"]).all()
+
+
+def test_gpx_links_existing_activity(conn, tmp_path):
+    fecha_ts, fecha_local = normalized_columns("2025-03-02 08:01:00")
+    conn.execute(
+        "INSERT INTO activities (fecha, fecha_ts, fecha_local, tipo, fuente) VALUES ('2025-03-02 08:01:00', ?, ?, 'running', 'Garmin V3 Sync')",
+        (fecha_ts, fecha_local),
+    )
+    conn.commit()
+    path = tmp_path / "run.gpx"
+    path.write_text(GPX, encoding="utf-8")
+
+    info = import_activity_file(conn, str(path))
+    assert info.activity_id == 1 and info.samples == 10
+    assert conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == 1
+
+    view = read_range(conn, 1, 4, 10, ["hr", "altitude"])
+    assert view["hr"].tolist() == [130, 0, 0, 0, 0, 140]
+    assert isinstance(view["hr"].base, np.memmap) or isinstance(view["hr"], np.memmap)  # sin copia
+    whole = read_range(conn, 1)
+    assert whole["distance"][-1] == pytest.approx(22.2, abs=0.5)
+    with pytest.raises(ValueError):
+        read_range(conn, 1, channels=["power"])
+    assert read_range(conn, 2) is None
+
+
+def test_sync_duplicate_inherits_imported_stream(conn, tmp_path):
+    """Archivo importado y luego el mismo entreno por sync: la serie pasa a la actividad conservada"""
+    path = tmp_path / "run.gpx"
+    path.write_text(GPX, encoding="utf-8")
+    imported = import_activity_file(conn, str(path))
+    fecha_ts, fecha_local = normalized_columns("2025-03-02 08:01:00")
+    for fuente in ("Garmin V3 Sync", "Strava"):
+        conn.execute(
+            "INSERT INTO activities (fecha, fecha_ts, fecha_local, tipo, fuente) VALUES ('2025-03-02 08:01:00', ?, ?, 'running', ?)",
+            (fecha_ts, fecha_local, fuente),
+        )
+    conn.commit()
+    garmin, strava = 2, 3
+    second = activity_streams.save_stream(conn, strava, imported.start_ts, read_range(conn, imported.activity_id))
+
+    plans = deduplicate(conn)
+    assert [(p.keeper_id, sorted(p.duplicate_ids)) for p in plans] == [(garmin, [imported.activity_id, strava])]
+    assert conn.execute("SELECT activity_id, path FROM activity_streams").fetchall() == [(garmin, imported.path)]
+    assert read_range(conn, garmin, 4, 10, ["hr"])["hr"].tolist() == [130, 0, 0, 0, 0, 140]
+    assert os.path.exists(imported.path) and not os.path.exists(second.path)
+
+
+def test_tcx_creates_activity_with_aggregates(conn, tmp_path):
+    path = tmp_path / "ride.tcx"
+    path.write_text(TCX, encoding="utf-8")
+    info = import_activity_file(conn, str(path))
+    row = conn.execute(
+        "SELECT tipo, fuente, distancia_km, fc_media, fc_max, elevacion_m, cadencia_media, sport_canonical FROM activities WHERE id = ?",
+        (info.activity_id,),
+    ).fetchone()
+    assert row == ("cycling", "Archivo TCX", 0.08, 105, 110, 3.0, 81, "cycling")
+    assert read_range(conn, info.activity_id, channels=["speed"])["speed"][1] == pytest.approx(8.0)
+
+
+def test_fit_without_fitdecode_raises_dedicated_error(conn, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "fitdecode", None)  # import fitdecode -> ImportError
+    path = tmp_path / "ride.fit"
+    path.write_bytes(b"")
+    with pytest.raises(activity_streams.FitDecoderMissingError) as err:
+        import_activity_file(conn, str(path))
+    assert isinstance(err.value, ImportError) and "fitdecode" in str(err.value)
+    assert conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == 0
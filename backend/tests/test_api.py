@@ -6,11 +6,20 @@ import os
 # Añadir el directorio backend al path para poder importar main
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from main import app
-from config import ADMIN_TOKEN
+from main import app, prepare_database
+from config import ADMIN_TOKEN, DB_PATH, BASE_DIR
 
+# Sin `with TestClient(app)` no corren los hooks de arranque (arrancarían el
+# scheduler de sync); solo se prepara la base de datos, que es la copia
+# temporal preparada en conftest.py y nunca la del repo
+prepare_database()
 client = TestClient(app)
 
+def test_tests_use_a_copy_of_the_db():
+    """Las migraciones de prepare_database() corren sobre la copia temporal, no sobre db/ del repo"""
+    assert os.path.abspath(DB_PATH) != os.path.abspath(BASE_DIR / "db" / "bioengine_v3.db")
+    assert os.path.exists(DB_PATH)
+
 def test_read_main():
     """Verifica que la raíz de la API responda correctamente"""
     response = client.get("/")
@@ -23,13 +32,59 @@ def test_get_activities():
     """Verifica que el endpoint de actividades funcione"""
     response = client.get("/activities")
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
+    data = response.json()
+    assert isinstance(data["items"], list)
+    assert "next_cursor" in data
+
+def test_activities_keyset_pagination():
+    """Las páginas encadenadas por cursor no repiten ni saltan actividades"""
+    full = client.get("/activities", params={"limit": 5000}).json()["items"]
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 50, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/activities", params=params).json()
+        seen.extend(a["id"] for a in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [a["id"] for a in full]
+
+def test_activities_filters_and_bad_cursor():
+    """Filtros from/to/tipo en servidor y cursor inválido"""
+    response = client.get("/activities", params={"from": "2025-01-01", "to": "2025-12-31"})
+    assert response.status_code == 200
+    assert all("2025-01-01" <= a["fecha"][:10] <= "2025-12-31" for a in response.json()["items"])
+    response = client.get("/activities", params={"tipo": "RUNNING"})
+    assert all(a["tipo"].lower() == "running" for a in response.json()["items"])
+    assert client.get("/activities", params={"cursor": "no-es-un-cursor"}).status_code == 400
+
+def test_activities_sport_filter_is_preclassified():
+    """`sport` filtra por deporte canónico y cada fila trae su etiqueta ya calculada"""
+    response = client.get("/activities", params={"sport": "running", "limit": 100})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert all(a["sport_canonical"] == "running" and a["sport_label"] for a in items)
+
+def test_equipment_serves_gear_odometers():
+    """/equipment devuelve el odómetro de cada material y responde igual desde caché"""
+    first = client.get("/equipment")
+    assert first.status_code == 200
+    data = first.json()
+    assert {"training_km", "trail_km", "bike_km", "bike_km_total", "tennis_sessions"} <= set(data["stats"])
+    assert {g["slug"] for g in data["gear"]} >= {"kayano", "brooks", "speedgoat", "trek", "babolat"}
+    assert client.get("/equipment").json() == data
+
+def test_activity_streams_missing_or_bad_channel():
+    response = client.get("/activities/999999999/streams")
+    assert response.status_code == 404
+    response = client.get("/activities/1/streams?channels=hr,power")
+    assert response.status_code in (400, 404)
 
 def test_get_biometrics():
     """Verifica que el endpoint de biometría funcione"""
     response = client.get("/biometrics")
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
+    assert isinstance(response.json()["items"], list)
 
 def test_coach_analysis_auth():
     """Verifica que el análisis del coach requiera token o devuelva 200 si no tiene seguridad estricta aún"""
@@ -50,6 +105,10 @@ def test_sync_authorized():
     # Pero aquí validamos que pase el middleware de seguridad.
     assert response.status_code in [200, 500, 503] 
 
+def test_sync_job_not_found():
+    assert client.get("/sync/jobs/no-existe").status_code == 404
+    assert client.get("/sync/jobs/no-existe/events").status_code == 404
+
 def test_system_status_auth():
     """Verifica que el estado del sistema requiera token"""
     response = client.get("/system/status")
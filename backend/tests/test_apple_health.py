@@ -0,0 +1,101 @@
+import sys
+import os
+import sqlite3
+import zipfile
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services.apple_health import ingest_export, load_checkpoint, workout_name, workout_type
+from services.datetime_normalizer import normalized_columns
+
+EXPORT = """<?xml version="1.0" encoding="UTF-8"?>
+<HealthData locale="es_UY">
+ <Me HKCharacteristicTypeIdentifierBiologicalSex="HKBiologicalSexMale"/>
+ <Record type="HKQuantityTypeIdentifierBodyMass" sourceName="Balanza" unit="kg" startDate="2025-03-01 07:00:00 -0300" value="72.4"/>
+ <Record type="HKQuantityTypeIdentifierStepCount" sourceName="iPhone" unit="count" startDate="2025-03-01 08:00:00 -0300" value="120"/>
+ <Record type="HKQuantityTypeIdentifierBodyMass" sourceName="Balanza" unit="lb" startDate="2025-03-08 07:00:00 -0300" value="160"/>
+ <Workout workoutActivityType="HKWorkoutActivityTypeRunning" duration="50" durationUnit="min" totalDistance="10" totalDistanceUnit="km" totalEnergyBurned="600" totalEnergyBurnedUnit="kcal" sourceName="Apple Watch" startDate="2025-03-02 08:03:00 -0300">
+  <MetadataEntry key="HKIndoorWorkout" value="0"/>
+ </Workout>
+ <Workout workoutActivityType="HKWorkoutActivityTypeTraditionalStrengthTraining" duration="1800" durationUnit="s" sourceName="Apple Watch" startDate="2025-03-03 19:00:00 -0300">
+  <WorkoutStatistics type="HKQuantityTypeIdentifierActiveEnergyBurned" sum="250" unit="kcal"/>
+  <WorkoutStatistics type="HKQuantityTypeIdentifierHeartRate" average="121.4" maximum="160" unit="count/min"/>
+ </Workout>
+ <Workout workoutActivityType="HKWorkoutActivityTypeCycling" duration="60" durationUnit="min" sourceName="Apple Watch" startDate="2025-03-04 07:00:00 -0300">
+  <WorkoutStatistics type="HKQuantityTypeIdentifierDistanceCycling" sum="18.6" unit="mi"/>
+ </Workout>
+</HealthData>
+"""
+
+
+def test_workout_without_start_date_is_skipped(tmp_path):
+    export = tmp_path / "export.xml"
+    export.write_text(EXPORT.replace(
+        '<Workout workoutActivityType="HKWorkoutActivityTypeCycling"',
+        '<Workout workoutActivityType="HKWorkoutActivityTypeYoga" duration="30" durationUnit="min"/>\n'
+        ' <Workout workoutActivityType="HKWorkoutActivityTypeCycling"',
+    ), encoding="utf-8")
+    conn = _db(tmp_path)
+    report = ingest_export(conn, str(export), dedup=False)
+    assert (report.workouts, report.weights, report.skipped) == (3, 2, 1)
+    conn.close()
+
+
+def _db(tmp_path):
+    db_path = str(tmp_path / "apple.db")
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    fecha_ts, fecha_local = normalized_columns("2025-03-02 08:00:00")
+    conn.execute(
+        "INSERT INTO activities (fecha, fecha_ts, fecha_local, tipo, distancia_km, fuente) "
+        "VALUES ('2025-03-02 08:00:00', ?, ?, 'running', 10.1, 'Garmin V3 Sync')",
+        (fecha_ts, fecha_local),
+    )
+    conn.commit()
+    return conn
+
+
+def test_workout_type():
+    assert workout_type("HKWorkoutActivityTypeRunning") == "running"
+    assert workout_type("HKWorkoutActivityTypeStairClimbing") == "stair_climbing"
+    assert workout_type(None) == "otros"
+    assert workout_name("HKWorkoutActivityTypeStairClimbing") == "Stair Climbing"
+    assert workout_name(None) is None
+
+
+def test_ingest_zip_with_dedup_and_checkpoint(tmp_path):
+    export = tmp_path / "export.zip"
+    with zipfile.ZipFile(export, "w") as zf:
+        zf.writestr("apple_health_export/export.xml", EXPORT)
+    conn = _db(tmp_path)
+    context_version = conn.execute("SELECT version FROM table_versions WHERE name = 'user_context'").fetchone()
+
+    report = ingest_export(conn, str(export), batch_size=2)
+    assert (report.workouts, report.weights, report.merged, report.resumed_from) == (3, 2, 1, 0)
+
+    # La carrera de Apple se fusionó con la de Garmin (misma sesión, 3 min de diferencia)
+    rows = conn.execute("SELECT tipo, fuente, distancia_km, duracion_min, calorias, fc_media FROM activities ORDER BY fecha_ts").fetchall()
+    assert rows == [
+        ("running", "Garmin V3 Sync", 10.1, 50.0, 600.0, None),
+        ("strength_training", "Apple", None, 30.0, 250.0, 121),
+        ("cycling", "Apple", 29.93, 60.0, None, None),
+    ]
+    weights = [w for (w,) in conn.execute("SELECT peso FROM biometrics ORDER BY fecha_ts")]
+    assert weights == [72.4, 72.57]
+
+    names = [n for (n,) in conn.execute("SELECT nombre FROM activities WHERE fuente = 'Apple' ORDER BY fecha_ts")]
+    assert names == ["Traditional Strength Training", "Cycling"]
+
+    # Reimportar el mismo archivo reanuda tras el checkpoint y no duplica nada;
+    # el checkpoint no toca user_context (ni la caché del contexto base)
+    assert load_checkpoint(conn, str(export)) == 5
+    assert conn.execute("SELECT COUNT(*) FROM user_context").fetchone()[0] == 0
+    assert conn.execute("SELECT version FROM table_versions WHERE name = 'user_context'").fetchone() == context_version
+    again = ingest_export(conn, str(export))
+    assert (again.workouts, again.weights, again.resumed_from) == (0, 0, 5)
+    again = ingest_export(conn, str(export), resume=False)
+    assert again.weights == 0
+    assert conn.execute("SELECT COUNT(*) FROM biometrics").fetchone()[0] == 2
+    conn.close()
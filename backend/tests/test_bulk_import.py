@@ -0,0 +1,69 @@
+import sys
+import os
+import sqlite3
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services.bulk_import import ImportSpec, import_file, read_chunks
+
+SPEC = ImportSpec("activities", {
+    "fecha": "Fecha",
+    "tipo": "Tipo",
+    "distancia_km": "Distancia (km)",
+    "fuente": lambda row: row.get("Fuente") or "CSV",
+}, date_column="fecha", required=("fecha",))
+
+
+def _db(tmp_path):
+    db_path = str(tmp_path / "bulk.db")
+    run_migrations(db_path)
+    return db_path
+
+
+def test_csv_import_in_chunks(tmp_path):
+    csv_path = tmp_path / "historial.csv"
+    lines = ["Fecha;Tipo;Distancia (km);Fuente"]
+    lines += [f"2025-01-{d:02d} 07:00:00;running;{d}.5;" for d in range(1, 29)]
+    lines.append(";running;3.0;Garmin")  # sin fecha: se descarta
+    csv_path.write_text("\n".join(lines), encoding="utf-8")
+
+    assert sum(len(c) for c in read_chunks(str(csv_path), chunk_size=10, sep=";")) == 29
+
+    conn = sqlite3.connect(_db(tmp_path))
+    report = import_file(conn, str(csv_path), SPEC, chunk_size=10, sep=";")
+    assert (report.rows, report.skipped, report.changes) == (28, 1, 28)
+    assert report.rows_per_s > 0
+
+    row = conn.execute(
+        "SELECT fecha_ts, fecha_local, distancia_km, fuente, sport_canonical FROM activities ORDER BY fecha_ts LIMIT 1"
+    ).fetchone()
+    assert row[0] is not None and row[1] == "2025-01-01"
+    assert row[2:] == (1.5, "CSV", "running")
+    # Los triggers de rollups siguen activos durante la carga masiva
+    assert conn.execute("SELECT SUM(sessions) FROM daily_load").fetchone()[0] == 28
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] != 0
+    conn.close()
+
+
+def test_xlsx_update_spec(tmp_path):
+    from openpyxl import Workbook
+
+    xlsx_path = tmp_path / "carreras.xlsx"
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Fecha", "Carrera"])
+    ws.append(["2025-01-05", "10K Rambla"])
+    ws.append(["2025-01-06", "Sin actividad"])
+    wb.save(xlsx_path)
+
+    conn = sqlite3.connect(_db(tmp_path))
+    conn.execute("INSERT INTO activities (fecha, fecha_local, tipo) VALUES ('2025-01-05 08:00:00', '2025-01-05', 'running')")
+    conn.commit()
+    spec = ImportSpec("activities", {"nombre": "Carrera", "fecha_local": "Fecha"},
+                      sql="UPDATE activities SET nombre = ? WHERE fecha_local = ?")
+    report = import_file(conn, str(xlsx_path), spec)
+    assert (report.rows, report.changes) == (2, 1)
+    assert conn.execute("SELECT nombre FROM activities").fetchone()[0] == "10K Rambla"
+    conn.close()
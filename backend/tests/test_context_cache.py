@@ -0,0 +1,67 @@
+import sys
+import os
+import sqlite3
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services.context_manager import ContextManager
+
+
+def _manager(tmp_path):
+    (tmp_path / "Plan_Entrenamiento_Tenis_Master_49.md").write_text("Plan v1", encoding="utf-8")
+    (tmp_path / "equipamiento.md").write_text("Raqueta", encoding="utf-8")
+    db_path = str(tmp_path / "ctx.db")
+    run_migrations(db_path)
+    manager = ContextManager(base_path=str(tmp_path))
+    manager.db_path = db_path
+    builds = []
+    build = manager._build_foundational_context
+
+    def counted():
+        builds.append(1)
+        return build()
+
+    manager._build_foundational_context = counted
+    return manager, builds
+
+
+def test_foundational_context_is_cached_until_something_changes(tmp_path):
+    manager, builds = _manager(tmp_path)
+    first = manager.get_foundational_context()
+    assert "Plan v1" in first and "Raqueta" in first
+    assert manager.get_foundational_context() is first
+    assert len(builds) == 1
+
+    # user_context (vía el propio manager)
+    manager._set_context_value("perfil_usuario", {"nombre": "Atleta"})
+    assert "Atleta" in manager.get_foundational_context()
+    assert len(builds) == 2
+
+    # evolutionary_memory escrita por otra conexión (scripts, otro proceso)
+    conn = sqlite3.connect(manager.db_path)
+    conn.execute("INSERT INTO evolutionary_memory (date, lesson, context) VALUES ('2025-03-01', 'Hidratar más', 'calor')")
+    conn.commit()
+    conn.close()
+    assert "Hidratar más" in manager.get_foundational_context()
+    assert len(builds) == 3
+
+    # Cambio en un .md (mtime / tamaño)
+    plan = tmp_path / "Plan_Entrenamiento_Tenis_Master_49.md"
+    plan.write_text("Plan v2 con descarga", encoding="utf-8")
+    os.utime(plan, ns=(os.stat(plan).st_atime_ns, os.stat(plan).st_mtime_ns + 10 ** 9))
+    assert "Plan v2" in manager.get_foundational_context()
+    manager.get_foundational_context()
+    assert len(builds) == 4
+
+
+def test_context_without_version_table_is_not_cached(tmp_path):
+    manager, builds = _manager(tmp_path)
+    conn = sqlite3.connect(manager.db_path)
+    conn.execute("DROP TABLE table_versions")
+    conn.commit()
+    conn.close()
+    manager.get_foundational_context()
+    manager.get_foundational_context()
+    assert len(builds) == 2
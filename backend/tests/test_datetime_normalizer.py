@@ -0,0 +1,132 @@
+import sys
+import os
+import sqlite3
+import datetime
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services.datetime_normalizer import (
+    LOCAL_TZ, normalize, to_epoch, epoch_bounds, epoch_to_local, backfill_normalized_columns,
+    normalized_columns, refresh_tz_offsets,
+)
+from services.pagination import keyset_page
+
+
+def _local_epoch(*args) -> int:
+    return int(datetime.datetime(*args, tzinfo=LOCAL_TZ).timestamp())
+
+
+def test_mixed_formats_normalize_to_same_instant():
+    expected = _local_epoch(2024, 12, 8, 8, 0)
+    for value in ("2024-12-08 08:00:00", "2024-12-08T08:00:00", datetime.datetime(2024, 12, 8, 8, 0)):
+        assert to_epoch(value) == expected
+    # Con zona explícita se convierte, no se reinterpreta
+    utc = datetime.datetime(2024, 12, 8, 8, 0, tzinfo=LOCAL_TZ).astimezone(datetime.timezone.utc)
+    assert to_epoch(utc.strftime("%Y-%m-%dT%H:%M:%SZ")) == expected
+    assert normalize("2024-12-08").local == datetime.datetime(2024, 12, 8)
+    assert normalize("no es una fecha") is None
+
+
+def test_local_date_follows_timezone():
+    # 01:30 UTC del día 9 sigue siendo día 8 en la zona local (UTC-3)
+    n = normalize("2024-12-09T01:30:00+00:00")
+    assert n.local_date == "2024-12-08"
+    assert epoch_to_local(n.ts) == datetime.datetime(2024, 12, 8, 22, 30)
+
+
+def test_epoch_bounds_date_only_to_is_inclusive():
+    lo, hi = epoch_bounds("2025-03-01", "2025-03-01")
+    assert lo == _local_epoch(2025, 3, 1)
+    assert hi == _local_epoch(2025, 3, 2)
+    assert epoch_bounds(None, None) == (None, None)
+
+
+def test_backfill_and_keyset_on_epoch(tmp_path):
+    db_path = str(tmp_path / "norm.db")
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executemany(
+        "INSERT INTO activities (fecha, tipo, distancia_km) VALUES (?, ?, ?)",
+        [("2025-03-01 23:30:00", "running", 5.0),
+         ("2025-03-02T00:15:00", "running", 7.0),
+         ("2025-03-02T02:00:00Z", "cycling", 20.0)],  # 23:00 local del día 1
+    )
+    # Los triggers de 0012 ya las rellenaron; el backfill cubre filas anteriores a ellos
+    assert backfill_normalized_columns(conn) == 0
+    conn.execute("UPDATE activities SET fecha_ts = NULL, fecha_local = NULL")
+    assert backfill_normalized_columns(conn) == 3
+    conn.commit()
+
+    days = [r[0] for r in conn.execute("SELECT fecha_local FROM activities ORDER BY fecha_ts")]
+    assert days == ["2025-03-01", "2025-03-01", "2025-03-02"]
+
+    rows, cursor = keyset_page(conn, "activities", ("fecha", "tipo"), 5, date_from="2025-03-01", date_to="2025-03-01")
+    assert [r["tipo"] for r in rows] == ["running", "cycling"]
+    assert cursor is None and "fecha_ts" not in rows[0]
+
+    # Los rollups agrupan por día local
+    daily = conn.execute("SELECT day, sport, sessions FROM daily_load ORDER BY day, sport").fetchall()
+    assert [tuple(r) for r in daily] == [("2025-03-01", "cycling", 1), ("2025-03-01", "running", 1), ("2025-03-02", "running", 1)]
+    conn.close()
+
+
+def test_triggers_normalize_raw_writes(tmp_path):
+    """INSERT crudo o UPDATE de la fecha: fecha_ts / fecha_local iguales a los de Python"""
+    db_path = str(tmp_path / "norm.db")
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    values = ["2024-12-08 08:00:00", "2026-02-07T21:11:11.848244", "2024-12-08", "2024-12-09T01:30:00+00:00",
+              "2024-12-08T23:30:00Z", "2010-01-15 10:00:00", "2010-07-15 10:00", "no es una fecha"]
+    for i, value in enumerate(values):
+        conn.execute("INSERT INTO activities (fecha, tipo, fuente) VALUES (?, 'running', ?)", (value, f"script {i}"))
+        conn.execute("INSERT INTO pain_logs (date, level) VALUES (?, 2)", (value,))
+    for table, column in (("activities", "fecha"), ("pain_logs", "date")):
+        rows = conn.execute(f"SELECT {column}, fecha_ts, fecha_local FROM {table} ORDER BY id").fetchall()
+        assert [(ts, local) for _, ts, local in rows] == [normalized_columns(v) for v in values]
+
+    conn.execute("UPDATE activities SET fecha = '2025-01-01 10:00:00' WHERE id = 1")
+    assert conn.execute("SELECT fecha_ts, fecha_local FROM activities WHERE id = 1").fetchone() == \
+        normalized_columns("2025-01-01 10:00:00")
+    # Si quien escribe trae las columnas, se respetan
+    conn.execute("UPDATE activities SET fecha = '2025-01-02', fecha_ts = 1, fecha_local = 'x' WHERE id = 1")
+    assert conn.execute("SELECT fecha_ts, fecha_local FROM activities WHERE id = 1").fetchone() == (1, "x")
+
+    # Los rollups cuentan cada actividad una vez, en su día local
+    conn.execute("UPDATE activities SET fecha = '2025-01-02 10:00:00' WHERE id = 1")
+    daily = dict(conn.execute("SELECT day, SUM(sessions) FROM daily_load WHERE sessions > 0 GROUP BY day"))
+    expected = dict(conn.execute(
+        "SELECT fecha_local, COUNT(*) FROM activities WHERE fecha_local IS NOT NULL GROUP BY fecha_local"))
+    assert daily == expected
+
+    # Otra zona: se regenera tz_offsets y los triggers la usan
+    assert refresh_tz_offsets(conn) is False
+    assert refresh_tz_offsets(conn, "UTC") is True
+    conn.execute("INSERT INTO biometrics (fecha, peso) VALUES ('2024-12-08 08:00:00', 70)")
+    ts = conn.execute("SELECT fecha_ts FROM biometrics").fetchone()[0]
+    assert ts == int(datetime.datetime(2024, 12, 8, 8, 0, tzinfo=datetime.timezone.utc).timestamp())
+    conn.close()
+
+
+def test_keyset_keeps_rows_without_epoch(tmp_path):
+    """Una fecha no interpretable no oculta la fila: va al final y el cursor la alcanza"""
+    db_path = str(tmp_path / "norm.db")
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executemany(
+        "INSERT INTO activities (fecha, tipo, fuente) VALUES (?, 'running', ?)",
+        [("2025-03-01 08:00:00", "a"), ("sin fecha", "b"), ("2025-03-02 08:00:00", "c"), ("??", "d")],
+    )
+    seen, cursor = [], None
+    while True:
+        rows, cursor = keyset_page(conn, "activities", ("fuente",), 1, cursor)
+        seen.extend(r["fuente"] for r in rows)
+        if not cursor:
+            break
+    assert seen == ["c", "a", "d", "b"]
+    rows, _ = keyset_page(conn, "activities", ("fuente",), 10, date_from="2025-01-01")
+    assert [r["fuente"] for r in rows] == ["c", "a"]
+    conn.close()
@@ -0,0 +1,140 @@
+import sys
+import os
+import threading
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.db_pool import SQLitePool
+
+
+def test_connection_pragmas(tmp_path):
+    pool = SQLitePool(str(tmp_path / "pool.db"), size=2)
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] < 0
+    pool.close_all()
+
+
+def test_connections_are_reused(tmp_path):
+    pool = SQLitePool(str(tmp_path / "pool.db"), size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert pool.stats()["created"] == 1
+    pool.close_all()
+
+
+def test_connection_is_reentrant_per_thread(tmp_path):
+    pool = SQLitePool(str(tmp_path / "pool.db"), size=1, timeout=0.5)
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            assert inner is outer
+        outer.execute("CREATE TABLE t (x INTEGER)")
+        outer.execute("INSERT INTO t VALUES (1)")
+        with pool.connection() as inner:
+            # Con transacción abierta la anidada comparte la misma conexión subyacente
+            assert inner._conn is outer
+    assert pool.stats()["created"] == 1
+    pool.close_all()
+
+
+def test_nested_commit_does_not_commit_callers_transaction(tmp_path):
+    pool = SQLitePool(str(tmp_path / "pool.db"), size=1, timeout=0.5)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+
+    with pool.connection() as outer:
+        outer.execute("INSERT INTO t VALUES (1)")
+        with pool.connection() as inner:
+            inner.execute("INSERT INTO t VALUES (2)")
+            inner.commit()
+        outer.rollback()
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+    with pool.connection() as outer:
+        outer.execute("INSERT INTO t VALUES (1)")
+        with pool.connection() as inner:
+            inner.execute("INSERT INTO t VALUES (2)")
+            inner.rollback()
+            inner.execute("INSERT INTO t VALUES (3)")
+        try:
+            with pool.connection() as inner:
+                inner.execute("INSERT INTO t VALUES (4)")
+                raise ValueError("falla el helper")
+        except ValueError:
+            pass
+        outer.commit()
+    with pool.connection() as conn:
+        assert [r[0] for r in conn.execute("SELECT x FROM t ORDER BY x")] == [1, 3]
+    pool.close_all()
+
+
+def test_uncommitted_work_is_rolled_back_on_release(tmp_path):
+    pool = SQLitePool(str(tmp_path / "pool.db"), size=1)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.close_all()
+
+
+def test_pool_is_thread_safe(tmp_path):
+    pool = SQLitePool(str(tmp_path / "pool.db"), size=3)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+
+    def worker(n):
+        for i in range(20):
+            with pool.connection() as conn:
+                conn.execute("INSERT INTO t VALUES (?)", (n * 100 + i,))
+                conn.commit()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 160
+    assert pool.stats()["created"] <= 3
+    pool.close_all()
+
+
+def test_run_db_keeps_event_loop_responsive(tmp_path):
+    import time
+    import asyncio
+    from services.db_pool import run_db, get_connection
+
+    db_path = str(tmp_path / "async.db")
+
+    def slow_query():
+        with get_connection(db_path) as conn:
+            time.sleep(0.3)  # simula una consulta lenta
+            return conn.execute("SELECT 1").fetchone()[0]
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        result = await run_db(slow_query)
+        task.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(main())
+    assert result == 1
+    assert ticks >= 10  # el loop siguió atendiendo mientras la consulta bloqueaba
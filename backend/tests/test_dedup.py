@@ -0,0 +1,93 @@
+import sys
+import os
+import sqlite3
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services.datetime_normalizer import normalized_columns
+from services.dedup import deduplicate, plan_merges
+
+
+def _row(id, fecha_ts, fuente, sport="running", distancia_km=10.0, **extra):
+    row = {"id": id, "fecha_ts": fecha_ts, "fuente": fuente, "sport_canonical": sport,
+           "distancia_km": distancia_km, "duracion_min": 50.0, "calorias": 600, "fc_media": 150,
+           "fc_max": 170, "elevacion_m": 20.0, "cadencia_media": 170, "nombre": "Rodaje"}
+    row.update(extra)
+    return row
+
+
+def test_plan_merges_sweep():
+    rows = [
+        _row(1, 1000, "Apple", distancia_km=0.0, fc_media=None),
+        _row(2, 1300, "Garmin V3 Sync", fc_media=None),
+        _row(3, 1400, "Garmin V3 Sync"),                     # misma fuente que 2: no se fusiona
+        _row(4, 5000, "Apple", sport="cycling"),
+        _row(5, 5100, "Garmin V3 Sync", sport="running"),    # deporte incompatible
+        _row(6, 9000, "Apple"),
+        _row(7, 9000 + 901, "Garmin V3 Sync"),               # fuera de la ventana
+    ]
+    plans = plan_merges(reversed(rows), window_s=900)
+    assert len(plans) == 1
+    plan = plans[0]
+    assert plan.keeper_id == 2
+    assert plan.duplicate_ids == [1]
+    assert plan.updates == {}  # Apple no aporta nada que Garmin no tenga
+
+    # La prioridad decide quién se conserva y los vacíos se completan con el duplicado
+    plans = plan_merges(rows[:2], window_s=900, priority=("apple", "garmin"))
+    assert plans[0].keeper_id == 1
+    assert plans[0].updates == {"distancia_km": 10.0}
+
+
+def test_deduplicate_applies_in_one_pass(tmp_path):
+    db_path = str(tmp_path / "dedup.db")
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    for fecha, fuente, distancia, fc in [
+        ("2025-03-01 08:00:00", "Garmin V3 Sync", 10.0, None),
+        ("2025-03-01 08:05:00", "Apple", 0.0, 148),
+        ("2025-03-02 08:00:00", "Apple", 5.0, 140),
+    ]:
+        fecha_ts, fecha_local = normalized_columns(fecha)
+        conn.execute(
+            "INSERT INTO activities (fecha, fecha_ts, fecha_local, tipo, distancia_km, fc_media, fuente) "
+            "VALUES (?, ?, ?, 'running', ?, ?, ?)",
+            (fecha, fecha_ts, fecha_local, distancia, fc, fuente),
+        )
+    conn.commit()
+
+    assert len(deduplicate(conn, dry_run=True)) == 1
+    assert conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == 3
+
+    plans = deduplicate(conn)
+    assert [p.duplicate_ids for p in plans] == [[2]]
+    rows = conn.execute("SELECT id, fuente, distancia_km, fc_media FROM activities ORDER BY id").fetchall()
+    assert rows == [(1, "Garmin V3 Sync", 10.0, 148), (3, "Apple", 5.0, 140)]
+    assert deduplicate(conn) == []
+    conn.close()
+
+
+def test_apply_merges_moves_pinned_gear_to_keeper(tmp_path):
+    db_path = str(tmp_path / "dedup.db")
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    for fecha, fuente in [("2025-03-01 08:00:00", "Garmin V3 Sync"), ("2025-03-01 08:02:00", "Apple")]:
+        fecha_ts, fecha_local = normalized_columns(fecha)
+        conn.execute(
+            "INSERT INTO activities (fecha, fecha_ts, fecha_local, tipo, distancia_km, fuente) "
+            "VALUES (?, ?, ?, 'running', 12.0, ?)",
+            (fecha, fecha_ts, fecha_local, fuente),
+        )
+    speedgoat = conn.execute("SELECT id FROM gear WHERE slug = 'speedgoat'").fetchone()[0]
+    conn.execute("DELETE FROM gear_activities WHERE activity_id = 2")
+    conn.execute("INSERT INTO gear_activities (activity_id, gear_id, km, pinned) VALUES (2, ?, 12.0, 1)", (speedgoat,))
+    conn.commit()
+    before = conn.execute("SELECT SUM(sessions) FROM gear").fetchone()[0]
+
+    assert [p.duplicate_ids for p in deduplicate(conn)] == [[2]]
+    assert conn.execute("SELECT activity_id, gear_id, pinned FROM gear_activities").fetchall() == [(1, speedgoat, 1)]
+    assert conn.execute("SELECT sessions, km FROM gear WHERE id = ?", (speedgoat,)).fetchone() == (1, 12.0)
+    assert conn.execute("SELECT SUM(sessions) FROM gear").fetchone()[0] == before - 1
+    conn.close()
@@ -0,0 +1,95 @@
+import sys
+import os
+import sqlite3
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services.db_pool import close_db_pools
+from services.equipment import EquipmentService
+
+
+def _db(tmp_path, rows=()):
+    db_path = str(tmp_path / "gear.db")
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO activities (fecha, tipo, nombre, distancia_km, elevacion_m) VALUES (?, ?, ?, ?, ?)", rows,
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def _odometer(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = {slug: (round(km, 1), sessions) for slug, km, sessions in conn.execute("SELECT slug, km, sessions FROM gear")}
+    conn.close()
+    return rows
+
+
+def test_ingest_assigns_gear_incrementally(tmp_path):
+    db_path = _db(tmp_path, [
+        ("2025-03-01 08:00:00", "running", "Rodaje", 8.0, 20.0),           # < 10 km -> brooks
+        ("2025-03-02 08:00:00", "running", "Fondo", 18.0, 30.0),           # kayano
+        ("2025-03-03 08:00:00", "running", "5K GP Montevideo", 5.0, 5.0),  # competición -> kayano
+        ("2025-03-04 08:00:00", "running", "Brooks test", 12.0, 10.0),     # nombrada -> brooks
+        ("2025-03-05 08:00:00", "trail_running", "Cerro", 15.0, 600.0),    # speedgoat
+        ("2024-01-10 08:00:00", "cycling", "Rambla", 30.0, 10.0),          # antes de la Trek
+        ("2025-03-06 08:00:00", "cycling", "Rambla", 40.0, 10.0),          # trek
+        ("2025-03-07 19:00:00", "tennis", None, None, None),               # babolat
+    ])
+    odo = _odometer(db_path)
+    assert odo["brooks"] == (20.0, 2)
+    assert odo["kayano"] == (23.0, 2)
+    assert odo["speedgoat"] == (15.0, 1)
+    assert odo["trek"] == (40.0, 1)
+    assert odo["babolat"] == (0.0, 1)
+
+    # Corregir distancia y borrar actividades mantiene los acumulados
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE activities SET distancia_km = 12.0 WHERE nombre = 'Rodaje'")  # pasa a kayano
+    conn.execute("DELETE FROM activities WHERE tipo = 'trail_running'")
+    conn.commit()
+    conn.close()
+    odo = _odometer(db_path)
+    assert odo["brooks"] == (12.0, 1)
+    assert odo["kayano"] == (35.0, 3)
+    assert odo["speedgoat"] == (0.0, 0)
+
+
+def test_snapshot_cached_until_invalidated(tmp_path):
+    db_path = _db(tmp_path, [("2025-03-06 08:00:00", "cycling", "Rambla", 40.0, 10.0)])
+    service = EquipmentService(db_path, equipment_file=tmp_path / "no-existe.md")
+    first = service.snapshot()
+    trek = next(g for g in first["gear"] if g["slug"] == "trek")
+    assert trek["total_km"] == 2490.0
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO activities (fecha, tipo, distancia_km) VALUES ('2025-03-08 08:00:00', 'cycling', 10.0)")
+    conn.commit()
+    conn.close()
+    assert service.snapshot() is first  # sin invalidar, sirve la caché
+
+    service.invalidate()
+    trek = next(g for g in service.snapshot()["gear"] if g["slug"] == "trek")
+    assert trek["km"] == 50.0
+
+    # Fijar a mano y editar material
+    assert service.assign_activity(1, "kayano")
+    service.update_gear("trek", {"since": "2026-01-01"})
+    odo = _odometer(db_path)
+    assert odo["kayano"] == (40.0, 1)
+    assert odo["trek"] == (0.0, 0)
+    close_db_pools()
+
+
+def test_update_gear_without_changes(tmp_path):
+    db_path = _db(tmp_path)
+    service = EquipmentService(db_path, equipment_file=tmp_path / "no-existe.md")
+    first = service.snapshot()
+    assert service.update_gear("no-existe", {}) is None
+    assert service.update_gear("trek", {"desconocido": 1})["slug"] == "trek"
+    assert service.snapshot() is first  # nada escrito: la caché sigue valiendo
+    close_db_pools()
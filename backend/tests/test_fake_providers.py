@@ -0,0 +1,52 @@
+import sys
+import os
+import datetime
+
+# Add backend and scripts to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(os.path.dirname(BACKEND_DIR), "scripts"))
+
+from fake_provider_server import FakeProviderState, MEASURE_PATH, OAUTH_PATH, STALE_TOKEN, local_garmin, start_in_thread
+from migrations import run_migrations
+from services import activity_frame, equipment, sync_service
+from services.sync_service import SyncService
+
+
+def test_sync_against_fake_providers(tmp_path, monkeypatch):
+    state = FakeProviderState(activities=120, measures=40, days=90, error_rate=0.0, token_ttl=5)
+    server, base_url = start_in_thread(state)
+    db_path = str(tmp_path / "fake.db")
+    run_migrations(db_path)
+    monkeypatch.setattr(activity_frame, "_activity_frame", activity_frame.ActivityFrame(db_path))
+    monkeypatch.setattr(equipment, "_equipment_service", equipment.EquipmentService(db_path))
+    monkeypatch.setattr(sync_service, "Garmin", local_garmin(base_url))
+    monkeypatch.setattr(sync_service, "WITHINGS_OAUTH_URL", base_url + OAUTH_PATH)
+    monkeypatch.setattr(sync_service, "WITHINGS_MEASURE_URL", base_url + MEASURE_PATH)
+    monkeypatch.setattr(sync_service, "BACKFILL_START", datetime.date.today() - datetime.timedelta(days=89))
+    monkeypatch.setattr(sync_service, "SYNC_WINDOW_DAYS", 10)
+
+    service = SyncService()
+    service.db_path = db_path
+    service.save_secret("garmin", {"email": "a@b.c", "password": "x"})
+    service.save_secret("withings_app", {"client_id": "id", "client_secret": "s"})
+    service.save_secret("withings_tokens", {"access_token": STALE_TOKEN, "refresh_token": "refresh-0"})
+    try:
+        garmin = service.sync_garmin()
+        withings = service.sync_withings()
+        # Segundo sync: solo se vuelve a pedir la ventana de hoy
+        before = state.stats["garmin_requests"]
+        again = service.sync_garmin()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert garmin["status"] == "success" and garmin["windows"] == 9
+    assert garmin["added"] + garmin["merged"] == len({(a["startTimeLocal"], a["activityType"]["typeKey"]) for a in state.activities})
+    assert withings == {"status": "success", "added": 40, "windows": 9}
+    # El token inicial está caducado: hubo 401 y al menos una renovación, guardada en secrets
+    assert state.stats["withings_401"] >= 1 and state.stats["withings_refreshes"] >= 1
+    assert service.get_secret("withings_tokens")["access_token"] == state.access_token
+    assert service.get_cursor("garmin") == datetime.date.today() - datetime.timedelta(days=1)
+    assert again["added"] == 0 and again["windows"] == 1
+    assert state.stats["garmin_requests"] - before == 1
@@ -0,0 +1,116 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import llm_clients
+from services.llm_clients import ASYNC, aclose_llm_clients, close_llm_clients, get_llm_client
+from services.model_health import HealthTracker
+from services.multi_model_client import MultiModelClient
+
+
+def test_clients_are_created_once_per_provider_and_key():
+    close_llm_clients()
+    openai_client = get_llm_client("openai", "sk-test")
+    assert get_llm_client("openai", "sk-test") is openai_client
+    assert get_llm_client("openai", "sk-other") is not openai_client
+    gemini = get_llm_client("gemini", "g-test")
+    assert get_llm_client("gemini", "g-test") is gemini
+    close_llm_clients()
+    assert get_llm_client("openai", "sk-test") is not openai_client
+    close_llm_clients()
+
+
+def test_async_clients_are_per_event_loop_and_closed_on_shutdown():
+    async def grab():
+        first = get_llm_client("anthropic", "sk-ant", ASYNC)
+        assert get_llm_client("anthropic", "sk-ant", ASYNC) is first
+        return first
+
+    close_llm_clients()
+    a, b = asyncio.run(grab()), asyncio.run(grab())
+    assert a is not b  # otro loop: otro pool httpx
+
+    async def shutdown():
+        get_llm_client("openai", "sk-test", ASYNC)
+        get_llm_client("anthropic", "sk-ant")
+        await aclose_llm_clients()
+
+    asyncio.run(shutdown())
+    assert llm_clients._clients == {}
+
+
+def test_gemini_async_client_is_per_loop_and_aio_closed(monkeypatch):
+    closed = []
+
+    class FakeAio:
+        def __init__(self, n):
+            self.n = n
+
+        async def aclose(self):
+            closed.append(("aio", self.n))
+
+    class FakeGenai:
+        built = 0
+
+        def __init__(self):
+            FakeGenai.built += 1
+            self.n = FakeGenai.built
+            self.aio = FakeAio(self.n)
+
+        def close(self):
+            closed.append(("sync", self.n))
+
+    monkeypatch.setattr(llm_clients, "_build", lambda provider, kind, api_key: FakeGenai())
+    close_llm_clients()
+
+    async def grab():
+        return get_llm_client("gemini", "g-test", ASYNC)
+
+    # Cada loop su cliente: el pool httpx de .aio no puede cruzar loops
+    loop = asyncio.new_event_loop()
+    a = loop.run_until_complete(grab())
+    b = asyncio.run(grab())
+    assert a is not b and get_llm_client("gemini", "g-test") not in (a, b)
+
+    # Shutdown síncrono: el .aio del loop aún abierto se cierra en ese loop
+    close_llm_clients()
+    loop.close()
+    assert ("aio", a.n) in closed and ("sync", a.n) in closed
+
+    async def shutdown():
+        c = await grab()
+        await aclose_llm_clients()
+        return c
+
+    c = asyncio.run(shutdown())
+    assert ("aio", c.n) in closed and ("sync", c.n) in closed
+    assert llm_clients._clients == {}
+
+
+def test_multi_model_client_reuses_sdk_client(monkeypatch):
+    built = []
+
+    class FakeCompletions:
+        def create(self, **kwargs):
+            msg = type("M", (), {"content": f"ok {kwargs['model']}"})
+            return type("R", (), {"choices": [type("C", (), {"message": msg})]})
+
+    class FakeOpenAI:
+        def __init__(self, api_key):
+            built.append(api_key)
+            self.chat = type("Chat", (), {"completions": FakeCompletions()})
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(llm_clients, "_build", lambda provider, kind, api_key: FakeOpenAI(api_key))
+    close_llm_clients()
+    client = MultiModelClient({"openai": "sk-test"})
+    client.health = HealthTracker()
+    assert client.generate("hola") == "ok gpt-4o"
+    assert client.generate("otra vez") == "ok gpt-4o"
+    assert built == ["sk-test"]
+    close_llm_clients()
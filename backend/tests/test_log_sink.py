@@ -0,0 +1,74 @@
+import sys
+import os
+import time
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.log_sink import LogSink
+
+
+def test_lines_are_written_on_flush(tmp_path):
+    path = str(tmp_path / "app.log")
+    sink = LogSink(path, batch_size=1000, flush_interval_s=60)
+    for i in range(10):
+        sink.write(f"linea {i}")
+    assert sink.flush()
+    with open(path, encoding="utf-8") as f:
+        assert f.read().splitlines() == [f"linea {i}" for i in range(10)]
+    sink.close()
+
+
+def test_time_threshold_flushes_partial_batch(tmp_path):
+    path = str(tmp_path / "app.log")
+    sink = LogSink(path, batch_size=1000, flush_interval_s=0.05)
+    sink.write("sola")
+    time.sleep(0.3)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "sola\n"
+    sink.close()
+
+
+def test_rotation_keeps_backup_count(tmp_path):
+    path = str(tmp_path / "app.log")
+    sink = LogSink(path, max_bytes=100, backup_count=2, batch_size=1, flush_interval_s=60)
+    for i in range(30):
+        sink.write("x" * 19)  # 20 bytes por línea -> 5 líneas por fichero
+    sink.close()
+    names = sorted(os.listdir(tmp_path))
+    assert names == ["app.log", "app.log.1", "app.log.2"]
+    for name in names:
+        assert os.path.getsize(tmp_path / name) <= 100
+
+
+def test_close_drains_queue_and_ignores_later_writes(tmp_path):
+    path = str(tmp_path / "app.log")
+    sink = LogSink(path, batch_size=1000, flush_interval_s=60)
+    for i in range(500):
+        sink.write(f"{i}")
+    sink.close()
+    sink.write("tarde")
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 500 and lines[-1] == "499"
+
+
+def test_handler_keeps_logging_after_sinks_are_closed(tmp_path):
+    import logging
+    from services.log_sink import LogSinkHandler, close_log_sinks, get_log_sink
+
+    path = str(tmp_path / "handler.log")
+    log = logging.getLogger("test_log_sink.handler")
+    log.propagate = False
+    handler = LogSinkHandler(path)
+    log.addHandler(handler)
+    try:
+        log.warning("antes")
+        close_log_sinks()  # shutdown de la API
+        log.warning("despues")
+        assert get_log_sink(path).flush()
+        with open(path, encoding="utf-8") as f:
+            assert f.read().splitlines() == ["antes", "despues"]
+    finally:
+        log.removeHandler(handler)
+        close_log_sinks()
@@ -0,0 +1,131 @@
+import sys
+import os
+import sqlite3
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations, get_schema_version, discover_migrations
+
+
+def _index_names(db_path):
+    conn = sqlite3.connect(db_path)
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'")}
+    conn.close()
+    return names
+
+
+def test_migrations_apply_on_empty_db(tmp_path):
+    db_path = str(tmp_path / "fresh.db")
+    applied = run_migrations(db_path)
+
+    latest = discover_migrations()[-1].version
+    assert applied == [m.version for m in discover_migrations()]
+    assert get_schema_version(db_path) == latest
+    assert "idx_activities_fecha" in _index_names(db_path)
+    assert "idx_hitl_actions_status_expires" in _index_names(db_path)
+
+
+def test_migrations_are_idempotent(tmp_path):
+    db_path = str(tmp_path / "twice.db")
+    run_migrations(db_path)
+    assert run_migrations(db_path) == []
+
+
+def test_legacy_scripts_are_not_migrations():
+    names = [m.name for m in discover_migrations()]
+    assert "add_multi_model_support" not in names
+
+
+def test_recent_activities_use_index(tmp_path):
+    db_path = str(tmp_path / "plan.db")
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    plan = " ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN SELECT * FROM activities ORDER BY fecha DESC LIMIT 50"))
+    conn.close()
+    assert "idx_activities_fecha" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_normalized_date_columns_are_indexed(tmp_path):
+    db_path = str(tmp_path / "norm.db")
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    for table in ("activities", "biometrics", "pain_logs"):
+        cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+        assert {"fecha_ts", "fecha_local"} <= cols
+    plan = " ".join(r[3] for r in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM activities WHERE fecha_ts >= ? AND fecha_ts < ? ORDER BY fecha_ts DESC", (0, 1)))
+    conn.close()
+    assert "idx_activities_fecha_ts" in plan
+
+
+def test_migrations_do_not_import_services():
+    # Las migraciones quedan congeladas: si importaran servicios, cambiar un
+    # servicio alteraría en silencio lo que produce una migración ya aplicada.
+    for m in discover_migrations():
+        with open(m.path, encoding="utf-8") as f:
+            source = f.read()
+        assert "from services" not in source and "import services" not in source, m.path
+
+
+def test_keyset_index_replaces_fecha_tipo(tmp_path):
+    db_path = str(tmp_path / "keyset.db")
+    run_migrations(db_path)
+    assert "idx_activities_fecha_tipo" not in _index_names(db_path)
+
+
+def _migrate_until(db_path, tmp_path, last_version):
+    """Aplica solo las migraciones hasta `last_version` (copiadas a un directorio aparte)."""
+    import shutil
+    partial = tmp_path / f"until_{last_version}"
+    partial.mkdir()
+    for m in discover_migrations():
+        if m.version <= last_version:
+            shutil.copy(m.path, partial)
+    run_migrations(db_path, str(partial))
+
+
+def _insert_activity(conn, fuente, distancia=None, fc=None, nombre=None):
+    conn.execute(
+        "INSERT INTO activities (fecha, fecha_ts, fecha_local, tipo, fuente, distancia_km, fc_media, nombre) "
+        "VALUES ('2025-03-01 08:00:00', 1740826800, '2025-03-01', 'running', ?, ?, ?, ?)",
+        (fuente, distancia, fc, nombre),
+    )
+
+
+def test_natural_keys_merge_repeated_rows(tmp_path):
+    db_path = str(tmp_path / "dups.db")
+    _migrate_until(db_path, tmp_path, 8)
+    conn = sqlite3.connect(db_path)
+    _insert_activity(conn, "Garmin V3 Sync", distancia=10.0)
+    _insert_activity(conn, "Garmin V3 Sync", fc=150, nombre="Rodaje")
+    conn.execute("INSERT INTO activity_streams (activity_id, path, start_ts, samples, channels) "
+                 "VALUES (2, '/streams/2.npy', 1740826800, 60, 'hr')")
+    conn.commit()
+    conn.close()
+
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT id, distancia_km, fc_media, nombre FROM activities").fetchall() == [(1, 10.0, 150, "Rodaje")]
+    assert conn.execute("SELECT activity_id, path FROM activity_streams").fetchall() == [(1, "/streams/2.npy")]
+    conn.close()
+
+
+def test_natural_keys_abort_on_conflicting_rows(tmp_path):
+    import pytest
+
+    db_path = str(tmp_path / "conflict.db")
+    _migrate_until(db_path, tmp_path, 8)
+    conn = sqlite3.connect(db_path)
+    _insert_activity(conn, "Garmin V3 Sync", distancia=10.0)
+    _insert_activity(conn, "Garmin V3 Sync", distancia=12.0)
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(RuntimeError, match="datos distintos"):
+        run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == 2
+    assert get_schema_version(db_path) == 8
+    conn.close()
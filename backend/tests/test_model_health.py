@@ -0,0 +1,148 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services import cost_control as cost_control_module
+from services.model_health import CLOSED, HALF_OPEN, OPEN, HealthTracker
+from services.multi_model_client import MultiModelClient
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = _Clock()
+    health = HealthTracker(window=10, failures=3, cooldown_s=30, max_cooldown_s=100, clock=clock)
+    for _ in range(2):
+        health.record_failure("gemini", "pro", RuntimeError("timeout"))
+    assert health.state("gemini", "pro") == CLOSED
+    health.record_failure("gemini", "pro", RuntimeError("timeout"))
+    assert health.state("gemini", "pro") == OPEN and not health.allow("gemini", "pro")
+
+    # Vencido el enfriamiento: una sola prueba
+    clock.now += 30
+    assert health.allow("gemini", "pro") and health.state("gemini", "pro") == HALF_OPEN
+    assert not health.allow("gemini", "pro")
+    # La prueba falla: vuelve a open con el enfriamiento duplicado
+    health.record_failure("gemini", "pro", RuntimeError("timeout"))
+    clock.now += 30
+    assert not health.allow("gemini", "pro")
+    clock.now += 30
+    assert health.allow("gemini", "pro")
+    health.record_success("gemini", "pro", 1.2)
+    assert health.state("gemini", "pro") == CLOSED
+    assert health.snapshot()["gemini/pro"]["error_rate"] == 0.0
+
+
+def test_rate_limit_opens_immediately():
+    health = HealthTracker(clock=_Clock())
+    health.record_failure("gemini", "pro", RuntimeError("429 RESOURCE_EXHAUSTED"))
+    assert health.state("gemini", "pro") == OPEN
+
+
+def test_order_by_cost_tier_then_latency():
+    health = HealthTracker(clock=_Clock())
+    configs = [
+        {"provider": "gemini", "model": "pro", "cost": "free"},
+        {"provider": "gemini", "model": "flash", "cost": "free"},
+        {"provider": "gemini", "model": "lite", "cost": "free"},
+        {"provider": "openai", "model": "gpt-4o", "cost": "paid"},
+    ]
+    health.record_success("gemini", "pro", 6.0)
+    health.record_success("gemini", "flash", 0.8)
+    health.record_success("openai", "gpt-4o", 0.1)
+    order = [c["model"] for c in health.order(configs)]
+    # Medidos por latencia, luego los sin medir; el pago siempre al final
+    assert order == ["flash", "pro", "lite", "gpt-4o"]
+
+
+def test_order_stale_latency_returns_model_to_its_priority():
+    clock = _Clock()
+    health = HealthTracker(latency_ttl_s=600, clock=clock)
+    configs = [
+        {"provider": "gemini", "model": "pro", "cost": "free"},
+        {"provider": "gemini", "model": "flash", "cost": "free"},
+    ]
+    health.record_success("gemini", "pro", 60.0)
+    health.record_success("gemini", "flash", 0.8)
+    assert [c["model"] for c in health.order(configs)] == ["flash", "pro"]
+
+    # flash se sigue usando (y midiendo); pro no, pero su medida caduca
+    clock.now += 601
+    health.record_success("gemini", "flash", 0.8)
+    assert [c["model"] for c in health.order(configs)] == ["pro", "flash"]
+
+    # Re-medida: la latencia caducada no pesa en el nuevo EWMA
+    health.record_success("gemini", "pro", 0.5)
+    assert [c["model"] for c in health.order(configs)] == ["pro", "flash"]
+
+
+def test_fallback_skips_open_model_without_calling_it():
+    calls = []
+    client = MultiModelClient({"gemini": "g"})
+    client.health = HealthTracker(clock=_Clock())
+    client.fallback_order = [
+        {"provider": "gemini", "model": "pro", "cost": "free", "priority": 0},
+        {"provider": "gemini", "model": "flash", "cost": "free", "priority": 1},
+    ]
+
+    async def fake_gemini(prompt, system_instruction, model, max_tokens):
+        calls.append(model)
+        if model == "pro":
+            raise RuntimeError("429 quota exceeded")
+        return f"ok {model}"
+
+    client._acall_gemini = fake_gemini
+    assert asyncio.run(client.agenerate("hola")) == "ok flash"
+    assert asyncio.run(client.agenerate("hola")) == "ok flash"
+    assert calls == ["pro", "flash", "flash"]
+
+
+def test_cost_control_rules_are_cached_and_invalidated(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "cost.db")
+    run_migrations(db_path)
+    monkeypatch.setattr(cost_control_module, "DB_PATH", db_path)
+    cc = cost_control_module.CostControl()
+    assert cc.is_provider_allowed("gemini") and not cc.is_provider_allowed("openai")
+
+    queries = []
+    original = cost_control_module.get_connection
+    monkeypatch.setattr(cost_control_module, "get_connection", lambda path: queries.append(path) or original(path))
+    for _ in range(5):
+        cc.is_provider_allowed("openai")
+    assert queries == []
+
+    cc.enable_paid_models()
+    assert cc.is_provider_allowed("openai")
+    cc.disable_paid_models()
+    assert not cc.is_provider_allowed("openai")
+
+
+def test_ttft_percentile_needs_enough_samples():
+    health = HealthTracker()
+    for latency in (0.5, 0.1, 0.4):
+        health.record_success("gemini", "flash", latency, ttft=True)
+    assert health.ttft_percentile("gemini", "flash", 90) is None
+    for latency in (0.2, 0.3, 1.0):
+        health.record_success("gemini", "flash", latency, ttft=True)
+    assert health.ttft_percentile("gemini", "flash", 50) == 0.4
+    assert health.ttft_percentile("gemini", "flash", 90) == 1.0
+
+
+def test_full_response_latency_does_not_feed_hedge_threshold():
+    """Las respuestas completas (generate) son mucho más lentas que un primer token"""
+    health = HealthTracker()
+    for latency in (0.2, 0.3, 0.2, 0.4, 0.3):
+        health.record_success("gemini", "flash", latency, ttft=True)
+    for _ in range(20):
+        health.record_success("gemini", "flash", 12.0)
+    assert health.ttft_percentile("gemini", "flash", 90) == 0.4
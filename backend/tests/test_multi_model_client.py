@@ -0,0 +1,179 @@
+import sys
+import os
+import asyncio
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import llm_clients
+from services.llm_clients import close_llm_clients
+from services.model_health import HealthTracker
+from services.multi_model_client import MultiModelClient
+
+
+class _FakeAsyncOpenAI:
+    def __init__(self, gate):
+        async def create(**kwargs):
+            # Espera a otra corrutina: si la llamada bloqueara el loop, nunca llegaría
+            await gate.wait()
+            msg = type("M", (), {"content": f"async {kwargs['model']}"})
+            return type("R", (), {"choices": [type("C", (), {"message": msg})]})
+
+        self.chat = type("Chat", (), {"completions": type("Comp", (), {"create": staticmethod(create)})})
+
+
+class _BrokenGemini:
+    def __init__(self):
+        async def generate_content(**kwargs):
+            raise RuntimeError("429 quota")
+
+        models = type("Models", (), {"generate_content": staticmethod(generate_content)})
+        self.aio = type("Aio", (), {"models": models})
+
+    def close(self):
+        pass
+
+
+def test_agenerate_falls_back_without_blocking_the_loop(monkeypatch):
+    close_llm_clients()
+
+    async def scenario():
+        gate = asyncio.Event()
+        clients = {"gemini": _BrokenGemini(), "openai": _FakeAsyncOpenAI(gate)}
+        monkeypatch.setattr(llm_clients, "_build", lambda provider, kind, api_key: clients[provider])
+        client = MultiModelClient({"gemini": "g", "openai": "sk"})
+        client.health = HealthTracker()
+
+        async def open_gate():
+            gate.set()
+
+        result, _ = await asyncio.gather(client.agenerate("hola", "sistema"), open_gate())
+        return result, client.current_provider
+
+    result, provider = asyncio.run(scenario())
+    assert result == "async gpt-4o" and provider == "openai"
+    llm_clients._clients.clear()
+
+
+def test_agenerate_raises_when_every_model_fails(monkeypatch):
+    close_llm_clients()
+    monkeypatch.setattr(llm_clients, "_build", lambda provider, kind, api_key: _BrokenGemini())
+    client = MultiModelClient({"gemini": "g"})
+    client.health = HealthTracker()
+    try:
+        asyncio.run(client.agenerate("hola"))
+        assert False, "debía fallar"
+    except Exception as e:
+        assert "Todos los modelos fallaron" in str(e)
+    close_llm_clients()
+
+
+def _gated_streams(client, gates, calls, closed):
+    """Sustituye los streams por fakes: cada modelo espera su Event antes del primer token."""
+    def fake(provider):
+        async def stream(prompt, system_instruction, model, max_tokens):
+            calls.append(model)
+            try:
+                await gates[model].wait()
+                yield f"{model}:1"
+                yield f"{model}:2"
+            finally:
+                closed.append(model)
+        return stream
+    client._call_gemini_stream = fake("gemini")
+    client._call_openai_stream = fake("openai")
+
+
+async def _collect(agen):
+    return [chunk async for chunk in agen]
+
+
+def _hedge_client(monkeypatch, api_keys, cost_control=None):
+    from services import multi_model_client
+    monkeypatch.setattr(multi_model_client, "LLM_HEDGE_DELAY_S", 0.0)
+    client = MultiModelClient(api_keys, cost_control)
+    client.health = HealthTracker()
+    client.fallback_order = [c for c in client.fallback_order
+                             if c["model"] in ("gemini-2.5-pro", "gemini-2.5-flash", "gpt-4o")]
+    return client
+
+
+def test_hedged_stream_slow_primary_loses_and_is_cancelled(monkeypatch):
+    client = _hedge_client(monkeypatch, {"gemini": "g"})
+    calls, closed = [], []
+
+    async def scenario():
+        gates = {"gemini-2.5-pro": asyncio.Event(), "gemini-2.5-flash": asyncio.Event()}
+        _gated_streams(client, gates, calls, closed)
+
+        async def release_hedge():
+            # El hedge arranca tras el umbral (0 s aquí); el principal nunca da su token
+            while "gemini-2.5-flash" not in calls:
+                await asyncio.sleep(0)
+            gates["gemini-2.5-flash"].set()
+
+        chunks, _ = await asyncio.gather(_collect(client.generate_stream("hola", hedge=True)), release_hedge())
+        return chunks
+
+    chunks = asyncio.run(scenario())
+    assert chunks == ["gemini-2.5-flash:1", "gemini-2.5-flash:2"]
+    assert calls == ["gemini-2.5-pro", "gemini-2.5-flash"]
+    assert "gemini-2.5-pro" in closed
+    assert client.current_model == "gemini-2.5-flash"
+    # Cancelar al perdedor no cuenta como fallo suyo
+    assert client.health.snapshot()["gemini/gemini-2.5-pro"]["samples"] == 0
+
+
+def test_hedged_stream_fast_primary_does_not_hedge(monkeypatch):
+    client = _hedge_client(monkeypatch, {"gemini": "g"})
+    calls, closed = [], []
+    for _ in range(5):
+        client.health.record_success("gemini", "gemini-2.5-pro", 60.0, ttft=True)
+
+    async def scenario():
+        gates = {"gemini-2.5-pro": asyncio.Event(), "gemini-2.5-flash": asyncio.Event()}
+        gates["gemini-2.5-pro"].set()
+        _gated_streams(client, gates, calls, closed)
+        return await _collect(client.generate_stream("hola", hedge=True))
+
+    assert asyncio.run(scenario()) == ["gemini-2.5-pro:1", "gemini-2.5-pro:2"]
+    assert calls == ["gemini-2.5-pro"]
+
+
+def test_hedged_stream_never_hedges_into_paid_models(monkeypatch):
+    class AllowAll:
+        def is_provider_allowed(self, provider):
+            return True
+
+    client = _hedge_client(monkeypatch, {"gemini": "g", "openai": "sk"}, AllowAll())
+    client.fallback_order = [c for c in client.fallback_order if c["model"] in ("gemini-2.5-pro", "gpt-4o")]
+    calls, closed = [], []
+
+    async def scenario():
+        gates = {"gemini-2.5-pro": asyncio.Event(), "gpt-4o": asyncio.Event()}
+        gates["gpt-4o"].set()
+        _gated_streams(client, gates, calls, closed)
+
+        async def release_primary():
+            # Varias vueltas del loop: si hubiera hedge al modelo pago ya habría empezado
+            for _ in range(20):
+                await asyncio.sleep(0)
+            gates["gemini-2.5-pro"].set()
+
+        chunks, _ = await asyncio.gather(_collect(client.generate_stream("hola", hedge=True)), release_primary())
+        return chunks
+
+    assert asyncio.run(scenario()) == ["gemini-2.5-pro:1", "gemini-2.5-pro:2"]
+    assert calls == ["gemini-2.5-pro"]
+
+
+def test_hedged_stream_falls_back_when_racers_fail(monkeypatch):
+    client = _hedge_client(monkeypatch, {"gemini": "g"})
+
+    async def broken(prompt, system_instruction, model, max_tokens):
+        raise RuntimeError(f"{model} caído")
+        yield
+
+    client._call_gemini_stream = broken
+    chunks = asyncio.run(_collect(client.generate_stream("hola", hedge=True)))
+    assert len(chunks) == 1 and "Todos los modelos de IA fallaron" in chunks[0]
@@ -0,0 +1,60 @@
+import sys
+import os
+
+import requests
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import provider_http
+
+
+class _Response:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+def _script(monkeypatch, outcomes):
+    calls, sleeps = [], []
+    session = provider_http.get_http_session("test")
+
+    def fake_request(method, url, timeout=None, **kwargs):
+        calls.append(timeout)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(session, "request", fake_request)
+    monkeypatch.setattr(provider_http.time, "sleep", sleeps.append)
+    return calls, sleeps
+
+
+def test_session_is_shared_per_provider():
+    assert provider_http.get_http_session("a") is provider_http.get_http_session("a")
+    assert provider_http.get_http_session("a") is not provider_http.get_http_session("b")
+
+
+def test_retries_429_and_5xx_with_backoff(monkeypatch):
+    calls, sleeps = _script(monkeypatch, [
+        _Response(429, {"Retry-After": "2"}),
+        requests.ConnectionError("reset"),
+        _Response(503),
+        _Response(200),
+    ])
+    response = provider_http.request("test", "POST", "https://example.invalid", retries=3)
+    assert response.status_code == 200
+    assert len(calls) == 4 and all(t is not None for t in calls)  # siempre con timeout
+    assert sleeps[0] == 2.0
+    assert 0 <= sleeps[1] <= provider_http.PROVIDER_HTTP_BACKOFF_S * 2
+    assert 0 <= sleeps[2] <= provider_http.PROVIDER_HTTP_BACKOFF_S * 4
+
+
+def test_gives_up_after_retries(monkeypatch):
+    _, sleeps = _script(monkeypatch, [_Response(500), _Response(502)])
+    assert provider_http.request("test", "GET", "https://example.invalid", retries=1).status_code == 502
+    assert len(sleeps) == 1
@@ -0,0 +1,49 @@
+import sys
+import os
+import sqlite3
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services.sport_taxonomy import classify_activity
+
+CASES = [
+    ("running", "Maraton de Montevideo", 42.2, 20.0),
+    ("Carrera", "Fondo domingo", 18.0, 30.0),
+    ("running", "Entrenamiento largo", 18.0, 30.0),
+    ("run", None, 8.0, None),
+    ("running", "Cerro", 10.0, 250.0),
+    ("Competición Trail", "Aventura", 21.0, 900.0),
+    ("Competición Calle", "10K", 10.0, 5.0),
+    ("Ciclismo", "Rambla", 40.0, 20.0),
+    ("tennis", None, None, None),
+    ("Breathwork", None, None, None),
+    ("Paddle", None, None, None),
+    (None, None, None, None),
+]
+
+
+def test_triggers_match_python_classification(tmp_path):
+    db_path = str(tmp_path / "sport.db")
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO activities (fecha, tipo, nombre, distancia_km, elevacion_m) VALUES ('2025-05-01 08:00:00', ?, ?, ?, ?)",
+        CASES,
+    )
+    rows = conn.execute("SELECT sport_canonical, sport_label FROM activities ORDER BY id").fetchall()
+    assert rows == [classify_activity(*case) for case in CASES]
+
+    # Reclasificación al corregir el tipo
+    conn.execute("UPDATE activities SET tipo = 'Tenis' WHERE id = 1")
+    assert conn.execute("SELECT sport_canonical, sport_label FROM activities WHERE id = 1").fetchone() == ("tennis", "Tenis")
+    conn.close()
+
+
+def test_known_labels():
+    assert classify_activity("running", "Maraton", 42.0) == ("running", "Competición Calle")
+    assert classify_activity("running", "", 20.0) == ("running", "Fondo Largo")
+    assert classify_activity("running", "", 5.0) == ("running", "Running Entreno")
+    assert classify_activity("hiking") == ("trail", "Trail Running")
+    assert classify_activity("Yoga") == ("otros", "Yoga")
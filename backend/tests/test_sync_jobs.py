@@ -0,0 +1,105 @@
+import sys
+import os
+import asyncio
+import threading
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.sync_jobs import STAGES, SyncJobConflict, SyncJobManager
+
+
+def test_providers_run_concurrently_and_stream_events():
+    release = threading.Event()
+    # Solo se cruza si los dos proveedores están dentro a la vez
+    both_running = threading.Barrier(2, timeout=5)
+
+    def provider(added, fail=False):
+        def run(progress):
+            progress("fetched", count=added)
+            both_running.wait()
+            assert release.wait(5)
+            if fail:
+                raise RuntimeError("sin red")
+            progress("inserted", count=added)
+            return {"status": "success", "added": added}
+        return run
+
+    manager = SyncJobManager({"garmin": provider(2), "withings": provider(1, fail=True)})
+    job = manager.start()
+    assert not job.done  # responde sin esperar a los proveedores
+    assert manager.start() is job  # un trabajo en curso no se duplica
+    assert manager.start(["withings"]) is job  # ya lo cubre el que está en curso
+    release.set()
+
+    async def collect():
+        return [event async for event in job.stream()]
+
+    events = asyncio.run(collect())
+    assert events[-1]["stage"] == "done"
+    assert [e["seq"] for e in events] == list(range(len(events)))
+    stages = [(e["provider"], e["stage"]) for e in events]
+    assert set(stages) >= {
+        ("garmin", "fetched"), ("garmin", "inserted"), ("withings", "fetched"), ("withings", "finished"),
+    }
+    # Ambos arrancaron antes de que terminara cualquiera de los dos
+    first_finished = min(i for i, (_, stage) in enumerate(stages) if stage == "finished")
+    assert {("garmin", "fetched"), ("withings", "fetched")} <= set(stages[:first_finished])
+    assert job.results["garmin"] == {"status": "success", "added": 2}
+    assert job.results["withings"]["status"] == "error"
+    assert job.snapshot()["status"] == "done"
+
+    # Terminado: se puede lanzar otro y el anterior sigue consultable
+    assert manager.start() is not job
+    assert manager.get(job.id) is job
+    manager.shutdown()
+
+
+def test_start_refuses_providers_not_in_running_job():
+    release = threading.Event()
+    manager = SyncJobManager({
+        "garmin": lambda progress: release.wait(5) and {"status": "success", "added": 0},
+        "withings": lambda progress: {"status": "success", "added": 0},
+    })
+    job = manager.start(["garmin"])
+    try:
+        # Devolver el de Garmin haría creer que Withings se está sincronizando
+        manager.start(["withings"])
+        assert False, "debía rechazar el trabajo"
+    except SyncJobConflict as e:
+        assert e.running is job
+    release.set()
+    job.wait()
+    assert manager.start(["withings"]) is not job
+    manager.shutdown()
+
+
+def test_real_sync_progress_uses_frontend_stages(tmp_path, monkeypatch):
+    """Las etapas que emite SyncService.run_windows son las que escucha el frontend"""
+    from datetime import date
+    from migrations import run_migrations
+    from services import sync_service
+    from services.sync_service import SyncService
+
+    monkeypatch.setattr(sync_service, "SYNC_WINDOW_DAYS", 7)
+    service = SyncService()
+    service.db_path = str(tmp_path / "sync.db")
+    run_migrations(service.db_path)
+
+    def garmin(progress):
+        inserted, windows = service.run_windows(
+            "garmin", date(2024, 1, 1), date(2024, 1, 14), lambda a, b: [], lambda conn, items: 0, progress)
+        progress("inserted", count=inserted)
+        return {"status": "success", "windows": windows}
+
+    manager = SyncJobManager({"garmin": garmin})
+    job = manager.start()
+
+    async def collect():
+        return [event async for event in job.stream()]
+
+    events = asyncio.run(collect())
+    stages = [e["stage"] for e in events if e["provider"] == "garmin"]
+    assert stages == ["started", "fetched", "fetched", "inserted", "finished"]
+    assert set(stages) <= set(STAGES)
+    manager.shutdown()
@@ -0,0 +1,81 @@
+import sys
+import os
+import asyncio
+import sqlite3
+from datetime import datetime
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services.data_events import publish_data_changed, subscribe
+from services.datetime_normalizer import LOCAL_TZ, to_epoch
+from services.sync_jobs import SyncJobManager
+from services.sync_scheduler import SyncScheduler, usual_training_hours
+
+
+def _at(hour, minute=0):
+    return datetime(2025, 3, 4, hour, minute, tzinfo=LOCAL_TZ)
+
+
+def test_usual_training_hours_from_history(tmp_path):
+    db_path = str(tmp_path / "sched.db")
+    run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    # Siete salidas que terminan a las 7 y una suelta a las 21
+    rows = [(f"2025-03-0{d} 06:30:00", to_epoch(f"2025-03-0{d} 06:30:00"), 45) for d in range(1, 8)]
+    rows.append(("2025-03-08 20:30:00", to_epoch("2025-03-08 20:30:00"), 40))
+    conn.executemany("INSERT INTO activities (fecha, fecha_ts, tipo, duracion_min) VALUES (?, ?, 'running', ?)", rows)
+    hours = usual_training_hours(conn, min_share=0.2, now=to_epoch("2025-03-09 12:00:00"))
+    assert hours == {7, 8}
+    conn.close()
+
+
+def test_next_delay_adapts_to_hours_and_idle_runs():
+    scheduler = SyncScheduler(SyncJobManager({}), interval_s=3600, active_interval_s=600,
+                              max_interval_s=4 * 3600, training_hours=(7, 8))
+    assert scheduler.next_delay(_at(7, 30)) == 600
+    assert scheduler.next_delay(_at(12)) == 3600
+    # Fuera de horas activas se despierta al empezar la siguiente
+    assert scheduler.next_delay(_at(6, 30)) == 1800
+
+    scheduler.idle_runs = 3
+    assert scheduler.next_delay(_at(7, 30)) == 3600
+    assert scheduler.next_delay(_at(12)) == 4 * 3600
+
+    # Meses sin datos nuevos: el exponente está acotado, no desborda
+    scheduler.idle_runs = 5000
+    assert scheduler.next_delay(_at(12)) == 4 * 3600
+
+
+def test_run_once_backs_off_and_publishes_data_changed():
+    results = iter([{"status": "success", "added": 0}, {"status": "success", "added": 2}])
+    events = []
+    unsubscribe = subscribe(events.append)
+    manager = SyncJobManager({"garmin": lambda progress: next(results)})
+    scheduler = SyncScheduler(manager, training_hours=(7,))
+    try:
+        first = asyncio.run(scheduler.run_once())
+        assert first["added"] == {} and scheduler.idle_runs == 1 and events == []
+
+        second = asyncio.run(scheduler.run_once())
+        assert second["added"] == {"garmin": 2} and scheduler.idle_runs == 0
+        assert [e["added"] for e in events] == [{"garmin": 2}]
+    finally:
+        unsubscribe()
+        manager.shutdown()
+
+
+def test_failing_listener_does_not_block_others():
+    seen = []
+
+    def broken(event):
+        raise RuntimeError("boom")
+
+    undo = [subscribe(broken), subscribe(seen.append)]
+    try:
+        publish_data_changed("test", rows=1)
+    finally:
+        for u in undo:
+            u()
+    assert seen and seen[0]["rows"] == 1
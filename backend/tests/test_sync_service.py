@@ -0,0 +1,183 @@
+import sys
+import os
+import sqlite3
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services.sync_service import SyncService, garmin_activity_row, withings_biometric_row
+
+
+def _garmin(start, tipo="running", km=10.0):
+    return {"startTimeLocal": start, "activityType": {"typeKey": tipo}, "distance": km * 1000, "duration": 3000}
+
+
+def _conn(tmp_path):
+    db_path = str(tmp_path / "sync.db")
+    run_migrations(db_path)
+    return sqlite3.connect(db_path)
+
+
+def test_insert_activities_skips_known_keys_in_one_pass(tmp_path):
+    conn = _conn(tmp_path)
+    service = SyncService()
+    rows = [garmin_activity_row(_garmin(f"2025-03-0{d} 08:00:00")) for d in range(1, 4)]
+    assert service.insert_activities(conn, rows[:2])[0] == 2
+
+    # Reenviar lo ya guardado (y un repetido dentro del lote) solo inserta lo nuevo
+    rows.append(garmin_activity_row(_garmin("2025-03-03 08:00:00")))
+    inserted, stamps = service.insert_activities(conn, rows)
+    assert inserted == 1 and stamps == [rows[2][1]]
+    # Misma clave natural por otra vía: el índice único la rechaza sin error
+    assert conn.execute(
+        "INSERT INTO activities (fecha, fecha_ts, tipo, fuente) VALUES (?, ?, 'running', 'Garmin V3 Sync') ON CONFLICT DO NOTHING",
+        (rows[0][0], rows[0][1]),
+    ).rowcount == 0
+    assert conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == 3
+    conn.close()
+
+
+def test_insert_biometrics(tmp_path):
+    conn = _conn(tmp_path)
+    group = {"date": 1740913200, "measures": [{"type": 1, "value": 72400, "unit": -3}, {"type": 6, "value": 185, "unit": -1}]}
+    no_weight = {"date": 1740999600, "measures": [{"type": 6, "value": 180, "unit": -1}]}
+    rows = [r for r in map(withings_biometric_row, [group, no_weight, {"measures": []}]) if r]
+    assert rows[0][3:5] == (72.4, 18.5) and len(rows) == 1
+    service = SyncService()
+    assert service.insert_biometrics(conn, rows) == 1
+    assert service.insert_biometrics(conn, rows) == 0
+    conn.close()
+
+
+class _FakeGarmin:
+    logins = []
+
+    def __init__(self, email, password):
+        self.client = self
+
+    def login(self, tokenstore=None):
+        _FakeGarmin.logins.append(tokenstore)
+
+    def dumps(self):
+        return "tokens-" + str(len(_FakeGarmin.logins))
+
+
+def test_garmin_client_reuses_session_and_tokens(tmp_path, monkeypatch):
+    from services import sync_service
+
+    monkeypatch.setattr(sync_service, "Garmin", _FakeGarmin)
+    _FakeGarmin.logins = []
+    _conn(tmp_path).close()
+    service = SyncService()
+    service.db_path = str(tmp_path / "sync.db")
+    creds = {"email": "a@b.c", "password": "x"}
+
+    client = service.garmin_client(creds)
+    assert service.garmin_client(creds) is client  # mismo proceso: sin login
+    assert _FakeGarmin.logins == [None]
+    assert service.get_secret("garmin_tokens") == {"tokens": "tokens-1"}
+
+    # Nuevo proceso: arranca desde los tokens guardados
+    restarted = SyncService()
+    restarted.db_path = service.db_path
+    restarted.garmin_client(creds)
+    assert _FakeGarmin.logins == [None, "tokens-1"]
+
+    restarted.reset_garmin_client(forget_tokens=True)
+    assert restarted.get_secret("garmin_tokens") is None
+
+
+def test_date_windows_cover_range():
+    from datetime import date
+    from services.sync_service import date_windows
+
+    windows = date_windows(date(2024, 1, 1), date(2024, 1, 25), 10)
+    assert windows == [(date(2024, 1, 1), date(2024, 1, 10)), (date(2024, 1, 11), date(2024, 1, 20)),
+                       (date(2024, 1, 21), date(2024, 1, 25))]
+    assert date_windows(date(2024, 2, 1), date(2024, 1, 31), 10) == []
+
+
+def test_run_windows_checkpoints_and_resumes(tmp_path, monkeypatch):
+    import threading
+    from datetime import date
+    from services import sync_service
+
+    monkeypatch.setattr(sync_service, "SYNC_WINDOW_DAYS", 7)
+    monkeypatch.setattr(sync_service, "SYNC_PROVIDER_CONCURRENCY", {"garmin": 2})
+    _conn(tmp_path).close()
+    service = SyncService()
+    service.db_path = str(tmp_path / "sync.db")
+
+    lock = threading.Lock()
+    active, peak, fetched = [0], [0], []
+
+    def fetch(a, b):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        try:
+            if a == date(2024, 1, 15) and not fetched:
+                raise RuntimeError("timeout")
+            return [_garmin(f"{a.isoformat()} 08:00:00")]
+        finally:
+            with lock:
+                active[0] -= 1
+
+    def store(conn, items):
+        return service.insert_activities(conn, [garmin_activity_row(a) for a in items])[0]
+
+    # La tercera ventana falla: quedan confirmadas las dos primeras y el cursor en el 14
+    try:
+        service.run_windows("garmin", date(2024, 1, 1), date(2024, 1, 31), fetch, store)
+        assert False, "debía propagar el error de la ventana"
+    except RuntimeError:
+        pass
+    assert peak[0] <= 2
+    assert service.get_cursor("garmin") == date(2024, 1, 14)
+
+    # Reanudar desde el cursor: solo se piden las ventanas que faltan
+    fetched.append(True)
+    events = []
+    inserted, windows = service.run_windows(
+        "garmin", service.get_cursor("garmin") + sync_service.datetime.timedelta(days=1), date(2024, 1, 31),
+        fetch, store, progress=lambda stage, **data: events.append((stage, data["start"], data["count"])))
+    assert windows == 3
+    assert events == [("fetched", "2024-01-15", 1), ("fetched", "2024-01-22", 1), ("fetched", "2024-01-29", 1)]
+    assert service.get_cursor("garmin") == date(2024, 1, 31)
+    with service.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] == 5
+
+
+def test_withings_token_refresh_is_not_retried(tmp_path, monkeypatch):
+    from services import sync_service
+
+    class _Response:
+        def __init__(self, payload):
+            self.payload = payload
+
+        def json(self):
+            return self.payload
+
+    calls = []
+
+    def fake_request(provider, method, url, **kwargs):
+        calls.append((url, kwargs.get("retries")))
+        if url == sync_service.WITHINGS_OAUTH_URL:
+            return _Response({"status": 0, "body": {"access_token": "new", "refresh_token": "r2"}})
+        if kwargs["headers"]["Authorization"] == "Bearer old":
+            return _Response({"status": 401})
+        return _Response({"status": 0, "body": {"measuregrps": []}})
+
+    monkeypatch.setattr(sync_service.provider_http, "request", fake_request)
+    monkeypatch.setattr(sync_service, "BACKFILL_START", sync_service.datetime.date.today())
+    _conn(tmp_path).close()
+    service = SyncService()
+    service.db_path = str(tmp_path / "sync.db")
+    service.save_secret("withings_app", {"client_id": "id", "client_secret": "s"})
+    service.save_secret("withings_tokens", {"access_token": "old", "refresh_token": "r1"})
+
+    assert service.sync_withings()["status"] == "success"
+    # El refresh rota el token: un reintento genérico lo repetiría con uno ya consumido
+    assert [c for c in calls if c[0] == sync_service.WITHINGS_OAUTH_URL] == [(sync_service.WITHINGS_OAUTH_URL, 0)]
+    assert service.get_secret("withings_tokens")["access_token"] == "new"
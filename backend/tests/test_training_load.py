@@ -0,0 +1,87 @@
+import sys
+import os
+import sqlite3
+import datetime
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+from services.sport_taxonomy import canonical_sport, sport_case_sql
+from services.training_load import TrainingLoadService
+
+
+def _db(tmp_path):
+    db_path = str(tmp_path / "load.db")
+    run_migrations(db_path)
+    return db_path
+
+
+def _rollup(db_path, table="daily_load"):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+    conn.close()
+    return rows
+
+
+def test_python_and_sql_mappings_agree():
+    conn = sqlite3.connect(":memory:")
+    for tipo in ["Carrera", "running", "Competición Trail", "cycling", "Tenis", "Caminata", "Breathwork", None]:
+        sql_sport = conn.execute(f"SELECT {sport_case_sql(':t')}", {"t": tipo}).fetchone()[0]
+        assert sql_sport == canonical_sport(tipo)
+    conn.close()
+
+
+def test_triggers_keep_rollups_current(tmp_path):
+    db_path = _db(tmp_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO activities (fecha, tipo, distancia_km, duracion_min) VALUES (?, ?, ?, ?)",
+        [("2025-03-03 08:00:00", "Running", 10.0, 50.0),   # lunes
+         ("2025-03-03T18:00:00", "carrera", 5.0, 25.0),
+         ("2025-03-09", "Ciclismo", 30.0, None)],           # domingo, misma semana
+    )
+    conn.commit()
+    assert _rollup(db_path) == [
+        ("2025-03-03", "running", 2, 15.0, 75.0, 0.0, 0.0, 0.0),
+        ("2025-03-09", "cycling", 1, 30.0, 0.0, 0.0, 0.0, 0.0),
+    ]
+    assert _rollup(db_path, "weekly_load") == [
+        ("2025-03-03", "cycling", 1, 30.0, 0.0, 0.0, 0.0, 0.0),
+        ("2025-03-03", "running", 2, 15.0, 75.0, 0.0, 0.0, 0.0),
+    ]
+
+    # UPDATE: cambia el tipo y la fecha de una actividad
+    conn.execute("UPDATE activities SET tipo = 'trail', fecha = '2025-03-10 07:00:00' WHERE tipo = 'carrera'")
+    # DELETE: la fila agregada desaparece al quedarse sin sesiones
+    conn.execute("DELETE FROM activities WHERE tipo = 'Ciclismo'")
+    conn.commit()
+    conn.close()
+    assert _rollup(db_path) == [
+        ("2025-03-03", "running", 1, 10.0, 50.0, 0.0, 0.0, 0.0),
+        ("2025-03-10", "trail", 1, 5.0, 25.0, 0.0, 0.0, 0.0),
+    ]
+    assert [r[0] for r in _rollup(db_path, "weekly_load")] == ["2025-03-03", "2025-03-10"]
+
+
+def test_service_reads_rollups(tmp_path):
+    db_path = _db(tmp_path)
+    today = datetime.date(2025, 3, 20)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO activities (fecha, tipo, distancia_km, duracion_min) VALUES (?, ?, ?, ?)",
+        [("2025-03-18 08:00:00", "running", 8.0, 40.0),
+         ("2025-03-01 08:00:00", "running", 12.0, 60.0),
+         ("2025-03-02 08:00:00", "tenis", None, 90.0)],
+    )
+    conn.commit()
+    conn.close()
+
+    service = TrainingLoadService(db_path)
+    assert service.acute_chronic_km(today) == {"acute_km": 8.0, "chronic_km": 20.0}
+    totals = service.sport_totals(since="2025-03-01")
+    assert totals["running"]["distancia_km"] == 20.0
+    assert totals["tennis"]["sessions"] == 1
+    assert service.sport_totals(since="2025-03-01", sports=["tennis"]).keys() == {"tennis"}
+    weeks = service.weekly(weeks=4, today=today)
+    assert [w["week_start"] for w in weeks] == ["2025-03-17", "2025-02-24"]
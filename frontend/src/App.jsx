@@ -45,6 +45,28 @@ const calculatePace = (dist, dur) => {
   return min > 60 ? null : `${min}:${sec.toString().padStart(2, '0')}`;
 };
 
+// Pide la siguiente página de un listado paginado por cursor
+const LoadMoreButton = ({ onClick, loading }) => (
+  <button
+    onClick={onClick}
+    disabled={loading}
+    style={{
+      display: 'block',
+      margin: '1rem auto 0',
+      padding: '8px 20px',
+      borderRadius: '50px',
+      cursor: loading ? 'not-allowed' : 'pointer',
+      background: 'transparent',
+      color: loading ? 'var(--text-muted)' : 'var(--accent-blue)',
+      border: '1px solid var(--accent-blue)',
+      fontSize: '0.9rem',
+      fontWeight: 600
+    }}
+  >
+    {loading ? 'Cargando...' : 'Cargar más'}
+  </button>
+);
+
 function App() {
   const {
     filteredActivities,
@@ -69,7 +91,12 @@ function App() {
     metricFilter,
     setMetricFilter,
     availableTypes,
-    normalizeActivityType
+    normalizeActivityType,
+    hasMoreActivities,
+    hasMoreBiometrics,
+    loadingMore,
+    loadMoreActivities,
+    loadMoreBiometrics
   } = useBioEngineData();
 
   const [activeView, setActiveView] = useState('overview');
@@ -86,8 +113,8 @@ function App() {
   const handleRunSync = async () => {
     try {
       const result = await handleSync();
-      const newGarmin = result.garmin.added || 0;
-      const newWithings = result.withings.added || 0;
+      const newGarmin = result.garmin?.added || 0;
+      const newWithings = result.withings?.added || 0;
       showToast(`Sincronización: +${newGarmin} Garmin, +${newWithings} Withings`);
     } catch (error) {
       showToast("Error crítico al sincronizar", "error");
@@ -130,7 +157,7 @@ function App() {
   const pieData = useMemo(() => {
     if (!filteredActivities.length) return [];
     const counts = filteredActivities.reduce((acc, curr) => {
-      const tipo = normalizeActivityType(curr.tipo);
+      const tipo = normalizeActivityType(curr);
       acc[tipo] = (acc[tipo] || 0) + 1;
       return acc;
     }, {});
@@ -349,11 +376,21 @@ function App() {
                 calculatePace={calculatePace}
                 getWeightForDate={getWeightForDate}
               />
+              {hasMoreActivities && (
+                <LoadMoreButton onClick={loadMoreActivities} loading={loadingMore} />
+              )}
             </div>
           </div>
         )}
 
-        {activeView === 'biometria' && <BiometricsView biometrics={biometrics} />}
+        {activeView === 'biometria' && (
+          <>
+            <BiometricsView biometrics={biometrics} />
+            {hasMoreBiometrics && (
+              <LoadMoreButton onClick={loadMoreBiometrics} loading={loadingMore} />
+            )}
+          </>
+        )}
 
         {activeView === 'calendario' && (
           <CalendarView
@@ -57,10 +57,10 @@ const ActivityTable = ({ activities, normalizeActivityType, calculatePace, getWe
                                 </td>
                                 <td style={{ whiteSpace: 'nowrap' }}>
                                     <div style={{ display: 'flex', alignItems: 'center', gap: '8px' }}>
-                                        <div className={`activity-icon-mini ${normalizeActivityType(act.tipo).toLowerCase().replace('/', '-')}`} style={{ minWidth: '14px' }}>
+                                        <div className={`activity-icon-mini ${normalizeActivityType(act).toLowerCase().replace('/', '-')}`} style={{ minWidth: '14px' }}>
                                             <Activity size={12} />
                                         </div>
-                                        <span style={{ fontWeight: 600, fontSize: '0.85rem' }}>{normalizeActivityType(act.tipo)}</span>
+                                        <span style={{ fontWeight: 600, fontSize: '0.85rem' }}>{normalizeActivityType(act)}</span>
                                         <span style={{ fontSize: '0.75rem', color: 'var(--text-muted)', overflow: 'hidden', textOverflow: 'ellipsis' }}>{act.nombre ? `- ${act.nombre}` : ''}</span>
                                     </div>
                                 </td>
@@ -175,7 +175,7 @@ const CalendarView = ({ activities, normalizeActivityType }) => {
                                                         textOverflow: 'ellipsis',
                                                         borderLeft: '2px solid var(--accent-green)'
                                                     }}>
-                                                        {normalizeActivityType(act.tipo)}
+                                                        {normalizeActivityType(act)}
                                                     </div>
                                                 ))}
                                                 {dayActivities.length > 2 && (
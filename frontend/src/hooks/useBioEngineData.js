@@ -33,8 +33,11 @@ const ACTIVITY_MAP = {
     'tenis': 'Tenis',
 };
 
+// Las filas de /activities ya traen `sport_label` (clasificada en servidor,
+// tabla sport_taxonomy); estas reglas solo cubren datos sin clasificar.
 const normalizeActivityType = (act) => {
     if (!act) return 'Otros';
+    if (typeof act === 'object' && act.sport_label) return act.sport_label;
     const type = typeof act === 'string' ? act : act.tipo;
     if (!type) return 'Otros';
 
@@ -64,9 +67,35 @@ const normalizeActivityType = (act) => {
     return ACTIVITY_MAP[lowType] || (typeof type === 'string' ? type.charAt(0).toUpperCase() + type.slice(1) : 'Otros');
 };
 
+// slug del material en /equipment -> clave de equipmentStats
+const GEAR_STATS_KEYS = {
+    kayano: 'kayano',
+    brooks: 'brooks',
+    speedgoat: 'trail',
+    trek: 'bike',
+    babolat: 'tennis',
+};
+
+const ACTIVITIES_PAGE_SIZE = 500;
+const BIOMETRICS_PAGE_SIZE = 1000;
+
+// Una página de un endpoint paginado ({ items, next_cursor }); la siguiente se
+// pide solo cuando el usuario la solicita ("Cargar más").
+const fetchPage = async (path, limit, cursor = null) => {
+    const params = cursor ? { limit, cursor } : { limit };
+    const res = await axios.get(`${API_BASE}${path}`, { params });
+    return {
+        items: Array.isArray(res.data?.items) ? res.data.items : [],
+        cursor: res.data?.next_cursor || null
+    };
+};
+
 export const useBioEngineData = () => {
     const [activities, setActivities] = useState([]);
     const [biometrics, setBiometrics] = useState([]);
+    const [activitiesCursor, setActivitiesCursor] = useState(null);
+    const [biometricsCursor, setBiometricsCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [equipment, setEquipment] = useState(null);
     const [loading, setLoading] = useState(true);
     const [syncing, setSyncing] = useState(false);
@@ -94,23 +123,27 @@ export const useBioEngineData = () => {
             // Fetch core data independently so one failure doesn't block others
             const fetchActivities = async () => {
                 try {
-                    const res = await axios.get(`${API_BASE}/activities`);
-                    setActivities(Array.isArray(res.data) ? res.data : []);
+                    // Paginación por cursor: solo la primera página; el resto con loadMoreActivities
+                    const page = await fetchPage('/activities', ACTIVITIES_PAGE_SIZE);
+                    setActivities(page.items);
+                    setActivitiesCursor(page.cursor);
                 } catch (e) {
                     console.error("Error loading activities:", e);
                     setActivities([]);
+                    setActivitiesCursor(null);
                 }
             };
 
             const fetchBiometrics = async () => {
                 try {
-                    const res = await axios.get(`${API_BASE}/biometrics`);
-                    const data = Array.isArray(res.data) ? res.data : [];
-                    // Ordenar por fecha descendente (más reciente primero)
-                    setBiometrics(data.sort((a, b) => new Date(b.fecha) - new Date(a.fecha)));
+                    // El backend ya devuelve fecha descendente (más reciente primero)
+                    const page = await fetchPage('/biometrics', BIOMETRICS_PAGE_SIZE);
+                    setBiometrics(page.items);
+                    setBiometricsCursor(page.cursor);
                 } catch (e) {
                     console.error("Error loading biometrics:", e);
                     setBiometrics([]);
+                    setBiometricsCursor(null);
                 }
             };
 
@@ -158,14 +191,51 @@ export const useBioEngineData = () => {
         fetchData();
     }, [fetchData]);
 
-    const handleSync = async (adminToken = 'bioengine-local') => {
+    // Siguiente página bajo demanda; se agrega al final (orden fecha descendente)
+    const loadMore = async (path, limit, cursor, setItems, setCursor) => {
+        if (!cursor || loadingMore) return;
+        setLoadingMore(true);
+        try {
+            const page = await fetchPage(path, limit, cursor);
+            setItems(prev => prev.concat(page.items));
+            setCursor(page.cursor);
+        } catch (e) {
+            console.error(`Error loading more from ${path}:`, e);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
+    const loadMoreActivities = () =>
+        loadMore('/activities', ACTIVITIES_PAGE_SIZE, activitiesCursor, setActivities, setActivitiesCursor);
+
+    const loadMoreBiometrics = () =>
+        loadMore('/biometrics', BIOMETRICS_PAGE_SIZE, biometricsCursor, setBiometrics, setBiometricsCursor);
+
+    // /sync/all responde al instante con un job; el progreso llega por SSE y
+    // la promesa se resuelve con los resultados por proveedor al recibir `done`.
+    const handleSync = async (adminToken = 'bioengine-local', onProgress = null) => {
         setSyncing(true);
         try {
             const res = await axios.post(`${API_BASE}/sync/all`, {}, {
                 headers: { 'X-Admin-Token': adminToken }
             });
+            const results = await new Promise((resolve, reject) => {
+                const source = new EventSource(`${API_BASE}${res.data.events_url}`);
+                ['started', 'fetched', 'inserted', 'deduped', 'finished'].forEach(stage =>
+                    source.addEventListener(stage, (e) => onProgress && onProgress(JSON.parse(e.data)))
+                );
+                source.addEventListener('done', (e) => {
+                    source.close();
+                    resolve(JSON.parse(e.data).results);
+                });
+                source.onerror = () => {
+                    source.close();
+                    reject(new Error('Conexión de progreso de sincronización perdida'));
+                };
+            });
             await fetchData();
-            return res.data;
+            return results;
         } catch (error) {
             console.error("Error syncing:", error);
             throw error;
@@ -420,6 +490,14 @@ export const useBioEngineData = () => {
             tennis: { sessions: 0 },
             bike: { km: 0, sessions: 0 }
         };
+        // Odómetros mantenidos en servidor (libro de material de /equipment)
+        if (Array.isArray(equipment?.gear)) {
+            equipment.gear.forEach(g => {
+                const key = GEAR_STATS_KEYS[g.slug];
+                if (key) stats[key] = { km: g.km || 0, sessions: g.sessions || 0 };
+            });
+            return stats;
+        }
         activities.forEach(act => {
             const type = normalizeActivityType(act);
 
@@ -445,7 +523,7 @@ export const useBioEngineData = () => {
             }
         });
         return stats;
-    }, [activities]);
+    }, [activities, equipment]);
 
     const availableTypes = useMemo(() => {
         if (!Array.isArray(activities)) return [];
@@ -462,6 +540,12 @@ export const useBioEngineData = () => {
         equipmentStats,
         kpis,
         availableTypes,
+        // Paginación bajo demanda
+        hasMoreActivities: Boolean(activitiesCursor),
+        hasMoreBiometrics: Boolean(biometricsCursor),
+        loadingMore,
+        loadMoreActivities,
+        loadMoreBiometrics,
         // Loading/Sync
         loading,
         syncing,
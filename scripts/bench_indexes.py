@@ -0,0 +1,202 @@
+"""
+Benchmark de los índices de las migraciones (0002 en adelante).
+
+Genera una base de datos sintética (500k actividades por defecto) con el
+esquema base (0001), mide las consultas calientes, aplica el resto de
+migraciones con el runner y vuelve a medir. Imprime EXPLAIN QUERY PLAN y el tiempo medio de cada consulta.
+
+Uso:
+    python scripts/bench_indexes.py [--rows 500000] [--repeat 20] [--db ruta.db]
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from migrations import discover_migrations, run_migrations
+from services.db_pool import close_db_pools
+from services.datetime_normalizer import to_epoch
+
+FUENTES = ["Garmin Cloud", "Garmin V3 Sync", "Apple", "Strava", "Manual"]
+TIPOS = ["running", "Carrera", "cycling", "Ciclismo", "trail", "tennis", "walking", "strength"]
+
+# (etiqueta, SQL antes, params, SQL después): el SQL "después" es el que emite
+# el código una vez aplicadas las migraciones (p. ej. fecha_ts en lugar de fecha, 0005).
+HOT_QUERIES = [
+    ("activities ORDER BY fecha LIMIT 50",
+     "SELECT * FROM activities ORDER BY fecha DESC LIMIT 50", (),
+     "SELECT * FROM activities ORDER BY fecha_ts DESC, id DESC LIMIT 50"),
+    ("activities MAX(fecha) Garmin",
+     "SELECT MAX(fecha) AS last_date FROM activities WHERE fuente LIKE '%Garmin%'", (),
+     "SELECT MAX(fecha_ts) AS last_ts FROM activities WHERE fuente LIKE '%Garmin%'"),
+    ("activities dedup fecha+tipo",
+     "SELECT id FROM activities WHERE fecha = ? AND tipo = ?", None,
+     "SELECT id FROM activities WHERE fecha_ts = ? AND tipo = ?"),
+    ("activities deep page OFFSET 400000",
+     "SELECT * FROM activities ORDER BY fecha DESC LIMIT 500 OFFSET 400000", (), None),
+    ("activities deep page keyset",
+     "SELECT * FROM activities WHERE (fecha, id) < (?, ?) ORDER BY fecha DESC, id DESC LIMIT 500", None,
+     "SELECT * FROM activities WHERE fecha_ts IS NOT NULL AND (fecha_ts, id) < (?, ?) ORDER BY fecha_ts DESC, id DESC LIMIT 500"),
+    ("activities since fecha",
+     "SELECT * FROM activities WHERE fecha >= ? ORDER BY fecha DESC", None,
+     "SELECT * FROM activities WHERE fecha_ts >= ? ORDER BY fecha_ts DESC, id DESC"),
+    ("activities same local day",
+     "SELECT id FROM activities WHERE fecha LIKE ?", None,
+     "SELECT id FROM activities WHERE fecha_local = ?"),
+    ("biometrics ORDER BY fecha LIMIT 5",
+     "SELECT * FROM biometrics ORDER BY fecha DESC LIMIT 5", (),
+     "SELECT * FROM biometrics ORDER BY fecha_ts DESC, id DESC LIMIT 5"),
+    ("biometrics MAX(fecha) Withings",
+     "SELECT MAX(fecha) AS last_date FROM biometrics WHERE fuente LIKE '%Withings%'", (),
+     "SELECT MAX(fecha_ts) AS last_ts FROM biometrics WHERE fuente LIKE '%Withings%'"),
+    ("pain_logs recent",
+     "SELECT date, level, notes FROM pain_logs ORDER BY created_at DESC LIMIT 10", (),
+     "SELECT date, level, notes FROM pain_logs ORDER BY fecha_ts DESC, id DESC LIMIT 10"),
+    ("evolutionary_memory recent",
+     "SELECT date, lesson, context FROM evolutionary_memory ORDER BY created_at DESC LIMIT 50", (), None),
+    ("system_logs recent",
+     "SELECT * FROM system_logs ORDER BY timestamp DESC LIMIT 100", (), None),
+    ("hitl pending",
+     "SELECT * FROM hitl_actions WHERE status = ? AND expires_at > ? ORDER BY created_at DESC", None, None),
+]
+
+
+def _migration_sql(version: int) -> str:
+    for m in discover_migrations():
+        if m.version == version:
+            with open(m.path, "r", encoding="utf-8") as f:
+                return f.read()
+    raise SystemExit(f"No existe la migración {version:04d}")
+
+
+def build_synthetic_db(path: str, rows: int) -> None:
+    rnd = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript(_migration_sql(1))
+
+    start = datetime(2010, 1, 1)
+    span_s = int((datetime(2026, 1, 1) - start).total_seconds())
+
+    def ts() -> str:
+        return (start + timedelta(seconds=rnd.randrange(span_s))).isoformat(timespec="seconds")
+
+    conn.executemany(
+        "INSERT INTO activities (fecha, tipo, distancia_km, duracion_min, calorias, fc_media, fuente, nombre) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ((ts(), rnd.choice(TIPOS), rnd.uniform(1, 40), rnd.uniform(10, 240), rnd.uniform(50, 2000),
+          rnd.randint(100, 170), rnd.choice(FUENTES), "sintética") for _ in range(rows)),
+    )
+    small = max(rows // 10, 1000)
+    conn.executemany(
+        "INSERT INTO biometrics (fecha, peso, grasa_pct, fuente) VALUES (?, ?, ?, ?)",
+        ((ts(), rnd.uniform(65, 85), rnd.uniform(10, 25), rnd.choice(["Withings", "Manual"])) for _ in range(small)),
+    )
+    conn.executemany(
+        "INSERT INTO pain_logs (date, level, notes, created_at) VALUES (?, ?, ?, ?)",
+        ((ts()[:10], rnd.randint(0, 10), "", ts()) for _ in range(small)),
+    )
+    conn.executemany(
+        "INSERT INTO evolutionary_memory (date, lesson, context, created_at) VALUES (?, ?, ?, ?)",
+        ((ts()[:10], "lección", "", ts()) for _ in range(small)),
+    )
+    conn.executemany(
+        "INSERT INTO system_logs (event_type, description, timestamp) VALUES (?, ?, ?)",
+        (("bench", "evento", ts()) for _ in range(small)),
+    )
+    conn.executemany(
+        "INSERT INTO hitl_actions (action_id, action_type, description, severity, proposed_changes, status, created_at, expires_at) "
+        "VALUES (?, 'plan', '', 'low', '{}', ?, ?, ?)",
+        ((f"a{i}", rnd.choice(["pending", "approved", "rejected", "expired"]), ts(), ts()) for i in range(small)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _params(conn: sqlite3.Connection, label: str, params, normalized: bool):
+    if params is not None:
+        return params
+    fecha = "fecha_ts" if normalized else "fecha"
+    if label.startswith("activities dedup"):
+        return tuple(conn.execute(f"SELECT {fecha}, tipo FROM activities WHERE id = 1").fetchone())
+    if label.startswith("activities deep page keyset"):
+        offset = min(399_999, conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] - 1)
+        return tuple(conn.execute(f"SELECT {fecha}, id FROM activities ORDER BY {fecha} DESC, id DESC LIMIT 1 OFFSET ?", (offset,)).fetchone())
+    if label.startswith("activities since"):
+        return (to_epoch("2025-10-01"),) if normalized else ("2025-10-01",)
+    if label.startswith("activities same local day"):
+        return ("2025-10-01",) if normalized else ("2025-10-01%",)
+    if label.startswith("hitl"):
+        return ("pending", "2025-06-01")
+    return ()
+
+
+def measure(conn: sqlite3.Connection, repeat: int, normalized: bool = False) -> dict:
+    results = {}
+    for label, sql, params, normalized_sql in HOT_QUERIES:
+        use_normalized = normalized and normalized_sql is not None
+        if use_normalized:
+            sql = normalized_sql
+        args = _params(conn, label, params, use_normalized)
+        plan = " | ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, args))
+        conn.execute(sql, args).fetchall()  # calentar caché
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, args).fetchall()
+        results[label] = (plan, (time.perf_counter() - t0) / repeat * 1000)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", help="Ruta de la DB sintética (por defecto, un fichero temporal)")
+    args = parser.parse_args()
+
+    tmpdir = None
+    path = args.db
+    if not path:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, "bench_indexes.db")
+
+    print(f"Generando {args.rows:,} actividades sintéticas en {path} ...")
+    t0 = time.perf_counter()
+    build_synthetic_db(path, args.rows)
+    print(f"  listo en {time.perf_counter() - t0:.1f}s\n")
+
+    conn = sqlite3.connect(path)
+    before = measure(conn, args.repeat)
+
+    t0 = time.perf_counter()
+    applied = run_migrations(path)
+    close_db_pools()
+    print(f"Migraciones {applied} aplicadas en {time.perf_counter() - t0:.2f}s\n")
+    after = measure(conn, args.repeat, normalized=True)
+    conn.close()
+
+    print(f"{'consulta':<38} {'antes (ms)':>11} {'después (ms)':>13} {'speedup':>8}")
+    print("-" * 74)
+    for label, *_ in HOT_QUERIES:
+        b, a = before[label][1], after[label][1]
+        print(f"{label:<38} {b:>11.3f} {a:>13.3f} {b / a if a else float('inf'):>7.1f}x")
+
+    print("\nPlanes de consulta:")
+    for label, *_ in HOT_QUERIES:
+        print(f"\n- {label}")
+        print(f"    antes:   {before[label][0]}")
+        print(f"    después: {after[label][0]}")
+
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark de SyncService contra los proveedores falsos (scripts/fake_provider_server.py).
+
+Cada repetición parte de una base de datos temporal vacía (migraciones al
+día), hace el backfill completo de Garmin y de Withings contra el servidor
+local y mide la duración de cada sync. Imprime actividades/s, pesajes/s y
+p50/p95/máx de la latencia de sync por proveedor, más los contadores del
+servidor (peticiones, 503 inyectados, 401 y renovaciones de token).
+
+Uso:
+    python scripts/bench_sync.py [--runs 5] [--activities 3000] [--measures 800] [--days 730]
+                                 [--latency-ms 30] [--jitter-ms 20] [--error-rate 0.02]
+                                 [--window-days 30] [--garmin-concurrency 2] [--withings-concurrency 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_provider_server import FakeProviderState, OAUTH_PATH, MEASURE_PATH, STALE_TOKEN, local_garmin, start_in_thread
+from migrations import run_migrations
+from services import activity_frame, equipment, provider_http, sync_service
+from services.db_pool import close_db_pools
+from services.sync_service import SyncService
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def fresh_service(db_path):
+    """SyncService y cachés (frame, equipamiento) sobre una base temporal con credenciales de prueba."""
+    run_migrations(db_path)
+    activity_frame._activity_frame = activity_frame.ActivityFrame(db_path)
+    equipment._equipment_service = equipment.EquipmentService(db_path)
+    service = SyncService()
+    service.db_path = db_path
+    service.save_secret('garmin', {'email': 'bench@local', 'password': 'x'})
+    service.save_secret('withings_app', {'client_id': 'bench', 'client_secret': 'x'})
+    service.save_secret('withings_tokens', {'access_token': STALE_TOKEN, 'refresh_token': 'refresh-0'})
+    return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput y latencia de SyncService contra proveedores locales")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--activities', type=int, default=3000)
+    parser.add_argument('--measures', type=int, default=800)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--latency-ms', type=float, default=30.0)
+    parser.add_argument('--jitter-ms', type=float, default=20.0)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--token-ttl', type=int, default=50)
+    parser.add_argument('--window-days', type=int, default=sync_service.SYNC_WINDOW_DAYS)
+    parser.add_argument('--garmin-concurrency', type=int, default=sync_service.SYNC_PROVIDER_CONCURRENCY['garmin'])
+    parser.add_argument('--withings-concurrency', type=int, default=sync_service.SYNC_PROVIDER_CONCURRENCY['withings'])
+    args = parser.parse_args()
+
+    sync_service.SYNC_WINDOW_DAYS = args.window_days
+    sync_service.SYNC_PROVIDER_CONCURRENCY = {'garmin': args.garmin_concurrency, 'withings': args.withings_concurrency}
+    # Backfill completo: sin datos previos se empezaría en 2023-01-01
+    sync_service.BACKFILL_START = sync_service.datetime.date.today() - sync_service.datetime.timedelta(days=args.days - 1)
+
+    durations = {'garmin': [], 'withings': []}
+    added = {'garmin': 0, 'withings': 0}
+    servers = []
+    print(f"{args.runs} repeticiones | {args.activities} actividades, {args.measures} pesajes en {args.days} días | "
+          f"latencia {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, errores {args.error_rate:.0%} | "
+          f"ventanas de {args.window_days} días, concurrencia garmin={args.garmin_concurrency} "
+          f"withings={args.withings_concurrency}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(args.runs):
+            state = FakeProviderState(args.activities, args.measures, args.days, args.latency_ms, args.jitter_ms,
+                                      args.error_rate, args.token_ttl)
+            server, base_url = start_in_thread(state)
+            servers.append(state)
+            sync_service.Garmin = local_garmin(base_url)
+            sync_service.WITHINGS_OAUTH_URL = base_url + OAUTH_PATH
+            sync_service.WITHINGS_MEASURE_URL = base_url + MEASURE_PATH
+
+            service = fresh_service(os.path.join(tmp, f"bench_{run}.db"))
+            for provider, sync in (('garmin', service.sync_garmin), ('withings', service.sync_withings)):
+                started = time.perf_counter()
+                result = sync()
+                durations[provider].append(time.perf_counter() - started)
+                if result.get('status') != 'success':
+                    print(f"  run {run + 1} {provider}: {result}")
+                added[provider] += result.get('added', 0)
+            server.shutdown()
+            server.server_close()
+            close_db_pools()
+            print(f"  run {run + 1}: garmin {durations['garmin'][-1]:.2f}s, withings {durations['withings'][-1]:.2f}s")
+
+    provider_http.close_http_sessions()
+    print()
+    for provider, unit in (('garmin', 'actividades'), ('withings', 'pesajes')):
+        total_s = sum(durations[provider])
+        rate = added[provider] / total_s if total_s else 0.0
+        print(f"{provider:9} {rate:10,.0f} {unit}/s | p50 {statistics.median(durations[provider]):.2f}s "
+              f"p95 {percentile(durations[provider], 95):.2f}s máx {max(durations[provider]):.2f}s "
+              f"({added[provider]} filas en {total_s:.2f}s)")
+    totals = {}
+    for state in servers:
+        for key, value in state.stats.items():
+            totals[key] = totals.get(key, 0) + value
+    print(f"servidor  {totals}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Servidor local que imita a Garmin Connect y Withings para medir SyncService
+sin cuentas reales.
+
+Expone:
+  GET  /activitylist-service/activities/search/activities   (startDate, endDate, start, limit)
+  POST /measure      action=getmeas (startdate, enddate; Bearer token)
+  POST /v2/oauth2    action=requesttoken (grant_type=refresh_token)
+
+Los datos son sintéticos y reproducibles (`--seed`): `--activities` actividades
+y `--measures` pesajes repartidos en `--days` días hasta hoy. Se puede inyectar
+latencia (`--latency-ms`, `--jitter-ms`) y errores 503 (`--error-rate`, los
+reintenta provider_http). El token de Withings caduca cada `--token-ttl`
+peticiones y el token inicial ya nace caducado, así que el primer getmeas
+devuelve 401 y ejercita la renovación.
+
+Garmin no admite cambiar su dominio (el SSO de garth va contra garmin.com), así
+que del lado cliente se usa `LocalGarmin`, que pagina este endpoint igual que
+`Garmin.get_activities_by_date` (de 20 en 20).
+
+Uso:
+    python scripts/fake_provider_server.py [--port 8765] [--activities 5000] [--latency-ms 40] [--error-rate 0.02]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from services import provider_http
+
+ACTIVITIES_PATH = "/activitylist-service/activities/search/activities"
+MEASURE_PATH = "/measure"
+OAUTH_PATH = "/v2/oauth2"
+STALE_TOKEN = "stale-access-token"
+
+TIPOS = ["running", "cycling", "tennis", "walking", "strength_training", "hiking"]
+
+
+class FakeProviderState:
+    """Datos sintéticos, fallos inyectados y contadores del servidor (compartido entre hilos)."""
+
+    def __init__(self, activities: int = 2000, measures: int = 500, days: int = 730, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, error_rate: float = 0.0, token_ttl: int = 50, seed: int = 7,
+                 today: Optional[date] = None):
+        self.latency_s = latency_ms / 1000.0
+        self.jitter_s = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.token_ttl = token_ttl
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self._token_serial = 0
+        self.access_token = STALE_TOKEN
+        self.refresh_token = "refresh-0"
+        self._token_uses = token_ttl  # el token inicial ya está caducado
+
+        first = (today or date.today()) - timedelta(days=days - 1)
+        rng = random.Random(seed)
+        self.activities = sorted((self._activity(rng, first, days, i) for i in range(activities)),
+                                 key=lambda a: a["startTimeLocal"], reverse=True)
+        self.measures = sorted((self._measure(rng, first, days) for _ in range(measures)), key=lambda g: g["date"])
+
+    @staticmethod
+    def _activity(rng: random.Random, first: date, days: int, i: int) -> dict:
+        # Segundo distinto por actividad: prácticamente sin choques de clave natural (fecha_ts, tipo)
+        start = datetime.combine(first, datetime.min.time()) + timedelta(days=rng.randrange(days),
+                                                                         hours=rng.choice([7, 8, 18, 19]),
+                                                                         seconds=i % 3600)
+        tipo = rng.choice(TIPOS)
+        return {
+            "activityId": 10_000_000 + i,
+            "activityName": f"{tipo} #{i}",
+            "startTimeLocal": start.strftime("%Y-%m-%d %H:%M:%S"),
+            "activityType": {"typeKey": tipo},
+            "distance": round(rng.uniform(2000, 25000), 1),
+            "duration": round(rng.uniform(1200, 7200), 1),
+            "calories": rng.randint(150, 1200),
+            "averageHR": rng.randint(110, 160),
+            "maxHR": rng.randint(160, 190),
+            "totalElevationGain": round(rng.uniform(0, 400), 1),
+        }
+
+    @staticmethod
+    def _measure(rng: random.Random, first: date, days: int) -> dict:
+        when = datetime.combine(first, datetime.min.time()) + timedelta(days=rng.randrange(days), seconds=rng.randrange(86400))
+        return {
+            "grpid": rng.randrange(10 ** 9),
+            "date": int(when.timestamp()),
+            "measures": [
+                {"type": 1, "value": rng.randint(70000, 80000), "unit": -3},
+                {"type": 6, "value": rng.randint(150, 220), "unit": -1},
+                {"type": 76, "value": rng.randint(30000, 36000), "unit": -3},
+            ],
+        }
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] += 1
+
+    def delay_and_maybe_fail(self) -> bool:
+        """Aplica la latencia inyectada; True si esta petición debe responder 503."""
+        with self.lock:
+            fail = self.random.random() < self.error_rate
+            pause = self.latency_s + self.random.uniform(0, self.jitter_s)
+        if pause:
+            time.sleep(pause)
+        return fail
+
+    def use_token(self, token: str) -> bool:
+        """True si `token` es el vigente y no ha caducado (cada uso cuenta)."""
+        with self.lock:
+            if token != self.access_token or self._token_uses >= self.token_ttl:
+                return False
+            self._token_uses += 1
+            return True
+
+    def refresh(self, refresh_token: str) -> Optional[dict]:
+        with self.lock:
+            if refresh_token != self.refresh_token:
+                return None
+            self._token_serial += 1
+            self.access_token = f"access-{self._token_serial}"
+            self.refresh_token = f"refresh-{self._token_serial}"
+            self._token_uses = 0
+            return {"access_token": self.access_token, "refresh_token": self.refresh_token,
+                    "expires_in": 10800, "token_type": "Bearer"}
+
+    def activities_between(self, start: str, end: Optional[str], offset: int, limit: int) -> List[dict]:
+        end = end or "9999-12-31"
+        hits = [a for a in self.activities if start <= a["startTimeLocal"][:10] <= end]
+        return hits[offset:offset + limit]
+
+    def measures_between(self, startdate: int, enddate: int) -> List[dict]:
+        return [g for g in self.measures if startdate <= g["date"] <= enddate]
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    state: FakeProviderState = None  # asignado por make_server
+
+    def log_message(self, fmt, *args):  # silencioso: el benchmark imprime su propio resumen
+        pass
+
+    def _send(self, status: int, payload) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _injected_error(self) -> bool:
+        if self.state.delay_and_maybe_fail():
+            self.state.count("errors_503")
+            self._send(503, {"error": "injected"})
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != ACTIVITIES_PATH:
+            return self._send(404, {"error": "not found"})
+        self.state.count("garmin_requests")
+        if self._injected_error():
+            return
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        page = self.state.activities_between(q.get("startDate", "0000-00-00"), q.get("endDate"),
+                                             int(q.get("start", 0)), int(q.get("limit", 20)))
+        self._send(200, page)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+        if url.path == OAUTH_PATH:
+            self.state.count("withings_refreshes")
+            tokens = self.state.refresh(form.get("refresh_token", ""))
+            return self._send(200, {"status": 0, "body": tokens} if tokens else {"status": 503})
+        if url.path != MEASURE_PATH:
+            return self._send(404, {"error": "not found"})
+        self.state.count("withings_requests")
+        if self._injected_error():
+            return
+        token = (self.headers.get("Authorization") or "").replace("Bearer ", "")
+        if not self.state.use_token(token):
+            self.state.count("withings_401")
+            return self._send(200, {"status": 401, "error": "invalid_token"})
+        grps = self.state.measures_between(int(form.get("startdate", 0)), int(form.get("enddate", 2 ** 62)))
+        self._send(200, {"status": 0, "body": {"updatetime": int(time.time()), "measuregrps": grps}})
+
+
+def make_server(state: FakeProviderState, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    handler = type("BoundFakeProviderHandler", (FakeProviderHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(state: FakeProviderState, port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Arranca el servidor en un hilo daemon; devuelve (servidor, url base)."""
+    server = make_server(state, port=port)
+    threading.Thread(target=server.serve_forever, name="fake-providers", daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+class LocalGarmin:
+    """
+    Sustituto de `garminconnect.Garmin` contra el servidor local: misma interfaz
+    que usa SyncService (login, client.dumps, get_activities_by_date) y la misma
+    paginación de 20 en 20. Las peticiones pasan por provider_http('garmin').
+    """
+
+    base_url = "http://127.0.0.1:8765"
+
+    def __init__(self, email=None, password=None):
+        self.client = self
+
+    def login(self, tokenstore=None):
+        return None, None
+
+    def dumps(self) -> str:
+        return "local-garmin-tokens"
+
+    def get_activities_by_date(self, startdate: str, enddate: Optional[str] = None) -> List[dict]:
+        activities, start, limit = [], 0, 20
+        params = {"startDate": startdate, "limit": str(limit)}
+        if enddate:
+            params["endDate"] = enddate
+        while True:
+            params["start"] = str(start)
+            r = provider_http.request("garmin", "GET", self.base_url + ACTIVITIES_PATH, params=params)
+            r.raise_for_status()
+            page = r.json()
+            if not page:
+                return activities
+            activities.extend(page)
+            start += limit
+
+
+def local_garmin(base_url: str) -> type:
+    """Clase LocalGarmin apuntando a `base_url` (para sustituir sync_service.Garmin)."""
+    return type("LocalGarmin", (LocalGarmin,), {"base_url": base_url})
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Servidor local Garmin/Withings para pruebas de sync")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--activities", type=int, default=2000)
+    parser.add_argument("--measures", type=int, default=500)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    state = FakeProviderState(args.activities, args.measures, args.days, args.latency_ms, args.jitter_ms,
+                              args.error_rate, args.token_ttl, args.seed)
+    server = make_server(state, port=args.port)
+    print(f"Fake Garmin/Withings en http://127.0.0.1:{args.port} "
+          f"({len(state.activities)} actividades, {len(state.measures)} pesajes)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(dict(state.stats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Importa series por segundo desde archivos FIT, GPX o TCX (o carpetas con ellos).
+
+Cada archivo se enlaza con la actividad que empieza dentro de la ventana de
+deduplicación o crea una nueva con los agregados del archivo.
+
+Uso:
+    python scripts/import_activity_files.py ruta/archivo.fit carpeta/ [--activity-id 123] [--db ruta.db]
+"""
+
+import os
+import sys
+import sqlite3
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from config import DB_PATH
+from services.activity_streams import STREAM_FORMATS, FitDecoderMissingError, import_activity_file
+
+
+def iter_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if os.path.splitext(name)[1].lower() in STREAM_FORMATS:
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--activity-id", type=int, help="enlazar con esta actividad (un único archivo)")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        for path in iter_files(args.paths):
+            try:
+                info = import_activity_file(conn, path, activity_id=args.activity_id)
+            except FitDecoderMissingError as e:
+                # Falta una dependencia: fallarían todos los .fit, no tiene sentido seguir
+                sys.exit(f"❌ {e}")
+            except Exception as e:
+                print(f"❌ {path}: {e}")
+                continue
+            if info:
+                print(f"✅ {path}: {info.samples} s -> actividad {info.activity_id}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
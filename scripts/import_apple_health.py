@@ -0,0 +1,46 @@
+"""
+Importa un export de Apple Health (export.xml o export.zip) en streaming.
+
+Reanuda desde el último lote confirmado si el archivo es el mismo; usar
+--restart para empezar de cero.
+
+Uso:
+    python scripts/import_apple_health.py ruta/export.zip [--batch 1000] [--restart] [--db ruta.db]
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from config import DB_PATH
+from services.apple_health import DEFAULT_BATCH_SIZE, ingest_export
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("export", help="export.xml o export.zip de Apple Health")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="ignorar el checkpoint")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    started = time.perf_counter()
+    try:
+        report = ingest_export(conn, args.export, batch_size=args.batch, resume=not args.restart)
+    finally:
+        conn.close()
+    print(f"Entrenamientos nuevos: {report.workouts}")
+    print(f"Pesajes nuevos:        {report.weights}")
+    print(f"Descartados:           {report.skipped}")
+    print(f"Duplicados fusionados: {report.merged}")
+    if report.resumed_from:
+        print(f"Reanudado tras {report.resumed_from} elementos")
+    print(f"Tiempo: {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
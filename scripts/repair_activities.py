@@ -1,9 +1,13 @@
 import sqlite3
 import pandas as pd
 import os
+import sys
 import shutil
 from datetime import datetime
 
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from services.dedup import deduplicate
+
 DB_PATH = os.path.join(os.getcwd(), 'db', 'bioengine_v3.db')
 BACKUP_PATH = os.path.join(os.getcwd(), 'db', 'bioengine_v3.backup_repair.db')
 
@@ -20,33 +24,14 @@ def get_connection():
 
 def step_1_merge_confirmed_duplicates(conn):
     """
-    Fusiona el caso específico detectado o re-escanea buscando duplicados exactos de tiempo.
-    En este caso, sabemos que el ID de Apple debe ser eliminado en favor del de Garmin.
+    Fusiona duplicados entre fuentes con el barrido de services/dedup.py
+    (ventana de 15 min, la fuente más fiable se conserva y se completa con los datos de la otra).
     """
     print("\n--- Step 1: Merging Duplicates ---")
-    cursor = conn.cursor()
-    
-    # Lógica de detección rápida: Ventana de 15 min, distinta fuente
-    # Buscar pares Apple (malo) vs Otro (bueno)
-    query = """
-    SELECT a.id as bad_id, b.id as good_id, a.fecha, a.duracion_min, b.fuente as good_source
-    FROM activities a
-    JOIN activities b ON abs(strftime('%s', a.fecha) - strftime('%s', b.fecha)) < 900 -- 15 mins diff
-    WHERE a.fuente = 'Apple' 
-      AND (a.distancia_km < 0.1 OR a.calorias < 5)
-      AND b.fuente != 'Apple'
-      AND b.distancia_km > 0.1
-    """
-    
-    rows = cursor.execute(query).fetchall()
-    print(f"Found {len(rows)} duplicates to merge.")
-    
-    for row in rows:
-        bad_id, good_id, date, dur, source = row
-        print(f"Merging: Deleting Apple Activity {bad_id} ({date}, {dur}min) in favor of {source} {good_id}")
-        cursor.execute("DELETE FROM activities WHERE id = ?", (bad_id,))
-    
-    conn.commit()
+    plans = deduplicate(conn, window_s=900)
+    print(f"Found {len(plans)} duplicate groups.")
+    for plan in plans:
+        print(f"Merged: kept {plan.keeper_id}, deleted {plan.duplicate_ids}, filled {sorted(plan.updates)}")
 
 def step_2_repair_ghosts(conn):
     """
@@ -1,59 +1,55 @@
+"""
+Migra los datos de BioEngine V2 (CSV de actividades y peso, contexto JSON) a
+una base V3.
+
+Uso:
+    python scripts/v2_to_v3_migrator.py --v2 RUTA_V2 [--db ruta.db] [--fresh]
+
+`--db` es por defecto config.DB_PATH. Si la base ya existe hay que pasar
+`--fresh` para borrarla y empezar de cero (evita duplicados).
+"""
+
 import sqlite3
-import pandas as pd
 import os
+import sys
 import json
+import argparse
 from datetime import datetime
 
-# Configuración de rutas
-V2_PATH = r"c:\BioEngine_Gonzalo"
-V3_PATH = r"c:\BioEngine_V3"
-DB_PATH = os.path.join(V3_PATH, "db\bioengine_v3.db")
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from config import DB_PATH as DEFAULT_DB_PATH
+from migrations import run_migrations
+from services.bulk_import import ImportSpec, import_file
+
+# Configuración de rutas (se fijan desde la línea de comandos en main)
+V2_PATH = os.getenv("BIOENGINE_V2_PATH", "")
+DB_PATH = DEFAULT_DB_PATH
+
+# Mapeo declarativo columna V3 <- columna del CSV de V2
+ACTIVITY_SPEC = ImportSpec("activities", {
+    "fecha": "Fecha",
+    "tipo": "Tipo",
+    "distancia_km": "Distancia (km)",
+    "duracion_min": "Duracion (min)",
+    "calorias": "Calorias",
+    "fc_media": "FC Media",
+    "fc_max": "FC Max",
+    "elevacion_m": "Elevacion (m)",
+    "cadencia_media": "Cadencia_Media",
+    "fuente": "Fuente",
+}, date_column="fecha", required=("fecha",))
+
+WEIGHT_SPEC = ImportSpec("biometrics", {
+    "fecha": "Fecha",
+    "peso": "Peso",
+    "grasa_pct": "Grasa_Pct",
+    "masa_muscular_kg": "Masa_Muscular_Kg",
+    "fuente": "Fuente",
+}, date_column="fecha", required=("fecha",))
 
 def create_schema(conn):
-    cursor = conn.cursor()
-    
-    # Tabla de Actividades
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS activities (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        fecha DATETIME,
-        tipo TEXT,
-        distancia_km REAL,
-        duracion_min REAL,
-        calorias REAL,
-        fc_media INTEGER,
-        fc_max INTEGER,
-        elevacion_m REAL,
-        cadencia_media INTEGER,
-        calzado TEXT,
-        evento_nombre TEXT,
-        stress_score REAL,
-        fuente TEXT
-    )
-    ''')
-    
-    # Tabla de Peso
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS biometrics (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        fecha DATETIME,
-        peso REAL,
-        grasa_pct REAL,
-        masa_muscular_kg REAL,
-        fuente TEXT
-    )
-    ''')
-    
-    # Tabla de Contexto / Config
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS user_context (
-        key TEXT PRIMARY KEY,
-        value_json TEXT,
-        updated_at DATETIME
-    )
-    ''')
-    
-    conn.commit()
+    # El esquema V3 completo (índices, rollups, triggers) lo crean las migraciones
+    run_migrations(DB_PATH)
 
 def migrate_sport_data(conn):
     csv_path = os.path.join(V2_PATH, "data_processed", "historial_deportivo_total_full.csv")
@@ -63,32 +59,8 @@ def migrate_sport_data(conn):
         
     if os.path.exists(csv_path):
         print(f"Migrando actividades desde {csv_path}...")
-        df = pd.read_csv(csv_path, sep=';')
-        
-        # Limpiar datos para SQLite
-        df['Fecha'] = pd.to_datetime(df['Fecha'])
-        
-        # Mapeo de columnas a nombres internos si es necesario
-        # df.rename(columns={...}, inplace=True)
-        
-        # Insertar en bloques para eficiencia
-        for idx, row in df.iterrows():
-            conn.execute('''
-            INSERT INTO activities (fecha, tipo, distancia_km, duracion_min, calorias, fc_media, fc_max, elevacion_m, cadencia_media, fuente)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                row.get('Fecha').isoformat() if hasattr(row.get('Fecha'), 'isoformat') else row.get('Fecha'), 
-                row.get('Tipo'), 
-                row.get('Distancia (km)'), 
-                row.get('Duracion (min)'), 
-                row.get('Calorias'),
-                row.get('FC Media'),
-                row.get('FC Max'),
-                row.get('Elevacion (m)'),
-                row.get('Cadencia_Media'),
-                row.get('Fuente')
-            ))
-        print(f"DONE: {len(df)} actividades migradas.")
+        report = import_file(conn, csv_path, ACTIVITY_SPEC, sep=';')
+        print(f"DONE: {report}")
     else:
         print("ERROR: No se encontró el archivo maestro de deportes.")
 
@@ -96,21 +68,8 @@ def migrate_weight_data(conn):
     csv_path = os.path.join(V2_PATH, "data_processed", "historial_completo_peso_full.csv")
     if os.path.exists(csv_path):
         print(f"Migrando biometría desde {csv_path}...")
-        df = pd.read_csv(csv_path, sep=';')
-        df['Fecha'] = pd.to_datetime(df['Fecha'])
-        
-        for idx, row in df.iterrows():
-            conn.execute('''
-            INSERT INTO biometrics (fecha, peso, grasa_pct, masa_muscular_kg, fuente)
-            VALUES (?, ?, ?, ?, ?)
-            ''', (
-                row.get('Fecha').isoformat() if hasattr(row.get('Fecha'), 'isoformat') else row.get('Fecha'),
-                row.get('Peso'),
-                row.get('Grasa_Pct'),
-                row.get('Masa_Muscular_Kg'),
-                row.get('Fuente')
-            ))
-        print(f"DONE: {len(df)} registros de peso migrados.")
+        report = import_file(conn, csv_path, WEIGHT_SPEC, sep=';')
+        print(f"DONE: {report}")
 
 def migrate_context(conn):
     json_path = os.path.join(V2_PATH, "sync_data", "user_context.json")
@@ -121,11 +80,22 @@ def migrate_context(conn):
                         ('main_context', json.dumps(data), datetime.now().isoformat()))
         print("DONE: Contexto de usuario migrado.")
 
-def main():
-    if not os.path.exists(V3_PATH):
-        os.makedirs(V3_PATH)
+def main(argv=None):
+    global V2_PATH, DB_PATH
+    parser = argparse.ArgumentParser(description="Migración de datos BioEngine V2 -> V3")
+    parser.add_argument("--v2", default=V2_PATH, required=not V2_PATH, help="Carpeta raíz de BioEngine V2")
+    parser.add_argument("--db", default=DB_PATH, help="Base de datos V3 de destino")
+    parser.add_argument("--fresh", action="store_true", help="Borrar la base de destino si ya existe")
+    args = parser.parse_args(argv)
+    V2_PATH, DB_PATH = args.v2, args.db
+
+    db_dir = os.path.dirname(os.path.abspath(DB_PATH))
+    if not os.path.exists(db_dir):
+        os.makedirs(db_dir)
         
     if os.path.exists(DB_PATH):
+        if not args.fresh:
+            sys.exit(f"ERROR: {DB_PATH} ya existe; usa --fresh para borrarla y migrar de cero.")
         os.remove(DB_PATH) # Empezar de cero para evitar duplicados en la prueba
         
     conn = sqlite3.connect(DB_PATH)